@@ -0,0 +1,137 @@
+"""
+Read-replica routing.
+
+Writes (ingestion, results, users, sessions) always go to `default`. Reads
+of NHL models are sent to the `replica` alias, but only inside views
+decorated with `read_from_replica` (dashboard, player page, JSON API,
+exports) and only while the replica's lag is under
+REPLICA_MAX_LAG_SECONDS; otherwise they fall back to the primary.
+Without a `replica` database configured, everything stays on `default`.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+REPLICA_APPS = {'nhl'}
+
+# Seconds since the last replayed transaction, 0 when fully caught up
+# (an idle primary would otherwise look like a lagging replica).
+POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_lag_lock = threading.Lock()
+_lag_cache = {'checked_at': None, 'lag': 0.0}
+
+
+def probe_lag(alias=REPLICA):
+    """Current replication lag of `alias` in seconds (inf if it cannot be reached)."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(POSTGRES_LAG_SQL)
+            return float(cursor.fetchone()[0] or 0.0)
+    except DatabaseError as e:
+        logger.warning("Replica lag check failed: %s", e)
+        return float('inf')
+
+
+def replica_lag():
+    """`probe_lag()`, cached for REPLICA_LAG_CHECK_SECONDS per process."""
+    now = time.monotonic()
+    with _lag_lock:
+        checked_at = _lag_cache['checked_at']
+        if checked_at is not None and now - checked_at < settings.REPLICA_LAG_CHECK_SECONDS:
+            return _lag_cache['lag']
+    lag = probe_lag(REPLICA)
+    with _lag_lock:
+        _lag_cache.update(checked_at=now, lag=lag)
+    return lag
+
+
+def reset_lag_cache():
+    with _lag_lock:
+        _lag_cache.update(checked_at=None, lag=0.0)
+
+
+def read_alias():
+    """Alias that replica-eligible reads should use right now."""
+    if REPLICA not in connections.settings:
+        return PRIMARY
+    lag = replica_lag()
+    if lag > settings.REPLICA_MAX_LAG_SECONDS:
+        logger.info("Replica lag %.1fs over threshold, reading from primary", lag)
+        return PRIMARY
+    return REPLICA
+
+
+def read_from_replica(view_func):
+    """Let NHL model reads of this view (sync or async) go to the replica."""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_wrapped_view(*args, **kwargs):
+            token = _replica_reads.set(True)
+            try:
+                return await view_func(*args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+
+        return _async_wrapped_view
+
+    @wraps(view_func)
+    def _wrapped_view(*args, **kwargs):
+        token = _replica_reads.set(True)
+        try:
+            return view_func(*args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+
+    return _wrapped_view
+
+
+@contextmanager
+def use_primary():
+    """Force reads back to the primary, e.g. to read one's own writes."""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and model._meta.app_label in REPLICA_APPS:
+            return read_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {PRIMARY, REPLICA}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives the schema through replication.
+        return db != REPLICA
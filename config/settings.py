@@ -63,6 +63,7 @@ SITE_ID = 1
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # WhiteNoise juste après Security
+    'core.middleware.PerformanceMiddleware',  # Server-Timing, slow log, histogrammes
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -88,8 +89,24 @@ TEMPLATES = [
             ],
         },
     },
+    {
+        # Hot NHL pages (dashboard, match list, player page): templates in <app>/jinja2/
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'environment': 'core.jinja_env.environment',
+            'context_processors': [
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
 ]
 
+# Engine rendering the NHL pages: 'jinja2' or 'django' (same view models, same HTML)
+NHL_TEMPLATE_ENGINE = os.environ.get('NHL_TEMPLATE_ENGINE', 'jinja2')
+
 WSGI_APPLICATION = 'config.wsgi.application'
 
 # Authentication settings
@@ -101,14 +118,46 @@ LOGIN_URL = 'login'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# "wsgi" (gunicorn gthread) or "asgi" (gunicorn + uvicorn workers), see gunicorn_config.py
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi').lower()
+
+# Connection pooling (psycopg 3 pool, Django 5.1+). Pools live in each process
+# (gunicorn worker, cron command), so size them per process type through the
+# environment: total connections = processes x DB_POOL_MAX_SIZE. 0 disables it.
+# On by default under ASGI, which can't keep persistent connections: without
+# a pool every request opens one (loadtest: half the throughput).
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '8' if SERVER_MODE == 'asgi' else '0'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+
+# Prime each web worker (URLconf, heavy imports, templates, DB connections,
+# caches) before its first request, see core/warmup.py
+WARMUP_ON_START = os.environ.get('WARMUP_ON_START', 'True') == 'True'
+
+
+def _database(url):
+    if DB_POOL_MAX_SIZE > 0:
+        # A pooled connection is returned to the pool at the end of each request.
+        config = dj_database_url.parse(url, conn_max_age=0)
+        config.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': min(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE),
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+        }
+        return config
+    return dj_database_url.parse(
+        url,
+        # Persistent connections are per-thread: under ASGI each request may
+        # run its ORM calls on a different thread, so they would pile up.
+        conn_max_age=0 if SERVER_MODE == 'asgi' else 600,
+        conn_health_checks=True,
+    )
+
+
 # PostgreSQL configuration for Supabase
 if os.environ.get('DATABASE_URL'):
     DATABASES = {
-        'default': dj_database_url.config(
-            default=os.environ.get('DATABASE_URL'),
-            conn_max_age=600,
-            conn_health_checks=True,
-        )
+        'default': _database(os.environ['DATABASE_URL']),
     }
 else:
     # Fallback to SQLite for local development
@@ -119,6 +168,29 @@ else:
         }
     }
 
+# Cache: local memory by default. Use a shared backend in production
+# (CACHE_BACKEND=django.core.cache.backends.redis.RedisCache, CACHE_LOCATION=redis://...)
+# so that the dashboard version bumped by ingestion commands reaches the web workers.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+# Dashboard match cards are cached per version (nhl.cache) for at most this long; 0 disables it
+DASHBOARD_CACHE_SECONDS = int(os.environ.get('DASHBOARD_CACHE_SECONDS', '60'))
+
+# Optional read replica: read-only NHL views and exports read from it
+# (see config/routers.py) unless its lag exceeds REPLICA_MAX_LAG_SECONDS.
+if os.environ.get('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = _database(os.environ['DATABASE_REPLICA_URL'])
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['config.routers.ReplicaRouter']
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', '30'))
+# Lag is probed at most once per interval per process
+REPLICA_LAG_CHECK_SECONDS = float(os.environ.get('REPLICA_LAG_CHECK_SECONDS', '5'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -233,6 +305,188 @@ STRIPE_PUBLIC_KEY = os.environ.get('STRIPE_PUBLIC_KEY', '')
 STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY', '')
 STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET', '')
 STRIPE_PRICE_ID = os.environ.get('STRIPE_PRICE_ID', '')
+# Webhook events applied per transaction by the background processor
+STRIPE_EVENT_BATCH_SIZE = int(os.environ.get('STRIPE_EVENT_BATCH_SIZE', '100'))
+
+
+# ==============================================================================
+# PERFORMANCE INSTRUMENTATION
+# ==============================================================================
+
+# Server-Timing headers, slow-request log and per-route histograms (core.middleware)
+PERF_INSTRUMENTATION = os.environ.get('PERF_INSTRUMENTATION', 'True') == 'True'
+# Requests slower than this are logged with their slowest queries
+PERF_SLOW_REQUEST_MS = float(os.environ.get('PERF_SLOW_REQUEST_MS', '500'))
+PERF_SLOW_QUERY_COUNT = int(os.environ.get('PERF_SLOW_QUERY_COUNT', '5'))
+
+
+# ==============================================================================
+# NHL API & LIVE RESULTS
+# ==============================================================================
+
+NHL_API_BASE_URL = os.environ.get('NHL_API_BASE_URL', 'https://api-web.nhle.com/v1')
+
+# Live poller intervals (seconds): in play, during intermissions, max pre-game wait
+LIVE_POLL_INTERVAL = int(os.environ.get('LIVE_POLL_INTERVAL', '15'))
+LIVE_POLL_INTERMISSION_INTERVAL = int(os.environ.get('LIVE_POLL_INTERMISSION_INTERVAL', '60'))
+LIVE_POLL_MAX_INTERVAL = int(os.environ.get('LIVE_POLL_MAX_INTERVAL', '300'))
+
+# SSE stream, served under ASGI only: under WSGI each stream would hold a
+# gthread thread and its DB connection for its whole lifetime. There the
+# dashboard reloads its match list every DASHBOARD_REFRESH_SECONDS instead.
+LIVE_STREAM_ENABLED = SERVER_MODE == 'asgi'
+DASHBOARD_REFRESH_SECONDS = int(os.environ.get('DASHBOARD_REFRESH_SECONDS', '60'))
+# DB check interval and max connection lifetime (EventSource reconnects)
+LIVE_STREAM_POLL_SECONDS = float(os.environ.get('LIVE_STREAM_POLL_SECONDS', '2'))
+LIVE_STREAM_MAX_SECONDS = int(os.environ.get('LIVE_STREAM_MAX_SECONDS', '300'))
+# Open streams per process (coroutines)
+LIVE_STREAM_MAX_CONNECTIONS = int(os.environ.get('LIVE_STREAM_MAX_CONNECTIONS', '500'))
+# Over the cap, clients are told to reconnect after this delay (SSE retry:)
+LIVE_STREAM_BUSY_RETRY_MS = int(os.environ.get('LIVE_STREAM_BUSY_RETRY_MS', '30000'))
+
+# Pre-game lineup watcher (manage.py watch_lineups): starts following a game
+# this long before puck drop, polling every seconds_to_start / 10 within bounds
+LINEUP_WATCH_WINDOW_MINUTES = int(os.environ.get('LINEUP_WATCH_WINDOW_MINUTES', '180'))
+LINEUP_POLL_MIN_INTERVAL = int(os.environ.get('LINEUP_POLL_MIN_INTERVAL', '30'))
+LINEUP_POLL_MAX_INTERVAL = int(os.environ.get('LINEUP_POLL_MAX_INTERVAL', '300'))
+
+
+# ==============================================================================
+# INGESTION SCHEDULER (manage.py run_scheduler)
+# ==============================================================================
+
+# Local times (TIME_ZONE) at which the daily jobs become due
+SCHEDULE_PLAYERS_AT = os.environ.get('SCHEDULE_PLAYERS_AT', '11:30')
+SCHEDULE_RESULTS_AT = os.environ.get('SCHEDULE_RESULTS_AT', '12:00')
+SCHEDULE_PROJECTIONS_AT = os.environ.get('SCHEDULE_PROJECTIONS_AT', '16:00')
+SCHEDULE_INJURIES_AT = os.environ.get('SCHEDULE_INJURIES_AT', '16:30')
+# watch_lineups runs for hours (until the last puck drop): run it in its own
+# process, `run_scheduler --only watch_lineups`, and skip it in the main one
+SCHEDULE_LINEUPS_AT = os.environ.get('SCHEDULE_LINEUPS_AT', '16:15')
+SCHEDULER_TICK_SECONDS = int(os.environ.get('SCHEDULER_TICK_SECONDS', '60'))
+# A failed job is retried after this delay, at most this many times per day
+SCHEDULER_RETRY_MINUTES = int(os.environ.get('SCHEDULER_RETRY_MINUTES', '15'))
+SCHEDULER_MAX_ATTEMPTS = int(os.environ.get('SCHEDULER_MAX_ATTEMPTS', '3'))
+# A job waits at most this long past its time for its dependencies to succeed
+SCHEDULER_DEPENDENCY_WAIT_MINUTES = int(os.environ.get('SCHEDULER_DEPENDENCY_WAIT_MINUTES', '120'))
+
+
+# ==============================================================================
+# BACKGROUND TASK QUEUE
+# ==============================================================================
+# DB-backed queue (nhl.tasks) served by `manage.py run_tasks`. TASK_WORKERS
+# is the number of worker processes (0 = one per CPU core, for backfills).
+TASK_WORKERS = int(os.environ.get('TASK_WORKERS', '1'))
+TASK_POLL_SECONDS = float(os.environ.get('TASK_POLL_SECONDS', '2'))
+# A running task beats every TASK_HEARTBEAT_SECONDS (background thread);
+# without a heartbeat for TASK_STALE_SECONDS it is requeued
+TASK_HEARTBEAT_SECONDS = float(os.environ.get('TASK_HEARTBEAT_SECONDS', '30'))
+TASK_STALE_SECONDS = int(os.environ.get('TASK_STALE_SECONDS', '600'))
+TASK_MAX_ATTEMPTS = int(os.environ.get('TASK_MAX_ATTEMPTS', '3'))
+# Retry n waits TASK_RETRY_BASE_SECONDS * 2^(n-1)
+TASK_RETRY_BASE_SECONDS = int(os.environ.get('TASK_RETRY_BASE_SECONDS', '30'))
+
+
+# ==============================================================================
+# INGESTION PIPELINE
+# ==============================================================================
+# fetch_nhl_data streams fetch -> parse -> project -> persist through
+# bounded queues (nhl.pipeline); a full queue blocks the stage upstream.
+PIPELINE_FETCH_WORKERS = int(os.environ.get('PIPELINE_FETCH_WORKERS', '4'))
+PIPELINE_PROJECT_WORKERS = int(os.environ.get('PIPELINE_PROJECT_WORKERS', '1'))
+PIPELINE_PERSIST_WORKERS = int(os.environ.get('PIPELINE_PERSIST_WORKERS', '1'))
+PIPELINE_PERSIST_BATCH = int(os.environ.get('PIPELINE_PERSIST_BATCH', '200'))
+PIPELINE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE', '64'))
+
+
+# ==============================================================================
+# PAYLOAD ARCHIVE
+# ==============================================================================
+# Raw API responses of every ingestion run, content-addressed (nhl.archive),
+# so `--replay <run>` can recompute a run offline. 'db' keeps the blobs in
+# the database next to their index (a container's disk does not survive a
+# redeploy); 'files' writes them under PAYLOAD_ARCHIVE_DIR (a mounted volume).
+PAYLOAD_ARCHIVE_ENABLED = os.environ.get('PAYLOAD_ARCHIVE_ENABLED', 'True') == 'True'
+PAYLOAD_ARCHIVE_STORAGE = os.environ.get('PAYLOAD_ARCHIVE_STORAGE', 'db')
+PAYLOAD_ARCHIVE_DIR = os.environ.get('PAYLOAD_ARCHIVE_DIR', str(BASE_DIR / 'archive'))
+# 'gzip' or 'zstd' (requires zstandard)
+PAYLOAD_ARCHIVE_COMPRESSION = os.environ.get('PAYLOAD_ARCHIVE_COMPRESSION', 'gzip')
+
+
+# ==============================================================================
+# VIEW BENCHMARK BUDGETS
+# ==============================================================================
+# Checked by `manage.py bench_views` (on a `seed_lake` database): maximum
+# queries per request and p95 latency per view.
+BENCH_VIEW_BUDGETS = {
+    'dashboard': {'queries': 6, 'p95_ms': 400},
+    'player_detail': {'queries': 4, 'p95_ms': 150},
+    'index': {'queries': 4, 'p95_ms': 150},
+}
+
+# ==============================================================================
+# ENGINE BENCHMARK
+# ==============================================================================
+# `manage.py bench_engine` compares the projection engine's throughput to this
+# baseline and fails when a case is slower by more than the tolerance.
+BENCH_ENGINE_BASELINE = os.environ.get('BENCH_ENGINE_BASELINE', str(BASE_DIR / 'benchmarks' / 'engine_baseline.json'))
+BENCH_ENGINE_TOLERANCE = float(os.environ.get('BENCH_ENGINE_TOLERANCE', '0.15'))
+
+
+# ==============================================================================
+# DATA LAKE ADMIN
+# ==============================================================================
+# The GameStats changelist shows the planner's row estimate (PostgreSQL) and
+# only runs an exact COUNT(*) when the estimate is below this.
+ADMIN_EXACT_COUNT_BELOW = int(os.environ.get('ADMIN_EXACT_COUNT_BELOW', '10000'))
+# Bulk "recompute" actions queue one task per game date, up to this many dates
+ADMIN_MAX_ENQUEUE_DAYS = int(os.environ.get('ADMIN_MAX_ENQUEUE_DAYS', '31'))
+
+
+# ==============================================================================
+# INGESTION LEDGER & METRICS
+# ==============================================================================
+
+# Wall-time budget of a cron run (s), i.e. how long it may take before it
+# runs into the next scheduled job; exported to Prometheus and drawn on the
+# admin trend charts. fetch_nhl_data (16:00) must be done by injury_guardian (16:30).
+INGESTION_RUN_BUDGET_SECONDS = int(os.environ.get('INGESTION_RUN_BUDGET_SECONDS', '3600'))
+INGESTION_RUN_BUDGETS = {
+    'fetch_nhl_data': int(os.environ.get('FETCH_NHL_DATA_BUDGET_SECONDS', '1800')),
+}
+# Bearer token for Prometheus scrapes of /nhl/metrics/ (staff sessions always allowed)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+
+# ==============================================================================
+# PARLAY SIMULATOR (Monte Carlo)
+# ==============================================================================
+
+# Hard cap on simulations per request (protects web workers)
+PARLAY_MAX_SIMULATIONS = int(os.environ.get('PARLAY_MAX_SIMULATIONS', '1000000'))
+# Process pool size for large runs (1 = single process)
+PARLAY_SIM_WORKERS = int(os.environ.get('PARLAY_SIM_WORKERS', '1'))
+# Runs above this many simulations use the process pool
+PARLAY_POOL_THRESHOLD = int(os.environ.get('PARLAY_POOL_THRESHOLD', '250000'))
+
+
+# ==============================================================================
+# DATA LAKE EXPORT (Offline analytics)
+# ==============================================================================
+
+# Columnar snapshots written by `manage.py export_lake` and the schedule
+# index. Point it at a mounted volume in production: a container's disk is
+# reset on redeploy. Both rebuild from the database and the API.
+LAKE_DIR = os.environ.get('LAKE_DIR', str(BASE_DIR / 'lake'))
+# Feature store (game logs settled by fetch_game_results, rolling form): 'db'
+# keeps them in the database, so they survive a redeploy; 'files' writes
+# them under LAKE_DIR/game_logs/ (a mounted volume, or local development).
+FEATURE_STORE_STORAGE = os.environ.get('FEATURE_STORE_STORAGE', 'db')
+# Incremental exports rewrite the last N exported dates too: results, INJURED
+# scratches and performance_log outcomes settle after the day was exported
+LAKE_RESETTLE_DAYS = int(os.environ.get('LAKE_RESETTLE_DAYS', '3'))
+# The season schedule index (LAKE_DIR/schedule/) is rebuilt after this many days
+SCHEDULE_INDEX_MAX_AGE_DAYS = int(os.environ.get('SCHEDULE_INDEX_MAX_AGE_DAYS', '7'))
 
 
 # ==============================================================================
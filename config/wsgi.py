@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.WARMUP_ON_START:
+    from core.warmup import warm_up  # noqa: E402
+    warm_up()
@@ -1,3 +1,28 @@
+from django.contrib import admin, messages
 
-# Valid models here only
+from .models import StripeEvent
+from .stripe_events import schedule_processing
 
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ['type', 'event_id', 'customer_id', 'stripe_created', 'status', 'note']
+    list_filter = ['status', 'type']
+    search_fields = ['event_id', 'customer_id']
+    ordering = ['-stripe_created']
+    readonly_fields = [f.name for f in StripeEvent._meta.fields]
+    actions = ['reprocess_events']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description="Retraiter les événements sélectionnés")
+    def reprocess_events(self, request, queryset):
+        n = queryset.exclude(status=StripeEvent.STATUS_PENDING).update(
+            status=StripeEvent.STATUS_PENDING, note='', processed_at=None,
+        )
+        schedule_processing()
+        self.message_user(request, f"{n} événement(s) remis en traitement.", messages.SUCCESS)
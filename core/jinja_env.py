@@ -0,0 +1,32 @@
+"""
+Jinja2 environment of the 'jinja2' TEMPLATES backend (templates in
+<app>/jinja2/, used for the NHL pages, see settings.NHL_TEMPLATE_ENGINE).
+
+Provides the equivalents of what the Django templates load: `url()`,
+`static()`, `now()`, and from cortex_extras `blur_if_free(user, value)`
+and the `is_premium_check` filter. `request`, `csrf_input`, `user` and
+`messages` come from the backend and its context processors.
+"""
+
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils import timezone
+from jinja2 import Environment
+
+from core.templatetags.cortex_extras import blur_if_free, is_premium_check
+
+
+def url(name, *args, **kwargs):
+    return reverse(name, args=args or None, kwargs=kwargs or None)
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update(
+        url=url,
+        static=static,
+        now=timezone.localtime,
+        blur_if_free=blur_if_free,
+    )
+    env.filters['is_premium_check'] = is_premium_check
+    return env
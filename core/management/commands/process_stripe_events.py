@@ -0,0 +1,36 @@
+"""
+Stripe Event Processor
+======================
+Applies the Stripe webhook events stored by the webhook (core.StripeEvent)
+in Stripe creation order, in batches: premium on checkout / successful
+invoice, removed on cancellation or expiry. Normally run by the task
+worker (task `process_stripe_events`, queued by the webhook).
+
+Usage:
+    python manage.py process_stripe_events
+    python manage.py process_stripe_events --batch-size 500
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.stripe_events import process_pending
+
+
+class Command(BaseCommand):
+    help = 'Apply pending Stripe webhook events to user entitlements'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.STRIPE_EVENT_BATCH_SIZE,
+            help='Events applied per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        counts = process_pending(batch_size=options['batch_size'])
+        if not counts:
+            self.stdout.write('No pending Stripe events.')
+            return
+        summary = ', '.join(f'{n} {status}' for status, n in sorted(counts.items()))
+        style = self.style.WARNING if counts.get('failed') else self.style.SUCCESS
+        self.stdout.write(style(f'[Stripe] {summary}'))
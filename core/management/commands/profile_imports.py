@@ -0,0 +1,142 @@
+"""
+Import Time Profiler
+====================
+Starts each entry point in a fresh interpreter under `python -X importtime`
+and reports what its cold start costs: wall time to ready, total import
+time, the slowest top-level packages (self time of all their modules) and
+whether the known heavy modules (stripe, requests, numpy) were loaded.
+
+Entry points:
+    wsgi / asgi   a web worker: config.wsgi (or asgi) imported, URLconf
+                  loaded, as on its first request (warm-up off, so the
+                  numbers show what the first request would pay);
+    <command>     a cron invocation of `manage.py <command>`: setup, the
+                  command module and the system checks run before handle().
+
+Usage:
+    python manage.py profile_imports
+    python manage.py profile_imports --entry wsgi fetch_nhl_data run_tasks --top 15
+    python manage.py profile_imports --save imports.json
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management import get_commands
+from django.core.management.base import BaseCommand, CommandError
+
+HEAVY_MODULES = ('stripe', 'requests', 'numpy')
+DEFAULT_ENTRIES = ('wsgi', 'asgi', 'fetch_nhl_data', 'fetch_game_results', 'injury_guardian', 'run_tasks')
+IMPORT_LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+WEB_SCRIPT = """
+import os
+os.environ['WARMUP_ON_START'] = 'False'
+import config.{server}
+from django.urls import get_resolver
+get_resolver().url_patterns
+"""
+
+COMMAND_SCRIPT = """
+import os
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+import django
+django.setup()
+from django.core.management import get_commands, load_command_class
+command = load_command_class(get_commands()[{name!r}], {name!r})
+if command.requires_system_checks:
+    command.check()
+"""
+
+
+def entry_script(entry):
+    if entry in ('wsgi', 'asgi'):
+        return WEB_SCRIPT.format(server=entry)
+    return COMMAND_SCRIPT.format(name=entry)
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] from `-X importtime` output."""
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules
+
+
+def profile_entry(entry, repeat):
+    """Best-of-`repeat` wall time, with the import breakdown of that run."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', entry_script(entry)],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'config.settings'},
+        )
+        wall = time.perf_counter() - start
+        if process.returncode != 0:
+            raise CommandError(f'{entry} failed to start:\n{process.stderr[-2000:]}')
+        if best is None or wall < best[0]:
+            best = (wall, process.stderr)
+    wall, stderr = best
+    modules = parse_importtime(stderr)
+
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in modules:
+        by_package[name.split('.')[0]] += self_us
+    loaded = {name for name, _, _, _ in modules}
+    return {
+        'wall_ms': round(wall * 1000, 1),
+        'imports_ms': round(sum(cumulative for _, _, cumulative, depth in modules if depth == 0) / 1000, 1),
+        'modules': len(modules),
+        'packages': {
+            package: round(us / 1000, 1)
+            for package, us in sorted(by_package.items(), key=lambda item: -item[1])
+        },
+        'heavy': {module: module in loaded for module in HEAVY_MODULES},
+    }
+
+
+class Command(BaseCommand):
+    help = 'Report the cold-start import cost of the web workers and management commands'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entry', nargs='+', default=list(DEFAULT_ENTRIES),
+                            help='wsgi, asgi and/or management command names.')
+        parser.add_argument('--top', type=int, default=10, help='Slowest packages shown per entry point.')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per entry point (the fastest counts).')
+        parser.add_argument('--save', help='Write the results as JSON.')
+
+    def handle(self, *args, **options):
+        commands = get_commands()
+        unknown = [entry for entry in options['entry'] if entry not in ('wsgi', 'asgi') and entry not in commands]
+        if unknown:
+            raise CommandError(f"Unknown entry point(s): {', '.join(unknown)}")
+
+        results = {}
+        for entry in options['entry']:
+            result = profile_entry(entry, max(1, options['repeat']))
+            results[entry] = result
+            heavy = [module for module, loaded in result['heavy'].items() if loaded]
+            self.stdout.write(self.style.SUCCESS(
+                f"{entry}: {result['wall_ms']} ms to ready, {result['imports_ms']} ms importing "
+                f"{result['modules']} modules"
+            ))
+            if heavy:
+                self.stdout.write(self.style.WARNING(f"  heavy modules loaded: {', '.join(heavy)}"))
+            for package, ms in list(result['packages'].items())[:options['top']]:
+                self.stdout.write(f'  {ms:>8} ms  {package}')
+
+        if options['save']:
+            with open(options['save'], 'w') as f:
+                json.dump({'python': sys.version.split()[0], 'entries': results}, f, indent=2)
+            self.stdout.write(f"Results saved to {options['save']}")
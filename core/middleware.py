@@ -0,0 +1,316 @@
+"""
+Per-request performance instrumentation.
+
+`PerformanceMiddleware` records, for every request: SQL query count and
+time, view time, and any named spans opened with `timed()` (template
+rendering, Python grouping...). It then
+- adds a `Server-Timing` header (visible in the browser devtools),
+- logs requests slower than PERF_SLOW_REQUEST_MS with their slowest queries,
+- feeds in-process histograms per URL name (see `core.views.perf_histograms`).
+
+A streaming response (export, SSE) sends its headers before its body is
+produced: its `Server-Timing` covers the view only (a `stream` metric says
+so), and the measurement is closed when the body is exhausted or the client
+disconnects, with the queries run while streaming.
+
+Queries are captured with a DB execute wrapper installed on every
+connection; the current request is found through a ContextVar, so queries
+run by the async ORM in a worker thread are attributed correctly.
+"""
+
+import heapq
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('cortex.perf')
+
+# Histogram bucket upper bounds (ms); the last bucket is open-ended.
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current = ContextVar('perf_collector', default=None)
+
+# ==============================================================================
+# COLLECTION
+# ==============================================================================
+
+class RequestTimings:
+    """Timings of one request (all durations in seconds)."""
+
+    def __init__(self, slow_query_count):
+        self.queries = 0
+        self.db = 0.0
+        self.spans = {}
+        self._slowest = []  # min-heap of (duration, seq, sql)
+        self._keep = slow_query_count
+        self._lock = threading.Lock()
+
+    def add_query(self, sql, duration):
+        with self._lock:
+            self.queries += 1
+            self.db += duration
+            item = (duration, self.queries, sql)
+            if len(self._slowest) < self._keep:
+                heapq.heappush(self._slowest, item)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def add_span(self, name, duration):
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + duration
+
+    @property
+    def slowest_queries(self):
+        return [(duration, sql) for duration, _, sql in sorted(self._slowest, reverse=True)]
+
+
+def _record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(sql, time.perf_counter() - start)
+
+
+def _install_wrapper(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _install_wrapper(connection)
+
+
+@contextmanager
+def timed(name):
+    """Add the duration of the block to the current request's `name` span."""
+    timings = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.add_span(name, time.perf_counter() - start)
+
+# ==============================================================================
+# HISTOGRAMS
+# ==============================================================================
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def observe(self, value_ms):
+        self.count += 1
+        self.sum += value_ms
+        self.max = max(self.max, value_ms)
+        for i, bound in enumerate(BUCKETS_MS):
+            if value_ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile, capped at the observed max."""
+        if not self.count:
+            return None
+        rank, seen, top = q * self.count, 0, round(self.max, 1)
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return min(BUCKETS_MS[i], top) if i < len(BUCKETS_MS) else top
+        return top
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.sum / self.count, 1) if self.count else None,
+            'p50_ms': self.quantile(0.50),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'max_ms': round(self.max, 1),
+            'buckets': dict(zip([str(b) for b in BUCKETS_MS] + ['+Inf'], self.buckets)),
+        }
+
+
+class RouteStats:
+    """In-process histograms per URL name (one instance per worker process)."""
+
+    METRICS = ('total', 'view', 'db', 'render')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.routes = {}
+
+    def observe(self, route, total_ms, view_ms, timings):
+        with self._lock:
+            stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes[route] = {
+                    'metrics': {name: Histogram() for name in self.METRICS},
+                    'queries': 0,
+                }
+            stats['metrics']['total'].observe(total_ms)
+            stats['metrics']['view'].observe(view_ms)
+            stats['metrics']['db'].observe(timings.db * 1000)
+            stats['metrics']['render'].observe(timings.spans.get('render', 0.0) * 1000)
+            stats['queries'] += timings.queries
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'since': self.started_at,
+                'buckets_ms': list(BUCKETS_MS),
+                'routes': {
+                    route: {
+                        'count': stats['metrics']['total'].count,
+                        'queries_per_request': round(stats['queries'] / stats['metrics']['total'].count, 1),
+                        **{name: h.as_dict() for name, h in stats['metrics'].items()},
+                    }
+                    for route, stats in sorted(self.routes.items())
+                },
+            }
+
+
+route_stats = RouteStats()
+
+# ==============================================================================
+# MIDDLEWARE
+# ==============================================================================
+
+class PerformanceMiddleware:
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = settings.PERF_INSTRUMENTATION
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(_on_connection_created, dispatch_uid='cortex_perf_queries')
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        timings, token, start = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, start)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        timings, token, start = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, start)
+
+    def _start(self):
+        # Connections opened before this process loaded the middleware
+        # (or reused from a previous request) get the wrapper here.
+        for connection in connections.all(initialized_only=True):
+            _install_wrapper(connection)
+        timings = RequestTimings(settings.PERF_SLOW_QUERY_COUNT)
+        return timings, _current.set(timings), time.perf_counter()
+
+    def _finish(self, request, response, timings, start):
+        total_ms = (time.perf_counter() - start) * 1000
+        response['Server-Timing'] = self._server_timing(timings, total_ms, response.streaming)
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._astream(request, response.streaming_content, timings, start, total_ms)
+            else:
+                response.streaming_content = self._stream(request, response.streaming_content, timings, start, total_ms)
+        else:
+            self._observe(request, timings, total_ms, total_ms)
+        return response
+
+    def _stream(self, request, content, timings, start, headers_ms):
+        iterator = iter(content)
+        try:
+            while True:
+                token = _current.set(timings)
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    _current.reset(token)
+                yield chunk
+        finally:
+            self._observe(request, timings, (time.perf_counter() - start) * 1000, headers_ms)
+
+    async def _astream(self, request, content, timings, start, headers_ms):
+        iterator = aiter(content)
+        try:
+            while True:
+                token = _current.set(timings)
+                try:
+                    chunk = await anext(iterator)
+                except StopAsyncIteration:
+                    return
+                finally:
+                    _current.reset(token)
+                yield chunk
+        finally:
+            self._observe(request, timings, (time.perf_counter() - start) * 1000, headers_ms)
+
+    @staticmethod
+    def _server_timing(timings, total_ms, streaming):
+        span_ms = {name: duration * 1000 for name, duration in timings.spans.items()}
+        view_ms = max(total_ms - span_ms.get('render', 0.0), 0.0)
+        metrics = [f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} queries"',
+                   f'view;dur={view_ms:.1f}']
+        metrics += [f'{name};dur={duration:.1f}' for name, duration in span_ms.items()]
+        metrics.append(f'total;dur={total_ms:.1f}')
+        if streaming:
+            metrics.append('stream;desc="body not included"')
+        return ', '.join(metrics)
+
+    def _observe(self, request, timings, total_ms, headers_ms):
+        """
+        Histograms and slow-request log. `headers_ms` is the time until the
+        response was returned: the slow-request threshold applies to it, as a
+        stream's body time is paced by its content (SSE) or the client.
+        """
+        span_ms = {name: duration * 1000 for name, duration in timings.spans.items()}
+        view_ms = max(total_ms - span_ms.get('render', 0.0), 0.0)
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match else 'unresolved'
+        route_stats.observe(route, total_ms, view_ms, timings)
+
+        if headers_ms >= settings.PERF_SLOW_REQUEST_MS:
+            lines = [
+                f'Slow request {request.method} {request.path} ({route}): {total_ms:.0f} ms, '
+                f'{timings.queries} queries / {timings.db * 1000:.0f} ms SQL'
+                + ''.join(f', {name} {duration:.0f} ms' for name, duration in span_ms.items())
+            ]
+            lines += [f'  {duration * 1000:8.1f} ms  {sql[:500]}' for duration, sql in timings.slowest_queries]
+            logger.warning('\n'.join(lines))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core', '0004_delete_player'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('type', models.CharField(max_length=100)),
+                ('customer_id', models.CharField(blank=True, db_index=True, max_length=255)),
+                ('stripe_created', models.DateTimeField(help_text='Event creation time at Stripe')),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('ignored', 'Ignored'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('note', models.TextField(blank=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['stripe_created', 'id'],
+                'indexes': [models.Index(fields=['status', 'stripe_created'], name='core_stripe_status_af2aec_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,37 @@
 from django.db import models
 
-# Create your models here.
+
+class StripeEvent(models.Model):
+    """
+    Raw Stripe webhook event, stored by `core.views.stripe_webhook` (one row
+    per Stripe event id, so retries and duplicates are ignored) and applied
+    later, in Stripe creation order, by `core.stripe_events.process_pending`.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSED = 'processed'
+    STATUS_IGNORED = 'ignored'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSED, 'Processed'),
+        (STATUS_IGNORED, 'Ignored'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    customer_id = models.CharField(max_length=255, blank=True, db_index=True)
+    stripe_created = models.DateTimeField(help_text='Event creation time at Stripe')
+    payload = models.JSONField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    note = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['stripe_created', 'id']
+        indexes = [models.Index(fields=['status', 'stripe_created'])]
+
+    def __str__(self):
+        return f"{self.type} {self.event_id} ({self.status})"
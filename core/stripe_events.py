@@ -0,0 +1,156 @@
+"""
+Deferred processing of Stripe webhook events.
+
+The webhook only verifies the signature and stores the raw event
+(`record_event`, one row per Stripe event id) before answering 200. The
+entitlement changes are applied later by `process_pending` (task
+`process_stripe_events`, drained by `run_tasks --once` from the deploy's
+cron, or `manage.py process_stripe_events`):
+
+- pending events are read in Stripe creation order, in batches;
+- users of a batch are loaded in two queries and saved with one bulk UPDATE;
+- an event older than the last one applied for the same customer is
+  ignored, so a late retry can't re-grant a cancelled subscription.
+"""
+
+import logging
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import StripeEvent
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = {'active', 'trialing'}
+ENDED_STATUSES = {'canceled', 'unpaid', 'incomplete_expired'}
+
+# ==============================================================================
+# WEBHOOK SIDE
+# ==============================================================================
+
+def record_event(event):
+    """Store a verified event (dict). Returns False if this event id was already stored."""
+    obj = event.get('data', {}).get('object', {})
+    customer = obj.get('customer')
+    if isinstance(customer, dict):
+        customer = customer.get('id')
+    if StripeEvent.objects.filter(event_id=event['id']).exists():
+        return False
+    try:
+        with transaction.atomic():
+            StripeEvent.objects.create(
+                event_id=event['id'],
+                type=event.get('type', ''),
+                customer_id=customer or '',
+                stripe_created=datetime.fromtimestamp(event.get('created', 0), tz=dt_timezone.utc),
+                payload=event,
+            )
+    except IntegrityError:  # the same event delivered concurrently
+        return False
+    return True
+
+
+def schedule_processing():
+    """Queue one processing task, unless one is already waiting."""
+    from nhl.models import Task
+    from nhl.tasks import enqueue
+
+    if not Task.objects.filter(name='process_stripe_events', status=Task.STATUS_QUEUED).exists():
+        enqueue('process_stripe_events', priority=Task.PRIORITY_HIGH)
+
+# ==============================================================================
+# PROCESSOR
+# ==============================================================================
+
+def entitlement(event_type, obj):
+    """New premium status for an event: True, False, or None (no change)."""
+    if event_type in ('checkout.session.completed', 'invoice.payment_succeeded'):
+        return True
+    if event_type == 'customer.subscription.deleted':
+        return False
+    if event_type in ('customer.subscription.created', 'customer.subscription.updated'):
+        status = obj.get('status')
+        if status in ACTIVE_STATUSES:
+            return True
+        if status in ENDED_STATUSES:
+            return False
+    return None
+
+
+def process_pending(batch_size=None):
+    """Apply every pending event; returns a Counter of resulting statuses."""
+    batch_size = batch_size or settings.STRIPE_EVENT_BATCH_SIZE
+    totals = Counter()
+    while True:
+        counts = process_batch(batch_size)
+        if not counts:
+            return totals
+        totals.update(counts)
+
+
+def process_batch(batch_size):
+    User = get_user_model()
+    now = timezone.now()
+    counts = Counter()
+
+    with transaction.atomic():
+        events = list(
+            StripeEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=StripeEvent.STATUS_PENDING)
+            .order_by('stripe_created', 'id')[:batch_size]
+        )
+        if not events:
+            return counts
+
+        user_ids = {
+            str(e.payload['data']['object'].get('client_reference_id'))
+            for e in events if str(e.payload['data']['object'].get('client_reference_id') or '').isdigit()
+        }
+        customers = {e.customer_id for e in events if e.customer_id}
+        users_by_id = {str(pk): user for pk, user in User.objects.in_bulk([int(pk) for pk in user_ids]).items()}
+        users_by_customer = {
+            user.stripe_customer_id: user for user in User.objects.filter(stripe_customer_id__in=customers)
+        }
+        # Latest event already applied per customer (out-of-order protection)
+        latest = dict(
+            StripeEvent.objects.filter(status=StripeEvent.STATUS_PROCESSED, customer_id__in=customers)
+            .values('customer_id').annotate(last=Max('stripe_created')).values_list('customer_id', 'last')
+        )
+
+        changed = {}
+        for event in events:
+            obj = event.payload['data']['object']
+            premium = entitlement(event.type, obj)
+            event.processed_at = now
+            if premium is None:
+                event.status, event.note = StripeEvent.STATUS_IGNORED, 'No entitlement change'
+            elif event.customer_id and event.customer_id in latest and event.stripe_created < latest[event.customer_id]:
+                event.status, event.note = StripeEvent.STATUS_IGNORED, 'Stale: a newer event was already applied'
+            else:
+                user = (users_by_id.get(str(obj.get('client_reference_id')))
+                        or users_by_customer.get(event.customer_id))
+                if user is None:
+                    event.status = StripeEvent.STATUS_FAILED
+                    event.note = f"User not found (client_reference_id={obj.get('client_reference_id')}, customer={event.customer_id})"
+                    logger.error("Stripe event %s: %s", event.event_id, event.note)
+                else:
+                    user.is_premium = premium
+                    if event.customer_id:
+                        user.stripe_customer_id = event.customer_id
+                        users_by_customer[event.customer_id] = user
+                        latest[event.customer_id] = event.stripe_created
+                    user.updated_at = now
+                    changed[user.pk] = user
+                    event.status, event.note = StripeEvent.STATUS_PROCESSED, ''
+                    logger.info("User %s premium=%s via Stripe event %s", user.email, premium, event.event_id)
+            counts[event.status] += 1
+
+        User.objects.bulk_update(changed.values(), ['is_premium', 'stripe_customer_id', 'updated_at'])
+        StripeEvent.objects.bulk_update(events, ['status', 'note', 'processed_at'])
+    return counts
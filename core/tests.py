@@ -1,3 +1,194 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import io
+import json
+import re
+import time
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from nhl.models import Task
+from nhl.tests import make_rows
+
+from . import warmup
+from .middleware import route_stats
+from .models import StripeEvent
+
+WEBHOOK_SECRET = 'whsec_test'
+
+
+def stripe_event(event_id, event_type, obj, created):
+    return {'id': event_id, 'object': 'event', 'type': event_type, 'created': created,
+            'data': {'object': obj}}
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class StripeWebhookTests(TestCase):
+    """Fixture events signed locally the way Stripe signs them: no network."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('client@cortex.test', 'pw')
+
+    def post(self, event, secret=WEBHOOK_SECRET):
+        body = json.dumps(event)
+        timestamp = int(time.time())
+        signature = hmac.new(secret.encode(), f'{timestamp}.{body}'.encode(), hashlib.sha256).hexdigest()
+        return self.client.post(reverse('core:stripe_webhook'), body, content_type='application/json',
+                                HTTP_STRIPE_SIGNATURE=f't={timestamp},v1={signature}')
+
+    def test_webhook_stores_once_and_defers_processing(self):
+        event = stripe_event('evt_1', 'checkout.session.completed',
+                             {'client_reference_id': str(self.user.pk), 'customer': 'cus_1'}, 1000)
+
+        self.assertEqual(self.post(event, secret='whsec_wrong').status_code, 400)
+        self.assertEqual(self.post(event).status_code, 200)
+        self.assertEqual(self.post(event).status_code, 200)  # Stripe retry
+
+        self.assertEqual(StripeEvent.objects.get().status, StripeEvent.STATUS_PENDING)
+        self.assertEqual(Task.objects.filter(name='process_stripe_events').count(), 1)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_premium)
+
+        # The deploy's cron drains the queue (keeping the test transaction's connection open)
+        with mock.patch('django.db.close_old_connections'):
+            call_command('run_tasks', '--once', stdout=io.StringIO())
+        self.assertEqual(StripeEvent.objects.get().status, StripeEvent.STATUS_PROCESSED)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_premium)
+
+    def test_processor_applies_events_in_order(self):
+        customer = {'customer': 'cus_1'}
+        events = [
+            stripe_event('evt_paid', 'checkout.session.completed',
+                         {'client_reference_id': str(self.user.pk), **customer}, 1000),
+            stripe_event('evt_cancel', 'customer.subscription.deleted', {'status': 'canceled', **customer}, 3000),
+            # Delivered out of order: older than the cancellation.
+            stripe_event('evt_invoice', 'invoice.payment_succeeded', customer, 2000),
+            stripe_event('evt_other', 'customer.created', {'id': 'cus_1'}, 1500),
+            stripe_event('evt_orphan', 'invoice.payment_succeeded', {'customer': 'cus_unknown'}, 1200),
+        ]
+        for event in events:
+            self.post(event)
+
+        call_command('process_stripe_events', '--batch-size', '2', stdout=io.StringIO())
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_premium)
+        self.assertEqual(self.user.stripe_customer_id, 'cus_1')
+        status = dict(StripeEvent.objects.values_list('event_id', 'status'))
+        self.assertEqual(status, {
+            'evt_paid': 'processed', 'evt_orphan': 'failed', 'evt_other': 'ignored',
+            'evt_invoice': 'processed', 'evt_cancel': 'processed',
+        })
+
+        # A late retry of an old payment doesn't re-grant after the cancellation.
+        self.post(stripe_event('evt_late', 'invoice.payment_succeeded', customer, 2500))
+        call_command('process_stripe_events', stdout=io.StringIO())
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_premium)
+        self.assertEqual(StripeEvent.objects.get(event_id='evt_late').status, 'ignored')
+
+
+class CheckoutTests(TestCase):
+    """CreateCheckoutSessionView.post is async: driven through AsyncClient, Stripe mocked."""
+
+    async def test_checkout_redirects_to_stripe(self):
+        response = await self.async_client.post(reverse('core:subscribe'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('login', response.url)
+
+        user = await sync_to_async(get_user_model().objects.create_user)('buyer@cortex.test', 'pw')
+        await self.async_client.aforce_login(user)
+        create = mock.AsyncMock(return_value=SimpleNamespace(url='https://checkout.stripe.test/c/1'))
+        with mock.patch('stripe.checkout.Session.create_async', create):
+            response = await self.async_client.post(reverse('core:subscribe'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, 'https://checkout.stripe.test/c/1')
+        kwargs = create.await_args.kwargs
+        self.assertEqual((kwargs['client_reference_id'], kwargs['customer_email']), (user.id, 'buyer@cortex.test'))
+
+        create.side_effect = RuntimeError('stripe down')
+        with mock.patch('stripe.checkout.Session.create_async', create):
+            response = await self.async_client.post(reverse('core:subscribe'))
+        self.assertEqual(response.json(), {'error': 'stripe down'})
+
+
+class PerformanceMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.premium = User.objects.create_user('premium@cortex.test', 'pw', is_premium=True)
+        cls.staff = User.objects.create_user('staff@cortex.test', 'pw', is_staff=True)
+        make_rows(30)
+
+    def setUp(self):
+        route_stats.reset()
+
+    def route(self, name):
+        return route_stats.snapshot()['routes'].get(name)
+
+    def test_server_timing_and_histograms(self):
+        response = self.client.get(reverse('core:index'))
+        timing = response['Server-Timing']
+        self.assertIn('total;dur=', timing)
+        self.assertNotIn('stream', timing)
+        self.assertEqual(self.route('core:index')['count'], 1)
+
+    def test_stream_is_measured_once_exhausted(self):
+        self.client.force_login(self.premium)
+        response = self.client.get(reverse('nhl:export_picks'), {'format': 'ndjson'})
+        self.assertIn('stream;desc="body not included"', response['Server-Timing'])
+        header_queries = int(re.search(r'"(\d+) queries"', response['Server-Timing']).group(1))
+        self.assertIsNone(self.route('nhl:export_picks'))
+
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 30)
+        stats = self.route('nhl:export_picks')
+        self.assertEqual(stats['count'], 1)
+        self.assertGreater(stats['queries_per_request'], header_queries)  # the body's query
+
+    async def test_async_stream_is_measured_once_exhausted(self):
+        await self.async_client.aforce_login(self.premium)
+        response = await self.async_client.get(reverse('nhl:export_picks'), {'format': 'ndjson'})
+        self.assertTrue(response.is_async)
+        self.assertIsNone(self.route('nhl:export_picks'))
+
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(body.splitlines()), 30)
+        self.assertEqual(self.route('nhl:export_picks')['count'], 1)
+
+    def test_perf_histograms_is_staff_only(self):
+        url = reverse('core:perf_histograms')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.premium)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.staff)
+        self.client.get(reverse('core:index'))
+        snapshot = self.client.get(url, {'reset': 1}).json()
+        self.assertEqual(snapshot['routes']['core:index']['count'], 1)
+        self.assertEqual(list(self.client.get(url).json()['routes']), ['core:perf_histograms'])
+
+
+class WarmUpTests(TestCase):
+    def test_every_step_runs(self):
+        # Keep the test transaction's connection open
+        with mock.patch.object(warmup.connections, 'close_all') as close_all:
+            timings = warmup.warm_up()
+        self.assertEqual(list(timings), [name for name, _ in warmup.STEPS])
+        self.assertTrue(all(ms is not None for ms in timings.values()), timings)
+        close_all.assert_called_once()
+
+    def test_failing_step_is_skipped(self):
+        steps = (('broken', mock.Mock(side_effect=RuntimeError('boom'))), ('urls', warmup._urls))
+        with mock.patch.object(warmup, 'STEPS', steps), mock.patch.object(warmup.connections, 'close_all'):
+            with self.assertLogs('core.warmup', 'WARNING'):
+                timings = warmup.warm_up()
+        self.assertIsNone(timings['broken'])
+        self.assertIsNotNone(timings['urls'])
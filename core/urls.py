@@ -12,4 +12,7 @@ urlpatterns = [
     # Billing
     path('subscribe/', views.CreateCheckoutSessionView.as_view(), name='subscribe'),
     path('webhook/stripe/', views.stripe_webhook, name='stripe_webhook'),
+
+    # Ops (staff only)
+    path('ops/perf/', views.perf_histograms, name='perf_histograms'),
 ]
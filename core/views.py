@@ -1,21 +1,38 @@
 from django.shortcuts import render, redirect
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.http import HttpResponse, JsonResponse
-from django.contrib.auth import get_user_model
-import stripe
+import json
 import logging
 
+from .middleware import route_stats, timed
+from .stripe_events import record_event, schedule_processing
+
 
 # Ensure models are imported (though not strictly used in new views except User models)
 # from .models import Player  <-- Removed
 
 logger = logging.getLogger(__name__)
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+_stripe_module = None
+
+
+def get_stripe():
+    """
+    The configured `stripe` module, imported on first use: it takes ~70 ms
+    to import, which every cold start and cron command (through the URLconf
+    system check) would otherwise pay.
+    """
+    global _stripe_module
+    if _stripe_module is None:
+        import stripe
+        stripe.api_key = settings.STRIPE_SECRET_KEY
+        _stripe_module = stripe
+    return _stripe_module
 
 def index(request):
     """
@@ -48,15 +65,32 @@ def index(request):
         'performance_data': performance_data,
     }
     
-    return render(request, 'index.html', context)
+    with timed('render'):
+        return render(request, 'index.html', context)
+
+
+@staff_member_required
+def perf_histograms(request):
+    """
+    Staff only: latency histograms per URL name for this worker process
+    (see core.middleware). `?reset=1` clears them after reading.
+    """
+    snapshot = route_stats.snapshot()
+    if request.GET.get('reset'):
+        route_stats.reset()
+    return JsonResponse(snapshot)
 
 
-@method_decorator(login_required, name='dispatch')
+@method_decorator(login_required, name='post')
 class CreateCheckoutSessionView(View):
-    def post(self, request, *args, **kwargs):
+    # Async: the Stripe call goes through stripe's async HTTP client (httpx),
+    # so under ASGI a slow Stripe response no longer holds a worker thread.
+    async def post(self, request, *args, **kwargs):
+        stripe = get_stripe()
+        user = await request.auser()
         domain_url = request.build_absolute_uri('/')[:-1] # Remove trailing slash
         try:
-            checkout_session = stripe.checkout.Session.create(
+            checkout_session = await stripe.checkout.Session.create_async(
                 payment_method_types=['card'],
                 line_items=[
                     {
@@ -67,8 +101,8 @@ class CreateCheckoutSessionView(View):
                 mode='subscription',
                 success_url=domain_url + '/nhl/dashboard/?payment=success',
                 cancel_url=domain_url + '/nhl/dashboard/?payment=cancelled',
-                client_reference_id=request.user.id,
-                customer_email=request.user.email,
+                client_reference_id=user.id,
+                customer_email=user.email,
             )
             return redirect(checkout_session.url)
         except Exception as e:
@@ -76,12 +110,18 @@ class CreateCheckoutSessionView(View):
 
 @csrf_exempt
 def stripe_webhook(request):
+    """
+    Fast path: verify the signature, store the raw event (duplicates and
+    Stripe retries are ignored by event id) and answer 200 right away. The
+    entitlement changes are applied by the background processor
+    (core.stripe_events).
+    """
+    stripe = get_stripe()
     payload = request.body
     sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
-    event = None
 
     try:
-        event = stripe.Webhook.construct_event(
+        stripe.Webhook.construct_event(
             payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
         )
     except ValueError as e:
@@ -91,24 +131,7 @@ def stripe_webhook(request):
         # Invalid signature
         return HttpResponse(status=400)
 
-    # Handle the event
-    if event['type'] in ['checkout.session.completed', 'invoice.payment_succeeded']:
-        session = event['data']['object']
-        
-        # Get user
-        client_reference_id = session.get('client_reference_id')
-        stripe_customer_id = session.get('customer')
-        
-        User = get_user_model()
-        
-        try:
-            if client_reference_id:
-                user = User.objects.get(id=client_reference_id)
-                user.is_premium = True
-                user.stripe_customer_id = stripe_customer_id
-                user.save()
-                logger.info(f"User {user.email} marked as premium via Webhook.")
-        except User.DoesNotExist:
-            logger.error(f"User with ID {client_reference_id} not found during webhook processing.")
+    if record_event(json.loads(payload)):
+        schedule_processing()
 
     return HttpResponse(status=200)
@@ -0,0 +1,104 @@
+"""
+Worker warm-up (called by config/wsgi.py and config/asgi.py when
+settings.WARMUP_ON_START is on).
+
+A fresh gunicorn worker (or Cloud Run instance) otherwise pays on its first
+request for everything Django loads lazily: the URLconf and every view
+module, the lazily imported heavy modules (stripe, numpy for the parlay
+simulator), template compilation, the first database connection (and the
+connection pool's minimum connections), the current Site and the replica
+lag probe. `warm_up()` does all of it once, at worker start, before the
+worker accepts traffic. Each step is timed and a failing step is logged
+and skipped: a worker that can't reach the database still starts.
+"""
+
+import logging
+import time
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES = (
+    'index.html',
+    'nhl/dashboard.html',
+    'nhl/partials/_match_list.html',
+    'nhl/player_detail.html',
+    'account/login.html',
+    'account/signup.html',
+)
+
+# ==============================================================================
+# STEPS
+# ==============================================================================
+
+def _urls():
+    from django.urls import get_resolver, reverse
+    get_resolver().url_patterns
+    reverse('core:index')  # builds the reverse lookup tables
+
+
+def _modules():
+    from core.views import get_stripe
+    get_stripe()
+    import nhl.simulation  # noqa: F401  (numpy)
+
+
+def _templates():
+    from django.conf import settings
+    from django.template import TemplateDoesNotExist
+    from django.template.loader import get_template
+    for name in TEMPLATES:
+        engine = settings.NHL_TEMPLATE_ENGINE if name.startswith('nhl/') else None
+        try:
+            get_template(name, using=engine)  # compiled once, kept by the engine's cache
+        except TemplateDoesNotExist:
+            logger.debug("Warm-up: template %s not found", name)
+
+
+def _database():
+    for alias in connections:
+        connections[alias].ensure_connection()  # opens the pool, if any
+
+
+def _caches():
+    from django.contrib.sites.models import Site
+    from config.routers import read_alias
+    Site.objects.get_current()
+    read_alias()
+
+
+STEPS = (
+    ('urls', _urls),
+    ('modules', _modules),
+    ('templates', _templates),
+    ('database', _database),
+    ('caches', _caches),
+)
+
+# ==============================================================================
+# ENTRY POINT
+# ==============================================================================
+
+def warm_up():
+    """Run every step; returns {step: milliseconds} (None for a failed step)."""
+    timings = {}
+    start = time.perf_counter()
+    try:
+        for name, step in STEPS:
+            step_start = time.perf_counter()
+            try:
+                step()
+                timings[name] = round((time.perf_counter() - step_start) * 1000, 1)
+            except Exception as e:
+                timings[name] = None
+                logger.warning("Warm-up step %s failed: %s", name, e)
+    finally:
+        # This thread's connections would not be reused by request threads;
+        # pooled connections go back to the (now open) pool.
+        connections.close_all()
+    logger.info(
+        "Worker warmed up in %.0f ms (%s)", (time.perf_counter() - start) * 1000,
+        ', '.join(f'{name} {ms} ms' for name, ms in timings.items()),
+    )
+    return timings
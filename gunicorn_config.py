@@ -20,9 +20,22 @@ accesslog = '-'
 errorlog = '-'
 loglevel = 'info'
 
-# Worker class
-# gthread permet de gérer mieux les I/O bloquants (DB calls)
-worker_class = 'gthread'
+# Mode de service : "wsgi" (gthread, défaut) ou "asgi" (workers uvicorn)
+# En ASGI, les vues async (dashboard, fiche joueur, API, checkout Stripe)
+# ne bloquent plus un thread pendant les I/O, et le direct (SSE) n'est servi
+# qu'en ASGI (en WSGI, le dashboard recharge la liste des matchs). Mais
+# chaque requête ORM y passe par sync_to_async : sur 1 vCPU (manage.py
+# loadtest), wsgi sert ~95 req/s contre ~80 en asgi avec pool, d'où wsgi
+# par défaut. Comparer avec loadtest avant de changer.
+server_mode = os.getenv('SERVER_MODE', 'wsgi').lower()
+
+if server_mode == 'asgi':
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'config.wsgi:application'
+    # gthread permet de gérer mieux les I/O bloquants (DB calls)
+    worker_class = 'gthread'
 
 # Reload (dev only)
 reload = bool(os.getenv('GUNICORN_RELOAD', False))
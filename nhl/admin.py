@@ -1,17 +1,346 @@
-from django.contrib import admin
-from .models import GameStats
+from datetime import date
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from django.utils.html import format_html
+from django.views.decorators.http import require_POST
+from . import tasks
+from .changelist import KEYSET_ORDERING, EstimatedCountPaginator, KeysetChangeList
+from .constants import NHL_TEAMS_FULL_NAMES
+from .models import ArchivedPayload, FailedRecord, GameStats, IngestionRun, Player, Task, TeamContextSnapshot
+
+
+def _enqueue_per_date(request, queryset, task_name, priority, exclude=()):
+    """One task per game date of the selection; None (and nothing queued) above ADMIN_MAX_ENQUEUE_DAYS dates."""
+    days = sorted(d for d in queryset.order_by().values_list('date', flat=True).distinct() if d and d not in exclude)
+    if len(days) > settings.ADMIN_MAX_ENQUEUE_DAYS:
+        return None
+    for day in days:
+        tasks.enqueue(task_name, priority=priority, created_by=request.user.get_username(), date=day)
+    return days
+
+
+OUTCOME_LABELS = {
+    GameStats.OUTCOME_HIT: "But",
+    GameStats.OUTCOME_MISS: "Pas de but",
+    GameStats.OUTCOME_INJURED: "Blessé",
+}
+OUTCOME_COLORS = {
+    GameStats.OUTCOME_HIT: 'green',
+    GameStats.OUTCOME_MISS: 'gray',
+    GameStats.OUTCOME_INJURED: 'orange',
+}
+
+
+class TeamFilter(admin.SimpleListFilter):
+    """The 32 teams from constants, instead of a SELECT DISTINCT team over data_lake."""
+    title = "équipe"
+    parameter_name = 'team'
+
+    def lookups(self, request, model_admin):
+        return sorted(NHL_TEAMS_FULL_NAMES.items(), key=lambda item: item[1])
+
+    def queryset(self, request, queryset):
+        return queryset.filter(team=self.value()) if self.value() else queryset
+
+
+class VenueFilter(admin.SimpleListFilter):
+    title = "lieu"
+    parameter_name = 'is_home'
+
+    def lookups(self, request, model_admin):
+        return [('1', "Domicile"), ('0', "Extérieur")]
+
+    def queryset(self, request, queryset):
+        return queryset.filter(is_home=int(self.value())) if self.value() in ('0', '1') else queryset
+
+
+class OutcomeFilter(admin.SimpleListFilter):
+    title = "résultat"
+    parameter_name = 'outcome'
+
+    def lookups(self, request, model_admin):
+        return [*OUTCOME_LABELS.items(), ('pending', "En attente")]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'pending':
+            return queryset.exclude(result_goal__in=GameStats.OUTCOMES)
+        if self.value() in GameStats.OUTCOMES:
+            return queryset.filter(result_goal=self.value())
+        return queryset
+
 
 @admin.register(GameStats)
 class GameStatsAdmin(admin.ModelAdmin):
-    list_display = ['name', 'team', 'game_date', 'algo_score_goal', 'calculated_odds_display']
+    """
+    data_lake, millions of rows: planner-estimated counts, keyset pages over
+    the (ts, player_id, date) index, static filters (see nhl.changelist).
+    Rows without a ts (never persisted by an ingestion run) aren't listed.
+    """
+    list_display = ['name', 'team', 'opp', 'game_date', 'algo_score_goal', 'python_prob', 'odds_display',
+                    'outcome_display']
     search_fields = ['name', 'team', 'opp']
-    list_filter = ['team', 'is_home']
-    ordering = ['-ts', 'name']
-    
+    list_filter = [TeamFilter, VenueFilter, OutcomeFilter]
+    date_hierarchy = 'ts'
+    ordering = KEYSET_ORDERING
+    sortable_by = ()
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    change_list_template = 'admin/nhl/gamestats/change_list.html'
+    actions = ['enqueue_rerun_projections', 'enqueue_fetch_results']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(ts__isnull=False)
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    @admin.action(description="Recalculer les projections (tâche de fond)")
+    def enqueue_rerun_projections(self, request, queryset):
+        # Settled dates keep their projections (they would be recomputed from today's stats)
+        settled = set(GameStats.objects.filter(
+            date__in=queryset.order_by().values('date')
+        ).settled().order_by().values_list('date', flat=True).distinct())
+        days = _enqueue_per_date(request, queryset, 'rerun_projections', Task.PRIORITY_HIGH, exclude=settled)
+        if settled:
+            self.message_user(
+                request, f"{len(settled)} date(s) déjà réglée(s), non recalculée(s) : {', '.join(sorted(settled))}",
+                messages.WARNING,
+            )
+        self._report_enqueued(request, days, "projection")
+
+    @admin.action(description="Récupérer les résultats (tâche de fond)")
+    def enqueue_fetch_results(self, request, queryset):
+        days = _enqueue_per_date(request, queryset, 'fetch_results', Task.PRIORITY_NORMAL)
+        self._report_enqueued(request, days, "résultats")
+
+    def _report_enqueued(self, request, days, kind):
+        if days is None:
+            self.message_user(
+                request,
+                f"Sélection sur plus de {settings.ADMIN_MAX_ENQUEUE_DAYS} dates : aucune tâche créée. "
+                f"Restreignez-la avec la hiérarchie de dates (ou le backfill des résultats).",
+                messages.ERROR,
+            )
+        else:
+            self.message_user(request, f"{len(days)} tâche(s) de {kind} en file : {', '.join(days)}", messages.SUCCESS)
+
     def game_date(self, obj):
-        return obj.ts.strftime('%Y-%m-%d') if obj.ts else '-'
-    
-    def calculated_odds_display(self, obj):
-        # Only for display purposes in admin
-        return obj.calculated_odds
-    calculated_odds_display.short_description = "Odds (Est)"
+        return obj.date or '-'
+    game_date.short_description = "Date"
+
+    def odds_display(self, obj):
+        return f'{obj.odds:.2f}' if obj.odds is not None else '-'
+    odds_display.short_description = "Cote but"
+
+    def outcome_display(self, obj):
+        if obj.outcome is None:
+            return "En attente"
+        return format_html('<span style="color: {}">{}</span>',
+                           OUTCOME_COLORS[obj.outcome], OUTCOME_LABELS[obj.outcome])
+    outcome_display.short_description = "Résultat"
+
+
+@admin.register(Player)
+class PlayerAdmin(admin.ModelAdmin):
+    list_display = ['name', 'id', 'team', 'position', 'updated_at']
+    search_fields = ['name', 'normalized_name', '=id']
+    list_filter = ['position', 'team']
+    ordering = ['name']
+    readonly_fields = [f.name for f in Player._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(TeamContextSnapshot)
+class TeamContextSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['date', 'teams_count', 'created_at']
+    date_hierarchy = 'date'
+    ordering = ['-date']
+    readonly_fields = [f.name for f in TeamContextSnapshot._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def teams_count(self, obj):
+        return len(obj.team_order)
+    teams_count.short_description = "Équipes"
+
+
+@admin.register(IngestionRun)
+class IngestionRunAdmin(admin.ModelAdmin):
+    list_display = ['command', 'started_at', 'status', 'duration_display', 'stages_display',
+                    'http_requests', 'rows_written', 'rows_skipped', 'errors']
+    list_filter = ['command', 'status']
+    date_hierarchy = 'started_at'
+    ordering = ['-started_at']
+    readonly_fields = [f.name for f in IngestionRun._meta.fields]
+    change_list_template = 'admin/nhl/ingestionrun/change_list.html'
+
+    TREND_RUNS = 60
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def duration_display(self, obj):
+        return f'{obj.duration:.1f}s' if obj.duration is not None else '-'
+    duration_display.short_description = "Durée"
+
+    def stages_display(self, obj):
+        return ', '.join(f'{name} {seconds:.1f}s' for name, seconds in obj.stages.items()) or '-'
+    stages_display.short_description = "Étapes"
+
+    def get_urls(self):
+        return [
+            path('trends/', self.admin_site.admin_view(self.trends_view), name='nhl_ingestionrun_trends'),
+        ] + super().get_urls()
+
+    def trends_view(self, request):
+        """Duration (stacked by stage, with the run budget), HTTP traffic and rows per run."""
+        series = {}
+        commands = IngestionRun.objects.values_list('command', flat=True).distinct().order_by('command')
+        for command in commands:
+            runs = list(
+                IngestionRun.objects.filter(command=command)
+                .exclude(status=IngestionRun.STATUS_RUNNING)
+                .order_by('-started_at')
+                .values('started_at', 'status', 'duration', 'stages', 'http_requests',
+                        'http_bytes', 'rows_written', 'rows_skipped', 'errors')[:self.TREND_RUNS]
+            )[::-1]
+            stages = sorted({stage for run in runs for stage in run['stages']})
+            series[command] = {
+                'labels': [timezone.localtime(run['started_at']).strftime('%m-%d %H:%M') for run in runs],
+                'status': [run['status'] for run in runs],
+                'duration': [round(run['duration'] or 0, 1) for run in runs],
+                'stages': {stage: [run['stages'].get(stage, 0) for run in runs] for stage in stages},
+                'budget': settings.INGESTION_RUN_BUDGETS.get(command, settings.INGESTION_RUN_BUDGET_SECONDS),
+                'http_requests': [run['http_requests'] for run in runs],
+                'http_kb': [round(run['http_bytes'] / 1024, 1) for run in runs],
+                'rows_written': [run['rows_written'] for run in runs],
+                'rows_skipped': [run['rows_skipped'] for run in runs],
+                'errors': [run['errors'] for run in runs],
+            }
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Tendances d'ingestion",
+            'series': series,
+        }
+        return TemplateResponse(request, 'admin/nhl/ingestionrun/trends.html', context)
+
+
+
+@admin.register(FailedRecord)
+class FailedRecordAdmin(admin.ModelAdmin):
+    list_display = ['command', 'stage', 'target_date', 'created_at', 'replayed_at', 'error']
+    list_filter = ['command', 'stage', ('replayed_at', admin.EmptyFieldListFilter)]
+    ordering = ['-created_at']
+    readonly_fields = [f.name for f in FailedRecord._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedPayload)
+class ArchivedPayloadAdmin(admin.ModelAdmin):
+    list_display = ['endpoint', 'fetched_at', 'run', 'size', 'sha256']
+    search_fields = ['endpoint', 'sha256']
+    date_hierarchy = 'fetched_at'
+    ordering = ['-fetched_at']
+    list_select_related = ['run']
+    readonly_fields = [f.name for f in ArchivedPayload._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'created_at', 'status', 'priority', 'progress_display',
+                    'attempts', 'worker', 'created_by']
+    list_filter = ['status', 'name']
+    ordering = ['-created_at']
+    readonly_fields = [f.name for f in Task._meta.fields]
+    change_list_template = 'admin/nhl/task/change_list.html'
+    actions = ['retry_tasks', 'cancel_tasks']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def progress_display(self, obj):
+        label = f'{obj.progress:.0%}'
+        if obj.progress_message:
+            label = f'{label} · {obj.progress_message}'
+        return format_html('<progress value="{}" max="1"></progress> {}', obj.progress, label)
+    progress_display.short_description = "Progression"
+
+    @admin.action(description="Relancer les tâches sélectionnées")
+    def retry_tasks(self, request, queryset):
+        n = queryset.filter(status__in=[Task.STATUS_FAILED, Task.STATUS_CANCELLED]).update(
+            status=Task.STATUS_QUEUED, attempts=0, run_after=None, error='', progress=0.0,
+            progress_message='', worker='', finished_at=None,
+        )
+        self.message_user(request, f"{n} tâche(s) remise(s) en file.", messages.SUCCESS)
+
+    @admin.action(description="Annuler les tâches en attente")
+    def cancel_tasks(self, request, queryset):
+        n = queryset.filter(status=Task.STATUS_QUEUED).update(
+            status=Task.STATUS_CANCELLED, finished_at=timezone.now(),
+        )
+        self.message_user(request, f"{n} tâche(s) annulée(s).", messages.SUCCESS)
+
+    def get_urls(self):
+        return [
+            path('enqueue/', self.admin_site.admin_view(require_POST(self.enqueue_view)), name='nhl_task_enqueue'),
+        ] + super().get_urls()
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {**(extra_context or {}), 'today': timezone.localdate().isoformat()}
+        return super().changelist_view(request, extra_context=extra_context)
+
+    def enqueue_view(self, request):
+        """Staff buttons: backfill a date range, rebuild the lake, run the injury check."""
+        kind = request.POST.get('task')
+        user = request.user.get_username()
+        try:
+            if kind == 'backfill_results':
+                start, end = request.POST.get('start', ''), request.POST.get('end', '')
+                if date.fromisoformat(end) < date.fromisoformat(start):
+                    raise ValueError("la date de fin précède la date de début")
+                task_obj = tasks.enqueue(kind, priority=Task.PRIORITY_LOW, created_by=user, start=start, end=end)
+            elif kind == 'rebuild_lake':
+                task_obj = tasks.enqueue(kind, priority=Task.PRIORITY_LOW, created_by=user,
+                                         full=bool(request.POST.get('full')))
+            elif kind == 'injury_check':
+                task_obj = tasks.enqueue(kind, priority=Task.PRIORITY_HIGH, created_by=user)
+            else:
+                raise ValueError(f"tâche inconnue : {kind}")
+        except ValueError as e:
+            self.message_user(request, f"Tâche non créée : {e}", messages.ERROR)
+        else:
+            self.message_user(request, f"Tâche « {task_obj.name} » #{task_obj.pk} mise en file.", messages.SUCCESS)
+        return redirect('admin:nhl_task_changelist')
@@ -0,0 +1,155 @@
+"""
+Read-only JSON API for machine clients (mobile prototype, power users).
+
+Rows are serialized straight from `.values()` dicts, never model instances
+or templates. Views are async (async ORM), so under ASGI a slow query does
+not hold a worker thread. Lists use keyset pagination on (ts, player_id): the opaque
+`cursor` returned in `next` encodes the last row seen, so every page is a
+single indexed range scan whatever its depth.
+
+Common query params:
+    fields  comma-separated sparse fieldset (default: all API_FIELDS)
+    limit   page size (default 100, max 500)
+    cursor  value of `next` from the previous page
+"""
+
+import base64
+import binascii
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET
+
+from config.routers import read_from_replica
+
+from .decorators import premium_required
+from .models import GameStats
+
+API_FIELDS = (
+    'player_id', 'name', 'team', 'opp', 'date', 'ts', 'is_home',
+    'algo_score_goal', 'algo_score_shot', 'python_prob', 'python_vol',
+    'cortex', 'result_goal', 'result_shot',
+)
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+class ApiError(ValueError):
+    pass
+
+
+def _encode_cursor(row):
+    raw = json.dumps([row['ts'].isoformat(), row['player_id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        ts, player_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        ts = parse_datetime(ts)
+    except (ValueError, TypeError, binascii.Error):
+        raise ApiError('cursor invalide.')
+    if ts is None:
+        raise ApiError('cursor invalide.')
+    return ts, player_id
+
+
+def _parse_fields(request):
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(API_FIELDS)
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = sorted(set(fields) - set(API_FIELDS))
+    if unknown:
+        raise ApiError(f"Champs inconnus: {', '.join(unknown)}.")
+    return fields
+
+
+def _parse_limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError('limit doit être un entier.')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+async def _page(request, queryset, descending=False):
+    """
+    One keyset page of `queryset` as a JSON-ready dict. Rows without ts
+    cannot be paginated on it and are left out.
+    """
+    fields = _parse_fields(request)
+    limit = _parse_limit(request)
+
+    queryset = queryset.with_cortex_score().filter(ts__isnull=False)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        ts, player_id = _decode_cursor(cursor)
+        if descending:
+            queryset = queryset.filter(Q(ts__lt=ts) | Q(ts=ts, player_id__lt=player_id))
+        else:
+            queryset = queryset.filter(Q(ts__gt=ts) | Q(ts=ts, player_id__gt=player_id))
+
+    order = ('-ts', '-player_id') if descending else ('ts', 'player_id')
+    # Keyset columns are always fetched, then dropped if not requested.
+    selected = list(dict.fromkeys(fields + ['ts', 'player_id']))
+    rows = [row async for row in queryset.order_by(*order).values(*selected)[:limit + 1]]
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = _encode_cursor(rows[-1]) if has_more else None
+    if len(selected) != len(fields):
+        rows = [{f: row[f] for f in fields} for row in rows]
+
+    return {'results': rows, 'count': len(rows), 'next': next_cursor}
+
+
+def api_view(view_func):
+    """GET-only, premium-only, replica reads, ApiError mapped to a 400. Views are async."""
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        try:
+            return JsonResponse(await view_func(request, *args, **kwargs))
+        except ApiError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+    return require_GET(premium_required(read_from_replica(_wrapped_view)))
+
+
+@api_view
+async def slate(request):
+    """
+    Projections for a slate: `?date=YYYY-MM-DD`, or by default the dashboard
+    window (last 24h + next 24h). Optional `team` matches either side.
+    """
+    queryset = GameStats.objects.filter(algo_score_goal__isnull=False, python_prob__isnull=False)
+    if request.GET.get('date'):
+        queryset = queryset.filter(date=request.GET['date'])
+    else:
+        now = timezone.now()
+        queryset = queryset.filter(ts__gte=now - timedelta(hours=24), ts__lte=now + timedelta(hours=24))
+
+    team = request.GET.get('team')
+    if team:
+        queryset = queryset.filter(Q(team=team) | Q(opp=team))
+    return await _page(request, queryset)
+
+
+@api_view
+async def match(request, date, team, opp):
+    """Both rosters of one match (team order does not matter)."""
+    queryset = GameStats.objects.filter(date=date).filter(
+        Q(team=team, opp=opp) | Q(team=opp, opp=team)
+    )
+    return await _page(request, queryset)
+
+
+@api_view
+async def player_history(request, player_id):
+    """Every projection (and result) for one player, most recent first."""
+    return await _page(request, GameStats.objects.filter(player_id=player_id), descending=True)
@@ -0,0 +1,217 @@
+"""
+Raw NHL API payload archive.
+
+While an ingestion run is recorded (nhl.ledger), its NHLClient stores the
+body of every successful response here, compressed, under its SHA-256, so
+an identical payload fetched by many runs is stored once. Each fetch is
+indexed by an ArchivedPayload row (run, endpoint, hash, fetch time).
+
+PAYLOAD_ARCHIVE_STORAGE picks where the blobs live:
+- 'db': PayloadBlob rows, next to their index, so they survive a redeploy.
+  They are buffered during the run and written in one INSERT when the run
+  is saved, with its index (fetch threads never write to the database).
+- 'files': PAYLOAD_ARCHIVE_DIR/ab/abcdef...json.gz (or .json.zst), for a
+  mounted volume or local development.
+Reads look in both, so blobs archived before a switch stay readable.
+
+`ReplayClient.for_run(run_id)` serves a past run's payloads in the order
+they were fetched, without network access: `--replay <run>` on the
+ingestion commands re-computes exactly what that run computed. A run whose
+blobs are gone is refused up front.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+
+from .client import NHLClient
+from .models import IngestionRun, PayloadBlob
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIONS = {'gzip': '.json.gz', 'zstd': '.json.zst'}
+STORAGES = ('db', 'files')
+
+# ==============================================================================
+# ARCHIVE
+# ==============================================================================
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("zstd compression requires zstandard (pip install zstandard)")
+    return zstandard
+
+
+class PayloadArchive:
+    def __init__(self, root=None, compression=None, storage=None):
+        self.root = Path(root or settings.PAYLOAD_ARCHIVE_DIR)
+        self.compression = compression or settings.PAYLOAD_ARCHIVE_COMPRESSION
+        self.storage = storage or settings.PAYLOAD_ARCHIVE_STORAGE
+        if self.compression not in COMPRESSIONS:
+            raise ValueError(
+                f"Unknown compression '{self.compression}' (expected one of {', '.join(COMPRESSIONS)})"
+            )
+        if self.storage not in STORAGES:
+            raise ValueError(f"Unknown storage '{self.storage}' (expected one of {', '.join(STORAGES)})")
+        if self.compression == 'zstd':
+            _zstd()
+        self._pending = {}  # digest -> compressed body, written by flush() ('db' storage)
+        self._loaded = {}   # digest -> (compression, compressed body), read by preload()
+        self._lock = threading.Lock()
+
+    def _path(self, digest, compression):
+        return self.root / digest[:2] / f'{digest}{COMPRESSIONS[compression]}'
+
+    def find(self, digest):
+        for compression in COMPRESSIONS:
+            path = self._path(digest, compression)
+            if path.exists():
+                return path, compression
+        return None, None
+
+    def _compress(self, body):
+        if self.compression == 'zstd':
+            return _zstd().ZstdCompressor(level=10).compress(body)
+        return gzip.compress(body, mtime=0)
+
+    def put(self, body: bytes) -> str:
+        """Store `body` (once per distinct content) and return its SHA-256."""
+        digest = hashlib.sha256(body).hexdigest()
+        if self.storage == 'db':
+            with self._lock:
+                if digest not in self._pending:
+                    self._pending[digest] = self._compress(body)
+            return digest
+
+        if self.find(digest)[0] is not None:
+            return digest
+        data = self._compress(body)
+        path = self._path(digest, self.compression)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so readers never see a partial blob.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return digest
+
+    def flush(self):
+        """Write the buffered blobs ('db' storage); those already stored are left as they are."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        PayloadBlob.objects.bulk_create([
+            PayloadBlob(sha256=digest, compression=self.compression, data=data) for digest, data in pending.items()
+        ], ignore_conflicts=True)
+
+    def preload(self, digests) -> set:
+        """
+        Read the digests' blobs from the database in one query, so that get()
+        serves them from memory in any thread. Returns the digests stored
+        nowhere (neither in the database nor under root).
+        """
+        digests = set(digests)
+        for digest, compression, data in PayloadBlob.objects.filter(
+            sha256__in=digests
+        ).values_list('sha256', 'compression', 'data'):
+            self._loaded[digest] = (compression, bytes(data))
+        return {digest for digest in digests - set(self._loaded) if self.find(digest)[0] is None}
+
+    def get(self, digest) -> bytes:
+        blob = self._loaded.get(digest) or PayloadBlob.objects.filter(
+            sha256=digest
+        ).values_list('compression', 'data').first()
+        if blob is not None:
+            compression, data = blob[0], bytes(blob[1])
+        else:
+            path, compression = self.find(digest)
+            if path is None:
+                raise FileNotFoundError(f'Payload {digest} is not in the archive (database or {self.root})')
+            data = path.read_bytes()
+        if compression == 'zstd':
+            return _zstd().ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def load(self, digest):
+        return json.loads(self.get(digest))
+
+# ==============================================================================
+# REPLAY
+# ==============================================================================
+
+class ReplayClient(NHLClient):
+    """
+    NHLClient answering from the archive of a past run. Each endpoint serves
+    its payloads in fetch order (the last one repeats); an endpoint the run
+    never fetched behaves like a network error.
+    """
+
+    def __init__(self, entries, archive=None):
+        super().__init__()
+        self.store = archive or PayloadArchive()
+        self._served = defaultdict(int)
+        self._last = {}
+        self._lock = threading.Lock()
+        self.entries = defaultdict(list)
+        for endpoint, digest, size in entries:
+            self.entries[endpoint].append((digest, size))
+
+    @classmethod
+    def for_run(cls, run_id, command=None, archive=None):
+        run = IngestionRun.objects.filter(pk=run_id).first()
+        if run is None:
+            raise ValueError(f'Ingestion run {run_id} does not exist')
+        if command and run.command != command:
+            raise ValueError(f'Run {run_id} is a {run.command} run, not {command}')
+        entries = list(run.payloads.order_by('fetched_at', 'id').values_list('endpoint', 'sha256', 'size'))
+        if not entries:
+            raise ValueError(f'Run {run_id} has no archived payloads')
+        archive = archive or PayloadArchive()
+        missing = archive.preload(digest for _, digest, _ in entries)
+        if missing:
+            raise ValueError(
+                f'Run {run_id}: {len(missing)} of its archived payloads are gone '
+                f'(archived on a disk that did not survive?), it cannot be replayed'
+            )
+        client = cls(entries, archive=archive)
+        client.replayed_run = run
+        return client
+
+    def has(self, path):
+        return self.endpoint(path) in self.entries
+
+    def _next(self, path):
+        endpoint = self.endpoint(path)
+        fetches = self.entries.get(endpoint)
+        if not fetches:
+            self._count(error=True)
+            logger.warning("Replay: %s was not fetched by the archived run", endpoint)
+            return None, None
+        with self._lock:
+            index = min(self._served[endpoint], len(fetches) - 1)
+            self._served[endpoint] += 1
+        digest, size = fetches[index]
+        self._count(received=size)
+        return endpoint, digest
+
+    def get_json(self, path):
+        endpoint, digest = self._next(path)
+        return self.store.load(digest) if digest else None
+
+    def get_conditional(self, path):
+        endpoint, digest = self._next(path)
+        if digest is None:
+            return None, False
+        with self._lock:
+            modified = self._last.get(endpoint) != digest
+            self._last[endpoint] = digest
+        return self.store.load(digest), modified
@@ -0,0 +1,292 @@
+"""
+Bankroll & staking simulator over settled picks.
+
+Answers "what if we had staked flat units / a Kelly fraction on every pick
+with cortex_score >= X" for many strategies and thresholds at once. Every
+(strategy, threshold) pair is one row of a 2-D array and all bankroll paths
+are computed in a handful of NumPy operations; bootstrap resamples add a
+leading axis and are processed in batches sized to a memory budget.
+
+Settled picks are read from `performance_log` (see schema_performance_log.sql)
+through a server-side cursor, straight into NumPy columns: multi-season
+histories never become Django model instances. An `export_lake` snapshot
+can be used instead to keep the load off the production database.
+
+`python_prob` is the goal model's probability: it only prices GOAL picks.
+Kelly stakes need the pick's own probability, so they only size the picks
+of KELLY_TYPES; the other types get no Kelly stake (flat staking bets them
+all).
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+from django.db import connections
+
+# ==============================================================================
+# DATA STRUCTURES
+# ==============================================================================
+
+STRATEGY_KINDS = ('flat', 'kelly')
+
+DEFAULT_BANKROLL = 100.0      # Starting bankroll, in units
+DEFAULT_RUIN_LEVEL = 0.5      # "Ruined" once the bankroll falls to 50% of start
+MAX_KELLY_STAKE = 0.25        # Never stake more than 25% of the bankroll on one pick
+KELLY_TYPES = ('GOAL',)       # prediction_type values whose probability is python_prob
+BOOTSTRAP_BUDGET_BYTES = 256 * 1024 * 1024
+
+@dataclass
+class PickHistory:
+    """Settled picks as parallel columns, in settlement order."""
+    dates: np.ndarray    # datetime64[D]
+    odds: np.ndarray     # Decimal odds
+    prob: np.ndarray     # Model probability of the pick (0-1), NaN when not known (see KELLY_TYPES)
+    cortex: np.ndarray   # cortex_score
+    won: np.ndarray      # bool
+
+    def __len__(self):
+        return self.odds.shape[0]
+
+@dataclass(frozen=True)
+class Strategy:
+    kind: str       # 'flat' (size = units per pick) or 'kelly' (size = Kelly fraction)
+    size: float
+
+    @property
+    def label(self) -> str:
+        return f"{self.kind}:{self.size:g}"
+
+@dataclass
+class StrategyReport:
+    strategy: Strategy
+    threshold: float
+    bets: int
+    staked: float
+    profit: float
+    roi_pct: float
+    final_bankroll: float
+    max_drawdown_pct: float
+    risk_of_ruin_pct: Optional[float] = None
+    roi_band: Optional[tuple] = None           # (low, high) percentiles
+    final_bankroll_band: Optional[tuple] = None
+    max_drawdown_band: Optional[tuple] = None
+
+def parse_strategy(spec: str) -> Strategy:
+    """'flat:1' or 'kelly:0.25'."""
+    kind, _, size = spec.partition(':')
+    kind = kind.strip().lower()
+    if kind not in STRATEGY_KINDS:
+        raise ValueError(f"Unknown strategy '{spec}' (expected flat:<units> or kelly:<fraction>)")
+    try:
+        size = float(size or 1.0)
+    except ValueError:
+        raise ValueError(f"Invalid strategy size in '{spec}'")
+    if size <= 0:
+        raise ValueError(f"Strategy size must be positive in '{spec}'")
+    return Strategy(kind=kind, size=size)
+
+# ==============================================================================
+# LOADING
+# ==============================================================================
+
+SETTLED_PICKS_SQL = """
+    SELECT date, predicted_odds, python_prob, cortex_score, actual_result, prediction_type
+    FROM performance_log
+    WHERE actual_result IS NOT NULL
+      AND predicted_odds > 1
+      AND python_prob IS NOT NULL
+    ORDER BY date, id
+"""
+
+def load_settled_picks(using: str = 'default', chunk_size: int = 5000) -> PickHistory:
+    """
+    Stream settled picks from performance_log through a server-side cursor
+    (`chunked_cursor()` is a named cursor on PostgreSQL) into NumPy columns.
+    """
+    connection = connections[using]
+    if 'performance_log' not in connection.introspection.table_names():
+        raise LookupError("Table performance_log not found (see schema_performance_log.sql)")
+
+    parts = []
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(SETTLED_PICKS_SQL)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            parts.append(history_from_rows(rows))
+
+    if not parts:
+        return history_from_rows([])
+    return PickHistory(**{
+        name: np.concatenate([getattr(part, name) for part in parts])
+        for name in ('dates', 'odds', 'prob', 'cortex', 'won')
+    })
+
+def load_settled_picks_from_lake(root=None) -> PickHistory:
+    """Same history, read from the columnar export of performance_log (see nhl.lake)."""
+    from .lake import open_table
+
+    cols = open_table('performance_log', root).read(
+        ['predicted_odds', 'python_prob', 'cortex_score', 'actual_result', 'prediction_type']
+    )
+    keep = (cols['actual_result'] >= 0) & (cols['predicted_odds'] > 1) & ~np.isnan(cols['python_prob'])
+    priced = np.isin(np.char.upper(cols['prediction_type'][keep]), KELLY_TYPES)
+    return PickHistory(
+        dates=cols['date'][keep],
+        odds=cols['predicted_odds'][keep],
+        prob=np.where(priced, np.clip(cols['python_prob'][keep] / 100.0, 0.0, 1.0), np.nan),
+        cortex=np.nan_to_num(cols['cortex_score'][keep]),
+        won=cols['actual_result'][keep] == 1,
+    )
+
+def history_from_rows(rows) -> PickHistory:
+    """Build columns from (date, odds, python_prob %, cortex_score, won, prediction_type) tuples."""
+    dates, odds, prob, cortex, won = [], [], [], [], []
+    for d, o, p, c, w, kind in rows:
+        dates.append(str(d)[:10])
+        odds.append(o)
+        prob.append(p if (kind or '').upper() in KELLY_TYPES else np.nan)
+        cortex.append(c if c is not None else 0.0)
+        won.append(bool(w))
+
+    return PickHistory(
+        dates=np.array(dates, dtype='datetime64[D]'),
+        odds=np.array(odds, dtype=float),
+        prob=np.clip(np.array(prob, dtype=float) / 100.0, 0.0, 1.0),
+        cortex=np.array(cortex, dtype=float),
+        won=np.array(won, dtype=bool),
+    )
+
+# ==============================================================================
+# VECTORIZED EVALUATION
+# ==============================================================================
+
+def _paths(history: PickHistory, strategies: Sequence[Strategy], thresholds: Sequence[float], bankroll: float, idx=None):
+    """
+    Bankroll paths and stakes for every (strategy, threshold) config, with
+    shape (..., C, n) where C = len(strategies) * len(thresholds) and the
+    leading axes come from the bootstrap indices `idx`.
+    """
+    take = (lambda a: a) if idx is None else (lambda a: a[idx])
+    odds, prob, cortex, won = take(history.odds), take(history.prob), take(history.cortex), take(history.won)
+
+    configs = [(s, t) for s in strategies for t in thresholds]
+    b = odds - 1.0
+    ret = np.where(won, b, -1.0)[..., None, :]                              # (..., 1, n)
+    edge = b * prob - (1.0 - prob)  # NaN for the picks of other types: no Kelly stake
+    kelly = np.where(edge > 1e-9, edge / b, 0.0)[..., None, :]
+
+    shape = odds.shape[:-1] + (len(configs), odds.shape[-1])
+    paths = np.empty(shape)
+    stakes = np.empty(shape)
+
+    for kind in STRATEGY_KINDS:
+        sel = np.array([c for c, (s, _) in enumerate(configs) if s.kind == kind], dtype=int)
+        if not sel.size:
+            continue
+        sizes = np.array([configs[c][0].size for c in sel])[:, None]
+        cuts = np.array([configs[c][1] for c in sel], dtype=float)[:, None]
+        eligible = cortex[..., None, :] >= cuts                              # (..., k, n)
+
+        if kind == 'kelly':
+            # Compounding: B_t = B_0 * prod(1 + f_i * r_i), stake_t = f_t * B_{t-1}
+            fraction = np.where(eligible, np.minimum(sizes * kelly, MAX_KELLY_STAKE), 0.0)
+            growth = bankroll * np.cumprod(1.0 + fraction * ret, axis=-1)
+            paths[..., sel, :] = growth
+            stakes[..., sel, :] = fraction
+            stakes[..., sel, 0] *= bankroll
+            stakes[..., sel, 1:] *= growth[..., :-1]
+        else:
+            # Flat staking is additive: B_t = B_0 + sum(u_i * r_i)
+            units = np.where(eligible, sizes, 0.0)
+            paths[..., sel, :] = bankroll + np.cumsum(units * ret, axis=-1)
+            stakes[..., sel, :] = units
+
+    return paths, stakes
+
+def _metrics(paths, stakes, bankroll, ruin_level):
+    """Reduce paths along the pick axis to the per-config metrics."""
+    start = np.full(paths.shape[:-1] + (1,), bankroll)
+    full = np.concatenate([start, paths], axis=-1)
+    peaks = np.maximum.accumulate(full, axis=-1)
+    drawdown = ((peaks - full) / np.where(peaks > 0, peaks, 1.0)).max(axis=-1)
+
+    staked = stakes.sum(axis=-1)
+    final = full[..., -1]
+    profit = final - bankroll
+    roi = np.divide(profit, staked, out=np.zeros_like(profit), where=staked > 0)
+    ruined = full.min(axis=-1) <= bankroll * ruin_level
+    return {
+        'bets': (stakes > 0).sum(axis=-1),
+        'staked': staked,
+        'profit': profit,
+        'roi': roi * 100.0,
+        'final': final,
+        'drawdown': drawdown * 100.0,
+        'ruined': ruined,
+    }
+
+def simulate(
+    history: PickHistory,
+    strategies: Sequence[Strategy],
+    thresholds: Sequence[float],
+    bankroll: float = DEFAULT_BANKROLL,
+    n_boot: int = 1000,
+    seed: Optional[int] = None,
+    ruin_level: float = DEFAULT_RUIN_LEVEL,
+    band: float = 90.0,
+) -> List[StrategyReport]:
+    """
+    Evaluate every (strategy, threshold) on the actual pick order, then
+    bootstrap `n_boot` resampled histories for confidence bands and risk of ruin.
+    """
+    n = len(history)
+    if n == 0:
+        return []
+
+    paths, stakes = _paths(history, strategies, thresholds, bankroll)
+    actual = _metrics(paths, stakes, bankroll, ruin_level)
+    configs = [(s, t) for s in strategies for t in thresholds]
+
+    boot = None
+    if n_boot > 0:
+        rng = np.random.default_rng(seed)
+        # Several (C, n) float arrays live at once per resample.
+        per_sample = len(configs) * n * 8 * 6
+        batch = max(1, BOOTSTRAP_BUDGET_BYTES // per_sample)
+        parts = []
+        for start in range(0, n_boot, batch):
+            size = min(batch, n_boot - start)
+            idx = rng.integers(0, n, size=(size, n))
+            b_paths, b_stakes = _paths(history, strategies, thresholds, bankroll, idx=idx)
+            parts.append(_metrics(b_paths, b_stakes, bankroll, ruin_level))
+        boot = {key: np.concatenate([p[key] for p in parts], axis=0) for key in parts[0]}
+
+    lo, hi = (100.0 - band) / 2.0, 100.0 - (100.0 - band) / 2.0
+
+    def _band(key, c):
+        low, high = np.percentile(boot[key][:, c], [lo, hi])
+        return (round(float(low), 2), round(float(high), 2))
+
+    reports = []
+    for c, (strategy, threshold) in enumerate(configs):
+        report = StrategyReport(
+            strategy=strategy,
+            threshold=threshold,
+            bets=int(actual['bets'][c]),
+            staked=round(float(actual['staked'][c]), 2),
+            profit=round(float(actual['profit'][c]), 2),
+            roi_pct=round(float(actual['roi'][c]), 2),
+            final_bankroll=round(float(actual['final'][c]), 2),
+            max_drawdown_pct=round(float(actual['drawdown'][c]), 2),
+        )
+        if boot is not None:
+            report.risk_of_ruin_pct = round(float(boot['ruined'][:, c].mean()) * 100.0, 2)
+            report.roi_band = _band('roi', c)
+            report.final_bankroll_band = _band('final', c)
+            report.max_drawdown_band = _band('drawdown', c)
+        reports.append(report)
+
+    return reports
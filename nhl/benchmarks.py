@@ -0,0 +1,266 @@
+"""
+Projection engine microbenchmarks (see `manage.py bench_engine`).
+
+Each case times one function of nhl.services (or nhl.simulation) over a
+batch of inputs drawn from realistic distributions rather than a single
+hand-picked player:
+- season lines for skaters with more than 5 games (the ingestion filter),
+  log-normal goal rates, ~1/3 defensemen scoring less, assists and shots
+  derived from the goal rate;
+- team / opponent stats spread around the league averages (PP%, PK%, GAA,
+  shots allowed);
+- lambdas and shot lines in the ranges the projection actually produces.
+
+`slate` projects a full 16-game night (32 teams, ~20 skaters each) the way
+fetch_nhl_data's project stage does: dataclasses built from the parsed
+dicts, hybrid projection, value filter. `parlays` prices PARLAY_COUNT
+3-leg parlays (goals, assists, points, shots) on that night with
+PARLAY_SIMS correlated simulations on one core.
+
+Results are operations per second (best of the repeats, GC disabled while
+timing) and are compared to a stored baseline: a case slower than the
+baseline by more than the tolerance is a regression.
+"""
+
+import gc
+import math
+import os
+import platform
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone as dt_timezone
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from .simulation import Leg, simulate_parlays, slate_from_rows
+from .services import (
+    GameContext, OpponentStats, PlayerSeasonStats, TeamStats,
+    calculate_hybrid_projection, estimate_realistic_odds, poisson_at_least, prob_at_least_1,
+)
+from .synthetic import TEAMS
+
+SLATE_SKATERS = 20  # per team, after the gamesPlayed filter
+PARLAY_COUNT = 16
+PARLAY_SIMS = 100_000
+
+# ==============================================================================
+# INPUTS
+# ==============================================================================
+
+def make_player_stats(rng, n) -> List[PlayerSeasonStats]:
+    games = rng.integers(6, 83, size=n)
+    defense = rng.random(n) < 0.33
+    goal_rates = np.clip(rng.lognormal(mean=math.log(0.17), sigma=0.65, size=n), 0.01, 0.75)
+    goal_rates = np.where(defense, goal_rates * 0.4, goal_rates)
+    assist_rates = np.clip(goal_rates * rng.lognormal(mean=math.log(1.4), sigma=0.35, size=n), 0.02, 1.2)
+    shooting_pct = np.clip(rng.normal(0.10, 0.025, size=n), 0.04, 0.20)
+    players = []
+    for i in range(n):
+        gp = int(games[i])
+        goals = int(rng.poisson(goal_rates[i] * gp))
+        assists = int(rng.poisson(assist_rates[i] * gp))
+        players.append(PlayerSeasonStats(
+            games_played=gp,
+            goals=goals,
+            assists=assists,
+            points=goals + assists,
+            shots=max(goals, int(rng.poisson(goal_rates[i] / shooting_pct[i] * gp))),
+            position_code='D' if defense[i] else 'F',
+        ))
+    return players
+
+
+def make_team_stats(rng) -> TeamStats:
+    return TeamStats(
+        pp_pct=float(np.clip(rng.normal(0.21, 0.03), 0.10, 0.35)),
+        l10_pts_pct=float(rng.uniform(0.25, 0.85)),
+    )
+
+
+def make_opp_stats(rng) -> OpponentStats:
+    return OpponentStats(
+        gaa=float(np.clip(rng.normal(3.0, 0.35), 2.0, 4.2)),
+        pk_pct=float(np.clip(rng.normal(0.79, 0.03), 0.70, 0.88)),
+        shots_allowed_avg=float(np.clip(rng.normal(30.0, 2.5), 24.0, 36.0)),
+    )
+
+
+def make_contexts(rng, n) -> List[GameContext]:
+    return [
+        GameContext(
+            is_home=bool(rng.random() < 0.5),
+            is_opponent_tired=bool(rng.random() < 0.15),
+            is_team_tired=bool(rng.random() < 0.15),
+            goalie_form=float(np.clip(rng.normal(0.0, 0.06), -0.15, 0.15)),
+        )
+        for _ in range(n)
+    ]
+
+
+def make_slate(rng) -> List[dict]:
+    """Parsed player dicts for one 16-game night, as fetch_nhl_data's parse stage yields them."""
+    teams = list(TEAMS)
+    rng.shuffle(teams)
+    team_stats = {team: asdict(make_team_stats(rng)) for team in teams}
+    opp_stats = {team: asdict(make_opp_stats(rng)) for team in teams}
+    players = []
+    for home, away in zip(teams[::2], teams[1::2]):
+        for team, opp, is_home in ((home, away, True), (away, home, False)):
+            for stats in make_player_stats(rng, SLATE_SKATERS):
+                players.append({
+                    'team': team,
+                    'opp': opp,
+                    'is_home': is_home,
+                    'team_stats': team_stats[team],
+                    'opp_stats': opp_stats[opp],
+                    'stats': asdict(stats),
+                })
+    return players
+
+
+def make_parlays(rng, players, count=PARLAY_COUNT, legs=3):
+    """A simulation slate from the parsed night (python_prob / python_vol as projected) and `count` parlays."""
+    rows = []
+    for i, player in enumerate(players):
+        stats = player['stats']
+        rows.append({
+            'player_id': str(i),
+            'team': player['team'],
+            'opp': player['opp'],
+            'is_home': player['is_home'],
+            'python_prob': 100.0 * (1.0 - math.exp(-stats['goals'] / stats['games_played'])),
+            'python_vol': stats['shots'] / stats['games_played'],
+        })
+    markets = rng.choice(('goal', 'assist', 'point', 'shot'), size=(count, legs), p=(0.4, 0.1, 0.3, 0.2))
+    parlays = []
+    for parlay_markets in markets:
+        parlays.append([
+            Leg(str(i), str(market), float(rng.choice((1.5, 2.5))) if market == 'shot' else 0.5)
+            for i, market in zip(rng.choice(len(rows), size=legs, replace=False), parlay_markets)
+        ])
+    return slate_from_rows(rows), parlays
+
+# ==============================================================================
+# CASES
+# ==============================================================================
+
+def project_slate(players):
+    kept = 0
+    for player in players:
+        proj = calculate_hybrid_projection(
+            PlayerSeasonStats(**player['stats']),
+            TeamStats(**player['team_stats']),
+            OpponentStats(**player['opp_stats']),
+            GameContext(is_home=player['is_home']),
+        )
+        if proj.score_point > 40 or proj.score_shot > 40:
+            kept += 1
+    return kept
+
+
+def build_cases(size, seed=42) -> Dict[str, tuple]:
+    """name -> (fn, operations per call); each fn processes a whole batch of `size` inputs."""
+    rng = np.random.default_rng(seed)
+    stats = make_player_stats(rng, size)
+    homes = [bool(h) for h in rng.random(size) < 0.5]
+    teams = [make_team_stats(rng) for _ in range(size)]
+    opps = [make_opp_stats(rng) for _ in range(size)]
+    contexts = make_contexts(rng, size)
+    goal_lams = [float(x) for x in np.clip(rng.lognormal(math.log(0.25), 0.6, size), 0.0, 2.0)]
+    shot_lams = [float(x) for x in np.clip(rng.lognormal(math.log(2.4), 0.45, size), 0.1, 12.0)]
+    shot_ks = [int(k) for k in rng.choice((2, 3, 4, 5), size=size, p=(0.3, 0.4, 0.2, 0.1))]
+    slate = make_slate(rng)
+    sim_slate, parlays = make_parlays(rng, slate)
+
+    def odds():
+        for s, h in zip(stats, homes):
+            estimate_realistic_odds(s, h)
+
+    def at_least_1():
+        for lam in goal_lams:
+            prob_at_least_1(lam)
+
+    def at_least_k():
+        for k, lam in zip(shot_ks, shot_lams):
+            poisson_at_least(k, lam)
+
+    def hybrid():
+        for s, t, o, c in zip(stats, teams, opps, contexts):
+            calculate_hybrid_projection(s, t, o, c)
+
+    return {
+        'estimate_realistic_odds': (odds, size),
+        'prob_at_least_1': (at_least_1, size),
+        'poisson_at_least': (at_least_k, size),
+        'calculate_hybrid_projection': (hybrid, size),
+        'slate': (lambda: project_slate(slate), 1),
+        'parlays': (lambda: simulate_parlays(sim_slate, parlays, PARLAY_SIMS, seed=seed), 1),
+    }
+
+# ==============================================================================
+# TIMING & COMPARISON
+# ==============================================================================
+
+@dataclass
+class CaseResult:
+    ops_per_sec: float   # best repeat
+    median_ops_per_sec: float
+    best_ms: float       # one call (a batch, or one slate)
+    repeats: int
+
+
+def time_case(fn: Callable[[], object], ops: int, repeat=7, warmup=1) -> CaseResult:
+    for _ in range(warmup):
+        fn()
+    timings = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    best = min(timings)
+    return CaseResult(
+        ops_per_sec=round(ops / best, 1),
+        median_ops_per_sec=round(ops / statistics.median(timings), 1),
+        best_ms=round(best * 1000, 3),
+        repeats=repeat,
+    )
+
+
+def machine_info() -> dict:
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'measured_at': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> Dict[str, dict]:
+    """
+    Per case present in both: ratio current / baseline throughput and whether
+    it regressed (ratio < 1 - tolerance).
+    """
+    comparison = {}
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference or not reference.get('ops_per_sec'):
+            continue
+        ratio = result['ops_per_sec'] / reference['ops_per_sec']
+        comparison[name] = {
+            'baseline_ops_per_sec': reference['ops_per_sec'],
+            'ratio': round(ratio, 3),
+            'regressed': ratio < 1 - tolerance,
+        }
+    return comparison
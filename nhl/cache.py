@@ -0,0 +1,51 @@
+"""
+Versioned dashboard cache.
+
+The dashboard's match cards (view_models.match_cards) are cached under a key
+that includes a version number:
+
+    key = dashboard_key(await adashboard_version(), team, is_premium)
+
+Commands that change the rows it shows (fetch_nhl_data, watch_lineups,
+live_results) call `bump_dashboard_version()` instead of deleting keys: the
+next request misses and rebuilds, the old entries expire on their own
+(DASHBOARD_CACHE_SECONDS, which also bounds how late the moving 24h window is).
+"""
+
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'nhl:dashboard:version'
+
+
+def _initial_version() -> int:
+    # Never reuses a number: an evicted version can't bring back old entries
+    return time.time_ns()
+
+
+def dashboard_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _initial_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def adashboard_version() -> int:
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, _initial_version(), timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def bump_dashboard_version() -> int:
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:  # not set yet, or evicted
+        return dashboard_version()
+
+
+def dashboard_key(version: int, team: str = None, is_premium: bool = False) -> str:
+    return f"nhl:dashboard:{version}:{team or '*'}:{int(bool(is_premium))}"
@@ -0,0 +1,132 @@
+"""
+Admin changelist for the data_lake table (GameStatsAdmin).
+
+data_lake grows by a full slate of players per day and has no real primary
+key, so the stock changelist doesn't scale on it: an exact COUNT(*) per
+page load and OFFSET pagination that reads (and throws away) every row
+before the page. Here:
+
+- counts are the planner's estimate on PostgreSQL (`estimate_count`),
+  exact only below settings.ADMIN_EXACT_COUNT_BELOW rows;
+- pages are keyset pages, newest first, over the (ts, player_id, date)
+  index of migration 0008: the `after` cursor is the last row shown, the
+  next page is `WHERE (ts, player_id, date) < cursor LIMIT n`, whatever
+  its depth. There are "first" and "next" links, no page numbers.
+"""
+
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_VAR = 'after'
+KEYSET_ORDERING = ['-ts', '-player_id', '-date']
+
+# ==============================================================================
+# ESTIMATED COUNTS
+# ==============================================================================
+
+def estimate_count(queryset):
+    """The planner's row estimate for `queryset` on PostgreSQL; None elsewhere or when unknown."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            # reltuples is -1 until the table's first VACUUM / ANALYZE
+            return int(row[0]) if row and row[0] >= 0 else None
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose count is the planner's estimate when it's large (`estimated` tells which)."""
+    estimated = False
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < settings.ADMIN_EXACT_COUNT_BELOW:
+            return self.object_list.count()
+        self.estimated = True
+        return estimate
+
+# ==============================================================================
+# KEYSET PAGINATION
+# ==============================================================================
+
+def encode_cursor(obj):
+    return f'{obj.ts.isoformat()}|{obj.player_id}|{obj.date or ""}'
+
+
+def decode_cursor(value):
+    """(ts, player_id, date) from an `after` parameter; IncorrectLookupParameters when malformed."""
+    try:
+        ts, player_id, day = value.split('|', 2)
+        return datetime.fromisoformat(ts), player_id, day
+    except ValueError:
+        raise IncorrectLookupParameters(f'Invalid cursor: {value!r}')
+
+
+def past_cursor(cursor):
+    """Rows strictly after `cursor` in KEYSET_ORDERING (the row-value comparison, spelled out)."""
+    ts, player_id, day = cursor
+    return Q(ts__lte=ts) & (
+        Q(ts__lt=ts)
+        | Q(ts=ts, player_id__lt=player_id)
+        | Q(ts=ts, player_id=player_id, date__lt=day)
+    )
+
+
+class KeysetChangeList(ChangeList):
+    """ChangeList paginated with a cursor instead of page numbers (`next_url`, `first_url`)."""
+
+    def __init__(self, request, *args, **kwargs):
+        value = request.GET.get(CURSOR_VAR)
+        self.cursor = decode_cursor(value) if value else None
+        self.next_url = self.first_url = None
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Filter, search and date links start over from the first page.
+        return super().get_query_string(new_params, [CURSOR_VAR, *(remove or [])])
+
+    def get_ordering(self, request, queryset):
+        return list(KEYSET_ORDERING)
+
+    def get_results(self, request):
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        page = self.queryset.filter(past_cursor(self.cursor)) if self.cursor else self.queryset
+        rows = list(page[:self.list_per_page + 1])
+        has_next = len(rows) > self.list_per_page
+        rows = rows[:self.list_per_page]
+
+        self.result_count = paginator.count
+        self.show_full_result_count = False
+        self.full_result_count = None
+        self.show_admin_actions = True
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = has_next or self.cursor is not None
+        self.paginator = paginator
+        if has_next:
+            self.next_url = self.get_query_string({CURSOR_VAR: encode_cursor(rows[-1])})
+        if self.cursor is not None:
+            self.first_url = self.get_query_string()
@@ -0,0 +1,141 @@
+"""
+HTTP client for the public NHL API (api-web.nhle.com).
+
+One `requests.Session` per client, so keep-alive connections are reused
+across calls. `get_conditional()` remembers each URL's ETag / Last-Modified
+and sends them back, so polling an unchanged feed costs a 304 with no body.
+Every client counts its requests, bytes received and errors (read by the
+ingestion ledger, see nhl.ledger). A client may be shared by the fetch
+workers of the ingestion pipeline: the counters are updated under a lock.
+While `archive` is set (during a recorded ingestion run), the body of every
+successful response is stored in the payload archive (see nhl.archive).
+
+`requests` is imported on the first real request (its import costs
+~70 ms): modules that only reference the client, like the scheduler or a
+replay, don't pay for it.
+"""
+
+import logging
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 10
+
+
+def _requests():
+    import requests
+    return requests
+
+
+class NHLClient:
+    def __init__(self, base_url=None, timeout=DEFAULT_TIMEOUT, session=None):
+        self.base_url = (base_url or settings.NHL_API_BASE_URL).rstrip('/')
+        self.timeout = timeout
+        self._session = session
+        self._validators = {}  # url -> (etag, last_modified, payload)
+        self.request_count = 0
+        self.bytes_received = 0
+        self.error_count = 0
+        self._count_lock = threading.Lock()
+        self.archive = None   # PayloadArchive, set by nhl.ledger.record_run
+        self.archived = []    # (endpoint, sha256, size, fetched_at) not yet indexed
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._count_lock:  # fetch workers may share the client
+                if self._session is None:
+                    self._session = _requests().Session()
+        return self._session
+
+    def url(self, path):
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def endpoint(self, path):
+        """Path relative to the API base (how archived payloads are indexed)."""
+        url = self.url(path)
+        return url[len(self.base_url) + 1:] if url.startswith(self.base_url + '/') else url
+
+    def _count(self, received=0, error=False):
+        with self._count_lock:
+            self.request_count += 1
+            self.bytes_received += received
+            self.error_count += int(error)
+
+    def _get(self, url, headers=None):
+        requests = _requests()
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException:
+            self._count(error=True)
+            raise
+        self._count(received=len(response.content), error=response.status_code not in (200, 304))
+        return response
+
+    def _archive(self, url, body):
+        if self.archive is None:
+            return
+        try:
+            digest = self.archive.put(body)
+        except OSError as e:
+            logger.warning("Payload archive write failed for %s: %s", url, e)
+            return
+        with self._count_lock:
+            self.archived.append((self.endpoint(url), digest, len(body), timezone.now()))
+
+    def take_archived(self):
+        with self._count_lock:
+            archived, self.archived = self.archived, []
+        return archived
+
+    def get_json(self, path):
+        """GET and decode JSON. Returns None on any network or HTTP error."""
+        url = self.url(path)
+        try:
+            response = self._get(url)
+            if response.status_code == 200:
+                payload = response.json()
+                self._archive(url, response.content)
+                return payload
+            logger.warning("NHL API %s -> HTTP %s", url, response.status_code)
+        except (_requests().RequestException, ValueError) as e:
+            logger.warning("NHL API %s failed: %s", url, e)
+        return None
+
+    def get_conditional(self, path):
+        """
+        Conditional GET. Returns (payload, modified): on a 304 the previously
+        seen payload is returned with modified=False; on error (None, False).
+        """
+        url = self.url(path)
+        etag, last_modified, cached = self._validators.get(url, (None, None, None))
+
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        try:
+            response = self._get(url, headers=headers)
+            if response.status_code == 304 and cached is not None:
+                return cached, False
+            if response.status_code == 200:
+                payload = response.json()
+                self._archive(url, response.content)
+                self._validators[url] = (
+                    response.headers.get('ETag'),
+                    response.headers.get('Last-Modified'),
+                    payload,
+                )
+                return payload, True
+            logger.warning("NHL API %s -> HTTP %s", url, response.status_code)
+        except (_requests().RequestException, ValueError) as e:
+            logger.warning("NHL API %s failed: %s", url, e)
+        return None, False
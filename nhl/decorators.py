@@ -0,0 +1,38 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.http import JsonResponse
+
+
+def _premium_error(user):
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentification requise.'}, status=401)
+    if not getattr(user, 'is_premium', False):
+        return JsonResponse({'error': 'Abonnement premium requis.'}, status=403)
+    return None
+
+
+def premium_required(view_func):
+    """
+    Restrict a JSON endpoint to premium subscribers.
+    Anonymous users get a 401, free users a 403 (both as JSON, never a redirect).
+    Works on sync and async views alike.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_wrapped_view(request, *args, **kwargs):
+            error = _premium_error(await request.auser())
+            if error is not None:
+                return error
+            return await view_func(request, *args, **kwargs)
+
+        return _async_wrapped_view
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        error = _premium_error(request.user)
+        if error is not None:
+            return error
+        return view_func(request, *args, **kwargs)
+
+    return _wrapped_view
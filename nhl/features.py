@@ -0,0 +1,241 @@
+"""
+Per-game player feature store (recent form for the projections).
+
+fetch_game_results settles each day from its boxscores; `FeatureStore.settle`
+keeps what it read. FEATURE_STORE_STORAGE picks where:
+- 'db': one GameLogPartition row per settled date (the GAME_LOGS columns,
+  npz-compressed) and a RollingFormState row, so they survive a redeploy.
+- 'files': the lake format (nhl.lake), for a mounted volume or local
+  development:
+
+    <LAKE_DIR>/game_logs/date=2026-01-07/player_id.npy, goals.npy, ...   game logs
+    <LAKE_DIR>/game_logs/rolling_form.npz                                  rolling state
+
+Game logs are written once per settled date. The rolling state holds each player's last 10 games
+(most recent first) and the running last-5 / last-10 totals. Settling the
+next day only touches the players who played it: their totals gain the new
+game and lose the one leaving each window. A date settled out of order (a
+backfill, or a day settled again) rebuilds the state from the partitions.
+
+fetch_nhl_data loads the state once per run (as of the date it projects,
+so replays see the form of the time); `RollingForm.get(player_id)` is
+then a dict lookup and two array rows.
+"""
+
+import io
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .lake import Column, LakeTable, LakeWriter, TableSpec, lake_root, read_manifest
+from .models import GameLogPartition, RollingFormState
+from .services import RecentForm
+
+GAME_LOGS = TableSpec('game_logs', 'date', (
+    Column('player_id', 'player_id', 'int'),
+    Column('game_id', 'game_id', 'int'),
+    Column('team', 'team', 'str'),
+    Column('goals', 'goals', 'int'),
+    Column('assists', 'assists', 'int'),
+    Column('shots', 'shots', 'int'),
+    Column('toi', 'toi', 'int'),
+))
+STATS = ('goals', 'assists', 'shots', 'toi')
+WINDOWS = (5, 10)
+DEPTH = max(WINDOWS)
+STATE_FILE = 'rolling_form.npz'
+STATE_NAME = 'rolling_form'
+STORAGES = ('db', 'files')
+
+
+def toi_seconds(toi: str) -> int:
+    """'18:34' -> 1114 (boxscore time on ice); 0 when missing."""
+    try:
+        minutes, seconds = (toi or '').split(':')
+        return int(minutes) * 60 + int(seconds)
+    except ValueError:
+        return 0
+
+# ==============================================================================
+# ROLLING STATE
+# ==============================================================================
+
+class RollingForm:
+    """
+    Last DEPTH games per player, most recent first (`ring`: players x DEPTH x
+    STATS), with the running totals of each window (`totals`: players x
+    WINDOWS x STATS) and the number of games seen.
+    """
+
+    def __init__(self, ids=None, ring=None, totals=None, games=None, last_date=''):
+        self.ids = np.zeros(0, dtype=np.int64) if ids is None else ids
+        self.ring = np.zeros((0, DEPTH, len(STATS)), dtype=np.int32) if ring is None else ring
+        self.totals = np.zeros((0, len(WINDOWS), len(STATS)), dtype=np.int32) if totals is None else totals
+        self.games = np.zeros(0, dtype=np.int32) if games is None else games
+        self.last_date = last_date
+        self.rows: Dict[int, int] = {int(player_id): i for i, player_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _rows_for(self, player_ids: np.ndarray) -> np.ndarray:
+        new = [int(player_id) for player_id in player_ids if int(player_id) not in self.rows]
+        if new:
+            n = len(new)
+            self.rows.update({player_id: len(self.ids) + i for i, player_id in enumerate(new)})
+            self.ids = np.concatenate([self.ids, np.array(new, dtype=np.int64)])
+            self.ring = np.concatenate([self.ring, np.zeros((n, DEPTH, len(STATS)), dtype=np.int32)])
+            self.totals = np.concatenate([self.totals, np.zeros((n, len(WINDOWS), len(STATS)), dtype=np.int32)])
+            self.games = np.concatenate([self.games, np.zeros(n, dtype=np.int32)])
+        return np.array([self.rows[int(player_id)] for player_id in player_ids], dtype=np.int64)
+
+    def apply(self, date: str, logs: Dict[str, np.ndarray]):
+        """Push one day's games (one per player) into the windows."""
+        player_ids, first = np.unique(np.asarray(logs['player_id']), return_index=True)
+        values = np.stack([np.asarray(logs[stat])[first] for stat in STATS], axis=1).astype(np.int32)
+        rows = self._rows_for(player_ids)
+        for w, window in enumerate(WINDOWS):
+            self.totals[rows, w] += values - self.ring[rows, window - 1]
+        self.ring[rows, 1:] = self.ring[rows, :-1]
+        self.ring[rows, 0] = values
+        self.games[rows] += 1
+        self.last_date = date
+
+    def get(self, player_id) -> Optional[RecentForm]:
+        row = self.rows.get(int(player_id))
+        if row is None:
+            return None
+        games = int(self.games[row])
+        form = {}
+        for w, window in enumerate(WINDOWS):
+            form[f'games_l{window}'] = min(games, window)
+            for s, stat in enumerate(STATS):
+                form[f'{stat}_l{window}'] = int(self.totals[row, w, s])
+        return RecentForm(**form)
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez(buffer, ids=self.ids, ring=self.ring, totals=self.totals, games=self.games,
+                 last_date=np.array(self.last_date))
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data) -> 'RollingForm':
+        with np.load(io.BytesIO(data), allow_pickle=False) as state:
+            return cls(state['ids'], state['ring'], state['totals'], state['games'], str(state['last_date']))
+
+    def save(self, path):
+        tmp = f'{path}.tmp.npz'
+        with open(tmp, 'wb') as f:
+            f.write(self.to_bytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path) -> 'RollingForm':
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+def pack_logs(rows: List[dict]) -> bytes:
+    """One day's game logs as GAME_LOGS columns in a compressed npz archive."""
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **{
+        col.name: np.array([row[col.source] for row in rows], dtype=np.int64 if col.kind == 'int' else str)
+        for col in GAME_LOGS.columns
+    })
+    return buffer.getvalue()
+
+
+def unpack_logs(data, columns: List[str]) -> Dict[str, np.ndarray]:
+    with np.load(io.BytesIO(data), allow_pickle=False) as logs:
+        return {name: logs[name] for name in columns}
+
+# ==============================================================================
+# STORE
+# ==============================================================================
+
+class FeatureStore:
+    def __init__(self, root=None, storage=None):
+        self.root = root
+        self.storage = storage or settings.FEATURE_STORE_STORAGE
+        if self.storage not in STORAGES:
+            raise ValueError(f"Unknown storage '{self.storage}' (expected one of {', '.join(STORAGES)})")
+        self.state_path = lake_root(root) / GAME_LOGS.name / STATE_FILE
+
+    def settled_dates(self) -> List[str]:
+        if self.storage == 'db':
+            return list(GameLogPartition.objects.order_by('date').values_list('date', flat=True))
+        manifest = read_manifest(GAME_LOGS.name, self.root)
+        return [p['date'] for p in manifest['partitions']] if manifest else []
+
+    def _load_state(self) -> RollingForm:
+        if self.storage == 'db':
+            data = RollingFormState.objects.filter(name=STATE_NAME).values_list('data', flat=True).first()
+            return RollingForm() if data is None else RollingForm.from_bytes(bytes(data))
+        return RollingForm.load(self.state_path)
+
+    def _save_state(self, state: RollingForm):
+        if self.storage == 'db':
+            RollingFormState.objects.update_or_create(
+                name=STATE_NAME, defaults={'last_date': state.last_date, 'data': state.to_bytes()},
+            )
+        else:
+            state.save(self.state_path)
+
+    def _write_logs(self, date: str, rows: List[dict]):
+        if self.storage == 'db':
+            GameLogPartition.objects.update_or_create(date=date, defaults={'rows': len(rows), 'data': pack_logs(rows)})
+        else:
+            LakeWriter(GAME_LOGS, root=self.root).write_partition(
+                date, [tuple(row[col.source] for col in GAME_LOGS.columns) for row in rows],
+            )
+
+    def _iter_logs(self, columns: List[str]):
+        """(date, {column: array}) of each settled date, in date order."""
+        if self.storage == 'db':
+            for date, data in GameLogPartition.objects.order_by('date').values_list('date', 'data').iterator():
+                yield date, unpack_logs(bytes(data), columns)
+        elif self.settled_dates():
+            yield from LakeTable(GAME_LOGS.name, self.root).iter_partitions(columns)
+
+    def form(self, as_of: str = None) -> RollingForm:
+        """
+        Recent form going into `as_of` (YYYY-MM-DD, default: the latest): a
+        replay of an earlier date rebuilds it from the games before that date.
+        """
+        state = self._load_state()
+        if as_of and state.last_date >= as_of:
+            state = self.rebuild(before=as_of)
+        return state
+
+    def settle(self, date: str, rows: Iterable[dict]) -> RollingForm:
+        """
+        Store one day's game logs (dicts with the GAME_LOGS columns) and roll
+        them into the recent-form windows.
+        """
+        rows = list(rows)
+        with transaction.atomic():
+            resettled = date in self.settled_dates()
+            self._write_logs(date, rows)
+            state = self._load_state()
+            if resettled or date <= state.last_date:
+                state = self.rebuild()
+            else:
+                state.apply(date, {col.name: np.array([row[col.source] for row in rows], dtype=np.int64)
+                                   for col in GAME_LOGS.columns if col.kind == 'int'})
+            self._save_state(state)
+        return state
+
+    def rebuild(self, before: str = None) -> RollingForm:
+        """The rolling state replayed from the game-log partitions (dated before `before`), in date order."""
+        state = RollingForm()
+        for date, logs in self._iter_logs(['player_id', *STATS]):
+            if before and date >= before:
+                break
+            state.apply(date, logs)
+        return state
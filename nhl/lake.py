@@ -0,0 +1,279 @@
+"""
+Columnar snapshots of data_lake / performance_log for offline analytics.
+
+Layout (one directory per table, one partition per date):
+
+    <LAKE_DIR>/data_lake/manifest.json
+    <LAKE_DIR>/data_lake/date=2026-01-07/ts.npy, python_prob.npy, ...   (format "npy")
+    <LAKE_DIR>/data_lake/date=2026-01-07/part.parquet                  (format "parquet")
+
+`.npy` columns are plain fixed-width arrays (floats with NaN for NULL,
+fixed-width unicode strings, datetime64[us] timestamps) so the loader can
+memory-map them and hand out zero-copy views. Parquet needs pyarrow, which
+is optional.
+"""
+
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from django.conf import settings
+
+FORMATS = ('npy', 'parquet')
+MANIFEST = 'manifest.json'
+
+# ==============================================================================
+# TABLE SPECS
+# ==============================================================================
+
+@dataclass(frozen=True)
+class Column:
+    name: str        # Column name in the lake
+    source: str      # SQL column
+    kind: str        # 'str' | 'float' | 'int' | 'bool' | 'ts'
+
+@dataclass(frozen=True)
+class TableSpec:
+    name: str
+    date_column: str
+    columns: Sequence[Column]
+
+    @property
+    def select_sql(self) -> str:
+        cols = ', '.join(c.source for c in self.columns)
+        return f"SELECT {self.date_column}, {cols} FROM {self.name}"
+
+TABLES = {
+    'data_lake': TableSpec('data_lake', 'date', (
+        Column('player_id', 'player_id', 'str'),
+        Column('name', 'player_name', 'str'),
+        Column('team', 'team', 'str'),
+        Column('opp', 'opp', 'str'),
+        Column('ts', 'ts', 'ts'),
+        Column('is_home', 'is_home', 'int'),
+        Column('algo_score_goal', 'algo_score_goal', 'float'),
+        Column('algo_score_shot', 'algo_score_shot', 'float'),
+        Column('python_prob', 'python_prob', 'float'),
+        Column('python_vol', 'python_vol', 'float'),
+        Column('result_goal', 'result_goal', 'str'),
+        Column('result_shot', 'result_shot', 'str'),
+    )),
+    'performance_log': TableSpec('performance_log', 'date', (
+        Column('id', 'id', 'int'),
+        Column('player_id', 'player_id', 'str'),
+        Column('name', 'player_name', 'str'),
+        Column('team', 'team', 'str'),
+        Column('opp', 'opponent', 'str'),
+        Column('prediction_type', 'prediction_type', 'str'),
+        Column('predicted_odds', 'predicted_odds', 'float'),
+        Column('algo_score_goal', 'algo_score_goal', 'float'),
+        Column('python_prob', 'python_prob', 'float'),
+        Column('cortex_score', 'cortex_score', 'float'),
+        Column('actual_result', 'actual_result', 'bool'),
+        Column('actual_value', 'actual_value', 'str'),
+        Column('stake', 'stake', 'float'),
+        Column('profit', 'profit', 'float'),
+        Column('created_at', 'created_at', 'ts'),
+    )),
+}
+
+def lake_root(root=None) -> Path:
+    return Path(root or settings.LAKE_DIR)
+
+# ==============================================================================
+# COLUMN CONVERSION
+# ==============================================================================
+
+INT_NULL = -1   # is_home / ids are never negative
+BOOL_NULL = -1  # actual_result: 1 hit, 0 miss, -1 unknown
+
+def _to_ts(value) -> np.datetime64:
+    if value is None:
+        return np.datetime64('NaT', 'us')
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(dt_timezone.utc).replace(tzinfo=None)
+    return np.datetime64(value, 'us')
+
+def to_array(kind: str, values: List) -> np.ndarray:
+    """Convert one column of DB values to a fixed-width, mmap-able array."""
+    if kind == 'float':
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+    if kind == 'int':
+        return np.array([INT_NULL if v is None else int(v) for v in values], dtype=np.int64)
+    if kind == 'bool':
+        return np.array([BOOL_NULL if v is None else int(bool(v)) for v in values], dtype=np.int8)
+    if kind == 'ts':
+        return np.array([_to_ts(v) for v in values], dtype='datetime64[us]')
+    strings = ['' if v is None else str(v) for v in values]
+    width = max([len(s) for s in strings] + [1])
+    return np.array(strings, dtype=f'<U{width}')
+
+# ==============================================================================
+# MANIFEST
+# ==============================================================================
+
+def read_manifest(table: str, root=None) -> Optional[dict]:
+    path = lake_root(root) / table / MANIFEST
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def _write_manifest(table_dir: Path, manifest: dict):
+    manifest['updated_at'] = datetime.now(dt_timezone.utc).isoformat()
+    tmp = table_dir / (MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, table_dir / MANIFEST)
+
+# ==============================================================================
+# WRITER
+# ==============================================================================
+
+class LakeWriter:
+    """
+    Writes one partition per date. Each partition is written to a temp
+    directory, moved into place, then recorded in the manifest, so an
+    interrupted export never leaves a half-written partition behind.
+    """
+
+    def __init__(self, spec: TableSpec, root=None, fmt: str = 'npy', full: bool = False):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}' (expected one of {', '.join(FORMATS)})")
+        if fmt == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError("Parquet export requires pyarrow (pip install pyarrow)")
+
+        self.spec = spec
+        self.fmt = fmt
+        self.table_dir = lake_root(root) / spec.name
+
+        manifest = None if full else read_manifest(spec.name, root)
+        if manifest and manifest.get('format') != fmt:
+            raise ValueError(
+                f"{spec.name} was exported as {manifest.get('format')}; use --full to switch formats"
+            )
+        if full and self.table_dir.exists():
+            shutil.rmtree(self.table_dir)
+        self.table_dir.mkdir(parents=True, exist_ok=True)
+
+        self.manifest = manifest or {
+            'table': spec.name,
+            'format': fmt,
+            'columns': {c.name: c.kind for c in spec.columns},
+            'partitions': [],
+        }
+
+    @property
+    def last_date(self) -> Optional[str]:
+        dates = [p['date'] for p in self.manifest['partitions']]
+        return max(dates) if dates else None
+
+    def write_partition(self, date: str, rows: List[tuple]):
+        """`rows` are tuples in `spec.columns` order (date column excluded)."""
+        columns = {
+            col.name: to_array(col.kind, [row[i] for row in rows])
+            for i, col in enumerate(self.spec.columns)
+        }
+
+        final_dir = self.table_dir / f'date={date}'
+        tmp_dir = self.table_dir / f'.tmp-date={date}'
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir()
+
+        if self.fmt == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            pq.write_table(pa.table(columns), tmp_dir / 'part.parquet')
+            files = ['part.parquet']
+        else:
+            files = []
+            for name, values in columns.items():
+                np.save(tmp_dir / f'{name}.npy', values, allow_pickle=False)
+                files.append(f'{name}.npy')
+
+        if final_dir.exists():
+            shutil.rmtree(final_dir)
+        os.replace(tmp_dir, final_dir)
+
+        partitions = [p for p in self.manifest['partitions'] if p['date'] != date]
+        partitions.append({'date': date, 'rows': len(rows), 'files': files})
+        self.manifest['partitions'] = sorted(partitions, key=lambda p: p['date'])
+        _write_manifest(self.table_dir, self.manifest)
+
+# ==============================================================================
+# LOADER
+# ==============================================================================
+
+class LakeTable:
+    """Read side of an exported table. Columns from `.npy` partitions are memory-mapped."""
+
+    def __init__(self, table: str, root=None):
+        self.manifest = read_manifest(table, root)
+        if self.manifest is None:
+            raise LookupError(f"No lake export found for {table} (run manage.py export_lake)")
+        self.table = table
+        self.table_dir = lake_root(root) / table
+
+    @property
+    def columns(self) -> Dict[str, str]:
+        return self.manifest['columns']
+
+    @property
+    def partitions(self) -> List[dict]:
+        return self.manifest['partitions']
+
+    def _select(self, start: Optional[str], end: Optional[str]) -> List[dict]:
+        return [
+            p for p in self.partitions
+            if (start is None or p['date'] >= start) and (end is None or p['date'] <= end)
+        ]
+
+    def _load(self, partition: dict, columns: Sequence[str]) -> Dict[str, np.ndarray]:
+        part_dir = self.table_dir / f"date={partition['date']}"
+        if self.manifest['format'] == 'parquet':
+            import pyarrow.parquet as pq
+            table = pq.read_table(part_dir / 'part.parquet', columns=list(columns), memory_map=True)
+            return {name: table.column(name).to_numpy() for name in columns}
+        return {name: np.load(part_dir / f'{name}.npy', mmap_mode='r') for name in columns}
+
+    def iter_partitions(self, columns: Optional[Sequence[str]] = None,
+                        start: Optional[str] = None, end: Optional[str] = None) -> Iterator[tuple]:
+        """Yield (date, {column: array}) per partition; `.npy` arrays are zero-copy memmaps."""
+        columns = list(columns or self.columns)
+        for partition in self._select(start, end):
+            yield partition['date'], self._load(partition, columns)
+
+    def read(self, columns: Optional[Sequence[str]] = None,
+             start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        Columns over a date range, plus a 'date' column. A single partition is
+        returned as-is (zero-copy); several are concatenated.
+        """
+        columns = list(columns or self.columns)
+        dates, parts = [], []
+        for date, arrays in self.iter_partitions(columns, start, end):
+            n = len(arrays[columns[0]]) if columns else 0
+            dates.append(np.full(n, date, dtype='datetime64[D]'))
+            parts.append(arrays)
+
+        if not parts:
+            return {name: np.array([]) for name in columns + ['date']}
+        if len(parts) == 1:
+            return {**parts[0], 'date': dates[0]}
+        out = {name: np.concatenate([p[name] for p in parts]) for name in columns}
+        out['date'] = np.concatenate(dates)
+        return out
+
+def open_table(table: str, root=None) -> LakeTable:
+    return LakeTable(table, root)
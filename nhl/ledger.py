@@ -0,0 +1,113 @@
+"""
+Ingestion run ledger.
+
+Each cron command wraps its work in `record_run()`, which writes one
+`IngestionRun` row: wall time per stage, HTTP traffic of its NHLClient,
+rows written / skipped and errors. The row is created as "running" when
+the command starts, so a run that hangs or gets killed is still visible.
+Every payload the client fetched during the run is archived and indexed
+against it (nhl.archive), so the run can be replayed offline.
+
+    with record_run('fetch_nhl_data', client=client) as run:
+        with run.stage('fetch'):
+            ...
+        run.rows_written += n
+"""
+
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.utils import timezone
+
+from .archive import PayloadArchive
+from .models import ArchivedPayload, IngestionRun
+
+STAGES = ('fetch', 'parse', 'project', 'persist')
+
+
+class RunRecorder:
+    def __init__(self, run, client=None):
+        self.run = run
+        self.client = client
+        self.stages = {}
+        self.rows_written = 0
+        self.rows_skipped = 0
+        self.errors = 0
+        self.failure = ''
+        self._started = time.perf_counter()
+        # A client shared between jobs (run_scheduler) keeps counting: record deltas.
+        self._http_base = self._http_counts()
+
+    def _http_counts(self):
+        if self.client is None:
+            return (0, 0, 0)
+        return (self.client.request_count, self.client.bytes_received, self.client.error_count)
+
+    @contextmanager
+    def stage(self, name):
+        """Add the wall time of the block to stage `name` (stages may repeat)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def error(self, count=1):
+        self.errors += count
+
+    def fail(self, message):
+        """Mark the run failed without raising (e.g. the schedule could not be fetched)."""
+        self.errors += 1
+        self.failure = message
+
+    def set_target_date(self, date_str):
+        self.run.target_date = date_str or ''
+
+    def _save(self, status, message=''):
+        run = self.run
+        run.status = status
+        run.finished_at = timezone.now()
+        run.duration = time.perf_counter() - self._started
+        run.stages = {name: round(seconds, 3) for name, seconds in self.stages.items()}
+        run.rows_written = self.rows_written
+        run.rows_skipped = self.rows_skipped
+        run.errors = self.errors
+        run.error_message = message
+        run.http_requests, run.http_bytes, run.http_errors = (
+            now - base for now, base in zip(self._http_counts(), self._http_base)
+        )
+        run.save()
+        if self.client is not None and self.client.archive is not None:
+            self.client.archive.flush()
+            ArchivedPayload.objects.bulk_create([
+                ArchivedPayload(run=run, endpoint=endpoint, sha256=digest, size=size, fetched_at=fetched_at)
+                for endpoint, digest, size, fetched_at in self.client.take_archived()
+            ])
+            self.client.archive = None
+
+
+@contextmanager
+def record_run(command, client=None, target_date='', replay_of=None):
+    """
+    Record one ingestion run; an exception marks it failed and is re-raised.
+    Unless the run is a replay, the client's responses are archived and
+    indexed against the run (see nhl.archive).
+    """
+    recorder = RunRecorder(
+        IngestionRun.objects.create(command=command, target_date=target_date or '', started_at=timezone.now(),
+                                    replay_of=replay_of),
+        client=client,
+    )
+    if client is not None and replay_of is None and settings.PAYLOAD_ARCHIVE_ENABLED:
+        client.take_archived()
+        client.archive = PayloadArchive()
+    try:
+        yield recorder
+    except BaseException as e:
+        recorder._save(IngestionRun.STATUS_FAILED, f'{type(e).__name__}: {e}')
+        raise
+    if recorder.failure:
+        recorder._save(IngestionRun.STATUS_FAILED, recorder.failure)
+    else:
+        recorder._save(IngestionRun.STATUS_SUCCESS)
@@ -0,0 +1,215 @@
+"""
+Pre-game lineups and starting goalies.
+
+Projections are computed once (fetch_nhl_data, 16:00), but scratches and the
+confirmed starting goalies are only known in the last hours before puck
+drop. `LineupWatcher` follows the gamecenter boxscore of every game on a
+date with conditional requests (an unchanged boxscore is a 304), from
+LINEUP_WATCH_WINDOW_MINUTES before puck drop and faster as it nears, until
+the game starts and live_results takes over.
+
+A change only re-projects the players it affects, through the `reproject`
+callback (watch_lineups: fetch_nhl_data's pipeline and bulk upserts):
+
+- a team's lineup (scratch, late call-up): that team's skaters, the dressed
+  ones only; the projected players who aren't dressed are listed as scratched;
+- a team's starting goalie, once confirmed or when he changes: the opposing
+  skaters, with the goalie's own form (team_context.goalie_form) instead of
+  the probable starter's.
+"""
+
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import GameStats
+from .team_context import goalie_form, goalie_save_pct, league_save_pct
+
+PREGAME_STATES = {'FUT', 'PRE'}
+
+
+@dataclass
+class LineupTracker:
+    game_id: int
+    date: str
+    home: str
+    away: str
+    start: Optional[datetime] = None
+    state: str = 'FUT'
+    next_poll: float = 0.0
+    interval: float = 0.0
+    projected: Dict[str, frozenset] = field(default_factory=dict)  # team -> player_ids with a projection
+    skaters: Dict[str, frozenset] = field(default_factory=dict)    # team -> dressed skaters last seen
+    goalies: Dict[str, str] = field(default_factory=dict)          # team -> starting goalie last seen
+    goalie_forms: Dict[str, float] = field(default_factory=dict)   # team -> goalie_form last projected with
+
+    @property
+    def done(self):
+        return self.state not in PREGAME_STATES
+
+    def opponent(self, team):
+        return self.away if team == self.home else self.home
+
+    def seconds_to_start(self):
+        return (self.start - timezone.now()).total_seconds() if self.start else None
+
+
+@dataclass
+class LineupChange:
+    """One team to re-project: its dressed skaters and the opposing starter's form, when known."""
+    team: str
+    opp: str
+    is_home: bool
+    lineup: Optional[List[str]] = None
+    opp_goalie_form: Optional[float] = None
+    scratched: List[str] = field(default_factory=list)
+    reasons: List[str] = field(default_factory=list)
+
+
+def extract_lineups(boxscore, home, away) -> Dict[str, Tuple[frozenset, Optional[str]]]:
+    """team -> (dressed skater ids, starting goalie id) of a boxscore; teams without a lineup yet are left out."""
+    by_team = boxscore.get('playerByGameStats', boxscore)
+    lineups = {}
+    for team_key, team in (('homeTeam', home), ('awayTeam', away)):
+        team_data = by_team.get(team_key) or {}
+        skaters = frozenset(
+            str(player.get('playerId')) for group in ('forwards', 'defense') for player in team_data.get(group, [])
+        )
+        starter = next((str(g.get('playerId')) for g in team_data.get('goalies', []) if g.get('starter')), None)
+        if skaters or starter:
+            lineups[team] = (skaters, starter)
+    return lineups
+
+
+def next_interval(seconds_to_start=None):
+    """
+    Seconds until the next poll of a game: until the watch window opens,
+    then a tenth of the time left before puck drop, within
+    LINEUP_POLL_MIN_INTERVAL..LINEUP_POLL_MAX_INTERVAL.
+    """
+    if seconds_to_start is None:
+        return settings.LINEUP_POLL_MAX_INTERVAL
+    window = settings.LINEUP_WATCH_WINDOW_MINUTES * 60
+    if seconds_to_start > window:
+        return seconds_to_start - window
+    return max(settings.LINEUP_POLL_MIN_INTERVAL, min(seconds_to_start / 10, settings.LINEUP_POLL_MAX_INTERVAL))
+
+
+class LineupWatcher:
+    def __init__(self, client, reproject: Callable[[str, List[LineupChange]], None], context=None, log=None,
+                 clock=time.monotonic):
+        self.client = client
+        self.reproject = reproject
+        self.context = context or {}  # the date's TeamContextSnapshot.teams
+        self.league_pct = league_save_pct(self.context)
+        self.log = log or (lambda message: None)
+        self.clock = clock
+        self.club_stats: Dict[str, dict] = {}
+
+    def load_games(self, date_str):
+        """Games scheduled on `date_str` that haven't started, with the players we hold projections for."""
+        schedule = self.client.get_json(f'schedule/{date_str}') or {}
+        trackers = []
+        for day in schedule.get('gameWeek', []):
+            if day.get('date') != date_str:
+                continue
+            for game in day.get('games', []):
+                home, away = game['homeTeam']['abbrev'], game['awayTeam']['abbrev']
+                start = game.get('startTimeUTC')
+                tracker = LineupTracker(
+                    game_id=game['id'],
+                    date=date_str,
+                    home=home,
+                    away=away,
+                    start=datetime.fromisoformat(start.replace('Z', '+00:00')) if start else None,
+                    state=game.get('gameState', 'FUT'),
+                )
+                if tracker.done:
+                    continue
+                for team, player_id in GameStats.objects.filter(
+                    date=date_str, team__in=[home, away]
+                ).values_list('team', 'player_id'):
+                    tracker.projected[team] = tracker.projected.get(team, frozenset()) | {player_id}
+                # First poll when the watch window opens (right away if it already has)
+                seconds, window = tracker.seconds_to_start(), settings.LINEUP_WATCH_WINDOW_MINUTES * 60
+                tracker.next_poll = self.clock() + (seconds - window if seconds and seconds > window else 0.0)
+                trackers.append(tracker)
+        return trackers
+
+    def team_club_stats(self, team) -> Optional[dict]:
+        """The team's club stats, revalidated with a conditional request."""
+        payload, _ = self.client.get_conditional(f'club-stats/{team}/now')
+        if payload is not None:
+            self.club_stats[team] = payload
+        return self.club_stats.get(team)
+
+    def starter_form(self, team, goalie_id) -> float:
+        return goalie_form(goalie_save_pct(self.team_club_stats(team), goalie_id), self.league_pct)
+
+    def poll(self, tracker) -> List[LineupChange]:
+        """Fetch one game's boxscore; re-project what its lineups changed. Returns the changes."""
+        boxscore, modified = self.client.get_conditional(f'gamecenter/{tracker.game_id}/boxscore')
+        changes = []
+        if boxscore is not None and modified:
+            tracker.state = boxscore.get('gameState', tracker.state)
+            if not tracker.done:
+                changes = self.detect(tracker, extract_lineups(boxscore, tracker.home, tracker.away))
+            if changes:
+                self.reproject(tracker.date, changes)
+
+        tracker.interval = next_interval(tracker.seconds_to_start())
+        tracker.next_poll = self.clock() + tracker.interval
+        return changes
+
+    def detect(self, tracker, lineups) -> List[LineupChange]:
+        reasons: Dict[str, List[str]] = {}
+        for team, (skaters, starter) in lineups.items():
+            previous = tracker.skaters.get(team)
+            if skaters and skaters != previous:
+                tracker.skaters[team] = skaters
+                # First lineup of the game: only a projected player left out of it changes anything
+                if previous is not None or tracker.projected.get(team, frozenset()) - skaters:
+                    reasons.setdefault(team, []).append('lineup')
+
+            if starter and starter != tracker.goalies.get(team):
+                tracker.goalies[team] = starter
+                form = self.starter_form(team, starter)
+                projected_with = tracker.goalie_forms.get(team, self.context.get(team, {}).get('goalie_form', 0.0))
+                tracker.goalie_forms[team] = form
+                if form != projected_with:
+                    reasons.setdefault(tracker.opponent(team), []).append(f'goalie {starter}')
+
+        changes = []
+        for team, why in reasons.items():
+            opp = tracker.opponent(team)
+            skaters = tracker.skaters.get(team)
+            changes.append(LineupChange(
+                team=team,
+                opp=opp,
+                is_home=team == tracker.home,
+                lineup=sorted(skaters) if skaters else None,
+                opp_goalie_form=tracker.goalie_forms.get(opp),
+                scratched=sorted(tracker.projected.get(team, frozenset()) - skaters) if skaters else [],
+                reasons=why,
+            ))
+            self.log(f"  > {team} vs {opp} (game {tracker.game_id}): {', '.join(why)}")
+        return changes
+
+    def run(self, trackers, sleep=time.sleep, max_seconds=None):
+        """Poll until every game has started (or `max_seconds` elapse)."""
+        deadline = self.clock() + max_seconds if max_seconds else None
+        while True:
+            pending = [t for t in trackers if not t.done]
+            if not pending or (deadline and self.clock() >= deadline):
+                return
+            now = self.clock()
+            for tracker in pending:
+                if tracker.next_poll <= now:
+                    self.poll(tracker)
+            upcoming = [t.next_poll for t in trackers if not t.done]
+            if upcoming:
+                sleep(max(0.0, min(upcoming) - self.clock()))
@@ -0,0 +1,197 @@
+"""
+Live in-game results.
+
+`LivePoller` follows the gamecenter boxscore of every game on a date with
+conditional requests, with an interval that adapts to the game state
+(in play, intermission, not started yet). Each change updates the tracked
+players' running lines (`LiveStat`, sent whole to a new SSE connection)
+and is recorded as a compact `LiveEvent` diff, which the SSE stream
+(`nhl.views.live_stream`) pushes to open dashboards. data_lake is only
+written once a game is final: its result columns hold the odds until then.
+"""
+
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import bump_dashboard_version
+from .models import GameStats, LiveEvent, LiveStat
+
+LIVE_STATES = {'LIVE', 'CRIT'}
+FINAL_STATES = {'OFF', 'FINAL'}
+
+
+@dataclass
+class GameTracker:
+    game_id: int
+    date: str
+    home: str
+    away: str
+    start: Optional[datetime] = None
+    state: str = 'FUT'
+    score: Tuple[int, int] = (0, 0)
+    next_poll: float = 0.0
+    interval: float = 0.0
+    tracked: set = field(default_factory=set)
+    stats: Dict[str, Tuple[int, int, int]] = field(default_factory=dict)  # player_id -> (G, A, SOG)
+
+    @property
+    def done(self):
+        return self.state in FINAL_STATES
+
+
+def extract_player_stats(boxscore) -> Dict[str, Tuple[int, int, int]]:
+    """(goals, assists, shots) per skater; handles both boxscore layouts."""
+    by_team = boxscore.get('playerByGameStats', boxscore)
+    stats = {}
+    for team_key in ('homeTeam', 'awayTeam'):
+        team_data = by_team.get(team_key, {})
+        for group in ('forwards', 'defense'):
+            for player in team_data.get(group, []):
+                stats[str(player.get('playerId'))] = (
+                    player.get('goals', 0) or 0,
+                    player.get('assists', 0) or 0,
+                    player.get('sog', player.get('shots', 0)) or 0,
+                )
+    return stats
+
+
+def next_interval(state, in_intermission, modified, previous, seconds_to_start=None):
+    """
+    Seconds until the next poll of a game.
+    - in play: LIVE_POLL_INTERVAL, stretched x1.5 per unchanged poll (up to x4)
+    - intermission: LIVE_POLL_INTERMISSION_INTERVAL
+    - not started: until puck drop, capped at LIVE_POLL_MAX_INTERVAL
+    """
+    base = settings.LIVE_POLL_INTERVAL
+    if state in LIVE_STATES:
+        if in_intermission:
+            return settings.LIVE_POLL_INTERMISSION_INTERVAL
+        if modified or not previous:
+            return base
+        return min(previous * 1.5, base * 4)
+    if seconds_to_start is not None:
+        return max(base, min(seconds_to_start, settings.LIVE_POLL_MAX_INTERVAL))
+    return settings.LIVE_POLL_MAX_INTERVAL
+
+
+class LivePoller:
+    def __init__(self, client, log=None, clock=time.monotonic):
+        self.client = client
+        self.log = log or (lambda message: None)
+        self.clock = clock
+
+    def load_games(self, date_str):
+        """Games scheduled on `date_str`, with the players we hold projections for."""
+        schedule = self.client.get_json(f'schedule/{date_str}') or {}
+        trackers = []
+        for day in schedule.get('gameWeek', []):
+            if day.get('date') != date_str:
+                continue
+            for game in day.get('games', []):
+                home, away = game['homeTeam']['abbrev'], game['awayTeam']['abbrev']
+                start = game.get('startTimeUTC')
+                trackers.append(GameTracker(
+                    game_id=game['id'],
+                    date=date_str,
+                    home=home,
+                    away=away,
+                    start=datetime.fromisoformat(start.replace('Z', '+00:00')) if start else None,
+                    state=game.get('gameState', 'FUT'),
+                    tracked=set(GameStats.objects.filter(
+                        date=date_str, team__in=[home, away]
+                    ).values_list('player_id', flat=True)),
+                ))
+        return trackers
+
+    def poll(self, tracker):
+        """Fetch one game; apply and record changes. Returns the diff or None."""
+        boxscore, modified = self.client.get_conditional(f'gamecenter/{tracker.game_id}/boxscore')
+        diff = None
+
+        if boxscore is not None and modified:
+            state = boxscore.get('gameState', tracker.state)
+            score = (
+                boxscore.get('homeTeam', {}).get('score', 0) or 0,
+                boxscore.get('awayTeam', {}).get('score', 0) or 0,
+            )
+            stats = extract_player_stats(boxscore)
+            changed = {
+                pid: line for pid, line in stats.items()
+                if pid in tracker.tracked and tracker.stats.get(pid) != line
+            }
+            finished = state in FINAL_STATES and not tracker.done
+
+            if changed or finished:
+                self.apply_results(tracker, changed, stats if finished else None)
+            if finished:
+                bump_dashboard_version()
+            if changed or score != tracker.score or state != tracker.state:
+                diff = {
+                    'game_id': tracker.game_id,
+                    'state': state,
+                    'home': tracker.home,
+                    'away': tracker.away,
+                    'score': list(score),
+                    'period': boxscore.get('periodDescriptor', {}).get('number'),
+                    'players': {pid: list(line) for pid, line in changed.items()},
+                }
+                LiveEvent.objects.create(game_id=tracker.game_id, payload=diff)
+
+            tracker.stats.update(stats)
+            tracker.state, tracker.score = state, score
+
+        seconds_to_start = None
+        if tracker.start is not None:
+            seconds_to_start = (tracker.start - timezone.now()).total_seconds()
+        in_intermission = bool((boxscore or {}).get('clock', {}).get('inIntermission'))
+        tracker.interval = next_interval(tracker.state, in_intermission, modified, tracker.interval, seconds_to_start)
+        tracker.next_poll = self.clock() + tracker.interval
+        return diff
+
+    def apply_results(self, tracker, changed, final_stats=None):
+        """
+        Live: the running lines go to LiveStat (one upsert per poll).
+        Final: every tracked player is settled exactly like fetch_game_results does.
+        """
+        if changed:
+            LiveStat.objects.bulk_create(
+                [
+                    LiveStat(date=tracker.date, player_id=pid, game_id=tracker.game_id,
+                             goals=goals, assists=assists, shots=shots)
+                    for pid, (goals, assists, shots) in changed.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['date', 'player_id'],
+                update_fields=['game_id', 'goals', 'assists', 'shots', 'updated_at'],
+            )
+
+        if final_stats is not None:
+            for pid, (goals, _, shots) in final_stats.items():
+                if pid in tracker.tracked:
+                    GameStats.objects.filter(player_id=pid, date=tracker.date).update(
+                        result_goal='HIT' if goals > 0 else 'MISS',
+                        result_shot=str(shots),
+                    )
+            self.log(f'  ✓ Game {tracker.game_id} final ({tracker.away} @ {tracker.home})')
+
+    def run(self, trackers, sleep=time.sleep, max_seconds=None):
+        """Poll until every game is final (or `max_seconds` elapse)."""
+        deadline = self.clock() + max_seconds if max_seconds else None
+        while True:
+            pending = [t for t in trackers if not t.done]
+            if not pending or (deadline and self.clock() >= deadline):
+                return
+            now = self.clock()
+            for tracker in pending:
+                if tracker.next_poll <= now:
+                    diff = self.poll(tracker)
+                    if diff and diff['players']:
+                        self.log(f"  > Game {tracker.game_id}: {len(diff['players'])} player update(s)")
+            upcoming = [t.next_poll for t in trackers if not t.done]
+            if upcoming:
+                sleep(max(0.0, min(upcoming) - self.clock()))
@@ -0,0 +1,119 @@
+"""
+Projection Engine Benchmark
+===========================
+Measures the throughput of the projection engine (nhl/services.py, and
+the parlay simulation of nhl/simulation.py) on realistic inputs (see
+nhl/benchmarks.py) and compares it to a stored baseline
+(settings.BENCH_ENGINE_BASELINE). Exits with an error when a case is
+slower than its baseline by more than the tolerance
+(settings.BENCH_ENGINE_TOLERANCE, 0.15 = 15%).
+
+Throughput depends on the machine: record the baseline on the machine that
+runs the gate (--update-baseline), and accept an optimization only when it
+beats the baseline measured there.
+
+Usage:
+    python manage.py bench_engine
+    python manage.py bench_engine --cases slate calculate_hybrid_projection --repeat 15
+    python manage.py bench_engine --save bench_engine.json
+    python manage.py bench_engine --update-baseline
+"""
+
+import json
+from dataclasses import asdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from nhl.benchmarks import build_cases, compare, machine_info, time_case
+
+CASES = (
+    'estimate_realistic_odds', 'prob_at_least_1', 'poisson_at_least', 'calculate_hybrid_projection', 'slate',
+    'parlays',
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the projection engine and fail on throughput regressions against the baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES))
+        parser.add_argument('--size', type=int, default=2000, help='Inputs per batch.')
+        parser.add_argument('--repeat', type=int, default=7, help='Timed repeats per case (the best counts).')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--baseline', default=str(settings.BENCH_ENGINE_BASELINE))
+        parser.add_argument('--tolerance', type=float, default=settings.BENCH_ENGINE_TOLERANCE,
+                            help='Allowed slowdown before failing (0.15 = 15%%).')
+        parser.add_argument('--save', help='Write the results as JSON.')
+        parser.add_argument('--update-baseline', action='store_true',
+                            help='Store these results as the new baseline instead of comparing.')
+
+    def handle(self, *args, **options):
+        if options['size'] < 1 or options['repeat'] < 1:
+            raise CommandError('--size and --repeat must be at least 1.')
+
+        cases = build_cases(options['size'], seed=options['seed'])
+        results = {}
+        for name in options['cases']:
+            fn, ops = cases[name]
+            results[name] = asdict(time_case(fn, ops, repeat=options['repeat']))
+
+        report = {
+            'machine': machine_info(),
+            'options': {key: options[key] for key in ('size', 'repeat', 'seed')},
+            'cases': results,
+        }
+        baseline_path = Path(options['baseline'])
+
+        if options['update_baseline']:
+            self.print_results(results, {})
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {baseline_path}'))
+            return
+
+        comparison = {}
+        if baseline_path.exists():
+            baseline = json.loads(baseline_path.read_text())
+            if baseline.get('machine', {}).get('platform') != report['machine']['platform']:
+                self.stdout.write(self.style.WARNING(
+                    f"Baseline recorded on another machine ({baseline.get('machine', {}).get('platform')}): "
+                    f"ratios are indicative only."
+                ))
+            comparison = compare(results, baseline.get('cases', {}), options['tolerance'])
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'No baseline at {baseline_path}: run with --update-baseline to record one.'
+            ))
+        report['tolerance'] = options['tolerance']
+        report['comparison'] = comparison
+        self.print_results(results, comparison)
+
+        if options['save']:
+            with open(options['save'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results saved to {options['save']}")
+
+        regressed = [name for name, c in comparison.items() if c['regressed']]
+        if regressed:
+            raise CommandError(
+                f"Throughput regression beyond {options['tolerance']:.0%}: {', '.join(regressed)}"
+            )
+        self.stdout.write(self.style.SUCCESS('No regression.' if comparison else 'Done.'))
+
+    def print_results(self, results, comparison):
+        for name, result in results.items():
+            line = (f"  {name:<28} {result['ops_per_sec']:>12,.0f} ops/s   "
+                    f"(median {result['median_ops_per_sec']:,.0f})   {result['best_ms']:>9} ms/call")
+            c = comparison.get(name)
+            if c is None:
+                self.stdout.write(line)
+                continue
+            line += f"   x{c['ratio']:.2f} vs baseline"
+            if c['regressed']:
+                self.stdout.write(self.style.ERROR(line + '   REGRESSION'))
+            elif c['ratio'] >= 1:
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                self.stdout.write(self.style.WARNING(line))
@@ -0,0 +1,172 @@
+"""
+Template Render Benchmark
+=========================
+Renders the NHL pages with both template engines (Django templates in
+nhl/templates/, Jinja2 in nhl/jinja2/) from the same view models, on a
+full 16-game slate of synthetic players (nhl.synthetic.slate_rows): the
+dashboard page, its HTMX match list partial and a player page. No
+database is needed.
+
+Reports per engine and template the render time (p50 / p95) and the
+Jinja2 speedup, plus the cost of building the view models themselves.
+Both engines must produce the same HTML (whitespace and CSRF token aside):
+a mismatch is reported as an error.
+
+Usage:
+    python manage.py bench_templates
+    python manage.py bench_templates --renders 500 --as free
+    python manage.py bench_templates --templates dashboard --save templates.json
+"""
+
+import json
+import re
+import time
+from collections import defaultdict
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from nhl.constants import NHL_TEAMS_FULL_NAMES
+from nhl.models import GameStats
+from nhl.synthetic import slate_rows
+from nhl.view_models import match_cards, player_page
+
+ENGINES = ('django', 'jinja2')
+TEMPLATES = {
+    'dashboard': 'nhl/dashboard.html',
+    'match_list': 'nhl/partials/_match_list.html',
+    'player_detail': 'nhl/player_detail.html',
+}
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="[^"]*"')
+SPACE_RE = re.compile(r'\s+')
+
+
+def slate_matches(day, seed, premium):
+    """The dashboard's grouped matches (model instances) for a 16-game slate."""
+    games = defaultdict(list)
+    for row in slate_rows(day, seed=seed):
+        game = GameStats(**row)
+        games[(game.team, game.opp) if game.is_home else (game.opp, game.team)].append(game)
+    matches = []
+    for (home, away), players in games.items():
+        top = 5 if premium else 3
+        matches.append({
+            'team': home,
+            'opp': away,
+            'team_full': NHL_TEAMS_FULL_NAMES.get(home, home),
+            'opp_full': NHL_TEAMS_FULL_NAMES.get(away, away),
+            'time': players[0].ts,
+            'context': 'Match Équilibré ⚖️',
+            'top_scorers': sorted(players, key=lambda g: g.python_prob or 0, reverse=True)[:top],
+            'top_playmakers': sorted(players, key=lambda g: g.algo_score_shot or 0, reverse=True)[:top],
+        })
+    return matches if premium else matches[:2]
+
+
+def normalized(html):
+    return SPACE_RE.sub(' ', CSRF_RE.sub('', html)).strip()
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = 'Compare Django templates and Jinja2 render times of the NHL pages on a full slate'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--templates', nargs='+', choices=list(TEMPLATES), default=list(TEMPLATES))
+        parser.add_argument('--renders', type=int, default=200, help='Measured renders per engine and template.')
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--as', dest='user', choices=('premium', 'free', 'anonymous'), default='premium')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--save', help='Write the results as JSON.')
+
+    def handle(self, *args, **options):
+        premium = options['user'] == 'premium'
+        request = RequestFactory().get('/nhl/dashboard/', secure=True)
+        if options['user'] == 'anonymous':
+            request.user = AnonymousUser()
+        else:
+            request.user = get_user_model()(email='bench@cortex.local', is_premium=premium)
+
+        raw_matches = slate_matches(date.today(), options['seed'], premium)
+        matches = match_cards(raw_matches)  # warm-up (URL resolver, translations)
+        timings = []
+        for _ in range(max(1, options['renders'] // 10)):
+            build_start = time.perf_counter()
+            matches = match_cards(raw_matches)
+            timings.append((time.perf_counter() - build_start) * 1000)
+        view_model_ms = sorted(timings)[len(timings) // 2]
+        self.stdout.write(
+            f"Slate: {len(raw_matches)} matches, {sum(len(m['top_scorers']) + len(m['top_playmakers']) for m in matches)} "
+            f"player cards; view models built in {view_model_ms:.2f} ms (p50)"
+        )
+
+        dashboard_context = {
+            'matches': matches,
+            'teams': [{'abbreviation': t, 'full_name': n} for t, n in sorted(NHL_TEAMS_FULL_NAMES.items())],
+            'selected_team': None,
+            'is_premium': premium,
+        }
+        star = raw_matches[0]['top_scorers'][0]
+        contexts = {
+            'dashboard': dashboard_context,
+            'match_list': dashboard_context,
+            'player_detail': {
+                'player': player_page(star),
+                'risk_level': 'Faible', 'risk_color': 'green',
+                'verdict': 'Valeur Standard', 'verdict_color': 'blue',
+                'context_text': f'{star.name} joue face à {star.opp}. ',
+            },
+        }
+
+        results, mismatches = {}, []
+        for name in options['templates']:
+            outputs = {}
+            results[name] = {}
+            for engine in ENGINES:
+                def render():
+                    return render_to_string(TEMPLATES[name], contexts[name], request=request, using=engine)
+
+                for _ in range(options['warmup']):
+                    render()
+                timings = []
+                for _ in range(options['renders']):
+                    render_start = time.perf_counter()
+                    html = render()
+                    timings.append((time.perf_counter() - render_start) * 1000)
+                outputs[engine] = normalized(html)
+                timings.sort()
+                results[name][engine] = {
+                    'p50_ms': round(percentile(timings, 0.50), 3),
+                    'p95_ms': round(percentile(timings, 0.95), 3),
+                    'mean_ms': round(sum(timings) / len(timings), 3),
+                    'bytes': len(html.encode()),
+                }
+            speedup = results[name]['django']['p50_ms'] / max(results[name]['jinja2']['p50_ms'], 1e-9)
+            results[name]['jinja2_speedup'] = round(speedup, 2)
+            same = outputs['django'] == outputs['jinja2']
+            results[name]['same_html'] = same
+            if not same:
+                mismatches.append(name)
+
+            style = self.style.SUCCESS if same else self.style.ERROR
+            self.stdout.write(style(
+                f"  {name:<14} django p50 {results[name]['django']['p50_ms']:>8} ms  p95 {results[name]['django']['p95_ms']:>8} ms   "
+                f"jinja2 p50 {results[name]['jinja2']['p50_ms']:>8} ms  p95 {results[name]['jinja2']['p95_ms']:>8} ms   "
+                f"x{speedup:.2f}" + ('' if same else '   HTML DIFFERS')
+            ))
+
+        if options['save']:
+            with open(options['save'], 'w') as f:
+                json.dump({'user': options['user'], 'renders': options['renders'],
+                           'view_model_ms': round(view_model_ms, 3), 'templates': results}, f, indent=2)
+            self.stdout.write(f"Results saved to {options['save']}")
+
+        if mismatches:
+            raise CommandError(f"Django and Jinja2 output differ: {', '.join(mismatches)}")
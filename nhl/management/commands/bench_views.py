@@ -0,0 +1,194 @@
+"""
+View Benchmark
+==============
+Drives the main pages in-process through Django's test client (full
+middleware stack, no network), at a configurable concurrency, and checks
+each against its budget (settings.BENCH_VIEW_BUDGETS): queries per request
+and p95 latency. Exits with an error when a view is over budget or fails.
+
+Queries per request come from the Server-Timing header of
+PerformanceMiddleware. Peak memory is measured in a separate pass with
+tracemalloc (peak Python allocations of one request), so tracing doesn't
+skew the latencies.
+
+Seed a realistic database first (see seed_lake):
+
+    python manage.py seed_lake --reset
+    python manage.py bench_views
+
+Usage:
+    python manage.py bench_views
+    python manage.py bench_views --views dashboard --requests 200 --concurrency 8
+    python manage.py bench_views --as free --save bench.json
+"""
+
+import json
+import re
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from nhl.models import GameStats
+
+VIEWS = ('dashboard', 'player_detail', 'index')
+BENCH_EMAIL = 'bench@cortex.local'
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+def view_paths(name, player_ids):
+    if name == 'dashboard':
+        return [reverse('nhl:nhl_dashboard')]
+    if name == 'player_detail':
+        return [reverse('nhl:player_detail', args=[player_id]) for player_id in player_ids]
+    return [reverse('core:index')]
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def drive(paths, requests, concurrency, user):
+    """Send `requests` GETs round-robin over `paths` from `concurrency` clients; returns (s, queries, status) per request."""
+    def worker(index):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        results = []
+        for i in range(index, requests, concurrency):
+            start = time.perf_counter()
+            response = client.get(paths[i % len(paths)], secure=True)
+            elapsed = time.perf_counter() - start
+            match = QUERIES_RE.search(response.get('Server-Timing', ''))
+            results.append((elapsed, int(match.group(1)) if match else None, response.status_code))
+        connections.close_all()
+        return results
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return [result for chunk in pool.map(worker, range(concurrency)) for result in chunk]
+
+
+def peak_memory_kb(paths, user):
+    """Largest tracemalloc peak over one request per path (up to 5 paths)."""
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    client.get(paths[0], secure=True)  # imports, template and URL caches
+    peak = 0
+    tracemalloc.start()
+    try:
+        for path in paths[:5]:
+            tracemalloc.reset_peak()
+            client.get(path, secure=True)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the dashboard, player and landing views in-process against query / latency budgets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--views', nargs='+', choices=VIEWS, default=list(VIEWS))
+        parser.add_argument('--requests', type=int, default=100, help='Measured requests per view.')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per view first.')
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent clients (threads).')
+        parser.add_argument('--as', dest='user', choices=('premium', 'free', 'anonymous'), default='premium')
+        parser.add_argument('--players', type=int, default=50, help='Distinct players for player_detail.')
+        parser.add_argument('--p95-budget', type=float, help='Override every view\'s p95 budget (ms).')
+        parser.add_argument('--query-budget', type=int, help='Override every view\'s query budget.')
+        parser.add_argument('--save', help='Write the results as JSON.')
+
+    def handle(self, *args, **options):
+        if not GameStats.objects.exists():
+            raise CommandError('data_lake is empty: run `manage.py seed_lake --reset` first.')
+        player_ids = list(
+            GameStats.objects.order_by('-ts').values_list('player_id', flat=True).distinct()[:options['players']]
+        )
+
+        user = None
+        if options['user'] != 'anonymous':
+            user, _ = get_user_model().objects.get_or_create(email=BENCH_EMAIL)
+            user.is_premium = options['user'] == 'premium'
+            user.save()
+
+        instrumentation = override_settings(
+            PERF_INSTRUMENTATION=True,
+            PERF_SLOW_REQUEST_MS=float('inf'),
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+        )
+        results, failures = {}, []
+        try:
+            with instrumentation:
+                for name in options['views']:
+                    results[name] = self.bench(name, view_paths(name, player_ids), user, options)
+        finally:
+            if user is not None:
+                user.delete()
+
+        for name, result in results.items():
+            budget = result['budget']
+            over = []
+            if result['errors']:
+                over.append(f"{result['errors']} error(s)")
+            if budget.get('queries') is not None and (result['queries_max'] or 0) > budget['queries']:
+                over.append(f"{result['queries_max']} queries > {budget['queries']}")
+            if budget.get('p95_ms') is not None and result['p95_ms'] > budget['p95_ms']:
+                over.append(f"p95 {result['p95_ms']} ms > {budget['p95_ms']} ms")
+            result['ok'] = not over
+            style = self.style.SUCCESS if not over else self.style.ERROR
+            self.stdout.write(style(
+                f"  {name:<14} p50 {result['p50_ms']:>7} ms   p95 {result['p95_ms']:>7} ms   "
+                f"{result['queries_max']} queries   peak {result['peak_kb']} KB   {result['rps']} req/s"
+                + (f"   OVER BUDGET: {', '.join(over)}" if over else '')
+            ))
+            if over:
+                failures.append(name)
+
+        if options['save']:
+            with open(options['save'], 'w') as f:
+                json.dump({'rows': GameStats.objects.count(), 'options': {
+                    key: options[key] for key in ('requests', 'concurrency', 'user')
+                }, 'views': results}, f, indent=2)
+            self.stdout.write(f"Results saved to {options['save']}")
+
+        if failures:
+            raise CommandError(f"Over budget: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('All views within budget.'))
+
+    def bench(self, name, paths, user, options):
+        budget = dict(settings.BENCH_VIEW_BUDGETS.get(name, {}))
+        if options['p95_budget'] is not None:
+            budget['p95_ms'] = options['p95_budget']
+        if options['query_budget'] is not None:
+            budget['queries'] = options['query_budget']
+
+        if options['warmup']:
+            drive(paths, options['warmup'], 1, user)
+        start = time.perf_counter()
+        measured = drive(paths, options['requests'], options['concurrency'], user)
+        wall = time.perf_counter() - start
+
+        latencies = sorted(elapsed * 1000 for elapsed, _, _ in measured)
+        queries = [count for _, count, _ in measured if count is not None]
+        return {
+            'requests': len(measured),
+            'errors': sum(1 for _, _, status in measured if status >= 400),
+            'p50_ms': round(percentile(latencies, 0.50), 1),
+            'p95_ms': round(percentile(latencies, 0.95), 1),
+            'max_ms': round(latencies[-1], 1),
+            'rps': round(len(measured) / wall, 1),
+            'queries_max': max(queries, default=None),
+            'queries_mean': round(sum(queries) / len(queries), 1) if queries else None,
+            'peak_kb': peak_memory_kb(paths, user),
+            'budget': budget,
+        }
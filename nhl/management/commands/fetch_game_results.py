@@ -9,18 +9,24 @@ Run daily at 12h (noon) to capture previous night's game results.
 Usage:
     python manage.py fetch_game_results
     python manage.py fetch_game_results --date 2026-01-07
+    python manage.py fetch_game_results --replay 42   # recompute run #42 offline
 """
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
+from nhl.archive import ReplayClient
+from nhl.client import NHLClient
+from nhl.features import FeatureStore, toi_seconds
+from nhl.ledger import record_run
 from nhl.models import GameStats
-import requests
+from nhl.players import player_index
 from datetime import datetime, timedelta
 import time
 
 
 class Command(BaseCommand):
     help = 'Fetch actual game results from NHL API and update data_lake'
+    client = None
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -28,13 +34,33 @@ class Command(BaseCommand):
             type=str,
             help='Date to check results for (YYYY-MM-DD). Defaults to yesterday.',
         )
+        parser.add_argument(
+            '--replay',
+            type=int,
+            metavar='RUN',
+            help='Re-run from the archived payloads of ingestion run RUN (no network access).',
+        )
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('[Fetch Results] Starting...'))
         
+        replay_of = None
+        if options['replay']:
+            try:
+                self.client = ReplayClient.for_run(options['replay'], command='fetch_game_results')
+            except ValueError as e:
+                raise CommandError(str(e))
+            replay_of = self.client.replayed_run
+            self.stdout.write(f'Replaying run #{replay_of.pk} ({replay_of.started_at:%Y-%m-%d %H:%M}) from the archive')
+        else:
+            # run_scheduler injects a warm, shared client
+            self.client = self.client or NHLClient()
+
         # Determine date to check
         if options['date']:
             target_date = datetime.strptime(options['date'], '%Y-%m-%d').date()
+        elif replay_of:
+            target_date = datetime.strptime(replay_of.target_date, '%Y-%m-%d').date()
         else:
             # Default: yesterday (games from last night)
             target_date = (datetime.now() - timedelta(days=1)).date()
@@ -42,14 +68,20 @@ class Command(BaseCommand):
         date_str = target_date.strftime('%Y-%m-%d')
         self.stdout.write(f'Checking results for {date_str}')
         
+        with record_run('fetch_game_results', client=self.client, target_date=date_str, replay_of=replay_of) as run:
+            self.run = run
+            self.players = player_index()
+            self.fetch_results(date_str)
+
+    def fetch_results(self, date_str):
+        run = self.run
+
         # 1. Get completed games for the date
-        schedule_url = f'https://api-web.nhle.com/v1/schedule/{date_str}'
-        try:
-            response = requests.get(schedule_url, timeout=10)
-            response.raise_for_status()
-            schedule = response.json()
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Failed to fetch schedule: {e}'))
+        with run.stage('fetch'):
+            schedule = self.client.get_json(f'schedule/{date_str}')
+        if schedule is None:
+            self.stdout.write(self.style.ERROR(f'Failed to fetch schedule: {self.client.url(f"schedule/{date_str}")}'))
+            run.fail('Failed to fetch schedule.')
             return
         
         if 'gameWeek' not in schedule or not schedule['gameWeek']:
@@ -58,6 +90,7 @@ class Command(BaseCommand):
         
         games_updated = 0
         players_updated = 0
+        game_logs = []  # every skater's line, for the feature store
         
         # 2. Process each completed game
         for day in schedule['gameWeek']:
@@ -72,17 +105,15 @@ class Command(BaseCommand):
                 self.stdout.write(f'  > Processing {away_abbrev} @ {home_abbrev} (Game {game_id})')
                 
                 # 3. Get boxscore for detailed stats
-                boxscore_url = f'https://api-web.nhle.com/v1/gamecenter/{game_id}/boxscore'
-                try:
-                    box_response = requests.get(boxscore_url, timeout=10)
-                    box_response.raise_for_status()
-                    boxscore = box_response.json()
-                except Exception as e:
-                    self.stdout.write(self.style.WARNING(f'    Failed to fetch boxscore: {e}'))
+                with run.stage('fetch'):
+                    boxscore = self.client.get_json(f'gamecenter/{game_id}/boxscore')
+                if boxscore is None:
+                    self.stdout.write(self.style.WARNING(f'    Failed to fetch boxscore for game {game_id}'))
+                    run.error()
                     continue
                 
                 # 4. Extract player stats
-                for team_key in ['homeTeam', 'awayTeam']:
+                for team_key, team_abbrev in [('homeTeam', home_abbrev), ('awayTeam', away_abbrev)]:
                     team_data = boxscore.get(team_key, {})
                     
                     # Forwards
@@ -95,29 +126,45 @@ class Command(BaseCommand):
                             goals = player.get('goals', 0)
                             assists = player.get('assists', 0)
                             shots = player.get('shots', 0)
+                            if player.get('playerId') is not None:
+                                game_logs.append({
+                                    'player_id': int(player['playerId']), 'game_id': game_id, 'team': team_abbrev,
+                                    'goals': goals, 'assists': assists, 'shots': shots,
+                                    'toi': toi_seconds(player.get('toi')),
+                                })
                             
                             # Update in database
-                            updated = self.update_player_result(
-                                player_id=player_id,
-                                player_name=player_name,
-                                date=date_str,
-                                goals=goals,
-                                assists=assists,
-                                shots=shots
-                            )
+                            with run.stage('persist'):
+                                updated = self.update_player_result(
+                                    player_id=player_id,
+                                    player_name=player_name,
+                                    team=team_abbrev,
+                                    date=date_str,
+                                    goals=goals,
+                                    assists=assists,
+                                    shots=shots
+                                )
                             
                             if updated:
                                 players_updated += 1
+                                run.rows_written += 1
+                            else:
+                                run.rows_skipped += 1
                 
                 games_updated += 1
                 time.sleep(0.5)  # Rate limiting
         
+        if game_logs:
+            with run.stage('persist'):
+                form = FeatureStore().settle(date_str, game_logs)
+            self.stdout.write(f'Feature store: {len(game_logs)} game logs, recent form of {len(form)} players')
+
         self.stdout.write(self.style.SUCCESS(
             f'[Fetch Results] Complete! '
             f'Updated {players_updated} players across {games_updated} games.'
         ))
 
-    def update_player_result(self, player_id, player_name, date, goals, assists, shots):
+    def update_player_result(self, player_id, player_name, team, date, goals, assists, shots):
         """
         Update the data_lake table with actual game results.
         Returns True if updated, False if player not found.
@@ -131,11 +178,12 @@ class Command(BaseCommand):
             )
             
             if not predictions.exists():
-                # Try by name if ID doesn't match
-                predictions = GameStats.objects.filter(
-                    name__icontains=player_name.split()[-1],  # Last name
-                    date=date
-                )
+                # Try the registry id of this name on this team (boxscores say "C. McDavid");
+                # an ambiguous name resolves to nothing rather than to the wrong player.
+                resolved = self.players.resolve(player_name, team=team)
+                if resolved is None or str(resolved) == player_id:
+                    return False
+                predictions = GameStats.objects.filter(player_id=str(resolved), date=date)
             
             if not predictions.exists():
                 return False
@@ -166,4 +214,5 @@ class Command(BaseCommand):
             
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'    Error updating {player_name}: {e}'))
+            self.run.error()
             return False
@@ -1,32 +1,121 @@
-import requests
+"""
+NHL Projection Ingestion
+========================
+Fetches the day's schedule, then streams every team through the ingestion
+pipeline (nhl/pipeline.py): fetch roster -> parse skaters -> project ->
+persist in batches. Stages are connected by bounded queues; a record that
+fails in a stage is stored as a FailedRecord and can be replayed.
+
+Usage:
+    python manage.py fetch_nhl_data
+    python manage.py fetch_nhl_data --date 2026-01-07
+    python manage.py fetch_nhl_data --replay-failed
+    python manage.py fetch_nhl_data --replay 42      # recompute run #42 offline
+"""
+
 import datetime
-from django.core.management.base import BaseCommand
+import threading
+from dataclasses import asdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
 from django.utils import timezone
-from nhl.models import GameStats
+from nhl.archive import ReplayClient
+from nhl.cache import bump_dashboard_version
+from nhl.client import NHLClient
+from nhl.features import FeatureStore
+from nhl.ledger import STAGES, record_run
+from nhl.models import FailedRecord, GameStats
+from nhl.pipeline import Pipeline, Stage
+from nhl.players import full_name, player_index
+from nhl.schedule import schedule_index
+from nhl.team_context import get_snapshot, opponent_stats, team_stats
 from nhl.services import (
     calculate_hybrid_projection, 
     PlayerSeasonStats, 
     TeamStats, 
     OpponentStats, 
-    GameContext
+    GameContext,
+    RecentForm,
 )
 
-BASE_URL = "https://api-web.nhle.com/v1"
-
 class Command(BaseCommand):
     help = 'Fetches NHL data, calculates projections, and updates the Data Lake.'
+    client = None
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Game date to project (YYYY-MM-DD). Defaults to today, or the next game day.',
+        )
+        parser.add_argument(
+            '--replay-failed',
+            action='store_true',
+            help='Re-run the records that failed in a previous run, from the stage where they failed.',
+        )
+        parser.add_argument(
+            '--replay',
+            type=int,
+            metavar='RUN',
+            help='Re-run from the archived payloads of ingestion run RUN (no network access).',
+        )
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting NHL Data Ingestion...'))
-        
+        self.club_stats = {}  # team -> club-stats payload already fetched this run
+        replay_of = None
+        if options['replay']:
+            try:
+                self.client = ReplayClient.for_run(options['replay'], command='fetch_nhl_data')
+            except ValueError as e:
+                raise CommandError(str(e))
+            replay_of = self.client.replayed_run
+            self.stdout.write(f'Replaying run #{replay_of.pk} ({replay_of.started_at:%Y-%m-%d %H:%M}) from the archive')
+        else:
+            # run_scheduler injects a warm, shared client
+            self.client = self.client or NHLClient()
+
+        # A settled date would be re-projected from today's club stats (club-stats/now)
+        if options.get('date') and GameStats.objects.filter(date=options['date']).settled().exists():
+            raise CommandError(f"{options['date']} is already settled: its projections are not recomputed.")
+
+        with record_run('fetch_nhl_data', client=self.client, replay_of=replay_of) as run:
+            self.run = run
+            if options.get('replay_failed'):
+                self.replay_failed()
+            elif replay_of:
+                # Same schedule request as the original run, for the date it projected
+                date = replay_of.target_date if self.client.has(f'schedule/{replay_of.target_date}') else None
+                self.ingest(date, as_of=replay_of.target_date)
+            else:
+                self.check_feature_store()
+                self.ingest(options.get('date'))
+
+    def check_feature_store(self):
+        """An empty feature store while games were settled: projections run without form until it is rebuilt."""
+        if FeatureStore().settled_dates() or not GameStats.objects.settled().exists():
+            return
+        self.run.error()
+        self.stdout.write(self.style.WARNING(
+            'Feature store is empty: projecting without recent form. '
+            'Rebuild it by replaying the fetch_game_results runs (--replay).'
+        ))
+
+    def ingest(self, date=None, as_of=None):
+        run = self.run
+
         # 1. Determine Date (ET)
-        # Simplified: Use current date
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        # Simplified: Use current date unless one was requested (or replayed)
+        today = date or as_of or datetime.datetime.now().strftime("%Y-%m-%d")
         
         # 2. Fetch Schedule
-        schedule = self.fetch_json(f"{BASE_URL}/schedule/now")
+        with run.stage('fetch'):
+            schedule = self.fetch_json(f"schedule/{date}" if date else "schedule/now")
         if not schedule or 'gameWeek' not in schedule:
             self.stdout.write(self.style.ERROR('Failed to fetch schedule.'))
+            run.fail('Failed to fetch schedule.')
             return
 
         # Find today's games (or closest playing date in the response)
@@ -38,144 +127,269 @@ class Command(BaseCommand):
                 break
         
         # Fallback: if no games today (or we ran it late/early), find next games
-        if not day_data and schedule['gameWeek']:
+        if not day_data and schedule['gameWeek'] and not date:
              # Just picking the first day for demo/testing purposes if today is empty
              day_data = schedule['gameWeek'][0]
              today = day_data['date'] # Update today to the game date
         
+        run.set_target_date(today)
         if not day_data or not day_data.get('games'):
             self.stdout.write(self.style.WARNING(f'No games found for {today}.'))
             return
 
         self.stdout.write(f"Processing {len(day_data['games'])} games for {today}...")
 
-        # 3. Fetch Context (Standings for Team Stats)
-        standings_data = self.fetch_json(f"{BASE_URL}/standings/now")
-        team_context = self.process_standings(standings_data)
+        # 3. Team context: the date's snapshot (standings, shots against, goalies), built by its
+        # first run; the club stats fetched to build it are reused by the fetch stage.
+        with run.stage('fetch'):
+            snapshot = get_snapshot(today, self.client, workers=settings.PIPELINE_FETCH_WORKERS,
+                                    fetched=self.club_stats)
+        if snapshot is None:
+            self.stdout.write(self.style.WARNING('No team context (standings unavailable): using league averages.'))
+        team_context = snapshot.teams if snapshot else {}
+
+        # Rest days: the season schedule index (built once, stored locally)
+        with run.stage('fetch'):
+            self.schedule = schedule_index(today, self.client)
+        if self.schedule is None:
+            self.stdout.write(self.style.WARNING('No schedule index: fatigue is ignored.'))
 
-        # 4. Process Games
+        # 4. Process Games: one fetch job per team, streamed through the pipeline
+        jobs = []
         for game in day_data['games']:
             home_team = game['homeTeam']['abbrev']
             away_team = game['awayTeam']['abbrev']
             
             self.stdout.write(f"  > Analyzing {home_team} vs {away_team}")
-            
-            # Analyze Home Team
-            self.process_team(home_team, away_team, True, team_context, today)
-            
-            # Analyze Away Team
-            self.process_team(away_team, home_team, False, team_context, today)
+            jobs.append(self.team_job(home_team, away_team, True, team_context, today))
+            jobs.append(self.team_job(away_team, home_team, False, team_context, today))
 
+        self.run_pipeline(jobs)
+        bump_dashboard_version()
         self.stdout.write(self.style.SUCCESS(f'Successfully processed data for {today}.'))
 
-    def fetch_json(self, url):
-        try:
-            resp = requests.get(url, timeout=10)
-            if resp.status_code == 200:
-                return resp.json()
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f"Error fetching {url}: {e}"))
-        return None
-
-    def process_standings(self, standings_json):
-        context = {}
-        if not standings_json or 'standings' not in standings_json:
-            return context
-            
-        for team in standings_json['standings']:
-            abbrev = team['teamAbbrev']['default']
-            
-            ga = team.get('goalAgainst', 0)
-            gp = max(1, team.get('gamesPlayed', 1))
-            gaa = ga / gp
-            
-            context[abbrev] = {
-                'gaa': gaa,
-                'pp_pct': team.get('powerPlayPctg', 0.20),
-                'pk_pct': team.get('penaltyKillPctg', 0.80),
-                'l10_pts_pct': team.get('l10PtsPctg', 0.50),
-                'shots_allowed': 30.0 # Placeholder, API v1 standings might not have shots allowed explicit
-            }
-        return context
-
-    def process_team(self, team, opp, is_home, context_map, date_str):
-        # Fetch Roster Stats
-        roster_stats = self.fetch_json(f"{BASE_URL}/club-stats/{team}/now")
-        if not roster_stats or 'skaters' not in roster_stats:
-            self.stdout.write(self.style.WARNING(f"    No stats found for {team}"))
+    def replay_failed(self):
+        """Re-run every unreplayed FailedRecord from the stage where it failed."""
+        pending = list(FailedRecord.objects.filter(command='fetch_nhl_data', replayed_at__isnull=True).order_by('id'))
+        if not pending:
+            self.stdout.write('No failed records to replay.')
             return
+        dates = sorted({record.target_date for record in pending if record.target_date})
+        self.run.set_target_date(dates[0] if len(dates) == 1 else '')
+
+        for stage in STAGES:
+            records = [record for record in pending if record.stage == stage]
+            if not records:
+                continue
+            self.stdout.write(f'Replaying {len(records)} record(s) from {stage}...')
+            self.run_pipeline([record.payload for record in records], start=stage)
+            FailedRecord.objects.filter(pk__in=[record.pk for record in records]).update(replayed_at=timezone.now())
+        bump_dashboard_version()
+
+    def build_pipeline(self):
+        return Pipeline([
+            Stage('fetch', self.fetch_roster, workers=settings.PIPELINE_FETCH_WORKERS,
+                  queue_size=settings.PIPELINE_QUEUE_SIZE),
+            Stage('parse', self.parse_roster, queue_size=settings.PIPELINE_QUEUE_SIZE),
+            Stage('project', self.project_player, workers=settings.PIPELINE_PROJECT_WORKERS,
+                  queue_size=settings.PIPELINE_QUEUE_SIZE),
+            Stage('persist', self.persist_rows, workers=settings.PIPELINE_PERSIST_WORKERS,
+                  batch_size=settings.PIPELINE_PERSIST_BATCH, queue_size=settings.PIPELINE_QUEUE_SIZE),
+        ])
+
+    def run_pipeline(self, items, start=None):
+        run = self.run
+        self._lock = threading.Lock()
+        self.written_keys = set()  # (date, player_id) persisted by this pipeline run
+        self.players = player_index()
+        self.form = FeatureStore().form(as_of=run.run.target_date or None)  # read once per run
+        pipeline = self.build_pipeline()
+        stats = pipeline.run(items, start=start)
+
+        for name, stage in stats.items():
+            if stage.items_in or stage.failed:
+                run.stages[name] = run.stages.get(name, 0.0) + stage.busy_seconds
+                self.stdout.write(
+                    f"    {name:<8} in {stage.items_in:>4}  out {stage.items_out:>4}  "
+                    f"failed {stage.failed:>3}  {stage.busy_seconds:.2f}s"
+                )
+        if pipeline.failures:
+            run.error(len(pipeline.failures))
+            FailedRecord.objects.bulk_create([
+                FailedRecord(command='fetch_nhl_data', stage=failure.stage, target_date=run.run.target_date,
+                             payload=failure.payload, error=failure.error)
+                for failure in pipeline.failures
+            ])
+            self.stdout.write(self.style.WARNING(
+                f"    {len(pipeline.failures)} record(s) failed (stored for --replay-failed)."
+            ))
+
+    def skipped(self, count=1):
+        with self._lock:
+            self.run.rows_skipped += count
 
-        # Context objects
-        my_ctx = context_map.get(team, {})
+    def fetch_json(self, path):
+        data = self.client.get_json(path)
+        if data is None:
+            self.stdout.write(self.style.ERROR(f"Error fetching {self.client.url(path)}"))
+        return data
+
+    def team_job(self, team, opp, is_home, context_map, date_str):
+        """Input of the fetch stage: everything needed to project one team (JSON-safe, for replay)."""
         opp_ctx = context_map.get(opp, {})
-        
-        t_stats = TeamStats(
-            pp_pct=my_ctx.get('pp_pct', 0.20),
-            l10_pts_pct=my_ctx.get('l10_pts_pct', 0.50)
-        )
-        
-        o_stats = OpponentStats(
-            gaa=opp_ctx.get('gaa', 3.0),
-            pk_pct=opp_ctx.get('pk_pct', 0.80),
-            shots_allowed_avg=opp_ctx.get('shots_allowed', 30.0)
-        )
-        
-        game_ctx = GameContext(
-            is_home=is_home,
-            is_opponent_tired=False, # TODO: Implement tired logic
-            is_team_tired=False # TODO: Implement tired logic
-        )
-        
-        # Iterate Skaters
-        count = 0
-        for p in roster_stats['skaters']:
+        return {
+            'date': date_str,
+            'team': team,
+            'opp': opp,
+            'is_home': is_home,
+            'team_stats': asdict(team_stats(context_map.get(team, {}))),
+            'opp_stats': asdict(opponent_stats(opp_ctx)),
+            'opp_goalie_form': opp_ctx.get('goalie_form', 0.0),
+            'team_tired': bool(self.schedule and self.schedule.is_tired(team, date_str)),
+            'opp_tired': bool(self.schedule and self.schedule.is_tired(opp, date_str)),
+        }
+
+    # Pipeline stages: each takes one item (persist: a batch) and returns the next stage's items.
+
+    def fetch_roster(self, job):
+        roster_stats = self.club_stats.get(job['team']) or self.fetch_json(f"club-stats/{job['team']}/now")
+        if not roster_stats or 'skaters' not in roster_stats:
+            raise ValueError(f"No stats found for {job['team']}")
+        return [{**job, 'skaters': roster_stats['skaters']}]
+
+    def parse_roster(self, fetched):
+        players = []
+        lineup = set(fetched['lineup']) if fetched.get('lineup') else None  # confirmed skaters (watch_lineups)
+        for p in fetched['skaters']:
+            player_id = str(p.get('id', p.get('playerId')))
             # Filters
-            if p.get('gamesPlayed', 0) <= 5:
+            if p.get('gamesPlayed', 0) <= 5 or (lineup is not None and player_id not in lineup):
+                self.skipped()
                 continue
-            
-            # Construct Player Stats
-            try:
-                p_stats = PlayerSeasonStats(
+            registered = self.players.get(player_id)
+            form = self.form.get(player_id) if player_id.isdigit() else None
+            players.append({
+                'date': fetched['date'],
+                'team': fetched['team'],
+                'opp': fetched['opp'],
+                'is_home': fetched['is_home'],
+                'team_stats': fetched['team_stats'],
+                'opp_stats': fetched['opp_stats'],
+                'opp_goalie_form': fetched.get('opp_goalie_form', 0.0),
+                'team_tired': fetched.get('team_tired', False),
+                'opp_tired': fetched.get('opp_tired', False),
+                'player_id': player_id,
+                'name': registered.name if registered else full_name(p),
+                'form': asdict(form) if form else None,
+                'stats': asdict(PlayerSeasonStats(
                     games_played=p.get('gamesPlayed', 0),
                     goals=p.get('goals', 0),
                     assists=p.get('assists', 0),
                     points=p.get('points', 0),
                     shots=p.get('shots', 0),
                     position_code=p.get('positionCode', 'F')
+                )),
+            })
+        return players
+
+    def project_player(self, player):
+        game_ctx = GameContext(
+            is_home=player['is_home'],
+            is_opponent_tired=player.get('opp_tired', False),
+            is_team_tired=player.get('team_tired', False),
+            goalie_form=player.get('opp_goalie_form', 0.0),
+        )
+        proj = calculate_hybrid_projection(
+            PlayerSeasonStats(**player['stats']),
+            TeamStats(**player['team_stats']),
+            OpponentStats(**player['opp_stats']),
+            game_ctx,
+            form=RecentForm(**player['form']) if player.get('form') else None,
+        )
+
+        # Check for Value (Score > 40)
+        if not (proj.score_point > 40 or proj.score_shot > 40):
+            self.skipped()
+            return []
+        return [{
+            'player_id': player['player_id'],
+            'date': player['date'],
+            'name': player['name'],
+            'team': player['team'],
+            'opp': player['opp'],
+            'is_home': 1 if player['is_home'] else 0,
+            'algo_score_goal': proj.algo_score_goal,
+            'algo_score_shot': proj.algo_score_shot,
+            'python_prob': proj.python_prob,
+            'python_vol': proj.python_vol,
+            'result_goal': str(proj.real_odds.goal),
+            'result_shot': str(proj.real_odds.shot_odds)
+        }]
+
+    def persist_rows(self, rows):
+        """
+        Upsert a batch (Manual Handling for Heap Table: no unique key on
+        player_id + date). One query finds the existing rows, one UPDATE
+        joined on a VALUES list keyed on player_id + date rewrites them (the
+        fake PK rules out bulk_update), and the new ones go in a single bulk
+        INSERT. An existing row with an outcome (HIT / MISS / INJURED) keeps
+        its result columns.
+        """
+        now = timezone.now()
+        by_date = {}
+        for row in rows:
+            by_date.setdefault(row['date'], {})[row['player_id']] = row  # last one wins
+
+        with transaction.atomic():
+            for date_str, batch in by_date.items():
+                existing = set(GameStats.objects.filter(
+                    date=date_str, player_id__in=list(batch)
+                ).values_list('player_id', flat=True))
+                self.update_rows([row for player_id, row in batch.items() if player_id in existing], now)
+                GameStats.objects.bulk_create([
+                    GameStats(ts=now, **row) for player_id, row in batch.items() if player_id not in existing
+                ])
+
+        keys = {(row['date'], row['player_id']) for row in rows}
+        with self._lock:
+            written, self.written_keys = keys - self.written_keys, self.written_keys | keys
+            self.run.rows_written += len(written)
+        return rows
+
+    @staticmethod
+    def update_rows(rows, ts):
+        """One UPDATE ... FROM (VALUES ...) for rows of data_lake that already exist."""
+        if not rows:
+            return
+        connection = connections[router.db_for_write(GameStats)]
+        qn = connection.ops.quote_name
+        fields = [GameStats._meta.get_field(name) for name in rows[0]]
+        table, keys = qn(GameStats._meta.db_table), ('player_id', 'date')
+
+        # Typed placeholders: Postgres would read the VALUES columns as text
+        placeholder = '(' + ', '.join(f'CAST(%s AS {field.db_type(connection)})' for field in fields) + ')'
+        params = [field.get_db_prep_value(row[field.name], connection) for row in rows for field in fields]
+        settled = ', '.join(['%s'] * len(GameStats.OUTCOMES))
+        assignments = [f"{qn('ts')} = %s"]
+        assignment_params = [GameStats._meta.get_field('ts').get_db_prep_value(ts, connection)]
+        for field in fields:
+            if field.name in keys:
+                continue
+            column = qn(field.column)
+            if field.name in ('result_goal', 'result_shot'):
+                assignments.append(
+                    f"{column} = CASE WHEN {table}.{qn('result_goal')} IN ({settled}) "
+                    f"THEN {table}.{column} ELSE v.{column} END"
                 )
-                
-                # Run Engine
-                proj = calculate_hybrid_projection(p_stats, t_stats, o_stats, game_ctx)
-                
-                # Check for Value (Score > 40)
-                if proj.score_point > 40 or proj.score_shot > 40:
-                    player_id = str(p.get('id', p.get('playerId')))
-                    
-                    # Upsert to DB (Manual Handling for Heap Table)
-                    # We check if a record exists for this player AND date.
-                    defaults = {
-                        'name': f"{p.get('firstName', {}).get('default', '')} {p.get('lastName', {}).get('default', '')}",
-                        'team': team,
-                        'opp': opp,
-                        'ts': timezone.now(),
-                        'is_home': 1 if is_home else 0,
-                        'algo_score_goal': proj.algo_score_goal,
-                        'algo_score_shot': proj.algo_score_shot,
-                        'python_prob': proj.python_prob,
-                        'python_vol': proj.python_vol,
-                        'result_goal': str(proj.real_odds.goal),
-                        'result_shot': str(proj.real_odds.shot_odds)
-                    }
-
-                    exists = GameStats.objects.filter(player_id=player_id, date=date_str).exists()
-                    if exists:
-                        GameStats.objects.filter(player_id=player_id, date=date_str).update(**defaults)
-                    else:
-                        GameStats.objects.create(player_id=player_id, date=date_str, **defaults)
-                        
-                    count += 1
-            except Exception as e:
-                # self.stdout.write(f"    Error processing player {p.get('id')}: {e}")
-                pass
-        
-        self.stdout.write(f"    -> Saved {count} players for {team}")
+                assignment_params += GameStats.OUTCOMES
+            else:
+                assignments.append(f'{column} = v.{column}')
+
+        sql = (
+            f"WITH v ({', '.join(qn(field.column) for field in fields)}) AS "
+            f"(VALUES {', '.join([placeholder] * len(rows))}) "
+            f"UPDATE {table} SET {', '.join(assignments)} FROM v "
+            f"WHERE " + ' AND '.join(f'{table}.{qn(key)} = v.{qn(key)}' for key in keys)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + assignment_params)
@@ -6,25 +6,53 @@ excludes injured players from predictions by marking their records in the data_l
 
 Usage:
     python manage.py injury_guardian
+    python manage.py injury_guardian --replay 42   # recompute run #42 offline
 
 Schedule with CRON (every 30 minutes):
     */30 * * * * cd /path/to/nhl-saas && python manage.py injury_guardian
 """
 
-import requests
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
+from nhl.archive import ReplayClient
+from nhl.client import NHLClient
+from nhl.ledger import record_run
 from nhl.models import GameStats
-
-BASE_URL = "https://api-web.nhle.com/v1"
+from nhl.players import sync_roster
 
 
 class Command(BaseCommand):
     help = 'Monitors NHL injuries and marks injured players in the database'
+    client = None
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--replay',
+            type=int,
+            metavar='RUN',
+            help='Re-run from the archived payloads of ingestion run RUN (no network access).',
+        )
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('[Injury Guardian] Starting injury check...'))
-        
+        replay_of = None
+        if options['replay']:
+            try:
+                self.client = ReplayClient.for_run(options['replay'], command='injury_guardian')
+            except ValueError as e:
+                raise CommandError(str(e))
+            replay_of = self.client.replayed_run
+            self.stdout.write(f'Replaying run #{replay_of.pk} ({replay_of.started_at:%Y-%m-%d %H:%M}) from the archive')
+        else:
+            # run_scheduler injects a warm, shared client
+            self.client = self.client or NHLClient()
+
+        with record_run('injury_guardian', client=self.client, replay_of=replay_of) as run:
+            self.run = run
+            self.check_injuries()
+
+    def check_injuries(self):
+        run = self.run
         injured_count = 0
         teams_checked = 0
         
@@ -39,25 +67,33 @@ class Command(BaseCommand):
             self.stdout.write(f"  Checking {team_abbrev}...")
             
             # Fetch roster with injury status
-            roster_data = self.fetch_roster(team_abbrev)
+            with run.stage('fetch'):
+                roster_data = self.fetch_roster(team_abbrev)
             
             if not roster_data:
+                run.error()
                 continue
+
+            # The roster is fetched anyway: keep the player registry current
+            with run.stage('persist'):
+                sync_roster(team_abbrev, roster_data)
             
             # Process injured players
             injured_players = self.extract_injured_players(roster_data)
             
             for player_id in injured_players:
                 # Mark all predictions for this player as INJURED
-                updated = GameStats.objects.filter(
-                    player_id=str(player_id)
-                ).update(
-                    result_goal='INJURED',
-                    result_shot='INJURED'
-                )
+                with run.stage('persist'):
+                    updated = GameStats.objects.filter(
+                        player_id=str(player_id)
+                    ).update(
+                        result_goal='INJURED',
+                        result_shot='INJURED'
+                    )
                 
                 if updated > 0:
                     injured_count += updated
+                    run.rows_written += updated
                     self.stdout.write(
                         self.style.WARNING(f"    ⚠️  Marked {updated} predictions as INJURED for player {player_id}")
                     )
@@ -71,23 +107,13 @@ class Command(BaseCommand):
 
     def fetch_roster(self, team_abbrev):
         """Fetch team roster with injury status from NHL API"""
-        try:
-            # Current season roster endpoint
-            url = f"{BASE_URL}/roster/{team_abbrev}/current"
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                self.stdout.write(
-                    self.style.WARNING(f"    Failed to fetch roster for {team_abbrev}: {response.status_code}")
-                )
-        except Exception as e:
+        # Current season roster endpoint
+        roster = self.client.get_json(f"roster/{team_abbrev}/current")
+        if roster is None:
             self.stdout.write(
-                self.style.ERROR(f"    Error fetching roster for {team_abbrev}: {e}")
+                self.style.WARNING(f"    Failed to fetch roster for {team_abbrev}")
             )
-        
-        return None
+        return roster
 
     def extract_injured_players(self, roster_data):
         """
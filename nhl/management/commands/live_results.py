@@ -0,0 +1,65 @@
+"""
+Live Results Poller
+===================
+Long-running command that follows tonight's games while they are played:
+conditional requests on each gamecenter boxscore, polling faster in play and
+slower in intermissions / before puck drop. The running lines of tracked
+players are kept in LiveStat as they change, each change is published as a
+LiveEvent for the dashboard SSE stream, and a final game is settled in
+data_lake.
+
+Started daily by the deploy's cron (railway.toml), before the first puck drop.
+
+Exits once every game is final (the noon fetch_game_results run still settles
+anything missed).
+
+Usage:
+    python manage.py live_results
+    python manage.py live_results --date 2026-01-07 --max-minutes 300
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from nhl.client import NHLClient
+from nhl.live import LivePoller
+from nhl.models import LiveEvent, LiveStat
+
+
+class Command(BaseCommand):
+    help = 'Poll live NHL games and push goal/shot updates for tracked players'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=str, help='Game date (YYYY-MM-DD). Defaults to today.')
+        parser.add_argument('--max-minutes', type=int, default=480, help='Stop after this many minutes.')
+        parser.add_argument('--base-url', type=str, help='Override the NHL API base URL (e.g. a replay server).')
+        parser.add_argument(
+            '--keep-days', type=int, default=2,
+            help='Delete LiveEvent / LiveStat rows older than this many days before starting.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('[Live Results] Starting...'))
+
+        date_str = options['date'] or timezone.localdate().isoformat()
+        cutoff = timezone.now() - timedelta(days=options['keep_days'])
+        LiveEvent.objects.filter(created_at__lt=cutoff).delete()
+        LiveStat.objects.filter(updated_at__lt=cutoff).delete()
+
+        poller = LivePoller(NHLClient(base_url=options['base_url']), log=self.stdout.write)
+        trackers = poller.load_games(date_str)
+        if not trackers:
+            self.stdout.write(f'No games found for {date_str}')
+            return
+
+        tracked = sum(len(t.tracked) for t in trackers)
+        self.stdout.write(f'Following {len(trackers)} games for {date_str} ({tracked} tracked players)')
+
+        poller.run(trackers, max_seconds=options['max_minutes'] * 60)
+
+        finals = sum(1 for t in trackers if t.done)
+        self.stdout.write(self.style.SUCCESS(
+            f'[Live Results] Complete! {finals}/{len(trackers)} games final.'
+        ))
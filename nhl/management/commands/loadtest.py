@@ -0,0 +1,166 @@
+"""
+Load Test
+=========
+Closed-loop load test against a running server: for each concurrency level,
+N clients send requests back-to-back for a fixed duration. Reports
+throughput, latency percentiles and errors, and the capacity of the
+container: the highest level whose p95 stays under budget with no errors.
+
+Run it once per serving mode to compare them (same container size):
+
+    SERVER_MODE=wsgi gunicorn --config gunicorn_config.py
+    python manage.py loadtest --url http://localhost:8080/nhl/dashboard/ --save wsgi.json
+
+    SERVER_MODE=asgi gunicorn --config gunicorn_config.py
+    python manage.py loadtest --url http://localhost:8080/nhl/dashboard/ --baseline wsgi.json
+
+Usage:
+    python manage.py loadtest --url URL [--url URL ...]
+    python manage.py loadtest --url URL --concurrency 8 32 128 256 --duration 20 --p95-budget 1000
+    python manage.py loadtest --url URL --cookie sessionid=...   # premium pages / API
+    python manage.py loadtest --url URL --header 'X-Forwarded-Proto: https'   # DEBUG=False, no proxy
+"""
+
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+
+def run_level(urls, concurrency, duration, cookies, timeout, headers=None):
+    """One concurrency level; returns latencies (s) of successful requests and the error count."""
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(index):
+        nonlocal errors
+        session = requests.Session()
+        session.cookies.update(cookies)
+        session.headers.update(headers or {})
+        local, local_errors, i = [], 0, index
+        while time.monotonic() < deadline:
+            url = urls[i % len(urls)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                response = session.get(url, timeout=timeout)
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            if ok:
+                local.append(time.perf_counter() - start)
+            else:
+                local_errors += 1
+        session.close()
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    return latencies, errors
+
+
+def summarize(concurrency, duration, latencies, errors):
+    total = len(latencies) + errors
+    ordered = sorted(latencies)
+
+    def pct(q):
+        if not ordered:
+            return None
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+
+    return {
+        'concurrency': concurrency,
+        'requests': total,
+        'rps': round(len(latencies) / duration, 1),
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 1) if ordered else None,
+        'error_rate': round(errors / total, 4) if total else 1.0,
+    }
+
+
+def capacity(levels, p95_budget):
+    """Highest concurrency served within budget and without errors (0 if none)."""
+    ok = [
+        level['concurrency'] for level in levels
+        if level['error_rate'] == 0 and level['p95_ms'] is not None and level['p95_ms'] <= p95_budget
+    ]
+    return max(ok, default=0)
+
+
+class Command(BaseCommand):
+    help = 'Closed-loop load test: throughput, latency and concurrent capacity per container'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', required=True, help='Target URL (repeatable, round-robin).')
+        parser.add_argument(
+            '--concurrency', nargs='+', type=int, default=[4, 8, 16, 32, 64, 128],
+            help='Concurrent clients per level.',
+        )
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per level.')
+        parser.add_argument('--p95-budget', type=float, default=1000.0, help='p95 latency budget (ms) for capacity.')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout (s).')
+        parser.add_argument('--cookie', action='append', default=[], help='name=value cookie (e.g. sessionid).')
+        parser.add_argument('--header', action='append', default=[], help="'Name: value' request header.")
+        parser.add_argument('--save', help='Write the results as JSON (to use as a --baseline later).')
+        parser.add_argument('--baseline', help='Previous --save output to compare against (before/after).')
+
+    def handle(self, *args, **options):
+        try:
+            cookies = dict(c.split('=', 1) for c in options['cookie'])
+        except ValueError:
+            raise CommandError('--cookie must be name=value')
+        try:
+            headers = {name.strip(): value.strip() for name, value in (h.split(':', 1) for h in options['header'])}
+        except ValueError:
+            raise CommandError("--header must be 'Name: value'")
+
+        levels = []
+        for concurrency in sorted(options['concurrency']):
+            latencies, errors = run_level(
+                options['url'], concurrency, options['duration'], cookies, options['timeout'], headers
+            )
+            level = summarize(concurrency, options['duration'], latencies, errors)
+            levels.append(level)
+            self.stdout.write(
+                f"  c={concurrency:<4} {level['rps']:>8.1f} req/s   "
+                f"p50 {level['p50_ms']} ms   p95 {level['p95_ms']} ms   p99 {level['p99_ms']} ms   "
+                f"errors {level['error_rate']:.2%}"
+            )
+
+        result = {
+            'urls': options['url'],
+            'duration': options['duration'],
+            'p95_budget_ms': options['p95_budget'],
+            'levels': levels,
+            'capacity': capacity(levels, options['p95_budget']),
+            'peak_rps': max((level['rps'] for level in levels), default=0),
+        }
+        self.stdout.write(self.style.SUCCESS(
+            f"Capacity: {result['capacity']} concurrent clients "
+            f"(p95 <= {options['p95_budget']:.0f} ms), peak {result['peak_rps']} req/s"
+        ))
+
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read baseline: {e}')
+            self.stdout.write(
+                f"Before: capacity {baseline['capacity']}, peak {baseline['peak_rps']} req/s  ->  "
+                f"After: capacity {result['capacity']}, peak {result['peak_rps']} req/s"
+            )
+
+        if options['save']:
+            with open(options['save'], 'w') as f:
+                json.dump(result, f, indent=2)
+            self.stdout.write(f"Results saved to {options['save']}")
@@ -0,0 +1,84 @@
+"""
+Ingestion Scheduler
+===================
+Long-running worker that replaces the daily cron jobs:
+
+    11:30  sync_players
+    12:00  fetch_game_results
+    16:00  fetch_nhl_data     (after fetch_game_results succeeded today)
+    16:15  watch_lineups      (after fetch_nhl_data succeeded today)
+    16:30  injury_guardian    (after fetch_nhl_data succeeded today)
+
+Times are in TIME_ZONE and configurable (SCHEDULE_*_AT). Every job runs
+under a DB advisory lock, so several instances never run the same job at
+once. Retries and dependencies are read from the ingestion ledger, so a
+cron running `--once` behaves like the worker. Deployed as always-on
+services (railway.scheduler.toml, railway.lineups.toml).
+See nhl/scheduler.py.
+
+watch_lineups runs until the last puck drop: give it its own process with
+--only, and --skip it in the main one, so it doesn't hold the other jobs.
+
+Usage:
+    python manage.py run_scheduler
+    python manage.py run_scheduler --once                 # run what is due now, then exit
+    python manage.py run_scheduler --run fetch_nhl_data   # run one job now (still locked)
+    python manage.py run_scheduler --once --skip watch_lineups
+    python manage.py run_scheduler --once --only watch_lineups
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from nhl.scheduler import Scheduler, default_jobs
+
+
+class Command(BaseCommand):
+    help = 'Run the daily ingestion jobs in one process, in dependency order, with DB locking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the jobs that are due, then exit.')
+        parser.add_argument('--run', metavar='JOB', help='Run this job immediately (ignores time and dependencies).')
+        parser.add_argument('--only', metavar='JOB', action='append', default=[], help='Run only this job (repeatable).')
+        parser.add_argument('--skip', metavar='JOB', action='append', default=[], help='Never run this job (repeatable).')
+        parser.add_argument(
+            '--tick', type=float, default=settings.SCHEDULER_TICK_SECONDS,
+            help='Seconds between checks for due jobs.',
+        )
+
+    def handle(self, *args, **options):
+        names = [job.name for job in default_jobs()]
+        unknown = [name for name in options['only'] + options['skip'] if name not in names]
+        if unknown:
+            raise CommandError(f"Unknown job '{unknown[0]}' (expected one of {', '.join(names)})")
+        skip = set(options['skip'])
+        if options['only']:
+            skip |= set(names) - set(options['only'])
+        scheduler = Scheduler(log=lambda message: self.stdout.write(message), skip=skip)
+        jobs = {job.name: job for job in scheduler.jobs}
+
+        if options['run']:
+            if options['run'] not in jobs:
+                raise CommandError(f"Unknown job '{options['run']}' (expected one of {', '.join(jobs)})")
+            ok = scheduler.run_job(jobs[options['run']], stdout=self.stdout)
+            if ok is None:
+                self.stdout.write(self.style.WARNING(f"{options['run']} is running on another instance."))
+            elif ok:
+                self.stdout.write(self.style.SUCCESS(f"{options['run']} done."))
+            else:
+                raise CommandError(f"{options['run']} failed (see the ingestion ledger).")
+            return
+
+        for job in scheduler.jobs:
+            if job.name in scheduler.skip:
+                continue
+            after = f" after {', '.join(job.after)}" if job.after else ''
+            self.stdout.write(f'[Scheduler] {job.name} at {job.at}{after}')
+
+        if options['once']:
+            started = scheduler.tick(stdout=self.stdout)
+            self.stdout.write(self.style.SUCCESS(f'[Scheduler] {started} job(s) started.'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"[Scheduler] Started (tick {options['tick']:.0f}s)"))
+        scheduler.run_forever(options['tick'], stdout=self.stdout)
@@ -0,0 +1,81 @@
+"""
+Background Task Worker
+======================
+Serves the DB-backed task queue (nhl/tasks.py): admin actions and staff
+buttons enqueue Task rows, this worker claims and runs them by priority,
+retrying failures with exponential backoff.
+
+With --workers N it forks N worker processes sharing the queue (0 = one
+per CPU core), so a backfill fanned out per date uses every core.
+
+Usage:
+    python manage.py run_tasks
+    python manage.py run_tasks --workers 0      # one process per core
+    python manage.py run_tasks --once           # drain the queue, then exit
+"""
+
+import multiprocessing
+import os
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from nhl import tasks
+
+
+def _worker_main(poll_seconds, once):
+    # Forked child: the parent closed its DB connections before forking,
+    # so each worker opens its own.
+    def log(message):
+        sys.stdout.write(message + '\n')
+        sys.stdout.flush()
+
+    tasks.work(poll_seconds=poll_seconds, once=once, log=log)
+
+
+class Command(BaseCommand):
+    help = 'Run background tasks from the DB-backed queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.TASK_WORKERS,
+            help='Worker processes (0 = one per CPU core).',
+        )
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty.')
+        parser.add_argument(
+            '--poll', type=float, default=settings.TASK_POLL_SECONDS,
+            help='Seconds between queue polls when idle.',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or os.cpu_count() or 1
+        poll, once = options['poll'], options['once']
+        self.stdout.write(self.style.SUCCESS(
+            f"[Tasks] {workers} worker(s), tasks: {', '.join(sorted(tasks.REGISTRY))}"
+        ))
+
+        if workers == 1:
+            tasks.work(poll_seconds=poll, once=once, log=lambda message: self.stdout.write(message))
+            return
+
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_worker_main, args=(poll, once), daemon=True)
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+
+        failed = [p.exitcode for p in processes if p.exitcode]
+        if failed:
+            self.stdout.write(self.style.ERROR(f'[Tasks] {len(failed)} worker(s) exited with errors.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('[Tasks] Workers stopped.'))
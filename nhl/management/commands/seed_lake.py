@@ -0,0 +1,91 @@
+"""
+Synthetic Data Lake Seeder
+==========================
+Fills data_lake with seasons of realistic synthetic rows (nhl/synthetic.py):
+32 teams, real schedule density, skewed scoring. The last season ends on
+--end (default today), so the dashboard has a current slate. Meant for
+local / benchmark databases only.
+
+The local schema created by the first migrations has a primary key on
+player_id (production has none), which allows one row per player: --reset
+recreates data_lake as a heap table, like production.
+
+Usage:
+    python manage.py seed_lake --reset
+    python manage.py seed_lake --reset --seasons 3 --seed 7
+    python manage.py seed_lake --days 14            # two weeks only
+"""
+
+import time
+from datetime import date
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from nhl.models import GameStats
+from nhl.synthetic import SEASON_DAYS, generate_rows
+
+
+def has_primary_key(connection, table):
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return any(c['primary_key'] for c in constraints.values())
+
+
+def recreate_heap_table(connection):
+    """Drop data_lake and create it with GameStats' columns and no key."""
+    table = GameStats._meta.db_table
+    quote = connection.ops.quote_name
+    columns = ', '.join(f'{quote(f.column)} {f.db_type(connection)}' for f in GameStats._meta.fields)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {quote(table)}')
+        cursor.execute(f'CREATE TABLE {quote(table)} ({columns})')
+
+
+class Command(BaseCommand):
+    help = 'Seed data_lake with synthetic seasons (local benchmarking only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seasons', type=int, default=1, help='Number of seasons.')
+        parser.add_argument('--days', type=int, default=SEASON_DAYS, help='Days per season.')
+        parser.add_argument('--end', type=str, help='Last day of the last season (YYYY-MM-DD). Defaults to today.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (same seed, same rows).')
+        parser.add_argument('--reset', action='store_true', help='Drop and recreate data_lake as a heap table first.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT.')
+        parser.add_argument('--database', default='default', help='Database alias to seed.')
+        parser.add_argument('--force', action='store_true', help='Allow seeding when DEBUG is off.')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('Refusing to seed synthetic data with DEBUG off (use --force on a benchmark database).')
+        connection = connections[options['database']]
+        table = GameStats._meta.db_table
+        end = date.fromisoformat(options['end']) if options['end'] else date.today()
+
+        if options['reset']:
+            recreate_heap_table(connection)
+            self.stdout.write(f'Recreated {table} as a heap table.')
+        elif has_primary_key(connection, table):
+            raise CommandError(
+                f'{table} has a primary key on player_id (legacy local schema): it can hold one row per '
+                'player only. Use --reset to recreate it as a heap table, like production.'
+            )
+
+        rows = generate_rows(end, seasons=options['seasons'], days=options['days'], seed=options['seed'])
+        start, written = time.perf_counter(), 0
+        manager = GameStats.objects.using(options['database'])
+        while True:
+            batch = [GameStats(**row) for row in islice(rows, options['batch_size'])]
+            if not batch:
+                break
+            with transaction.atomic(using=options['database']):
+                manager.bulk_create(batch)
+            written += len(batch)
+            self.stdout.write(f'  {written} rows...', ending='\r')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {written} rows ({options["seasons"]} season(s) of {options["days"]} days, '
+            f'ending {end}) in {time.perf_counter() - start:.1f}s.'
+        ))
@@ -0,0 +1,98 @@
+"""
+Bankroll & Staking Simulator
+============================
+Replays settled picks from performance_log under several staking strategies
+and cortex_score thresholds, with bootstrap confidence bands. Kelly only
+sizes GOAL picks: python_prob is the goal probability (nhl.bankroll).
+
+Usage:
+    python manage.py simulate_bankroll
+    python manage.py simulate_bankroll --strategies flat:1 kelly:0.25 kelly:0.5 --thresholds 0 80 100 120
+    python manage.py simulate_bankroll --bootstrap 5000 --seed 7 --ruin-level 0.3
+    python manage.py simulate_bankroll --lake   # read the export_lake snapshot
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nhl.bankroll import (
+    DEFAULT_BANKROLL,
+    DEFAULT_RUIN_LEVEL,
+    load_settled_picks,
+    load_settled_picks_from_lake,
+    parse_strategy,
+    simulate,
+)
+
+
+class Command(BaseCommand):
+    help = 'Simulate flat and Kelly staking over settled picks (ROI, drawdown, risk of ruin)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strategies', nargs='+', default=['flat:1', 'kelly:0.25', 'kelly:0.5', 'kelly:1'],
+            help='Strategies as flat:<units> or kelly:<fraction>.',
+        )
+        parser.add_argument(
+            '--thresholds', nargs='+', type=float, default=[0, 60, 80, 100, 120],
+            help='Minimum cortex_score for a pick to be staked.',
+        )
+        parser.add_argument('--bankroll', type=float, default=DEFAULT_BANKROLL, help='Starting bankroll (units).')
+        parser.add_argument('--bootstrap', type=int, default=1000, help='Bootstrap resamples (0 to disable).')
+        parser.add_argument('--seed', type=int, default=None, help='Seed for the bootstrap.')
+        parser.add_argument(
+            '--ruin-level', type=float, default=DEFAULT_RUIN_LEVEL,
+            help='Fraction of the starting bankroll counted as ruin.',
+        )
+        parser.add_argument('--database', default='default', help='Database alias to read from.')
+        parser.add_argument(
+            '--lake', nargs='?', const='', default=None, metavar='ROOT',
+            help='Read the export_lake snapshot of performance_log instead of the database.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            strategies = [parse_strategy(spec) for spec in options['strategies']]
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        try:
+            if options['lake'] is not None:
+                history = load_settled_picks_from_lake(root=options['lake'] or None)
+            else:
+                history = load_settled_picks(using=options['database'])
+        except LookupError as e:
+            raise CommandError(str(e))
+
+        if not len(history):
+            self.stdout.write(self.style.WARNING('No settled picks found.'))
+            return
+
+        self.stdout.write(
+            f'[Bankroll] {len(history)} settled picks '
+            f'({history.dates.min()} -> {history.dates.max()}), '
+            f'{len(strategies) * len(options["thresholds"])} configurations, '
+            f'{options["bootstrap"]} resamples'
+        )
+
+        reports = simulate(
+            history,
+            strategies,
+            options['thresholds'],
+            bankroll=options['bankroll'],
+            n_boot=options['bootstrap'],
+            seed=options['seed'],
+            ruin_level=options['ruin_level'],
+        )
+
+        header = f"{'strategy':<12}{'min':>6}{'bets':>7}{'ROI %':>9}{'ROI 90% band':>20}{'final':>10}{'max DD %':>10}{'ruin %':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for r in reports:
+            band = f"[{r.roi_band[0]:.1f}, {r.roi_band[1]:.1f}]" if r.roi_band else '-'
+            ruin = f"{r.risk_of_ruin_pct:.1f}" if r.risk_of_ruin_pct is not None else '-'
+            self.stdout.write(
+                f"{r.strategy.label:<12}{r.threshold:>6g}{r.bets:>7}{r.roi_pct:>9.2f}{band:>20}"
+                f"{r.final_bankroll:>10.2f}{r.max_drawdown_pct:>10.2f}{ruin:>9}"
+            )
+
+        self.stdout.write(self.style.SUCCESS('[Bankroll] Complete!'))
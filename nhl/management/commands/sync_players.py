@@ -0,0 +1,58 @@
+"""
+Player Registry Sync
+====================
+Fetches the current roster of every team and upserts the players into the
+`players` registry (nhl.players): canonical name, normalized name, position,
+current team and team history. Run daily before fetch_game_results, so the
+boxscores of last night resolve against today's rosters.
+
+Usage:
+    python manage.py sync_players
+    python manage.py sync_players --teams EDM TOR
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nhl.constants import NHL_TEAMS_FULL_NAMES
+from nhl.client import NHLClient
+from nhl.ledger import record_run
+from nhl.players import sync_roster
+
+
+class Command(BaseCommand):
+    help = 'Sync the player registry from the 32 team rosters'
+    client = None
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teams', nargs='+', metavar='TEAM', help='Team abbreviations (default: all).')
+
+    def handle(self, *args, **options):
+        teams = options['teams'] or sorted(NHL_TEAMS_FULL_NAMES)
+        unknown = [team for team in teams if team not in NHL_TEAMS_FULL_NAMES]
+        if unknown:
+            raise CommandError(f"Unknown team(s): {', '.join(unknown)}")
+
+        # run_scheduler injects a warm, shared client
+        self.client = self.client or NHLClient()
+        self.stdout.write(self.style.SUCCESS(f'[Players] Syncing {len(teams)} rosters...'))
+
+        created = updated = 0
+        with record_run('sync_players', client=self.client) as run:
+            for team in teams:
+                with run.stage('fetch'):
+                    roster = self.client.get_json(f'roster/{team}/current')
+                if roster is None:
+                    self.stdout.write(self.style.WARNING(f'  Failed to fetch roster for {team}'))
+                    run.error()
+                    continue
+                with run.stage('persist'):
+                    new, changed = sync_roster(team, roster)
+                created += new
+                updated += changed
+                run.rows_written += new + changed
+            if run.errors == len(teams):
+                run.fail('No roster could be fetched.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'[Players] Complete! {created} new, {updated} updated.'
+        ))
@@ -0,0 +1,96 @@
+"""
+Pre-game Lineup Watcher
+=======================
+Long-running command started after fetch_nhl_data (by run_scheduler, in its
+own process: --only watch_lineups): follows each game of the date from
+LINEUP_WATCH_WINDOW_MINUTES before puck drop (nhl.lineups), with
+conditional requests on its boxscore. A scratch re-projects that team's
+skaters (the dressed ones; the scratched players' rows are marked INJURED
+like injury_guardian does), a confirmed or changed starting goalie the
+opposing skaters. Only those teams go through fetch_nhl_data's pipeline
+(bulk upserts), and each re-projection bumps the dashboard cache version.
+
+Exits once every game has started (live_results takes over).
+
+Usage:
+    python manage.py watch_lineups
+    python manage.py watch_lineups --date 2026-01-07 --max-minutes 600
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from nhl.cache import bump_dashboard_version
+from nhl.client import NHLClient
+from nhl.ledger import record_run
+from nhl.lineups import LineupWatcher
+from nhl.management.commands.fetch_nhl_data import Command as Ingestion
+from nhl.models import GameStats
+from nhl.schedule import schedule_index
+from nhl.team_context import get_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Watch pre-game lineups and starting goalies, re-projecting the affected players'
+    client = None
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=str, help='Game date (YYYY-MM-DD). Defaults to today.')
+        parser.add_argument('--max-minutes', type=int, default=720, help='Stop after this many minutes.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('[Lineups] Starting...'))
+        date_str = options['date'] or datetime.now().strftime('%Y-%m-%d')
+        # run_scheduler injects a warm, shared client
+        self.client = self.client or NHLClient()
+
+        with record_run('watch_lineups', client=self.client, target_date=date_str) as run:
+            with run.stage('fetch'):
+                snapshot = get_snapshot(date_str, self.client)
+            self.context = snapshot.teams if snapshot else {}
+            self.watcher = LineupWatcher(self.client, self.reproject, context=self.context, log=self.stdout.write)
+
+            # The re-projections run fetch_nhl_data's stages, recorded in this run
+            self.ingestion = Ingestion(stdout=self.stdout, stderr=self.stderr)
+            self.ingestion.client, self.ingestion.run = self.client, run
+            self.ingestion.club_stats = self.watcher.club_stats
+            with run.stage('fetch'):
+                self.ingestion.schedule = schedule_index(date_str, self.client)
+
+            trackers = self.watcher.load_games(date_str)
+            if not trackers:
+                self.stdout.write(f'No upcoming games found for {date_str}')
+                return
+            self.stdout.write(f'Watching {len(trackers)} games for {date_str}')
+            self.watcher.run(trackers, max_seconds=options['max_minutes'] * 60)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'[Lineups] Complete! {run.rows_written} row(s) re-projected or scratched.'
+        ))
+
+    def reproject(self, date_str, changes):
+        """Re-project the changed teams only (one fetch job each) and mark their scratched players."""
+        run = self.ingestion.run
+        jobs = []
+        for change in changes:
+            with run.stage('fetch'):
+                self.watcher.team_club_stats(change.team)  # revalidated, reused by the fetch stage
+            job = self.ingestion.team_job(change.team, change.opp, change.is_home, self.context, date_str)
+            if change.opp_goalie_form is not None:
+                job['opp_goalie_form'] = change.opp_goalie_form
+            if change.lineup is not None:
+                job['lineup'] = change.lineup
+            jobs.append(job)
+
+            if change.scratched:
+                with run.stage('persist'):
+                    scratched = GameStats.objects.filter(
+                        date=date_str, player_id__in=change.scratched,
+                    ).exclude(result_goal='INJURED').update(result_goal='INJURED', result_shot='INJURED')
+                run.rows_written += scratched
+                if scratched:
+                    self.stdout.write(self.style.WARNING(f'    {scratched} scratched player(s) marked INJURED'))
+
+        self.ingestion.run_pipeline(jobs)
+        bump_dashboard_version()
@@ -0,0 +1,87 @@
+"""
+Prometheus text exposition of the ingestion ledger (nhl.models.IngestionRun).
+
+Per command: the last finished run (duration, per-stage time, HTTP traffic,
+rows, errors, success flag, finish timestamp), the run budget, the runs in
+progress, and a `runs_total` counter of finished runs by status. The ledger
+is never pruned, so the counter only grows (deleting rows reads as a
+counter reset, which rate() handles).
+"""
+
+from django.conf import settings
+from django.db.models import Count
+
+from .models import IngestionRun
+
+PREFIX = 'cortex_ingestion'
+
+LAST_RUN_GAUGES = (
+    ('last_run_duration_seconds', 'Wall time of the last finished run', lambda r: r.duration or 0.0),
+    ('last_run_http_requests', 'HTTP requests made by the last finished run', lambda r: r.http_requests),
+    ('last_run_http_bytes', 'Bytes received by the last finished run', lambda r: r.http_bytes),
+    ('last_run_http_errors', 'HTTP errors of the last finished run', lambda r: r.http_errors),
+    ('last_run_rows_written', 'Rows written by the last finished run', lambda r: r.rows_written),
+    ('last_run_rows_skipped', 'Rows skipped by the last finished run', lambda r: r.rows_skipped),
+    ('last_run_errors', 'Errors of the last finished run', lambda r: r.errors),
+    ('last_run_success', '1 if the last finished run succeeded', lambda r: int(r.status == IngestionRun.STATUS_SUCCESS)),
+    ('last_run_finished_timestamp_seconds', 'Unix time the last run finished',
+     lambda r: r.finished_at.timestamp() if r.finished_at else 0),
+)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _family(lines, name, kind, help_text):
+    lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+    lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+
+
+def render_ingestion_metrics():
+    commands = list(IngestionRun.objects.values_list('command', flat=True).distinct().order_by('command'))
+    last_runs = {}
+    for command in commands:
+        run = IngestionRun.objects.filter(command=command).exclude(
+            status=IngestionRun.STATUS_RUNNING
+        ).order_by('-started_at').first()
+        if run is not None:
+            last_runs[command] = run
+
+    lines = []
+    for name, help_text, value in LAST_RUN_GAUGES:
+        _family(lines, name, 'gauge', help_text)
+        for command, run in last_runs.items():
+            lines.append(f'{PREFIX}_{name}{_labels(command=command)} {value(run)}')
+
+    _family(lines, 'last_run_stage_seconds', 'gauge', 'Wall time per stage of the last finished run')
+    for command, run in last_runs.items():
+        for stage, seconds in sorted(run.stages.items()):
+            lines.append(f'{PREFIX}_last_run_stage_seconds{_labels(command=command, stage=stage)} {seconds}')
+
+    _family(lines, 'run_budget_seconds', 'gauge', 'Wall time a run may take before it risks its deadline')
+    for command in commands:
+        budget = settings.INGESTION_RUN_BUDGETS.get(command, settings.INGESTION_RUN_BUDGET_SECONDS)
+        lines.append(f'{PREFIX}_run_budget_seconds{_labels(command=command)} {budget}')
+
+    counts = {
+        (row['command'], row['status']): row['n']
+        for row in IngestionRun.objects.values('command', 'status').annotate(n=Count('id'))
+    }
+    _family(lines, 'runs_running', 'gauge', 'Runs started and not finished (running, hung or killed)')
+    for command in commands:
+        lines.append(f'{PREFIX}_runs_running{_labels(command=command)} '
+                     f'{counts.get((command, IngestionRun.STATUS_RUNNING), 0)}')
+
+    # A run only moves out of "running": counting finished runs keeps the counter monotonic
+    _family(lines, 'runs_total', 'counter', 'Finished runs by status')
+    for command in commands:
+        for status in (IngestionRun.STATUS_SUCCESS, IngestionRun.STATUS_FAILED):
+            lines.append(f'{PREFIX}_runs_total{_labels(command=command, status=status)} '
+                         f'{counts.get((command, status), 0)}')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nhl', '0002_alter_gamestats_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LiveEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_id', models.BigIntegerField(db_index=True)),
+                ('payload', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LiveStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.CharField(help_text='Game date (YYYY-MM-DD), as data_lake.date', max_length=10)),
+                ('player_id', models.CharField(max_length=16)),
+                ('game_id', models.BigIntegerField()),
+                ('goals', models.PositiveSmallIntegerField(default=0)),
+                ('assists', models.PositiveSmallIntegerField(default=0)),
+                ('shots', models.PositiveSmallIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['date', 'player_id'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'player_id'), name='unique_live_stat_per_player_date')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nhl', '0003_liveevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('command', models.CharField(db_index=True, max_length=64)),
+                ('target_date', models.CharField(blank=True, max_length=10)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('success', 'Success'), ('failed', 'Failed')], default='running', max_length=16)),
+                ('started_at', models.DateTimeField(db_index=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration', models.FloatField(blank=True, help_text='Wall time (s)', null=True)),
+                ('stages', models.JSONField(blank=True, default=dict, help_text='Wall time per stage (s)')),
+                ('http_requests', models.PositiveIntegerField(default=0)),
+                ('http_bytes', models.PositiveBigIntegerField(default=0)),
+                ('http_errors', models.PositiveIntegerField(default=0)),
+                ('rows_written', models.PositiveIntegerField(default=0)),
+                ('rows_skipped', models.PositiveIntegerField(default=0)),
+                ('errors', models.PositiveIntegerField(default=0)),
+                ('error_message', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['command', '-started_at'], name='nhl_ingesti_command_50473d_idx')],
+            },
+        ),
+    ]
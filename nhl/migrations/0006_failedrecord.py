@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nhl', '0005_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FailedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('command', models.CharField(max_length=64)),
+                ('stage', models.CharField(max_length=32)),
+                ('target_date', models.CharField(blank=True, max_length=10)),
+                ('payload', models.JSONField()),
+                ('error', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('replayed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['command', 'replayed_at'], name='nhl_failedr_command_b4c066_idx')],
+            },
+        ),
+    ]
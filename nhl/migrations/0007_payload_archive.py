@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nhl', '0006_failedrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionrun',
+            name='replay_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='replays', to='nhl.ingestionrun'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedPayload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=255)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveIntegerField(help_text='Uncompressed bytes')),
+                ('fetched_at', models.DateTimeField()),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payloads', to='nhl.ingestionrun')),
+            ],
+            options={
+                'ordering': ['fetched_at', 'id'],
+                'indexes': [models.Index(fields=['endpoint', '-fetched_at'], name='nhl_archive_endpoin_d87e0d_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PayloadBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('compression', models.CharField(max_length=8)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
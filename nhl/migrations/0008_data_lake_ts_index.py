@@ -0,0 +1,31 @@
+from django.db import migrations
+
+INDEX_NAME = 'data_lake_ts_idx'
+
+
+def create_index(apps, schema_editor):
+    # data_lake is not managed by Django (no Meta.indexes): the index backs the
+    # admin's keyset pagination and date hierarchy, in the changelist's order.
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(
+        f'CREATE INDEX {concurrently}IF NOT EXISTS {INDEX_NAME} ON data_lake (ts, player_id, date)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction (and doesn't
+    # lock the table against the ingestion writes).
+    atomic = False
+
+    dependencies = [
+        ('nhl', '0007_payload_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
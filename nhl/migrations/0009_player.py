@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nhl', '0008_data_lake_ts_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Player',
+            fields=[
+                ('id', models.BigIntegerField(help_text='NHL player id', primary_key=True, serialize=False)),
+                ('name', models.CharField(help_text='Canonical "First Last"', max_length=128)),
+                ('normalized_name', models.CharField(db_index=True, help_text='Accent-folded, lowercase', max_length=128)),
+                ('team', models.CharField(blank=True, help_text='Current team', max_length=3)),
+                ('position', models.CharField(blank=True, choices=[('C', 'Centre'), ('L', 'Left wing'), ('R', 'Right wing'), ('D', 'Defense'), ('G', 'Goalie')], max_length=1)),
+                ('team_history', models.JSONField(blank=True, default=list, help_text='[[team, first seen (YYYY-MM-DD)], ...]')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'players',
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nhl', '0009_player'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameLogPartition',
+            fields=[
+                ('date', models.CharField(help_text='YYYY-MM-DD', max_length=10, primary_key=True, serialize=False)),
+                ('rows', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RollingFormState',
+            fields=[
+                ('name', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('last_date', models.CharField(blank=True, max_length=10)),
+                ('data', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
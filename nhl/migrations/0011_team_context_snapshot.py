@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nhl', '0010_feature_store'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamContextSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('teams', models.JSONField(help_text='{team: {gaa, pp_pct, pk_pct, l10_pts_pct, shots_allowed, save_pct, goalie_form}}')),
+                ('team_order', models.JSONField(help_text='Teams in matchup row / column order')),
+                ('matchup', models.JSONField(help_text='Goal-rate factor of the row team facing the column team')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+    ]
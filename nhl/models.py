@@ -1,6 +1,26 @@
 from django.db import models
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.utils.functional import cached_property
 from .constants import NHL_TEAMS_FULL_NAMES
 
+
+class GameStatsQuerySet(models.QuerySet):
+    def with_cortex_score(self):
+        """
+        Annotate `cortex` with the SQL equivalent of `GameStats.cortex_score`
+        (NULL when either input is missing), so it can be filtered and exported
+        without instantiating models.
+        """
+        return self.annotate(cortex=ExpressionWrapper(
+            F('algo_score_goal') * 0.6 + F('python_prob') * 0.4,
+            output_field=FloatField(),
+        ))
+
+    def settled(self):
+        """Rows whose game was settled (result_goal HIT or MISS): their outcome columns are final."""
+        return self.filter(result_goal__in=(GameStats.OUTCOME_HIT, GameStats.OUTCOME_MISS))
+
+
 class GameStats(models.Model):
     """
     Model representing an NHL player stats from Supabase data_lake table.
@@ -33,6 +53,13 @@ class GameStats(models.Model):
     result_goal = models.TextField(blank=True, null=True)
     # result_shot -> The schema check showed 'result_shot' exists. Use it.
     result_shot = models.TextField(blank=True, null=True)
+
+    OUTCOME_HIT = 'HIT'
+    OUTCOME_MISS = 'MISS'
+    OUTCOME_INJURED = 'INJURED'
+    OUTCOMES = (OUTCOME_HIT, OUTCOME_MISS, OUTCOME_INJURED)
+
+    objects = GameStatsQuerySet.as_manager()
     
     class Meta:
         managed = False
@@ -57,6 +84,21 @@ class GameStats(models.Model):
     def opp_full_name(self):
         return NHL_TEAMS_FULL_NAMES.get(self.opp, self.opp)
 
+    @property
+    def outcome(self):
+        """HIT / MISS / INJURED once settled, None while the game is pending."""
+        return self.result_goal if self.result_goal in self.OUTCOMES else None
+
+    @property
+    def odds(self):
+        """Goal odds while pending (result_goal holds them until settlement), else None."""
+        if self.outcome is not None or not self.result_goal:
+            return None
+        try:
+            return float(self.result_goal)
+        except ValueError:
+            return None
+
     @property
     def cortex_score(self):
         """
@@ -90,3 +132,298 @@ class GameStats(models.Model):
             pass
         
         return 0
+
+
+class Player(models.Model):
+    """
+    Player identity registry, populated from team rosters (nhl.players.sync_roster).
+    Every command resolves NHL ids and names through its in-memory index
+    (nhl.players.player_index) instead of matching names in data_lake.
+    """
+
+    POSITION_CHOICES = [
+        ('C', 'Centre'),
+        ('L', 'Left wing'),
+        ('R', 'Right wing'),
+        ('D', 'Defense'),
+        ('G', 'Goalie'),
+    ]
+
+    id = models.BigIntegerField(primary_key=True, help_text='NHL player id')
+    name = models.CharField(max_length=128, help_text='Canonical "First Last"')
+    normalized_name = models.CharField(max_length=128, db_index=True, help_text='Accent-folded, lowercase')
+    team = models.CharField(max_length=3, blank=True, help_text='Current team')
+    position = models.CharField(max_length=1, choices=POSITION_CHOICES, blank=True)
+    team_history = models.JSONField(default=list, blank=True, help_text='[[team, first seen (YYYY-MM-DD)], ...]')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'players'
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.team or '-'})"
+
+
+class GameLogPartition(models.Model):
+    """
+    One settled date of the feature store's game logs (nhl.features), when
+    it is stored in the database (FEATURE_STORE_STORAGE=db): the GAME_LOGS
+    columns as a compressed npz archive.
+    """
+
+    date = models.CharField(max_length=10, primary_key=True, help_text='YYYY-MM-DD')
+    rows = models.PositiveIntegerField()
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return f"Game logs {self.date} ({self.rows} rows)"
+
+
+class RollingFormState(models.Model):
+    """
+    The feature store's rolling recent-form state (nhl.features.RollingForm)
+    as of `last_date`, when it is stored in the database.
+    """
+
+    name = models.CharField(max_length=32, primary_key=True)
+    last_date = models.CharField(max_length=10, blank=True)
+    data = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.last_date or 'empty'})"
+
+
+class TeamContextSnapshot(models.Model):
+    """
+    Team context of one game date, computed once from standings and the
+    teams' skater / goalie stats (nhl.team_context). Projections of that
+    date, including replays, read it instead of refetching.
+    """
+
+    date = models.DateField(unique=True)
+    teams = models.JSONField(help_text='{team: {gaa, pp_pct, pk_pct, l10_pts_pct, shots_allowed, save_pct, goalie_form}}')
+    team_order = models.JSONField(help_text='Teams in matchup row / column order')
+    matchup = models.JSONField(help_text='Goal-rate factor of the row team facing the column team')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"Team context {self.date}"
+
+    def team(self, abbrev):
+        return self.teams.get(abbrev, {})
+
+    @cached_property
+    def team_index(self):
+        return {abbrev: i for i, abbrev in enumerate(self.team_order)}
+
+    def matchup_factor(self, team, opp):
+        """O(1) lookup in the precomputed matrix; 1.0 for a team outside the snapshot."""
+        index = self.team_index
+        if team not in index or opp not in index:
+            return 1.0
+        return self.matchup[index[team]][index[opp]]
+
+
+class LiveEvent(models.Model):
+    """
+    Compact in-game diff written by the `live_results` poller and pushed
+    to open dashboards by the SSE stream (ids double as SSE event ids).
+    """
+
+    game_id = models.BigIntegerField(db_index=True)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"Game {self.game_id} @ {self.created_at:%H:%M:%S}"
+
+
+class LiveStat(models.Model):
+    """
+    Running in-game line of a tracked player, kept by the `live_results`
+    poller and sent to every fresh SSE connection (nhl.views.live_stream).
+    data_lake's result columns hold the odds until the game is settled, so
+    live counts never go there.
+    """
+
+    date = models.CharField(max_length=10, help_text='Game date (YYYY-MM-DD), as data_lake.date')
+    player_id = models.CharField(max_length=16)
+    game_id = models.BigIntegerField()
+    goals = models.PositiveSmallIntegerField(default=0)
+    assists = models.PositiveSmallIntegerField(default=0)
+    shots = models.PositiveSmallIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        ordering = ['date', 'player_id']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'player_id'], name='unique_live_stat_per_player_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.player_id} {self.date}: {self.goals}G {self.assists}A {self.shots}SOG"
+
+
+class IngestionRun(models.Model):
+    """
+    Ledger row for one run of an ingestion command (fetch_nhl_data,
+    fetch_game_results, injury_guardian...), written by `nhl.ledger.record_run`.
+    """
+
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCESS = 'success'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCESS, 'Success'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    command = models.CharField(max_length=64, db_index=True)
+    target_date = models.CharField(max_length=10, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_RUNNING)
+    started_at = models.DateTimeField(db_index=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True, help_text='Wall time (s)')
+    stages = models.JSONField(default=dict, blank=True, help_text='Wall time per stage (s)')
+
+    http_requests = models.PositiveIntegerField(default=0)
+    http_bytes = models.PositiveBigIntegerField(default=0)
+    http_errors = models.PositiveIntegerField(default=0)
+    rows_written = models.PositiveIntegerField(default=0)
+    rows_skipped = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0)
+    error_message = models.TextField(blank=True)
+    # Set when the run replayed another run's archived payloads (`--replay`)
+    replay_of = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='replays')
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [models.Index(fields=['command', '-started_at'])]
+
+    def __str__(self):
+        return f"{self.command} @ {self.started_at:%Y-%m-%d %H:%M} ({self.status})"
+
+
+class Task(models.Model):
+    """
+    Background job in the DB-backed queue (see nhl.tasks and `manage.py run_tasks`).
+    Higher priority first, then oldest first; failed attempts are retried
+    with exponential backoff until max_attempts.
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_CANCELLED, 'Cancelled'),
+    ]
+
+    PRIORITY_LOW = 0
+    PRIORITY_NORMAL = 5
+    PRIORITY_HIGH = 10
+
+    name = models.CharField(max_length=64)
+    kwargs = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=PRIORITY_NORMAL)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(null=True, blank=True)
+
+    progress = models.FloatField(default=0.0, help_text='0 to 1')
+    progress_message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    created_by = models.CharField(max_length=254, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=64, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', '-priority', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class FailedRecord(models.Model):
+    """
+    Record that failed in one stage of the ingestion pipeline (nhl.pipeline),
+    kept with its input payload so it can be replayed from that stage
+    (`manage.py fetch_nhl_data --replay-failed`).
+    """
+
+    command = models.CharField(max_length=64)
+    stage = models.CharField(max_length=32)
+    target_date = models.CharField(max_length=10, blank=True)
+    payload = models.JSONField()
+    error = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    replayed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['command', 'replayed_at'])]
+
+    def __str__(self):
+        return f"{self.command}/{self.stage} {self.target_date} #{self.pk}"
+
+
+class ArchivedPayload(models.Model):
+    """
+    One API response fetched by an ingestion run. The body lives in the
+    content-addressed payload archive (nhl.archive) under `sha256`, shared by
+    every fetch that returned the same bytes.
+    """
+
+    run = models.ForeignKey(IngestionRun, on_delete=models.CASCADE, related_name='payloads')
+    endpoint = models.CharField(max_length=255)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveIntegerField(help_text='Uncompressed bytes')
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['fetched_at', 'id']
+        indexes = [models.Index(fields=['endpoint', '-fetched_at'])]
+
+    def __str__(self):
+        return f"{self.endpoint} @ {self.fetched_at:%Y-%m-%d %H:%M:%S}"
+
+
+class PayloadBlob(models.Model):
+    """
+    Compressed body of an archived payload, by SHA-256, when the archive is
+    stored in the database (PAYLOAD_ARCHIVE_STORAGE=db): it lives as long as
+    the ArchivedPayload rows that point to it, unlike a container's disk.
+    """
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    compression = models.CharField(max_length=8)
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.compression}, {len(self.data)} bytes)"
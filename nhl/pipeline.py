@@ -0,0 +1,193 @@
+"""
+Streaming staged pipeline (used by `manage.py fetch_nhl_data`).
+
+    pipeline = Pipeline([
+        Stage('fetch', fetch, workers=4),
+        Stage('parse', parse),
+        Stage('project', project, workers=2),
+        Stage('persist', persist, batch_size=200),
+    ])
+    stats = pipeline.run(jobs)
+
+Each stage function takes one item (or, with batch_size > 1, a list of up
+to batch_size items) and returns an iterable of items for the next stage.
+Stages are connected by bounded queues: when persistence is slow, the
+queues fill up and upstream workers block, so fetching is throttled
+instead of buffering the whole day in memory.
+
+An exception fails only the item being processed: it goes to the error
+channel (`pipeline.failures`) with the stage name and its input, so it can
+be stored and replayed from that stage later (`run(items, start=stage)`).
+A failing batch is retried item by item, so one bad row doesn't fail the
+others.
+
+The calling thread runs one worker of the last stage (so with the default
+single persist worker, DB writes use the caller's connection and
+transaction); every other worker is a thread.
+"""
+
+import queue
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from django.db import connections
+
+_DONE = object()
+
+# ==============================================================================
+# STAGES
+# ==============================================================================
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[Any], Iterable[Any]]
+    workers: int = 1
+    batch_size: int = 1
+    queue_size: int = 64  # bound of the stage's input queue
+
+
+@dataclass
+class StageStats:
+    items_in: int = 0
+    items_out: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0  # summed over the stage's workers
+
+
+@dataclass
+class Failure:
+    stage: str
+    payload: Any
+    error: str
+
+# ==============================================================================
+# PIPELINE
+# ==============================================================================
+
+class Pipeline:
+    def __init__(self, stages: Sequence[Stage], on_error: Optional[Callable[[Failure], None]] = None):
+        if not stages:
+            raise ValueError('A pipeline needs at least one stage')
+        self.stages = list(stages)
+        self.on_error = on_error
+        self.failures: List[Failure] = []
+        self.stats: Dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+
+    def stage_index(self, name):
+        for i, stage in enumerate(self.stages):
+            if stage.name == name:
+                return i
+        raise ValueError(f"Unknown stage '{name}' (expected one of {', '.join(s.name for s in self.stages)})")
+
+    def run(self, items: Iterable[Any], start: str = None) -> Dict[str, StageStats]:
+        """Stream `items` through the stages (from `start`, default the first); returns per-stage stats."""
+        stages = self.stages[self.stage_index(start) if start else 0:]
+        self.stats = {stage.name: StageStats() for stage in self.stages}
+        queues = [queue.Queue(maxsize=max(stage.queue_size, stage.batch_size)) for stage in stages]
+        remaining = [stage.workers for stage in stages]
+        errors = []
+
+        def finish_worker(index):
+            with self._lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last and index + 1 < len(stages):
+                for _ in range(stages[index + 1].workers):
+                    queues[index + 1].put(_DONE)
+
+        def worker(index, own_thread):
+            try:
+                self._work(stages[index], queues[index], queues[index + 1] if index + 1 < len(stages) else None)
+            except BaseException as e:  # a bug in the pipeline itself, not in an item
+                errors.append(e)
+                raise
+            finally:
+                finish_worker(index)
+                if own_thread:
+                    connections.close_all()
+
+        def feed():
+            try:
+                for item in items:
+                    queues[0].put(item)
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                for _ in range(stages[0].workers):
+                    queues[0].put(_DONE)
+
+        threads = [threading.Thread(target=feed, name='pipeline-feed', daemon=True)]
+        for index, stage in enumerate(stages):
+            own = stage.workers - 1 if index == len(stages) - 1 else stage.workers
+            threads += [
+                threading.Thread(target=worker, args=(index, True), name=f'pipeline-{stage.name}-{n}', daemon=True)
+                for n in range(own)
+            ]
+        for thread in threads:
+            thread.start()
+        worker(len(stages) - 1, False)
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+        return self.stats
+
+    def _work(self, stage, inbox, outbox):
+        stats = self.stats[stage.name]
+        done = False
+        while not done:
+            item = inbox.get()
+            if item is _DONE:
+                return
+            batch = [item]
+            while len(batch) < stage.batch_size:
+                try:
+                    item = inbox.get(timeout=0.05)
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+                batch.append(item)
+            for output in self._process(stage, batch):
+                if outbox is not None:
+                    outbox.put(output)
+                with self._lock:
+                    stats.items_out += 1
+
+    def _process(self, stage, batch):
+        stats = self.stats[stage.name]
+        start = time.perf_counter()
+        try:
+            outputs = list(stage.fn(batch if stage.batch_size > 1 else batch[0]))
+            failed = []
+        except Exception as e:
+            if len(batch) > 1:
+                # Isolate the bad item(s): retry one by one.
+                outputs, failed = [], []
+                for item in batch:
+                    try:
+                        outputs.extend(stage.fn([item]))
+                    except Exception as item_error:
+                        failed.append((item, item_error))
+            else:
+                outputs, failed = [], [(batch[0], e)]
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            stats.items_in += len(batch)
+            stats.busy_seconds += elapsed
+            stats.failed += len(failed)
+        for item, error in failed:
+            failure = Failure(stage.name, item, ''.join(traceback.format_exception_only(type(error), error)).strip())
+            with self._lock:
+                self.failures.append(failure)
+            if self.on_error:
+                self.on_error(failure)
+        return outputs
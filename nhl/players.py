@@ -0,0 +1,173 @@
+"""
+Player identity registry.
+
+The `players` table (models.Player) is filled from team rosters by
+`sync_roster` (`manage.py sync_players`, and injury_guardian with the
+rosters it fetches anyway). Commands don't query it per player: they
+resolve through `player_index()`, an in-memory index loaded once per
+process and reloaded only when the registry changed.
+
+    index = player_index()
+    index.get(8478402)                      # -> PlayerEntry
+    index.resolve('C. McDavid', team='EDM') # boxscore name -> 8478402
+    index.resolve('Tim Stützle')            # odds file name -> 8482116
+
+Names are matched on `normalize_name` (accents folded, case and
+punctuation dropped), in full ("connor mcdavid") or as the initial + last
+name the boxscores use ("c mcdavid"). A name shared by several players
+resolves only with the team that tells them apart, never to a guess.
+"""
+
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Player
+
+ROSTER_GROUPS = ('forwards', 'defensemen', 'goalies')
+PUNCTUATION_RE = re.compile(r"[.'’]")
+SEPARATOR_RE = re.compile(r'[^a-z0-9]+')
+
+# ==============================================================================
+# NAMES
+# ==============================================================================
+
+def normalize_name(name: str) -> str:
+    """'Alexis Lafrenière' -> 'alexis lafreniere', 'J.T. Miller' -> 'jt miller', 'Marc-André' -> 'marc andre'."""
+    folded = unicodedata.normalize('NFKD', name or '')
+    folded = ''.join(c for c in folded if not unicodedata.combining(c)).lower()
+    return SEPARATOR_RE.sub(' ', PUNCTUATION_RE.sub('', folded)).strip()
+
+
+def short_name(normalized: str) -> str:
+    """Initial + last name of a normalized name ('connor mcdavid' -> 'c mcdavid'), as in boxscores."""
+    parts = normalized.split()
+    if len(parts) < 2:
+        return normalized
+    return f'{parts[0][0]} {parts[-1]}'
+
+
+def full_name(player: dict) -> str:
+    """'First Last' of an API player dict (roster, club-stats: firstName / lastName as {'default': ...})."""
+    first = (player.get('firstName') or {}).get('default', '')
+    last = (player.get('lastName') or {}).get('default', '')
+    return f'{first} {last}'.strip()
+
+# ==============================================================================
+# REGISTRY
+# ==============================================================================
+
+def roster_players(roster: dict) -> Iterable[dict]:
+    """The players of a `roster/{team}/current` payload."""
+    for group in ROSTER_GROUPS:
+        yield from roster.get(group, [])
+
+
+def sync_roster(team: str, roster: dict, day=None) -> Tuple[int, int]:
+    """
+    Upsert the players of one team's roster; a change of team is appended to
+    the player's team_history. Returns (created, updated).
+    """
+    day = (day or timezone.localdate()).isoformat()
+    incoming = {}
+    for p in roster_players(roster):
+        if p.get('id') is None:
+            continue
+        name = full_name(p)
+        incoming[int(p['id'])] = (name, normalize_name(name), p.get('positionCode', '') or '')
+
+    existing = Player.objects.in_bulk(list(incoming))
+    new, changed = [], []
+    for player_id, (name, normalized, position) in incoming.items():
+        player = existing.get(player_id)
+        if player is None:
+            new.append(Player(id=player_id, name=name, normalized_name=normalized, team=team,
+                              position=position, team_history=[[team, day]]))
+            continue
+        if (player.name, player.team, player.position) == (name, team, position):
+            continue
+        if player.team != team:
+            player.team_history = [*player.team_history, [team, day]]
+        player.name, player.normalized_name, player.team, player.position = name, normalized, team, position
+        player.updated_at = timezone.now()  # auto_now isn't applied by bulk_update
+        changed.append(player)
+
+    Player.objects.bulk_create(new)
+    Player.objects.bulk_update(changed, ['name', 'normalized_name', 'team', 'position', 'team_history',
+                                         'updated_at'])
+    return len(new), len(changed)
+
+# ==============================================================================
+# INDEX
+# ==============================================================================
+
+@dataclass(frozen=True)
+class PlayerEntry:
+    id: int
+    name: str
+    team: str
+    position: str
+
+
+class PlayerIndex:
+    """Ids and normalized names (full and short) of the registry, in dicts."""
+
+    def __init__(self, entries: Iterable[PlayerEntry]):
+        self.by_id: Dict[int, PlayerEntry] = {}
+        self.by_name: Dict[str, List[PlayerEntry]] = {}
+        for entry in entries:
+            self.by_id[entry.id] = entry
+            normalized = normalize_name(entry.name)
+            for key in {normalized, short_name(normalized)}:
+                self.by_name.setdefault(key, []).append(entry)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def get(self, player_id) -> Optional[PlayerEntry]:
+        try:
+            return self.by_id.get(int(player_id))
+        except (TypeError, ValueError):
+            return None
+
+    def resolve(self, name: str, team: str = None) -> Optional[int]:
+        """Id of the only player with this name (on `team`, when given); None if unknown or ambiguous."""
+        normalized = normalize_name(name)
+        candidates = self.by_name.get(normalized) or self.by_name.get(short_name(normalized), [])
+        if team:
+            candidates = [entry for entry in candidates if entry.team == team]
+        return candidates[0].id if len(candidates) == 1 else None
+
+    @classmethod
+    def load(cls):
+        return cls(PlayerEntry(*row) for row in Player.objects.values_list('id', 'name', 'team', 'position'))
+
+
+_index: Optional[PlayerIndex] = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def player_index() -> PlayerIndex:
+    """
+    The process-wide index. One aggregate query checks that the registry
+    hasn't changed since it was loaded (a sync in another process); the
+    table itself is only read again when it has.
+    """
+    global _index, _index_version
+    version = tuple(Player.objects.aggregate(n=Count('id'), at=Max('updated_at')).values())
+    with _index_lock:
+        if _index is None or version != _index_version:
+            _index, _index_version = PlayerIndex.load(), version
+        return _index
+
+
+def reset_player_index():
+    global _index, _index_version
+    with _index_lock:
+        _index = _index_version = None
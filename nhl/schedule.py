@@ -0,0 +1,201 @@
+"""
+Season schedule index: rest days and back-to-backs for any team and date.
+
+The season's games are read once from the league schedule (`schedule/{date}`,
+one request per week, following `nextStartDate`) and stored locally as
+`<LAKE_DIR>/schedule/<season>.npz`: one row per team, one column per day of
+the season (0 no game, 1 home, 2 away). From it the index precomputes, per
+team and day, the cumulative games played, the last game day and the
+current road-trip length, so that
+
+    index = schedule_index('2026-01-07', client)
+    index.days_since_last_game('EDM', '2026-01-07')  # 1 -> back-to-back
+    index.games_in_last('EDM', '2026-01-07', 4)      # games in the 4 days before
+    index.road_trip_length('EDM', '2026-01-07')      # consecutive away games, this one included
+
+are array lookups. The file is rebuilt once it is older than
+SCHEDULE_INDEX_MAX_AGE_DAYS (postponements, playoff dates) or doesn't reach
+the requested date.
+"""
+
+import os
+import threading
+from datetime import date as date_cls, datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .lake import lake_root
+
+NO_GAME, HOME, AWAY = 0, 1, 2
+GAME_TYPES = (2, 3)  # regular season, playoffs
+MAX_WEEKS = 60
+
+
+def _day(value) -> date_cls:
+    return value if isinstance(value, date_cls) else datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def season_of(day) -> str:
+    """'20252026' for any date from July 2025 to June 2026."""
+    day = _day(day)
+    first = day.year if day.month >= 7 else day.year - 1
+    return f'{first}{first + 1}'
+
+# ==============================================================================
+# INDEX
+# ==============================================================================
+
+class ScheduleIndex:
+    def __init__(self, season: str, start: date_cls, teams: Iterable[str], venue: np.ndarray, built_at: float = None):
+        self.season = season
+        self.start = start
+        self.teams = list(teams)
+        self.rows: Dict[str, int] = {team: i for i, team in enumerate(self.teams)}
+        self.venue = venue.astype(np.int8)
+        self.built_at = built_at
+
+        n_teams, n_days = self.venue.shape
+        played = self.venue != NO_GAME
+        # played_before[t, d]: games of team t on the days before day d
+        self.played_before = np.zeros((n_teams, n_days + 1), dtype=np.int16)
+        np.cumsum(played, axis=1, out=self.played_before[:, 1:])
+        # last_before[t, d]: last day before d with a game (-1: none)
+        days = np.where(played, np.arange(n_days), -1)
+        self.last_before = np.full((n_teams, n_days + 1), -1, dtype=np.int32)
+        self.last_before[:, 1:] = np.maximum.accumulate(days, axis=1)
+        # road[t, d]: consecutive away games up to day d, that day's included (home games reset it)
+        self.road = np.zeros((n_teams, n_days), dtype=np.int16)
+        streak = np.zeros(n_teams, dtype=np.int16)
+        for d in range(n_days):
+            streak = np.where(self.venue[:, d] == AWAY, streak + 1, np.where(self.venue[:, d] == HOME, 0, streak))
+            self.road[:, d] = np.where(self.venue[:, d] == AWAY, streak, 0)
+
+    @property
+    def end(self) -> date_cls:
+        return self.start + timedelta(days=self.venue.shape[1] - 1)
+
+    def _locate(self, team: str, day) -> Optional[Tuple[int, int]]:
+        row = self.rows.get(team)
+        offset = (_day(day) - self.start).days
+        if row is None or offset < 0:
+            return None
+        return row, min(offset, self.venue.shape[1])
+
+    def days_since_last_game(self, team: str, day) -> Optional[int]:
+        """Days since the team's previous game (1: it played the day before); None if it hasn't played."""
+        located = self._locate(team, day)
+        if located is None:
+            return None
+        row, offset = located
+        last = self.last_before[row, offset]
+        return None if last < 0 else (_day(day) - self.start).days - int(last)
+
+    def games_in_last(self, team: str, day, days: int) -> int:
+        """Games in the `days` days before `day`."""
+        located = self._locate(team, day)
+        if located is None:
+            return 0
+        row, offset = located
+        return int(self.played_before[row, offset] - self.played_before[row, max(0, offset - days)])
+
+    def is_back_to_back(self, team: str, day) -> bool:
+        return self.days_since_last_game(team, day) == 1
+
+    def road_trip_length(self, team: str, day) -> int:
+        located = self._locate(team, day)
+        if located is None or located[1] >= self.venue.shape[1]:
+            return 0
+        return int(self.road[located])
+
+    def is_tired(self, team: str, day) -> bool:
+        """Second night of a back-to-back, or a third game in four nights."""
+        return self.is_back_to_back(team, day) or self.games_in_last(team, day, 3) >= 2
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.tmp.npz'
+        np.savez(tmp, season=np.array(self.season), start=np.array(self.start.isoformat()),
+                 teams=np.array(self.teams), venue=self.venue, built_at=np.array(self.built_at or 0.0))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path) -> 'ScheduleIndex':
+        with np.load(path, allow_pickle=False) as data:
+            return cls(str(data['season']), _day(str(data['start'])), [str(t) for t in data['teams']],
+                       data['venue'], float(data['built_at']))
+
+    @classmethod
+    def from_games(cls, season: str, games: Iterable[Tuple[str, str, str]], built_at: float = None):
+        """From (date, home, away) tuples."""
+        games = sorted(set(games))
+        if not games:
+            raise ValueError(f'No games in season {season}')
+        start, end = _day(games[0][0]), _day(games[-1][0])
+        teams = sorted({team for _, home, away in games for team in (home, away)})
+        rows = {team: i for i, team in enumerate(teams)}
+        venue = np.zeros((len(teams), (end - start).days + 1), dtype=np.int8)
+        for day, home, away in games:
+            offset = (_day(day) - start).days
+            venue[rows[home], offset] = HOME
+            venue[rows[away], offset] = AWAY
+        return cls(season, start, teams, venue, built_at)
+
+# ==============================================================================
+# BUILD & LOAD
+# ==============================================================================
+
+def index_path(season: str, root=None):
+    return lake_root(root) / 'schedule' / f'{season}.npz'
+
+
+def fetch_season_games(season: str, client):
+    """(date, home, away) of every regular-season / playoff game, week by week. None if a week fails."""
+    first_year = int(season[:4])
+    day, last_day = f'{first_year}-09-01', f'{first_year + 1}-06-30'
+    games = []
+    for _ in range(MAX_WEEKS):
+        payload = client.get_json(f'schedule/{day}')
+        if payload is None:
+            return None
+        for game_day in payload.get('gameWeek', []):
+            for game in game_day.get('games', []):
+                if game.get('gameType') in GAME_TYPES:
+                    games.append((game_day['date'], game['homeTeam']['abbrev'], game['awayTeam']['abbrev']))
+        day = payload.get('nextStartDate')
+        if not day or day > last_day:
+            break
+    return games
+
+
+_indexes: Dict[str, ScheduleIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def schedule_index(day, client=None, root=None) -> Optional[ScheduleIndex]:
+    """
+    The index of the season of `day`: from this process, else the local file,
+    else (or when stale, with a client) built from the API. None if there is
+    none and it can't be built.
+    """
+    season = season_of(day)
+    path = index_path(season, root)
+    max_age = settings.SCHEDULE_INDEX_MAX_AGE_DAYS * 86400
+    with _indexes_lock:
+        index = _indexes.get(str(path))
+        if index is None and os.path.exists(path):
+            index = _indexes[str(path)] = ScheduleIndex.load(path)
+        stale = index is None or _day(day) > index.end or datetime.now().timestamp() - index.built_at > max_age
+        if stale and client is not None:
+            games = fetch_season_games(season, client)
+            if games:
+                index = ScheduleIndex.from_games(season, games, built_at=datetime.now().timestamp())
+                index.save(path)
+                _indexes[str(path)] = index
+        return index
+
+
+def reset_schedule_indexes():
+    with _indexes_lock:
+        _indexes.clear()
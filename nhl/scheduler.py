@@ -0,0 +1,228 @@
+"""
+In-process scheduler for the daily ingestion jobs (see `manage.py run_scheduler`).
+
+One long-running process replaces the cron entries:
+
+    fetch_game_results (12:00)  ->  fetch_nhl_data (16:00)  ->  injury_guardian (16:30)
+                                                            ->  watch_lineups (16:15)
+
+plus sync_players (11:30, player registry), which nothing waits for: a
+failed sync leaves yesterday's registry in place.
+
+watch_lineups follows the games until the last puck drop, so it holds its
+tick for hours: an instance can `skip` jobs (still known as dependencies),
+and run_scheduler runs it in a process of its own (`--only watch_lineups`).
+
+A job runs once it is past its time of day (TIME_ZONE) and every job it
+depends on has succeeded today. A dependency that has used up its attempts
+no longer holds it back, nor does any dependency once SCHEDULER_DEPENDENCY_WAIT_MINUTES
+have passed since the job's time: fetch_nhl_data still projects the night's
+games when the results could not be fetched.
+
+Successes and attempts come from the ingestion ledger (IngestionRun), so
+they survive restarts and are shared between instances: `run_scheduler
+--once` from a cron retries and orders jobs the same way as the long-running
+worker. Each job runs under a Postgres advisory lock: if another instance
+holds it, the job is skipped for this tick, which is not an attempt.
+
+Jobs run in this process with one shared NHLClient (warm keep-alive
+sessions) and warm in-process state (the player index), instead of a
+fresh interpreter, DB connection and HTTP session per cron run.
+"""
+
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.management import call_command, get_commands, load_command_class
+from django.db import close_old_connections, connections
+from django.utils import timezone
+
+from .client import NHLClient
+from .models import IngestionRun
+
+# ==============================================================================
+# JOBS
+# ==============================================================================
+
+@dataclass(frozen=True)
+class Job:
+    name: str                     # management command
+    at: str                       # local time of day it becomes due ("HH:MM")
+    after: Tuple[str, ...] = ()   # jobs that must have succeeded today first
+
+    @property
+    def due_time(self):
+        return datetime.strptime(self.at, '%H:%M').time()
+
+
+def default_jobs() -> Tuple[Job, ...]:
+    return (
+        Job('sync_players', settings.SCHEDULE_PLAYERS_AT),
+        Job('fetch_game_results', settings.SCHEDULE_RESULTS_AT),
+        Job('fetch_nhl_data', settings.SCHEDULE_PROJECTIONS_AT, after=('fetch_game_results',)),
+        Job('injury_guardian', settings.SCHEDULE_INJURIES_AT, after=('fetch_nhl_data',)),
+        Job('watch_lineups', settings.SCHEDULE_LINEUPS_AT, after=('fetch_nhl_data',)),
+    )
+
+# ==============================================================================
+# LOCKING
+# ==============================================================================
+
+_local_locks: Dict[str, threading.Lock] = {}
+
+
+def lock_key(name: str) -> int:
+    """Stable signed 64-bit key for pg_try_advisory_lock."""
+    return int.from_bytes(hashlib.blake2b(f'cortex:{name}'.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+@contextmanager
+def advisory_lock(name: str, using: str = 'default'):
+    """
+    Non-blocking lock held for the duration of the block; yields whether it
+    was acquired. Postgres session advisory lock (cluster-wide); other
+    backends (SQLite in development) fall back to a process-local lock.
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        key = lock_key(name)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [key])
+            acquired = cursor.fetchone()[0]
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_unlock(%s)', [key])
+        return
+
+    lock = _local_locks.setdefault(name, threading.Lock())
+    acquired = lock.acquire(blocking=False)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            lock.release()
+
+# ==============================================================================
+# SCHEDULER
+# ==============================================================================
+
+def _runs_on(command: str, day):
+    return IngestionRun.objects.filter(command=command, started_at__date=day, replay_of__isnull=True)
+
+
+def succeeded_on(command: str, day) -> bool:
+    return _runs_on(command, day).filter(status=IngestionRun.STATUS_SUCCESS).exists()
+
+
+def attempts_on(command: str, day) -> list:
+    """Start times of the day's unsuccessful runs (failed, or still running / killed)."""
+    return list(_runs_on(command, day).exclude(status=IngestionRun.STATUS_SUCCESS)
+                .order_by('started_at').values_list('started_at', flat=True))
+
+
+class Scheduler:
+    def __init__(self, jobs: Sequence[Job] = None, client: Optional[NHLClient] = None,
+                 log: Callable[[str], None] = None, now: Callable[[], datetime] = timezone.localtime,
+                 retry_minutes: int = None, max_attempts: int = None, dependency_wait_minutes: int = None,
+                 skip: Sequence[str] = ()):
+        self.jobs = tuple(jobs or default_jobs())
+        self.skip = frozenset(skip)  # jobs another process runs: dependencies only
+        self.client = client or NHLClient()
+        self.log = log or (lambda message: None)
+        self.now = now
+        self.retry = timedelta(minutes=retry_minutes if retry_minutes is not None else settings.SCHEDULER_RETRY_MINUTES)
+        self.max_attempts = max_attempts if max_attempts is not None else settings.SCHEDULER_MAX_ATTEMPTS
+        self.dependency_wait = timedelta(minutes=dependency_wait_minutes if dependency_wait_minutes is not None
+                                         else settings.SCHEDULER_DEPENDENCY_WAIT_MINUTES)
+
+        names = {job.name for job in self.jobs}
+        for job in self.jobs:
+            missing = set(job.after) - names
+            if missing:
+                raise ValueError(f"{job.name} depends on unknown job(s): {', '.join(sorted(missing))}")
+        unknown = self.skip - names
+        if unknown:
+            raise ValueError(f"Unknown job(s) to skip: {', '.join(sorted(unknown))}")
+
+    def exhausted(self, name: str, day) -> bool:
+        return len(attempts_on(name, day)) >= self.max_attempts
+
+    def waiting_on(self, job: Job, now: datetime) -> list:
+        """Dependencies not done today that still hold `job` back (neither succeeded nor given up)."""
+        day = now.date()
+        return [dep for dep in job.after if not succeeded_on(dep, day) and not self.exhausted(dep, day)]
+
+    def past_dependency_wait(self, job: Job, now: datetime) -> bool:
+        due = now.replace(hour=job.due_time.hour, minute=job.due_time.minute, second=0, microsecond=0)
+        return now - due >= self.dependency_wait
+
+    def is_due(self, job: Job, now: datetime) -> bool:
+        day = now.date()
+        if now.time() < job.due_time or succeeded_on(job.name, day):
+            return False
+        attempts = attempts_on(job.name, day)
+        if len(attempts) >= self.max_attempts:
+            return False
+        if attempts and now - attempts[-1] < self.retry:
+            return False
+        return not self.waiting_on(job, now) or self.past_dependency_wait(job, now)
+
+    def next_due(self, now: datetime, exclude=()) -> Optional[Job]:
+        for job in self.jobs:
+            if job.name not in exclude and job.name not in self.skip and self.is_due(job, now):
+                return job
+        return None
+
+    def run_job(self, job: Job, stdout=None) -> Optional[bool]:
+        """Run one job under its lock. Returns success, or None if another instance holds it."""
+        now = self.now()
+        with advisory_lock(job.name) as acquired:
+            if not acquired:
+                self.log(f'[Scheduler] {job.name} is locked by another instance, skipping')
+                return None
+            # Another instance may have finished it between our check and the lock.
+            if succeeded_on(job.name, now.date()):
+                return True
+
+            skipped = [dep for dep in job.after if not succeeded_on(dep, now.date())]
+            command = load_command_class(get_commands()[job.name], job.name)
+            command.client = self.client
+            self.log(f'[Scheduler] Running {job.name}' + (f" without {', '.join(skipped)}" if skipped else ''))
+            start = time.monotonic()
+            try:
+                call_command(command, stdout=stdout)
+            except Exception as e:
+                # record_run has marked the run failed: it counts as an attempt
+                self.log(f'[Scheduler] {job.name} failed after {time.monotonic() - start:.1f}s: {e}')
+                return False
+            # The command records its own outcome in the ledger (it may fail without raising).
+            ok = succeeded_on(job.name, now.date())
+            self.log(f"[Scheduler] {job.name} {'done' if ok else 'failed'} in {time.monotonic() - start:.1f}s")
+            return ok
+
+    def tick(self, stdout=None) -> int:
+        """Run every job that is due, in dependency order. Returns the number of jobs started."""
+        started, tried = 0, set()
+        while True:
+            job = self.next_due(self.now(), exclude=tried)
+            if job is None:
+                return started
+            tried.add(job.name)
+            # Locked elsewhere or failed: its dependants stay held back, the other jobs go on.
+            if self.run_job(job, stdout=stdout) is not None:
+                started += 1
+
+    def run_forever(self, tick_seconds: float, stdout=None, sleep=time.sleep):
+        while True:
+            close_old_connections()
+            self.tick(stdout=stdout)
+            sleep(tick_seconds)
@@ -34,6 +34,20 @@ class GameContext:
     goalie_form: float = 0.0  # -0.15 to +0.15
     ai_factor: float = 1.0
 
+@dataclass
+class RecentForm:
+    """Totals over the player's last 5 / last 10 games (nhl.features); toi in seconds."""
+    games_l5: int = 0
+    goals_l5: int = 0
+    assists_l5: int = 0
+    shots_l5: int = 0
+    toi_l5: int = 0
+    games_l10: int = 0
+    goals_l10: int = 0
+    assists_l10: int = 0
+    shots_l10: int = 0
+    toi_l10: int = 0
+
 @dataclass
 class OddsResult:
     goal: float
@@ -96,6 +110,26 @@ def poisson_at_least(k: float, lam: float) -> float:
 # CORE LOGIC
 # ==============================================================================
 
+# Share of the per-game rates taken from recent form, at 10 recent games
+# (scaled down with fewer); the last 5 games count double within it.
+FORM_WEIGHT = 0.30
+
+def blend_recent_form(gpg: float, apg: float, spg: float, form: Optional[RecentForm]):
+    """Season goals / assists / shots per game, pulled towards the player's recent form."""
+    if form is None or form.games_l10 <= 0:
+        return gpg, apg, spg
+    games = 2 * form.games_l5 + form.games_l10
+    weight = FORM_WEIGHT * min(form.games_l10, 10) / 10
+
+    def blend(season, recent_l5, recent_l10):
+        return (1 - weight) * season + weight * (2 * recent_l5 + recent_l10) / games
+
+    return (
+        blend(gpg, form.goals_l5, form.goals_l10),
+        blend(apg, form.assists_l5, form.assists_l10),
+        blend(spg, form.shots_l5, form.shots_l10),
+    )
+
 def estimate_realistic_odds(stats: PlayerSeasonStats, is_home: bool) -> OddsResult:
     """
     Port of `estimateRealisticOdds` from Code.gs.
@@ -158,20 +192,49 @@ def estimate_realistic_odds(stats: PlayerSeasonStats, is_home: bool) -> OddsResu
         shot_odds=round(odds_shot, 2)
     )
 
+def defense_factor(opp_stats: OpponentStats, goalie_form: float = 0.0) -> float:
+    """Goal-rate factor of the opposing defense and goalie (GAA around 3.0, goalie form -0.15 to +0.15)."""
+    opp_gaa = max(0.1, opp_stats.gaa)
+    def_factor = 1.0 + 0.08 * (opp_gaa - 3.0)
+    if goalie_form != 0:
+        def_factor *= (1.0 - goalie_form)
+    return clamp(def_factor, 0.70, 1.40)
+
+def team_form_bonus(team_stats: TeamStats) -> float:
+    return 1.04 if team_stats.l10_pts_pct > 0.65 else 1.00
+
+def power_play_advantage(team_stats: TeamStats, opp_stats: OpponentStats) -> float:
+    if team_stats.pp_pct > 0.22 and opp_stats.pk_pct < 0.78:
+        return 1.08
+    return 1.00
+
+def matchup_factor(team_stats: TeamStats, opp_stats: OpponentStats, goalie_form: float = 0.0) -> float:
+    """
+    The team-vs-opponent part of the goal lambda (defense and goalie, team
+    form, power play): what a skater's rate is multiplied by for this
+    matchup, before venue, fatigue and player factors.
+    """
+    return defense_factor(opp_stats, goalie_form) * team_form_bonus(team_stats) * power_play_advantage(team_stats, opp_stats)
+
 def calculate_hybrid_projection(
     player_stats: PlayerSeasonStats,
     team_stats: TeamStats,
     opp_stats: OpponentStats,
-    context: GameContext
+    context: GameContext,
+    form: Optional[RecentForm] = None,
 ) -> ProjectionResult:
     """
     Full implementation of `analyzeRoster` logic from Code.gs + `brain_quick` from main.py.
+    With `form`, the per-game rates lean towards the last 5 / 10 games.
     """
     gp = max(1, player_stats.games_played)
     gpg = player_stats.goals / gp
     apg = player_stats.assists / gp
     ppg = player_stats.points / gp
     spg = player_stats.shots / gp
+    if form is not None:
+        gpg, apg, spg = blend_recent_form(gpg, apg, spg, form)
+        ppg = gpg + apg
 
     # --- P2 : BASE ODDS ---
     real_odds = estimate_realistic_odds(player_stats, context.is_home)
@@ -179,12 +242,7 @@ def calculate_hybrid_projection(
     # --- P3 : CONTEXT FACTORS ---
     # Defensive & Goalie Adjustments
     opp_gaa = max(0.1, opp_stats.gaa)
-    def_factor = 1.0 + 0.08 * (opp_gaa - 3.0)
-    
-    if context.goalie_form != 0:
-        def_factor *= (1.0 - context.goalie_form)
-        
-    def_factor = clamp(def_factor, 0.70, 1.40)
+    def_factor = defense_factor(opp_stats, context.goalie_form)
     
     # Fatigue & Home/Away
     home_factor = 1.05 if context.is_home else 0.95
@@ -194,10 +252,8 @@ def calculate_hybrid_projection(
         def_factor *= 0.97
         
     # Form & PowerPlay
-    form_bonus = 1.04 if team_stats.l10_pts_pct > 0.65 else 1.00
-    pp_adv = 1.00
-    if team_stats.pp_pct > 0.22 and opp_stats.pk_pct < 0.78:
-        pp_adv = 1.08
+    form_bonus = team_form_bonus(team_stats)
+    pp_adv = power_play_advantage(team_stats, opp_stats)
         
     # --- LAMBDA CALCULATIONS (Standard Model) ---
     lam_goal = gpg * home_factor * def_factor * form_bonus * pp_adv * context.ai_factor
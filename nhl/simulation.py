@@ -0,0 +1,522 @@
+"""
+Monte Carlo engine for same-game and multi-game parlays.
+
+Single legs are priced in `nhl.services` as independent Poisson events, which
+badly misprices combos: two players from the same team scoring are positively
+correlated through the team total, a goal is also a point and a shot, and a
+high-event game lifts both teams at once.
+
+The engine draws, for every simulated game:
+- a shared pace factor per match (Gamma, mean 1.0) that correlates both teams,
+- the goals of each team (Poisson on team lambda * pace), each with its
+  scorer (by goal share, or the rest of the team) and up to 2 assists by
+  assist share, never to the goal's scorer nor twice to the same player.
+  Only the goals that involve a tracked player are drawn: their number is
+  the team total thinned by that probability (Poisson again), and the
+  scorer and assister pair come from precomputed tables. A team no assist
+  or point leg reads is cheaper still: given the pace its scorers are
+  independent Poisson (splitting), drawn per tracked player by inversion,
+- shots on goal = goals + extra Poisson shots scaled by pace (shot legs only
+  need to know whether the line is reached, decided by inversion).
+
+Everything is vectorized over simulations with NumPy and run in fixed-size
+chunks so memory stays bounded whatever `n_sims` is. Each chunk has its own
+seed derived from the run seed, so results are reproducible and identical
+whether the run uses one process or a pool.
+"""
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# ==============================================================================
+# MODEL CONSTANTS
+# ==============================================================================
+
+MARKETS = ('goal', 'assist', 'point', 'shot')
+
+LEAGUE_AVG_TEAM_GOALS = 3.0   # Goals per team per game
+ASSISTS_PER_GOAL = 1.7        # League average (some goals have 0 or 1 assist)
+ASSIST_SLOT_P = ASSISTS_PER_GOAL / 2.0  # Each of a goal's two assist slots is used with this probability
+PACE_SHAPE = 12.0             # Gamma shape of the match pace (lower = stronger correlation)
+MAX_TRACKED_SHARE = 0.95      # Tracked players never own the whole team total
+
+DEFAULT_N_SIMS = 100_000
+DEFAULT_CHUNK_SIZE = 25_000
+DRAW_RESOLUTION = 1 << 16     # Player picks are 16-bit draws into a lookup table
+
+# ==============================================================================
+# DATA STRUCTURES
+# ==============================================================================
+
+@dataclass
+class SimPlayer:
+    player_id: str
+    team: str
+    lam_goal: float
+    lam_assist: float
+    lam_shot: float
+
+@dataclass
+class SimMatch:
+    home: str
+    away: str
+    lam_home: float = LEAGUE_AVG_TEAM_GOALS
+    lam_away: float = LEAGUE_AVG_TEAM_GOALS
+
+@dataclass
+class Slate:
+    matches: List[SimMatch]
+    players: Dict[str, SimPlayer]
+
+@dataclass(frozen=True)
+class Leg:
+    player_id: str
+    market: str
+    line: float = 0.5
+
+    @property
+    def threshold(self) -> int:
+        """Minimum count that wins the leg ("over 2.5 shots" -> 3)."""
+        return int(math.floor(self.line)) + 1
+
+    @property
+    def key(self) -> str:
+        return f"{self.player_id}:{self.market}:{self.line:g}"
+
+@dataclass
+class ParlayEstimate:
+    legs: List[Leg]
+    probability: float
+    stderr: float
+
+    @property
+    def fair_odds(self) -> Optional[float]:
+        return round(1.0 / self.probability, 2) if self.probability > 0 else None
+
+@dataclass
+class SimulationResult:
+    n_sims: int
+    seed: Optional[int]
+    parlays: List[ParlayEstimate]
+    marginals: Dict[str, float] = field(default_factory=dict)
+
+# ==============================================================================
+# SLATE CONSTRUCTION
+# ==============================================================================
+
+def lambda_from_prob(prob_pct: float) -> float:
+    """Invert P(X >= 1) = 1 - exp(-lam) for a percentage probability."""
+    p = min(max(prob_pct or 0.0, 0.0), 99.0) / 100.0
+    return -math.log(1.0 - p)
+
+def slate_from_rows(rows: Iterable[dict]) -> Slate:
+    """
+    Build a slate from data_lake `.values()` rows
+    (player_id, team, opp, is_home, python_prob, python_vol).
+
+    The goal lambda is recovered from `python_prob`, shots from `python_vol`,
+    and assists follow the league assists-per-goal ratio.
+    """
+    players = {}
+    matches = {}
+    team_goal_mass = {}
+
+    for row in rows:
+        team, opp = row['team'], row['opp']
+        if not team or not opp:
+            continue
+
+        home, away = (team, opp) if row.get('is_home') else (opp, team)
+        matches.setdefault((home, away), SimMatch(home=home, away=away))
+
+        # Rows come ordered by ts: a later projection replaces an earlier one.
+        previous = players.get(str(row['player_id']))
+        if previous is not None:
+            team_goal_mass[previous.team] -= previous.lam_goal
+
+        lam_goal = lambda_from_prob(row.get('python_prob'))
+        player = SimPlayer(
+            player_id=str(row['player_id']),
+            team=team,
+            lam_goal=lam_goal,
+            lam_assist=lam_goal * ASSISTS_PER_GOAL,
+            lam_shot=max(row.get('python_vol') or 0.0, lam_goal),
+        )
+        players[player.player_id] = player
+        team_goal_mass[team] = team_goal_mass.get(team, 0.0) + lam_goal
+
+    # A team's expected total can never be below what its tracked players score.
+    for match in matches.values():
+        match.lam_home = max(match.lam_home, team_goal_mass.get(match.home, 0.0) / MAX_TRACKED_SHARE)
+        match.lam_away = max(match.lam_away, team_goal_mass.get(match.away, 0.0) / MAX_TRACKED_SHARE)
+
+    return Slate(matches=list(matches.values()), players=players)
+
+def parse_leg(spec) -> Leg:
+    """Accept a dict {'player_id', 'market', 'line'} or a 'player_id:market[:line]' string."""
+    if isinstance(spec, str):
+        parts = spec.split(':')
+        if len(parts) not in (2, 3):
+            raise ValueError(f"Invalid leg '{spec}' (expected player_id:market[:line])")
+        spec = {'player_id': parts[0], 'market': parts[1], 'line': parts[2] if len(parts) == 3 else 0.5}
+
+    market = str(spec.get('market', '')).lower()
+    if market not in MARKETS:
+        raise ValueError(f"Unknown market '{market}' (expected one of {', '.join(MARKETS)})")
+    try:
+        line = float(spec.get('line', 0.5))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid line '{spec.get('line')}'")
+    if line < 0:
+        raise ValueError("Line must be positive")
+
+    return Leg(player_id=str(spec.get('player_id')), market=market, line=line)
+
+# ==============================================================================
+# COMPILED PLAN
+# ==============================================================================
+
+@dataclass
+class _TeamPlan:
+    match_idx: int
+    lam_team: float
+    goal_lams: np.ndarray      # Per tracked player, goal lambda at pace 1.0 (his share of lam_team)
+    extra_shots: np.ndarray    # Per tracked player, shot lambda beyond his goals
+    goal_cap: int = 1          # Goals are only counted up to the highest threshold a leg needs
+    needs_assists: bool = False
+    # Assist legs only (see _involvement_tables)
+    involved: float = 0.0                        # Share of the team goals involving a tracked player
+    scorer_table: Optional[np.ndarray] = None    # Scorer of such a goal, per draw
+    pair_table: Optional[np.ndarray] = None      # (scorer, draw) -> assister pair code
+
+    @property
+    def n_players(self) -> int:
+        return self.extra_shots.shape[0]
+
+@dataclass
+class _Plan:
+    n_matches: int
+    teams: List[_TeamPlan]
+    # (team index, player index in team, market index, threshold) per unique leg
+    legs: List[Tuple[int, int, int, int]]
+    parlays: List[List[int]]   # Indices into `legs`
+
+def _scaled_shares(shares: Sequence[float]) -> np.ndarray:
+    """Shares of the tracked players, scaled so the "rest of team" bucket keeps a minimum."""
+    shares = np.asarray(shares, dtype=float)
+    total = shares.sum()
+    if total > MAX_TRACKED_SHARE:
+        shares = shares * (MAX_TRACKED_SHARE / total)
+    return shares
+
+def _draw_table(probs: np.ndarray) -> np.ndarray:
+    """
+    Outcome picked by each of the DRAW_RESOLUTION integer draws, for
+    outcome probabilities summing to 1. They are rounded to
+    1 / DRAW_RESOLUTION, far below the Monte Carlo error.
+    """
+    bounds = np.round(np.cumsum(probs[:-1]) * DRAW_RESOLUTION).astype(np.int64).clip(0, DRAW_RESOLUTION)
+    widths = np.diff(bounds, prepend=0, append=DRAW_RESOLUTION).clip(0)
+    return np.repeat(np.arange(len(probs), dtype=np.int8 if len(probs) <= 127 else np.int16), widths)
+
+def _involvement_tables(goal_shares: np.ndarray, assist_shares: np.ndarray) -> Tuple[float, np.ndarray, np.ndarray]:
+    """
+    Joint law of (scorer, first assister, second assister) of a team goal,
+    restricted to the goals that involve a tracked player. Index k (the
+    number of tracked players) is the rest of the team, or an unused assist
+    slot. Each slot is used with probability ASSIST_SLOT_P and goes by
+    assist share to anyone but the goal's scorer and the other assister.
+
+    Returns (share of the goals involving a tracked player, scorer table,
+    pair tables): pair_table[scorer] maps a draw to a1 * (k + 1) + a2.
+    """
+    k = len(goal_shares)
+    rest = k
+
+    def slot(excluded):
+        probs = np.zeros(k + 1)
+        free = 1.0 - sum(assist_shares[i] for i in excluded)
+        if free > 0:
+            probs[:k] = ASSIST_SLOT_P * assist_shares / free
+            probs[list(excluded)] = 0.0
+        probs[rest] = max(1.0 - probs[:k].sum(), 0.0)
+        return probs
+
+    pairs = np.zeros((k + 1, k + 1, k + 1))
+    for scorer in range(k + 1):
+        excluded = {scorer} - {rest}
+        for first, p_first in enumerate(slot(excluded)):
+            if p_first > 0:
+                pairs[scorer, first] = p_first * slot(excluded | ({first} - {rest}))
+
+    scorer_probs = np.append(goal_shares, max(1.0 - goal_shares.sum(), 0.0))
+    # A goal by the rest of the team, unassisted by tracked players, changes no leg
+    quiet = scorer_probs[rest] * pairs[rest, rest, rest]
+    pairs[rest, rest, rest] = 0.0
+    if pairs[rest].sum() > 0:
+        pairs[rest] /= pairs[rest].sum()
+    else:
+        pairs[rest, rest, rest] = 1.0  # unreachable: the rest of the team is never drawn then
+    scorer_probs[rest] -= quiet
+    involved = 1.0 - quiet
+    if involved > 0:
+        scorer_probs /= involved
+
+    pair_table = np.stack([_draw_table(pairs[scorer].ravel()) for scorer in range(k + 1)])
+    return involved, _draw_table(scorer_probs), pair_table
+
+def _compile(slate: Slate, parlays: Sequence[Sequence[Leg]]) -> _Plan:
+    """
+    Reduce the slate to the matches and players the legs actually reference.
+    Untracked teammates are folded into the implicit "rest of team" bucket,
+    which leaves the joint distribution of the tracked players unchanged.
+    """
+    match_index = {}
+    team_index = {}
+    team_players: Dict[str, List[str]] = {}
+    team_lams: Dict[str, Tuple[SimMatch, float]] = {}
+
+    for m in slate.matches:
+        team_lams[m.home] = (m, m.lam_home)
+        team_lams[m.away] = (m, m.lam_away)
+
+    leg_index = {}
+    leg_refs = []
+    parlay_refs = []
+
+    for parlay in parlays:
+        if not parlay:
+            raise ValueError("A parlay needs at least one leg")
+        refs = []
+        for leg in parlay:
+            player = slate.players.get(leg.player_id)
+            if player is None:
+                raise ValueError(f"Player {leg.player_id} is not on the slate")
+            if player.team not in team_lams:
+                raise ValueError(f"No match found for team {player.team}")
+
+            if leg.key not in leg_index:
+                match, _ = team_lams[player.team]
+                match_key = (match.home, match.away)
+                if match_key not in match_index:
+                    match_index[match_key] = len(match_index)
+                if player.team not in team_index:
+                    team_index[player.team] = len(team_index)
+                    team_players[player.team] = []
+                if player.player_id not in team_players[player.team]:
+                    team_players[player.team].append(player.player_id)
+
+                leg_index[leg.key] = len(leg_refs)
+                leg_refs.append(leg)
+            refs.append(leg_index[leg.key])
+        parlay_refs.append(refs)
+
+    teams = []
+    for team, _ in sorted(team_index.items(), key=lambda kv: kv[1]):
+        match, lam_team = team_lams[team]
+        tracked = [slate.players[pid] for pid in team_players[team]]
+        lam_team = max(lam_team, 1e-9)
+        goal_shares = _scaled_shares([p.lam_goal / lam_team for p in tracked])
+        teams.append(_TeamPlan(
+            match_idx=match_index[(match.home, match.away)],
+            lam_team=lam_team,
+            goal_lams=goal_shares * lam_team,
+            extra_shots=np.array([max(p.lam_shot - p.lam_goal, 0.0) for p in tracked]),
+        ))
+
+    legs = []
+    for leg in leg_refs:
+        player = slate.players[leg.player_id]
+        t = team_index[player.team]
+        legs.append((t, team_players[player.team].index(leg.player_id),
+                     MARKETS.index(leg.market), leg.threshold))
+        # Only draw the stats some leg actually reads.
+        teams[t].needs_assists |= leg.market in ('assist', 'point')
+        teams[t].goal_cap = max(teams[t].goal_cap, leg.threshold)
+
+    for team, plan in zip(sorted(team_index, key=team_index.get), teams):
+        if plan.needs_assists:
+            tracked = [slate.players[pid] for pid in team_players[team]]
+            assist_shares = _scaled_shares([p.lam_assist / (plan.lam_team * ASSISTS_PER_GOAL) for p in tracked])
+            plan.involved, plan.scorer_table, plan.pair_table = _involvement_tables(
+                plan.goal_lams / plan.lam_team, assist_shares)
+
+    return _Plan(n_matches=len(match_index), teams=teams, legs=legs, parlays=parlay_refs)
+
+# ==============================================================================
+# SIMULATION CORE
+# ==============================================================================
+
+def _draw(rng: np.random.Generator, table: np.ndarray, size: int) -> np.ndarray:
+    """`size` picks from a `_draw_table`: one 16-bit draw and one lookup each."""
+    return table.take(rng.integers(0, DRAW_RESOLUTION, size=size, dtype=np.uint16))
+
+
+def _allocate(rng: np.random.Generator, totals: np.ndarray, team: _TeamPlan) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split the goals involving a tracked player (`totals` per simulation)
+    into scorers and assisters, one scorer draw and one pair draw per goal:
+    the cost scales with the number of goals, not of players. Returns
+    (goals, assists), each (players, n).
+    """
+    n, k = totals.shape[0], team.n_players
+    sim_idx = np.repeat(np.arange(n), totals)
+    n_goals = sim_idx.shape[0]
+    scorer = _draw(rng, team.scorer_table, n_goals)
+    pair_draw = scorer.astype(np.intp) * DRAW_RESOLUTION
+    pair_draw += rng.integers(0, DRAW_RESOLUTION, size=n_goals, dtype=np.uint16)
+    first, second = np.divmod(team.pair_table.take(pair_draw), k + 1)
+    assists = _count(np.concatenate((first, second)), np.tile(sim_idx, 2), k, n)
+    return _count(scorer, sim_idx, k, n), assists
+
+
+def _count(who: np.ndarray, sim_idx: np.ndarray, k: int, n: int) -> np.ndarray:
+    """Events per tracked player and simulation, (k, n); the rest of team gets a row too, dropped."""
+    return np.bincount(who.astype(np.intp) * n + sim_idx, minlength=(k + 1) * n).reshape(k + 1, n)[:k]
+
+
+def _poisson_counts(u: np.ndarray, lam: np.ndarray, cap: int) -> np.ndarray:
+    """min(Poisson(lam), cap) drawn by inversion from `u`: one CDF step per unit of `cap`."""
+    counts = np.zeros(u.shape, dtype=np.int64)
+    term = np.exp(-lam)
+    cdf = term
+    for k in range(cap):
+        if k:
+            term = term * lam / k
+            cdf = cdf + term
+        counts += u >= cdf
+    return counts
+
+
+def _poisson_reaches(u: np.ndarray, lam: np.ndarray, needed: np.ndarray) -> np.ndarray:
+    """
+    Whether Poisson(lam) drawn by inversion from `u` is >= `needed`
+    (elementwise): u >= P(X <= needed - 1). Only the CDF up to the largest
+    `needed` is computed, so a shot line costs a few vector operations
+    instead of a full Poisson draw.
+    """
+    reached = needed <= 0
+    term = np.exp(-lam)
+    cdf = term.copy()
+    for k in range(int(needed.max(initial=0))):
+        if k:
+            term = term * lam / k
+            cdf = cdf + term
+        at = needed - 1 == k
+        reached = np.where(at, u >= cdf, reached)
+    return reached
+
+def _simulate_chunk(plan: _Plan, n: int, seed_seq: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (hits per leg, hits per parlay) for `n` simulated slates."""
+    rng = np.random.default_rng(seed_seq)
+    pace = rng.gamma(PACE_SHAPE, 1.0 / PACE_SHAPE, size=(plan.n_matches, n))
+
+    # stats[team] -> (goals, assists), each (players, n); assists is None when no leg reads them
+    stats = []
+    for team in plan.teams:
+        if team.needs_assists:
+            involved = rng.poisson(team.lam_team * team.involved * pace[team.match_idx])
+            stats.append(_allocate(rng, involved, team))
+        else:
+            lam = team.goal_lams[:, None] * pace[team.match_idx]
+            stats.append((_poisson_counts(rng.random(lam.shape), lam, team.goal_cap), None))
+
+    leg_hits = np.empty((len(plan.legs), n), dtype=bool)
+    goal_market, assist_market, point_market, _ = range(len(MARKETS))
+    shot_u = {}  # (team, player) -> uniforms of his extra shots, shared by all his shot lines
+    for i, (t, p, m, threshold) in enumerate(plan.legs):
+        goals, assists = stats[t]
+        if m == goal_market:
+            leg_hits[i] = goals[p] >= threshold
+        elif m == assist_market:
+            leg_hits[i] = assists[p] >= threshold
+        elif m == point_market:
+            leg_hits[i] = goals[p] + assists[p] >= threshold
+        else:
+            # shots = goals + extra shots ~ Poisson(extra lambda * pace)
+            team = plan.teams[t]
+            if (t, p) not in shot_u:
+                shot_u[(t, p)] = rng.random(n)
+            leg_hits[i] = _poisson_reaches(shot_u[(t, p)], team.extra_shots[p] * pace[team.match_idx],
+                                           threshold - goals[p])
+
+    parlay_counts = np.array(
+        [np.logical_and.reduce(leg_hits[refs], axis=0).sum() for refs in plan.parlays],
+        dtype=np.int64,
+    )
+    return leg_hits.sum(axis=1), parlay_counts
+
+def _run_chunks(plan: _Plan, jobs: List[Tuple[int, np.random.SeedSequence]]) -> Tuple[np.ndarray, np.ndarray]:
+    leg_counts = np.zeros(len(plan.legs), dtype=np.int64)
+    parlay_counts = np.zeros(len(plan.parlays), dtype=np.int64)
+    for n, seed_seq in jobs:
+        legs, parlays = _simulate_chunk(plan, n, seed_seq)
+        leg_counts += legs
+        parlay_counts += parlays
+    return leg_counts, parlay_counts
+
+def simulate_parlays(
+    slate: Slate,
+    parlays: Sequence[Sequence[Leg]],
+    n_sims: int = DEFAULT_N_SIMS,
+    seed: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    n_jobs: int = 1,
+) -> SimulationResult:
+    """
+    Estimate the joint hit probability of each parlay (and every leg's marginal)
+    over `n_sims` correlated simulations of the slate.
+
+    With `n_jobs > 1` chunks are spread over a process pool; the result is
+    identical to a single-process run with the same seed.
+    """
+    if n_sims <= 0:
+        raise ValueError("n_sims must be positive")
+
+    plan = _compile(slate, parlays)
+    chunk_size = max(1, min(chunk_size, n_sims))
+    sizes = [chunk_size] * (n_sims // chunk_size)
+    if n_sims % chunk_size:
+        sizes.append(n_sims % chunk_size)
+    chunks = list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
+
+    if n_jobs > 1 and len(chunks) > 1:
+        n_jobs = min(n_jobs, len(chunks))
+        batches = [chunks[i::n_jobs] for i in range(n_jobs)]
+        leg_counts = np.zeros(len(plan.legs), dtype=np.int64)
+        parlay_counts = np.zeros(len(plan.parlays), dtype=np.int64)
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            for legs, parlays_hit in pool.map(_run_chunks, [plan] * n_jobs, batches):
+                leg_counts += legs
+                parlay_counts += parlays_hit
+    else:
+        leg_counts, parlay_counts = _run_chunks(plan, chunks)
+
+    leg_list = _unique_legs(parlays)
+    estimates = []
+    for parlay, hits in zip(parlays, parlay_counts):
+        p = hits / n_sims
+        estimates.append(ParlayEstimate(
+            legs=list(parlay),
+            probability=round(float(p), 5),
+            stderr=round(math.sqrt(p * (1.0 - p) / n_sims), 5),
+        ))
+
+    return SimulationResult(
+        n_sims=n_sims,
+        seed=seed,
+        parlays=estimates,
+        marginals={leg.key: round(float(c) / n_sims, 5) for leg, c in zip(leg_list, leg_counts)},
+    )
+
+def _unique_legs(parlays: Sequence[Sequence[Leg]]) -> List[Leg]:
+    """Legs in first-seen order, matching the order `_compile` assigns."""
+    seen = {}
+    for parlay in parlays:
+        for leg in parlay:
+            seen.setdefault(leg.key, leg)
+    return list(seen.values())
@@ -0,0 +1,170 @@
+"""
+Synthetic data_lake rows for local benchmarking (see `manage.py seed_lake`).
+
+Shapes the data like production rather than uniformly at random:
+- 32 teams, 82 games each over a ~190-day season, with the real weekly
+  rhythm (heavy Tuesday / Thursday / Saturday slates, light Mondays and
+  Wednesdays) and an all-star break;
+- 18 dressed skaters per team and game, out of a 23-man roster;
+- skewed scoring: per-player goal rates are log-normal (a few stars near
+  0.6 goals/game, a long tail of depth players under 0.1), so goal
+  probabilities, value scores and HIT rates have production-like tails;
+- finished games carry HIT / MISS and shot counts, upcoming ones carry odds.
+
+Generation is deterministic for a given seed.
+"""
+
+import math
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+from .constants import NHL_TEAMS_FULL_NAMES
+
+# ==============================================================================
+# CONSTANTS
+# ==============================================================================
+
+# The 32 current franchises (Arizona relocated to Utah)
+TEAMS = tuple(sorted(team for team in NHL_TEAMS_FULL_NAMES if team != 'ARI'))
+
+SEASON_DAYS = 190
+GAMES_PER_TEAM = 82
+ROSTER_SIZE = 23
+DRESSED = 18
+# Relative slate size by weekday (Mon..Sun)
+WEEKDAY_WEIGHTS = (0.55, 1.35, 0.7, 1.3, 0.85, 1.6, 0.95)
+ALL_STAR_BREAK = (118, 124)  # season day range without games
+START_TIMES_UTC = (time(23, 0), time(23, 30), time(0, 0), time(1, 0), time(2, 0))
+
+FIRST_NAMES = ('Alex', 'Connor', 'Nathan', 'Mathieu', 'Jack', 'Elias', 'Mikko', 'Kirill', 'Auston', 'Leon',
+               'Cale', 'Quinn', 'Jason', 'Brady', 'Sidney', 'Nikita', 'Tage', 'William', 'Samuel', 'Jonathan')
+LAST_NAMES = ('Tremblay', 'Gagnon', 'Roy', 'Pettersson', 'Karlsson', 'Makar', 'Hughes', 'Tkachuk', 'Point',
+              'Larkin', 'Suzuki', 'Caufield', 'Draisaitl', 'Kucherov', 'Barkov', 'Rantanen', 'Nylander',
+              'Marner', 'Eichel', 'Stone', 'Zibanejad', 'Kaprizov', 'Boldy', 'Thompson', 'Dahlin')
+
+# ==============================================================================
+# GENERATION
+# ==============================================================================
+
+@dataclass
+class SyntheticPlayer:
+    player_id: str
+    name: str
+    team: str
+    goal_rate: float   # goals per game
+    shot_rate: float   # shots per game
+
+
+def make_rosters(rng, season_index=0) -> Dict[str, List[SyntheticPlayer]]:
+    rosters = {}
+    for t, team in enumerate(TEAMS):
+        goal_rates = np.clip(rng.lognormal(mean=math.log(0.17), sigma=0.65, size=ROSTER_SIZE), 0.01, 0.75)
+        shooting_pct = np.clip(rng.normal(0.10, 0.025, size=ROSTER_SIZE), 0.04, 0.20)
+        rosters[team] = [
+            SyntheticPlayer(
+                player_id=str(8_400_000 + season_index * 10_000 + t * 100 + i),
+                name=f'{FIRST_NAMES[rng.integers(len(FIRST_NAMES))]} {LAST_NAMES[rng.integers(len(LAST_NAMES))]}',
+                team=team,
+                goal_rate=float(goal_rates[i]),
+                shot_rate=float(goal_rates[i] / shooting_pct[i]),
+            )
+            for i in range(ROSTER_SIZE)
+        ]
+    return rosters
+
+
+def make_schedule(rng, start: date, days: int = SEASON_DAYS):
+    """List of (day, home, away); every team plays ~GAMES_PER_TEAM games over `days` days."""
+    playing = [d for d in range(days) if not ALL_STAR_BREAK[0] <= d < ALL_STAR_BREAK[1]]
+    season_playing_days = SEASON_DAYS - (ALL_STAR_BREAK[1] - ALL_STAR_BREAK[0])
+    n_games = round(len(TEAMS) * GAMES_PER_TEAM / 2 * len(playing) / season_playing_days)
+    weights = np.array([WEEKDAY_WEIGHTS[(start + timedelta(days=d)).weekday()] for d in playing])
+    per_day = rng.multinomial(n_games, weights / weights.sum())
+
+    played = {team: 0 for team in TEAMS}
+    games = []
+    for d, count in zip(playing, per_day):
+        count = min(int(count), len(TEAMS) // 2)
+        # Teams with the fewest games so far play first (keeps the 82-game balance)
+        order = sorted(TEAMS, key=lambda team: (played[team], rng.random()))[:2 * count]
+        rng.shuffle(order)
+        for home, away in zip(order[::2], order[1::2]):
+            games.append((start + timedelta(days=d), home, away))
+            played[home] += 1
+            played[away] += 1
+    return games
+
+
+def generate_rows(end: date, seasons: int = 1, days: int = SEASON_DAYS, seed: int = 42, today: date = None) -> Iterator[dict]:
+    """
+    data_lake rows for `seasons` seasons of `days` days, the last one ending
+    on `end`. Games up to yesterday are settled; today's and later carry odds.
+    """
+    rng = np.random.default_rng(seed)
+    today = today or date.today()
+    for k in reversed(range(seasons)):
+        season_end = end - timedelta(days=365 * k)
+        rosters = make_rosters(rng, season_index=k)
+        for day, home, away in make_schedule(rng, season_end - timedelta(days=days - 1), days):
+            yield from _game_rows(rng, rosters, day, home, away, settled=day < today)
+
+
+def slate_rows(day: date, seed: int = 42) -> Iterator[dict]:
+    """Upcoming data_lake rows for a full 16-game night on `day` (every team plays)."""
+    rng = np.random.default_rng(seed)
+    rosters = make_rosters(rng)
+    teams = list(TEAMS)
+    rng.shuffle(teams)
+    for home, away in zip(teams[::2], teams[1::2]):
+        yield from _game_rows(rng, rosters, day, home, away, settled=False)
+
+
+def _game_rows(rng, rosters, day, home, away, settled):
+    ts = datetime.combine(day, START_TIMES_UTC[rng.integers(len(START_TIMES_UTC))], tzinfo=dt_timezone.utc)
+    if ts.time() < time(12, 0):  # early-UTC start = evening of `day` in North America
+        ts += timedelta(days=1)
+    pace = rng.gamma(12.0, 1 / 12.0)
+    for team, opp, is_home in ((home, away, 1), (away, home, 0)):
+        yield from _team_rows(rng, rosters[team], opp, is_home, day, ts, pace, settled)
+
+
+def _team_rows(rng, roster, opp, is_home, day, ts, pace, settled):
+    dressed = rng.choice(len(roster), size=DRESSED, replace=False)
+    home_factor = 1.05 if is_home else 0.95
+    for i in dressed:
+        player = roster[i]
+        lam_goal = player.goal_rate * home_factor * pace
+        lam_shot = player.shot_rate * home_factor * pace
+        prob = 1 - math.exp(-lam_goal)
+        # Bookmaker odds: fair odds with a ~7% margin and pricing noise
+        goal_odds = max(1.05, (1 / max(prob, 0.01)) * 0.93 * float(rng.lognormal(0, 0.2)))
+        shot_odds = round(float(rng.uniform(1.6, 2.4)), 2)
+        shot_prob = 1 - math.exp(-lam_shot) * (1 + lam_shot + lam_shot ** 2 / 2)  # 3+ shots
+
+        if settled:
+            goals = rng.poisson(lam_goal)
+            result_goal = 'HIT' if goals else 'MISS'
+            if rng.random() < 0.003:
+                result_goal = 'INJURED'
+            result_shot = str(int(goals + rng.poisson(max(lam_shot - goals, 0.0))))
+        else:
+            result_goal, result_shot = f'{goal_odds:.2f}', f'{shot_odds:.2f}'
+
+        yield {
+            'player_id': player.player_id,
+            'name': player.name,
+            'team': player.team,
+            'opp': opp,
+            'date': day.isoformat(),
+            'ts': ts,
+            'is_home': is_home,
+            'algo_score_goal': int(round(prob * 100 * goal_odds)),
+            'algo_score_shot': int(round(shot_prob * 100 * shot_odds)),
+            'python_prob': round(prob * 100, 1),
+            'python_vol': round(lam_shot, 1),
+            'result_goal': result_goal,
+            'result_shot': result_shot,
+        }
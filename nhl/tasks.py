@@ -0,0 +1,284 @@
+"""
+Lightweight DB-backed task queue (no external broker).
+
+    from nhl.tasks import enqueue
+    enqueue('rerun_projections', date='2026-01-07', priority=Task.PRIORITY_HIGH)
+
+Workers (`manage.py run_tasks`) claim the highest-priority queued task with
+a conditional UPDATE (status queued -> running), which is race-free on any
+backend, so any number of worker processes can share the table. Tasks
+report progress through `ctx.progress()`; a background thread also beats
+every TASK_HEARTBEAT_SECONDS while the task runs, so a long command without
+progress reports is not mistaken for a dead worker. A running task without
+a heartbeat for TASK_STALE_SECONDS is requeued, which counts as an attempt.
+Failures are retried with exponential backoff.
+
+Commands run by tasks take the scheduler's advisory lock for their name
+(nhl.scheduler.advisory_lock): a task never runs fetch_nhl_data while the
+scheduler does. A busy lock puts the task back without using an attempt.
+"""
+
+import io
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+from .scheduler import advisory_lock
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+LOCK_BUSY_DELAY = 60  # seconds before a task blocked by a busy lock is retried
+PROGRESS_WRITE_INTERVAL = 1.0  # seconds between progress writes
+OUTPUT_TAIL_LINES = 40
+
+# ==============================================================================
+# REGISTRY & ENQUEUE
+# ==============================================================================
+
+def task(name, label=None):
+    """Register a task function `fn(ctx, **kwargs)` under `name`."""
+    def decorator(fn):
+        fn.task_label = label or name
+        REGISTRY[name] = fn
+        return fn
+    return decorator
+
+
+def enqueue(name, priority=Task.PRIORITY_NORMAL, max_attempts=None, created_by='', **kwargs):
+    if name not in REGISTRY:
+        raise ValueError(f"Unknown task '{name}' (expected one of {', '.join(sorted(REGISTRY))})")
+    return Task.objects.create(
+        name=name,
+        kwargs=kwargs,
+        priority=priority,
+        max_attempts=max_attempts or settings.TASK_MAX_ATTEMPTS,
+        created_by=created_by,
+    )
+
+
+class TaskContext:
+    def __init__(self, task_obj):
+        self.task = task_obj
+        self._last_write = 0.0
+
+    def progress(self, done, total=None, message=''):
+        """Report progress (`done / total`, or a fraction if total is None); throttled."""
+        fraction = done / total if total else float(done)
+        now = time.monotonic()
+        if now - self._last_write < PROGRESS_WRITE_INTERVAL and fraction < 1:
+            return
+        self._last_write = now
+        Task.objects.filter(pk=self.task.pk).update(
+            progress=min(max(fraction, 0.0), 1.0),
+            progress_message=message[:255],
+            heartbeat_at=timezone.now(),
+        )
+
+    def call_command(self, name, *args, **options):
+        """Run a management command under its advisory lock, returning the tail of its output."""
+        out = io.StringIO()
+        with advisory_lock(name) as acquired:
+            if not acquired:
+                raise LockBusy(f'{name} is already running (scheduler or another worker)')
+            call_command(name, *args, stdout=out, **options)
+        return out.getvalue().splitlines()[-OUTPUT_TAIL_LINES:]
+
+
+class LockBusy(Exception):
+    """The command's advisory lock is held elsewhere: retry later, without using an attempt."""
+
+# ==============================================================================
+# WORKER
+# ==============================================================================
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+@contextmanager
+def heartbeat(task_obj, interval=None):
+    """Beat `task_obj` from a background thread (its own DB connection) for the duration of the block."""
+    interval = settings.TASK_HEARTBEAT_SECONDS if interval is None else interval
+    stopped = threading.Event()
+
+    def beat():
+        try:
+            while not stopped.wait(interval):
+                Task.objects.filter(pk=task_obj.pk, status=Task.STATUS_RUNNING).update(heartbeat_at=timezone.now())
+        except Exception:
+            logger.exception('Heartbeat of task %s stopped', task_obj.pk)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'task-{task_obj.pk}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def requeue_stale():
+    """
+    Put back tasks whose worker died mid-run (no heartbeat for
+    TASK_STALE_SECONDS). The lost run counts as an attempt: a task that keeps
+    killing its worker fails after max_attempts.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.TASK_STALE_SECONDS)
+    stale = Task.objects.filter(status=Task.STATUS_RUNNING, heartbeat_at__lt=cutoff)
+    requeued = stale.filter(attempts__lt=F('max_attempts') - 1).update(
+        status=Task.STATUS_QUEUED, worker='', attempts=F('attempts') + 1, progress_message='Requeued (worker lost)'
+    )
+    failed = stale.update(
+        status=Task.STATUS_FAILED, attempts=F('attempts') + 1, error='Worker lost (no heartbeat)',
+        finished_at=timezone.now(),
+    )
+    return requeued + failed
+
+
+def claim_next(worker):
+    """Atomically claim the next runnable task, or return None."""
+    now = timezone.now()
+    candidates = Task.objects.filter(status=Task.STATUS_QUEUED).filter(
+        Q(run_after__isnull=True) | Q(run_after__lte=now)
+    ).order_by('-priority', 'created_at').values_list('pk', flat=True)[:10]
+
+    for pk in candidates:
+        claimed = Task.objects.filter(pk=pk, status=Task.STATUS_QUEUED).update(
+            status=Task.STATUS_RUNNING, worker=worker, started_at=now, heartbeat_at=now,
+            progress=0.0, progress_message='', error='',
+        )
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def run_task(task_obj):
+    """
+    Execute a claimed task and record its outcome (retry, done or failed).
+    Returns whether it succeeded, or None if it was postponed (busy lock).
+    """
+    fn = REGISTRY.get(task_obj.name)
+    attempts = task_obj.attempts + 1
+    try:
+        if fn is None:
+            raise LookupError(f"Unknown task '{task_obj.name}'")
+        with heartbeat(task_obj):
+            result = fn(TaskContext(task_obj), **task_obj.kwargs)
+    except LockBusy as e:
+        Task.objects.filter(pk=task_obj.pk).update(
+            status=Task.STATUS_QUEUED, worker='', progress_message=str(e)[:255],
+            run_after=timezone.now() + timedelta(seconds=LOCK_BUSY_DELAY),
+        )
+        logger.info("Task %s postponed: %s", task_obj, e)
+        return None
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}\n\n{traceback.format_exc()}'
+        # A command refusing its arguments (CommandError) would refuse them again
+        if attempts < task_obj.max_attempts and fn is not None and not isinstance(e, CommandError):
+            delay = settings.TASK_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+            Task.objects.filter(pk=task_obj.pk).update(
+                status=Task.STATUS_QUEUED, attempts=attempts, error=error, worker='',
+                run_after=timezone.now() + timedelta(seconds=delay),
+                progress_message=f'Retry {attempts}/{task_obj.max_attempts - 1} in {delay}s',
+            )
+        else:
+            Task.objects.filter(pk=task_obj.pk).update(
+                status=Task.STATUS_FAILED, attempts=attempts, error=error, finished_at=timezone.now(),
+            )
+        logger.warning("Task %s failed (attempt %s): %s", task_obj, attempts, e)
+        return False
+
+    Task.objects.filter(pk=task_obj.pk).update(
+        status=Task.STATUS_DONE, attempts=attempts, result=result, progress=1.0, finished_at=timezone.now(),
+    )
+    return True
+
+
+def work(poll_seconds=None, once=False, log=None):
+    """Worker loop: claim and run tasks; with `once`, exit when the queue is empty."""
+    from django.db import close_old_connections
+
+    poll_seconds = settings.TASK_POLL_SECONDS if poll_seconds is None else poll_seconds
+    log = log or (lambda message: None)
+    me = worker_id()
+    while True:
+        close_old_connections()
+        requeue_stale()
+        task_obj = claim_next(me)
+        if task_obj is None:
+            if once:
+                return
+            time.sleep(poll_seconds)
+            continue
+        log(f'[{me}] {task_obj.name} #{task_obj.pk} started')
+        start = time.monotonic()
+        ok = run_task(task_obj)
+        outcome = {True: 'done', False: 'failed', None: 'postponed'}[ok]
+        log(f'[{me}] {task_obj.name} #{task_obj.pk} {outcome} in {time.monotonic() - start:.1f}s')
+
+# ==============================================================================
+# TASKS
+# ==============================================================================
+
+def _date_range(start, end):
+    day, last = date.fromisoformat(start), date.fromisoformat(end)
+    if last < day:
+        raise ValueError('end must be on or after start')
+    while day <= last:
+        yield day.isoformat()
+        day += timedelta(days=1)
+
+
+@task('rerun_projections', 'Recalculer les projections')
+def rerun_projections(ctx, date=None):
+    ctx.progress(0, message=f'fetch_nhl_data {date or "today"}')
+    options = {'date': date} if date else {}
+    return {'output': ctx.call_command('fetch_nhl_data', **options)}
+
+
+@task('fetch_results', 'Récupérer les résultats')
+def fetch_results(ctx, date):
+    ctx.progress(0, message=f'fetch_game_results {date}')
+    return {'output': ctx.call_command('fetch_game_results', date=date)}
+
+
+@task('backfill_results', 'Backfill des résultats')
+def backfill_results(ctx, start, end, priority=Task.PRIORITY_LOW):
+    """Fan out one fetch_results task per date, so a worker pool runs them in parallel."""
+    days = list(_date_range(start, end))
+    ids = []
+    for i, day in enumerate(days, 1):
+        ids.append(enqueue('fetch_results', priority=priority, created_by=ctx.task.created_by, date=day).pk)
+        ctx.progress(i, len(days), f'{i}/{len(days)} dates queued')
+    return {'tasks': ids}
+
+
+@task('injury_check', 'Vérifier les blessures')
+def injury_check(ctx):
+    return {'output': ctx.call_command('injury_guardian')}
+
+
+@task('rebuild_lake', 'Reconstruire le lake')
+def rebuild_lake(ctx, full=False):
+    ctx.progress(0, message='export_lake')
+    return {'output': ctx.call_command('export_lake', full=full)}
+
+
+@task('process_stripe_events', 'Appliquer les événements Stripe')
+def process_stripe_events(ctx):
+    return {'output': ctx.call_command('process_stripe_events')}
@@ -0,0 +1,161 @@
+"""
+Daily team-context snapshot (models.TeamContextSnapshot).
+
+Built once per game date from the standings (GAA, special teams, last-10
+form) and each team's club stats (`club-stats/{team}/now`: shots against
+and save percentage from its goalies), with the 32x32 matrix of
+`services.matchup_factor` for every (team, opponent) pair. Later runs of
+the same date, replays and on-demand projections read the snapshot:
+
+    snapshot = get_snapshot(date, client)   # built on the first call of the date
+    snapshot.team('EDM')['shots_allowed']
+    snapshot.matchup_factor('EDM', 'VAN')
+
+goalie_form is the probable starter's (most starts) save percentage against
+the league's, scaled into the -0.15..+0.15 range of GameContext.goalie_form:
+a hot opposing goalie lowers the skaters' goal rate. Once the starter is
+confirmed (nhl.lineups), his own form replaces the probable starter's.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from django.db import IntegrityError
+
+from .models import TeamContextSnapshot
+from .services import OpponentStats, TeamStats, clamp, matchup_factor
+
+GOALIE_FORM_SCALE = 5.0   # .010 of save percentage over the league -> +0.05
+GOALIE_FORM_LIMIT = 0.15
+DEFAULT_SHOTS_ALLOWED = 30.0
+
+# ==============================================================================
+# BUILD
+# ==============================================================================
+
+def standings_context(standings: dict) -> Dict[str, dict]:
+    context = {}
+    for team in (standings or {}).get('standings', []):
+        abbrev = team['teamAbbrev']['default']
+        gp = max(1, team.get('gamesPlayed', 1))
+        context[abbrev] = {
+            'games_played': gp,
+            'gaa': team.get('goalAgainst', 0) / gp,
+            'pp_pct': team.get('powerPlayPctg', 0.20),
+            'pk_pct': team.get('penaltyKillPctg', 0.80),
+            'l10_pts_pct': team.get('l10PtsPctg', 0.50),
+        }
+    return context
+
+
+def goalie_totals(club_stats: Optional[dict]):
+    """(shots against, saves, save % of the probable starter) from a club-stats payload."""
+    goalies = (club_stats or {}).get('goalies', [])
+    shots = sum(g.get('shotsAgainst', 0) for g in goalies)
+    saves = sum(g.get('saves', 0) for g in goalies)
+    starter = max(goalies, key=lambda g: g.get('gamesStarted', g.get('gamesPlayed', 0)), default=None)
+    starter_pct = None
+    if starter and starter.get('shotsAgainst'):
+        starter_pct = starter.get('saves', 0) / starter['shotsAgainst']
+    return shots, saves, starter_pct
+
+
+def goalie_form(save_pct: Optional[float], league_pct: Optional[float]) -> float:
+    """A goalie's save percentage against the league's, as a GameContext.goalie_form (0.0 if unknown)."""
+    if save_pct is None or league_pct is None:
+        return 0.0
+    return round(clamp((save_pct - league_pct) * GOALIE_FORM_SCALE, -GOALIE_FORM_LIMIT, GOALIE_FORM_LIMIT), 4)
+
+
+def goalie_save_pct(club_stats: Optional[dict], goalie_id) -> Optional[float]:
+    """Save percentage of one goalie (by id) in a club-stats payload; None if he has faced no shots."""
+    for goalie in (club_stats or {}).get('goalies', []):
+        if str(goalie.get('playerId')) == str(goalie_id) and goalie.get('shotsAgainst'):
+            return goalie.get('saves', 0) / goalie['shotsAgainst']
+    return None
+
+
+def league_save_pct(context: Dict[str, dict]) -> Optional[float]:
+    """League save percentage from a built context (each team's save_pct weighted by its shots against)."""
+    shots = saves = 0.0
+    for team in context.values():
+        if team.get('save_pct') is None:
+            continue
+        team_shots = team.get('shots_allowed', 0) * team.get('games_played', 0)
+        shots += team_shots
+        saves += team_shots * team['save_pct']
+    return saves / shots if shots else None
+
+
+def build_context(standings: dict, club_stats: Dict[str, dict]) -> Dict[str, dict]:
+    """Per-team context from the standings and the club stats of each team (missing teams get defaults)."""
+    context = standings_context(standings)
+    totals = {abbrev: goalie_totals(club_stats.get(abbrev)) for abbrev in context}
+    league_shots = sum(shots for shots, _, _ in totals.values())
+    league_pct = sum(saves for _, saves, _ in totals.values()) / league_shots if league_shots else None
+
+    for abbrev, team in context.items():
+        shots, saves, starter_pct = totals[abbrev]
+        team['shots_allowed'] = round(shots / team['games_played'], 2) if shots else DEFAULT_SHOTS_ALLOWED
+        team['save_pct'] = round(saves / shots, 4) if shots else None
+        team['goalie_form'] = goalie_form(starter_pct, league_pct)
+    return context
+
+
+def team_stats(team: dict) -> TeamStats:
+    return TeamStats(pp_pct=team.get('pp_pct', 0.20), l10_pts_pct=team.get('l10_pts_pct', 0.50))
+
+
+def opponent_stats(team: dict) -> OpponentStats:
+    return OpponentStats(
+        gaa=team.get('gaa', 3.0),
+        pk_pct=team.get('pk_pct', 0.80),
+        shots_allowed_avg=team.get('shots_allowed', DEFAULT_SHOTS_ALLOWED),
+    )
+
+
+def matchup_matrix(context: Dict[str, dict], order) -> list:
+    """matrix[i][j]: matchup_factor of team order[i] facing order[j] (diagonal 1.0)."""
+    attack = [team_stats(context[abbrev]) for abbrev in order]
+    defense = [(opponent_stats(context[abbrev]), context[abbrev].get('goalie_form', 0.0)) for abbrev in order]
+    return [
+        [1.0 if i == j else round(matchup_factor(attack[i], *defense[j]), 4) for j in range(len(order))]
+        for i in range(len(order))
+    ]
+
+# ==============================================================================
+# SNAPSHOTS
+# ==============================================================================
+
+def build_snapshot(day, client, workers: int = 4, fetched: Dict[str, dict] = None) -> Optional[TeamContextSnapshot]:
+    """
+    Fetch standings and every team's club stats, and store the snapshot of
+    `day`. The club-stats payloads are also put in `fetched` (team -> payload)
+    for the caller to reuse. None when the standings can't be fetched.
+    """
+    standings = client.get_json('standings/now')
+    teams = sorted(standings_context(standings))
+    if not teams:
+        return None
+    fetched = {} if fetched is None else fetched
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for abbrev, payload in zip(teams, pool.map(lambda t: client.get_json(f'club-stats/{t}/now'), teams)):
+            if payload is not None:
+                fetched[abbrev] = payload
+
+    context = build_context(standings, fetched)
+    try:
+        snapshot, _ = TeamContextSnapshot.objects.update_or_create(
+            date=day, defaults={'teams': context, 'team_order': teams, 'matchup': matchup_matrix(context, teams)},
+        )
+    except IntegrityError:  # built concurrently by another run
+        snapshot = TeamContextSnapshot.objects.get(date=day)
+    return snapshot
+
+
+def get_snapshot(day, client=None, **kwargs) -> Optional[TeamContextSnapshot]:
+    """The snapshot of `day`; built (with `client`) if there is none yet and a client is given."""
+    snapshot = TeamContextSnapshot.objects.filter(date=day).first()
+    if snapshot is None and client is not None:
+        snapshot = build_snapshot(day, client, **kwargs)
+    return snapshot
@@ -1,3 +1,1350 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.template.defaultfilters import floatformat
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from config import routers
+from nhl.management.commands.bench_templates import normalized
+from nhl.management.commands.fetch_nhl_data import Command as FetchNhlData
+
+from . import tasks, views
+from .admin import GameStatsAdmin
+from .archive import PayloadArchive
+from .bankroll import Strategy, history_from_rows, simulate
+from .benchmarks import build_cases, compare, time_case
+from .client import NHLClient
+from .features import FeatureStore
+from .cache import dashboard_version
+from .lake import open_table
+from .ledger import record_run
+from .lineups import LineupTracker, LineupWatcher
+from .live import LivePoller
+from .metrics import render_ingestion_metrics
+from .models import (
+    ArchivedPayload, FailedRecord, GameLogPartition, GameStats, IngestionRun, LiveEvent, LiveStat, PayloadBlob,
+    Player, RollingFormState, Task, TeamContextSnapshot,
+)
+from .players import normalize_name, player_index, reset_player_index, sync_roster
+from .schedule import ScheduleIndex, reset_schedule_indexes, schedule_index
+from .scheduler import Scheduler, advisory_lock, attempts_on, default_jobs
+from .simulation import PACE_SHAPE, Leg, _allocate, _compile, simulate_parlays, slate_from_rows
+from .services import (
+    GameContext, OpponentStats, PlayerSeasonStats, RecentForm, TeamStats, calculate_hybrid_projection,
+    matchup_factor,
+)
+from .synthetic import DRESSED, generate_rows
+from .team_context import get_snapshot, opponent_stats, team_stats
+from .view_models import fmt
+
+
+def make_rows(count, date='2026-01-07', team='EDM', opp='VAN', start=0):
+    """Bulk-insert synthetic data_lake rows (player_id is unique in the test table)."""
+    now = timezone.now()
+    GameStats.objects.bulk_create([
+        GameStats(
+            player_id=f'{team}-{date}-{start + i}',
+            name=f'Joueur {start + i}',
+            team=team,
+            opp=opp,
+            date=date,
+            ts=now,
+            is_home=1,
+            algo_score_goal=80 + (i % 80),
+            algo_score_shot=60,
+            python_prob=20 + (i % 40),
+            python_vol=3.2,
+            result_goal='2.9',
+            result_shot='1.6',
+        )
+        for i in range(count)
+    ], batch_size=1000)
+
+
+@mock.patch.object(GameStatsAdmin, 'list_per_page', 4)
+class GameStatsAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser('admin@cortex.test', 'pw')
+        make_rows(6, date='2026-01-06')  # each batch shares one ts
+        make_rows(5, date='2026-01-07')
+        GameStats.objects.filter(player_id='EDM-2026-01-06-0').update(result_goal='HIT')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_keyset_pages_cover_every_row_once(self):
+        url, seen = reverse('admin:nhl_gamestats_changelist'), []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            cl = response.context['cl']
+            seen += [row.player_id for row in cl.result_list]
+            self.assertEqual(cl.result_count, 11)
+            url = cl.next_url and reverse('admin:nhl_gamestats_changelist') + cl.next_url
+        self.assertEqual(len(seen), 11)
+        self.assertEqual(set(seen), set(GameStats.objects.values_list('player_id', flat=True)))
+        self.assertEqual(seen[0], 'EDM-2026-01-07-4')  # newest batch first
+
+    def test_typed_columns_and_filters(self):
+        response = self.client.get(reverse('admin:nhl_gamestats_changelist'), {'outcome': 'HIT'})
+        rows = response.context['cl'].result_list
+        self.assertEqual([row.player_id for row in rows], ['EDM-2026-01-06-0'])
+        self.assertEqual((rows[0].outcome, rows[0].odds), ('HIT', None))
+        pending = GameStats.objects.get(player_id='EDM-2026-01-07-0')
+        self.assertEqual((pending.outcome, pending.odds), (None, 2.9))
+
+    def test_bulk_action_enqueues_one_task_per_date(self):
+        self.client.post(reverse('admin:nhl_gamestats_changelist'), {
+            'action': 'enqueue_fetch_results', 'select_across': '1', 'index': '0',
+            '_selected_action': ['EDM-2026-01-06-0'],
+        })
+        self.assertEqual(
+            sorted(Task.objects.filter(name='fetch_results').values_list('kwargs', flat=True), key=str),
+            [{'date': '2026-01-06'}, {'date': '2026-01-07'}],
+        )
+
+    def test_rerun_skips_settled_dates(self):
+        response = self.client.post(reverse('admin:nhl_gamestats_changelist'), {
+            'action': 'enqueue_rerun_projections', 'select_across': '1', 'index': '0',
+            '_selected_action': ['EDM-2026-01-06-0'],
+        }, follow=True)
+        self.assertEqual(list(Task.objects.values_list('kwargs', flat=True)), [{'date': '2026-01-07'}])
+        self.assertContains(response, 'déjà réglée(s), non recalculée(s) : 2026-01-06')
+
+
+def roster(*players):
+    """A roster/{team}/current payload of (id, first, last, position) tuples."""
+    groups = {'forwards': [], 'defensemen': [], 'goalies': []}
+    for player_id, first, last, position in players:
+        group = {'D': 'defensemen', 'G': 'goalies'}.get(position, 'forwards')
+        groups[group].append({'id': player_id, 'firstName': {'default': first},
+                              'lastName': {'default': last}, 'positionCode': position})
+    return groups
+
+
+class PlayerRegistryTests(TestCase):
+    def setUp(self):
+        reset_player_index()
+        sync_roster('EDM', roster((8478402, 'Connor', 'McDavid', 'C'), (8477934, 'Leon', 'Draisaitl', 'C')),
+                    day=date(2025, 10, 1))
+        sync_roster('OTT', roster((8482116, 'Tim', 'Stützle', 'C'), (8480000, 'Jake', 'Miller', 'D')),
+                    day=date(2025, 10, 1))
+        sync_roster('VAN', roster((8476468, 'J.T.', 'Miller', 'C')), day=date(2025, 10, 1))
+
+    def test_normalize_name(self):
+        self.assertEqual(normalize_name('Alexis Lafrenière'), 'alexis lafreniere')
+        self.assertEqual(normalize_name('J.T. Miller'), 'jt miller')
+        self.assertEqual(normalize_name("Marc-André  O'Reilly"), 'marc andre oreilly')
+
+    def test_resolve_names(self):
+        index = player_index()
+        self.assertEqual(index.resolve('C. McDavid', team='EDM'), 8478402)
+        self.assertEqual(index.resolve('tim stutzle'), 8482116)
+        self.assertEqual(index.get('8477934').name, 'Leon Draisaitl')
+        # "J. Miller" is J.T. (VAN) or Jake (OTT): only the team decides.
+        self.assertIsNone(index.resolve('J. Miller'))
+        self.assertEqual(index.resolve('J. Miller', team='OTT'), 8480000)
+        self.assertIsNone(index.resolve('Wayne Gretzky'))
+
+    def test_trade_updates_team_history_and_index(self):
+        self.assertEqual(player_index().get(8476468).team, 'VAN')
+        created, updated = sync_roster('NYR', roster((8476468, 'J.T.', 'Miller', 'C')), day=date(2026, 1, 31))
+        self.assertEqual((created, updated), (0, 1))
+        self.assertEqual(Player.objects.get(pk=8476468).team_history, [['VAN', '2025-10-01'], ['NYR', '2026-01-31']])
+        self.assertEqual(player_index().get(8476468).team, 'NYR')  # reloaded: the registry changed
+        with self.assertNumQueries(1):
+            player_index()
+
+
+class FeatureStoreTests(TestCase):
+    def setUp(self):
+        self.store = FeatureStore()
+
+    def settle(self, day, player_id, goals, shots=3):
+        self.store.settle(f'2026-01-{day:02d}', [{'player_id': player_id, 'game_id': day, 'team': 'EDM',
+                                                  'goals': goals, 'assists': 1, 'shots': shots, 'toi': 1200}])
+
+    def test_rolling_windows(self):
+        goals = [0, 1, 2, 0, 0, 1, 3, 0, 1, 0, 2, 1]
+        for day, g in enumerate(goals, 1):
+            self.settle(day, 8478402, g)
+        form = self.store.form().get(8478402)
+        self.assertEqual((form.games_l5, form.goals_l5), (5, sum(goals[-5:])))
+        self.assertEqual((form.games_l10, form.goals_l10, form.toi_l10), (10, sum(goals[-10:]), 12000))
+        self.assertIsNone(self.store.form().get(1))
+        # Going into Jan 4th, only the first three games count.
+        self.assertEqual(self.store.form(as_of='2026-01-04').get(8478402).goals_l10, 3)
+
+    def test_out_of_order_day_rebuilds(self):
+        self.settle(1, 8478402, 1)
+        self.settle(3, 8478402, 2)
+        self.settle(2, 8478402, 4)  # backfilled
+        self.settle(3, 8478402, 0)  # settled again
+        self.assertEqual(self.store.form().get(8478402).goals_l5, 5)
+        self.assertEqual(self.store.settled_dates(), ['2026-01-01', '2026-01-02', '2026-01-03'])
+        # Stored in the database, it survives the container: a new store reads it back.
+        self.assertEqual(GameLogPartition.objects.count(), 3)
+        self.assertEqual(RollingFormState.objects.get().last_date, '2026-01-03')
+        self.assertEqual(FeatureStore().form().get(8478402).goals_l5, 5)
+
+    def test_files_storage(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.store = FeatureStore(root=tmp, storage='files')
+            for day, g in enumerate([1, 0, 2], 1):
+                self.settle(day, 8478402, g)
+            self.settle(2, 8478402, 3)  # settled again
+            self.assertEqual(self.store.form().get(8478402).goals_l5, 6)
+            self.assertEqual(self.store.settled_dates(), ['2026-01-01', '2026-01-02', '2026-01-03'])
+            self.assertTrue(os.path.exists(self.store.state_path))
+        self.assertFalse(GameLogPartition.objects.exists())
+
+    def test_projection_leans_towards_recent_form(self):
+        args = (PlayerSeasonStats(40, 10, 10, 20, 100), TeamStats(), OpponentStats(), GameContext(is_home=True))
+        base = calculate_hybrid_projection(*args)
+        self.assertEqual(calculate_hybrid_projection(*args, form=RecentForm()), base)
+        hot = calculate_hybrid_projection(*args, form=RecentForm(games_l5=5, goals_l5=5, games_l10=10, goals_l10=8))
+        self.assertGreater(hot.prob_goal, base.prob_goal)
+
+
+class TeamContextTests(TestCase):
+    STANDINGS = {'standings': [
+        {'teamAbbrev': {'default': 'EDM'}, 'gamesPlayed': 40, 'goalAgainst': 100, 'powerPlayPctg': 0.30,
+         'penaltyKillPctg': 0.82, 'l10PtsPctg': 0.70},
+        {'teamAbbrev': {'default': 'VAN'}, 'gamesPlayed': 40, 'goalAgainst': 140, 'powerPlayPctg': 0.18,
+         'penaltyKillPctg': 0.75, 'l10PtsPctg': 0.40},
+    ]}
+    CLUB_STATS = {
+        'EDM': {'goalies': [{'gamesStarted': 30, 'shotsAgainst': 900, 'saves': 828},
+                            {'gamesStarted': 10, 'shotsAgainst': 300, 'saves': 270}]},
+        'VAN': {'goalies': [{'gamesStarted': 40, 'shotsAgainst': 1300, 'saves': 1170}]},
+    }
+
+    class FakeClient:
+        def __init__(self, payloads):
+            self.payloads, self.calls = payloads, []
+
+        def get_json(self, path):
+            self.calls.append(path)
+            return self.payloads.get(path)
+
+    def api_client(self):
+        return self.FakeClient({'standings/now': self.STANDINGS,
+                            **{f'club-stats/{t}/now': p for t, p in self.CLUB_STATS.items()}})
+
+    def test_snapshot_is_built_once_per_date(self):
+        client, fetched = self.api_client(), {}
+        snapshot = get_snapshot(date(2026, 1, 7), client, fetched=fetched)
+        self.assertEqual(set(fetched), {'EDM', 'VAN'})
+        edm, van = snapshot.team('EDM'), snapshot.team('VAN')
+        self.assertEqual((edm['gaa'], edm['shots_allowed'], van['shots_allowed']), (2.5, 30.0, 32.5))
+        # EDM's starter (.920) beats the league (.906), VAN's (.900) doesn't.
+        self.assertGreater(edm['goalie_form'], 0)
+        self.assertLess(van['goalie_form'], 0)
+        # EDM's power play against VAN's penalty kill, and VAN's weak goalie.
+        self.assertEqual(snapshot.matchup_factor('EDM', 'VAN'), round(
+            matchup_factor(team_stats(edm), opponent_stats(van), van['goalie_form']), 4))
+        self.assertGreater(snapshot.matchup_factor('EDM', 'VAN'), snapshot.matchup_factor('VAN', 'EDM'))
+        self.assertEqual(snapshot.matchup_factor('EDM', 'XXX'), 1.0)
+
+        calls = len(client.calls)
+        self.assertEqual(get_snapshot(date(2026, 1, 7), client).pk, snapshot.pk)
+        self.assertEqual(len(client.calls), calls)
+
+
+class ScheduleIndexTests(TestCase):
+    GAMES = [
+        ('2025-10-07', 'EDM', 'CGY'),
+        ('2025-10-09', 'VAN', 'EDM'),
+        ('2025-10-10', 'SEA', 'EDM'),
+        ('2025-10-12', 'CGY', 'EDM'),
+        ('2025-10-14', 'EDM', 'VAN'),
+    ]
+
+    def test_rest_days_and_road_trips(self):
+        index = ScheduleIndex.from_games('20252026', self.GAMES)
+        self.assertIsNone(index.days_since_last_game('EDM', '2025-10-07'))
+        self.assertEqual(index.days_since_last_game('EDM', '2025-10-09'), 2)
+        self.assertTrue(index.is_back_to_back('EDM', '2025-10-10'))
+        self.assertFalse(index.is_back_to_back('SEA', '2025-10-10'))
+        self.assertEqual(index.games_in_last('EDM', '2025-10-12', 4), 2)
+        self.assertTrue(index.is_tired('EDM', '2025-10-12'))  # third game in four nights
+        self.assertEqual([index.road_trip_length('EDM', d) for d in ('2025-10-09', '2025-10-10', '2025-10-12')],
+                         [1, 2, 3])
+        self.assertEqual(index.road_trip_length('EDM', '2025-10-14'), 0)
+        self.assertEqual(index.days_since_last_game('EDM', '2025-11-01'), 18)  # after the last known game
+
+    def test_built_once_from_the_weekly_schedule(self):
+        weeks = {
+            'schedule/2025-09-01': {'nextStartDate': '2025-10-06', 'gameWeek': []},
+            'schedule/2025-10-06': {'nextStartDate': '2025-10-13', 'gameWeek': [
+                {'date': d, 'games': [{'gameType': 2, 'homeTeam': {'abbrev': h}, 'awayTeam': {'abbrev': a}}]}
+                for d, h, a in self.GAMES[:4]]},
+            'schedule/2025-10-13': {'gameWeek': [
+                {'date': d, 'games': [{'gameType': 2, 'homeTeam': {'abbrev': h}, 'awayTeam': {'abbrev': a}}]}
+                for d, h, a in self.GAMES[4:]]},
+        }
+        client = TeamContextTests.FakeClient(weeks)
+        reset_schedule_indexes()
+        self.addCleanup(reset_schedule_indexes)
+        with tempfile.TemporaryDirectory() as root:
+            index = schedule_index('2025-10-12', client, root=root)
+            self.assertTrue(index.is_tired('EDM', '2025-10-12'))
+            self.assertEqual(len(client.calls), 3)
+            reset_schedule_indexes()
+            self.assertEqual(schedule_index('2025-10-12', client, root=root).venue.tolist(), index.venue.tolist())
+            self.assertEqual(len(client.calls), 3)  # read back from the file
+
+
+class ExportPicksTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.premium = User.objects.create_user('premium@cortex.test', 'pw', is_premium=True)
+        cls.free = User.objects.create_user('free@cortex.test', 'pw')
+
+    def export(self, **params):
+        response = self.client.get(reverse('nhl:export_picks'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_requires_premium(self):
+        self.assertEqual(self.client.get(reverse('nhl:export_picks')).status_code, 401)
+        self.client.force_login(self.free)
+        self.assertEqual(self.client.get(reverse('nhl:export_picks')).status_code, 403)
+
+    def test_csv_with_filters(self):
+        make_rows(10, date='2026-01-06')
+        make_rows(10, date='2026-01-07')
+        make_rows(5, date='2026-01-07', team='TOR', opp='MTL')
+        self.client.force_login(self.premium)
+
+        rows = list(csv.DictReader(io.StringIO(self.export(start='2026-01-07', team='EDM'))))
+        self.assertEqual(len(rows), 10)
+        self.assertTrue(all(r['team'] == 'EDM' and r['date'] == '2026-01-07' for r in rows))
+
+        rows = list(csv.DictReader(io.StringIO(self.export(min_score=62))))
+        self.assertTrue(0 < len(rows) < 25)
+        self.assertTrue(all(float(r['cortex']) >= 62 for r in rows))
+
+    def test_ndjson(self):
+        make_rows(3)
+        self.client.force_login(self.premium)
+        lines = self.export(format='ndjson').splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])['team'], 'EDM')
+
+    def test_peak_memory_is_constant(self):
+        self.client.force_login(self.premium)
+
+        def peak_for_range(end):
+            response = self.client.get(reverse('nhl:export_picks'), {'end': end})
+            tracemalloc.start()
+            size = sum(len(chunk) for chunk in response.streaming_content)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return size, peak
+
+        make_rows(4000, date='2026-01-01')
+        make_rows(16000, date='2026-01-02')
+
+        small_size, small_peak = peak_for_range('2026-01-01')
+        large_size, large_peak = peak_for_range('2026-01-02')
+
+        self.assertGreater(large_size, 4 * small_size)
+        # 5x the rows, same peak (one iterator chunk) within noise.
+        self.assertLess(large_peak, small_peak * 1.5)
+
+    async def test_asgi_export_is_an_async_stream(self):
+        await sync_to_async(make_rows)(3)
+        await self.async_client.aforce_login(self.premium)
+        response = await self.async_client.get(reverse('nhl:export_picks'), {'format': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)  # served chunk by chunk, not consumed whole by the handler
+        lines = ''.join([chunk.decode() async for chunk in response.streaming_content]).splitlines()
+        self.assertEqual([json.loads(line)['team'] for line in lines], ['EDM'] * 3)
+
+
+class ApiTests(TestCase):
+    # Session + user lookup + one data query; a page must never cost more.
+    QUERY_BUDGET = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('api@cortex.test', 'pw', is_premium=True)
+        make_rows(25, date='2026-01-07', team='EDM', opp='VAN')
+        make_rows(20, date='2026-01-07', team='VAN', opp='EDM')
+        make_rows(5, date='2026-01-07', team='TOR', opp='MTL')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get(self, url, **params):
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_requires_premium(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('nhl:api_slate')).status_code, 401)
+
+    def test_slate_cursor_pagination(self):
+        url = reverse('nhl:api_slate')
+        seen, cursor = [], None
+        while True:
+            params = {'date': '2026-01-07', 'limit': 20}
+            if cursor:
+                params['cursor'] = cursor
+            page = self.get(url, **params)
+            seen += [row['player_id'] for row in page['results']]
+            cursor = page['next']
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 50)
+        self.assertEqual(len(set(seen)), 50)
+
+    def test_sparse_fieldset(self):
+        page = self.get(reverse('nhl:api_slate'), date='2026-01-07', fields='name,cortex', limit=5)
+        self.assertEqual(set(page['results'][0]), {'name', 'cortex'})
+        self.assertIsNotNone(page['next'])
+
+        response = self.client.get(reverse('nhl:api_slate'), {'fields': 'name,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_match_both_sides(self):
+        page = self.get(reverse('nhl:api_match', args=['2026-01-07', 'VAN', 'EDM']), limit=100)
+        self.assertEqual(page['count'], 45)
+
+    def test_player_history(self):
+        page = self.get(reverse('nhl:api_player_history', args=['TOR-2026-01-07-0']))
+        self.assertEqual([row['team'] for row in page['results']], ['TOR'])
+
+
+class AsyncViewTests(TestCase):
+    """The async views through the ASGI request path (AsyncClient)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('asgi@cortex.test', 'pw', is_premium=True)
+        make_rows(12)
+        make_rows(12, team='VAN', opp='EDM')
+
+    async def test_dashboard_and_player_detail(self):
+        await self.async_client.aforce_login(self.user)
+        dashboard = await self.async_client.get(reverse('nhl:nhl_dashboard'), secure=True)
+        partial = await self.async_client.get(reverse('nhl:nhl_dashboard'), {'team': 'EDM'}, secure=True,
+                                              headers={'HX-Request': 'true'})
+        player = await self.async_client.get(reverse('nhl:player_detail', args=['EDM-2026-01-07-3']), secure=True)
+        self.assertEqual([dashboard.status_code, partial.status_code, player.status_code], [200, 200, 200])
+        self.assertContains(player, 'Joueur 3')
+
+        missing = await self.async_client.get(reverse('nhl:player_detail', args=['nobody']), secure=True)
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_api(self):
+        url = reverse('nhl:api_slate')
+        self.assertEqual((await self.async_client.get(url)).status_code, 401)
+
+        await self.async_client.aforce_login(self.user)
+        page = (await self.async_client.get(url, {'date': '2026-01-07', 'limit': 10})).json()
+        self.assertEqual(len(page['results']), 10)
+        self.assertIsNotNone(page['next'])
+        match = await self.async_client.get(reverse('nhl:api_match', args=['2026-01-07', 'VAN', 'EDM']))
+        self.assertEqual(match.json()['count'], 24)
+        history = await self.async_client.get(reverse('nhl:api_player_history', args=['VAN-2026-01-07-0']))
+        self.assertEqual([row['team'] for row in history.json()['results']], ['VAN'])
+
+
+class ReplayServer:
+    """
+    Local HTTP server replaying recorded NHL API feeds. Each path serves its
+    frames in order (the last one repeats), with ETags so that an unchanged
+    frame answers 304 to a conditional request.
+    """
+
+    def __init__(self, feeds):
+        self.feeds = {path: list(frames) for path, frames in feeds.items()}
+        self.hits = {path: 0 for path in feeds}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                frames = server.feeds.get(self.path)
+                if frames is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                index = min(server.hits[self.path], len(frames) - 1)
+                server.hits[self.path] += 1
+                body = json.dumps(frames[index]).encode()
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = 'http://127.0.0.1:%d' % self.httpd.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def boxscore_frame(state, home_score, away_score, skaters, intermission=False):
+    """Minimal gamecenter boxscore: `skaters` maps playerId -> (G, A, SOG), all on the home team."""
+    return {
+        'gameState': state,
+        'homeTeam': {'abbrev': 'EDM', 'score': home_score},
+        'awayTeam': {'abbrev': 'VAN', 'score': away_score},
+        'clock': {'inIntermission': intermission},
+        'periodDescriptor': {'number': 2},
+        'playerByGameStats': {
+            'homeTeam': {'forwards': [
+                {'playerId': int(pid), 'goals': g, 'assists': a, 'sog': sog}
+                for pid, (g, a, sog) in skaters.items()
+            ]},
+            'awayTeam': {'forwards': []},
+        },
+    }
+
+
+class LiveResultsTests(TestCase):
+    DATE = '2026-01-07'
+
+    def setUp(self):
+        for pid in ('8478402', '8477934'):
+            GameStats.objects.create(player_id=pid, team='EDM', opp='VAN', date=self.DATE,
+                                     python_prob=40, result_goal='2.3', result_shot='1.6')
+
+    def feeds(self):
+        schedule = {'gameWeek': [{'date': self.DATE, 'games': [{
+            'id': 2025020500, 'gameState': 'LIVE', 'startTimeUTC': '2026-01-08T00:00:00Z',
+            'homeTeam': {'abbrev': 'EDM'}, 'awayTeam': {'abbrev': 'VAN'},
+        }]}]}
+        boxscore = [
+            boxscore_frame('LIVE', 0, 0, {'8478402': (0, 0, 1), '8477934': (0, 0, 0)}),
+            boxscore_frame('LIVE', 1, 0, {'8478402': (1, 0, 3), '8477934': (0, 1, 0)}),
+            boxscore_frame('LIVE', 1, 0, {'8478402': (1, 0, 3), '8477934': (0, 1, 0)}),
+            boxscore_frame('OFF', 1, 0, {'8478402': (1, 0, 4), '8477934': (0, 1, 2)}),
+        ]
+        return {f'/schedule/{self.DATE}': [schedule], '/gamecenter/2025020500/boxscore': boxscore}
+
+    def test_replay_updates_results_and_publishes_diffs(self):
+        with ReplayServer(self.feeds()) as server:
+            clock = [0.0]
+            poller = LivePoller(NHLClient(base_url=server.base_url), clock=lambda: clock[0])
+            trackers = poller.load_games(self.DATE)
+            self.assertEqual(trackers[0].tracked, {'8478402', '8477934'})
+
+            poller.poll(trackers[0])
+            poller.poll(trackers[0])
+            # In play: the running line goes to LiveStat, data_lake keeps its odds
+            live = LiveStat.objects.get(player_id='8478402', date=self.DATE)
+            self.assertEqual((live.goals, live.assists, live.shots), (1, 0, 3))
+            mcdavid = GameStats.objects.get(player_id='8478402')
+            self.assertEqual((mcdavid.result_goal, mcdavid.result_shot), ('2.3', '1.6'))
+
+            # Identical frame: 304, no new event, polling slows down.
+            events_before = LiveEvent.objects.count()
+            interval_before = trackers[0].interval
+            self.assertIsNone(poller.poll(trackers[0]))
+            self.assertEqual(LiveEvent.objects.count(), events_before)
+            self.assertGreater(trackers[0].interval, interval_before)
+
+            poller.run(trackers, sleep=lambda seconds: clock.__setitem__(0, clock[0] + seconds))
+
+        self.assertTrue(trackers[0].done)
+        settled = dict(GameStats.objects.values_list('player_id', 'result_goal'))
+        self.assertEqual(settled, {'8478402': 'HIT', '8477934': 'MISS'})
+        self.assertEqual(LiveStat.objects.get(player_id='8477934').shots, 2)
+        final = LiveEvent.objects.order_by('id').last().payload
+        self.assertEqual(final['state'], 'OFF')
+        self.assertEqual(final['players']['8477934'], [0, 1, 2])
+
+    def test_sse_stream_is_served_under_asgi_only(self):
+        url = reverse('nhl:live_stream')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(get_user_model().objects.create_user('live@cortex.test', 'pw', is_premium=True))
+        self.assertEqual(self.client.get(url).status_code, 404)  # WSGI: one thread per stream
+
+    @override_settings(LIVE_STREAM_ENABLED=True, LIVE_STREAM_MAX_SECONDS=0.05, LIVE_STREAM_POLL_SECONDS=0.01)
+    async def test_sse_stream_resumes_from_last_event_id(self):
+        first = await LiveEvent.objects.acreate(game_id=1, payload={'score': [0, 0]})
+        await LiveEvent.objects.acreate(game_id=1, payload={'score': [2, 1]})
+        user = await get_user_model().objects.acreate(email='alive@cortex.test', is_premium=True)
+        await self.async_client.aforce_login(user)
+        url = reverse('nhl:live_stream')
+
+        async def body(response):
+            return ''.join([chunk.decode() async for chunk in response.streaming_content])
+
+        response = await self.async_client.get(url, headers={'Last-Event-ID': str(first.id)})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(response.is_async)
+        events = await body(response)
+        self.assertIn('event: diff', events)
+        self.assertIn('"score":[2,1]', events)
+        self.assertNotIn('"score":[0,0]', events)
+        self.assertNotIn('event: lines', events)  # resuming: the diffs are enough
+        self.assertEqual(views._live_streams, 0)
+
+        # A fresh connection gets the running lines first, then only new diffs
+        await LiveStat.objects.acreate(date='2026-01-07', player_id='8478402', game_id=1, goals=1, assists=0, shots=3)
+        events = await body(await self.async_client.get(url))
+        self.assertIn('event: lines\ndata: {"8478402":[1,0,3]}', events)
+        self.assertNotIn('event: diff', events)
+
+        # Over the cap: still an event stream (EventSource would give up on an error), told to retry later
+        self.assertTrue(views._reserve_live_stream())
+        self.addCleanup(views._release_live_stream)
+        with override_settings(LIVE_STREAM_MAX_CONNECTIONS=1, LIVE_STREAM_BUSY_RETRY_MS=30000):
+            self.assertFalse(views._reserve_live_stream())
+            response = await self.async_client.get(url)
+        self.assertEqual((response.status_code, response['Content-Type']), (200, 'text/event-stream'))
+        self.assertEqual(response.content, b'retry: 30000\n\n')
+
+
+def skater(pid, goals, shots, games=60):
+    return {'playerId': pid, 'firstName': {'default': 'P'}, 'lastName': {'default': str(pid)},
+            'gamesPlayed': games, 'goals': goals, 'assists': goals, 'points': 2 * goals,
+            'shots': shots, 'positionCode': 'C'}
+
+
+@override_settings(PIPELINE_FETCH_WORKERS=2, PIPELINE_PERSIST_BATCH=2, PIPELINE_QUEUE_SIZE=2)
+class IngestionPipelineTests(TestCase):
+    DATE = '2026-01-07'
+
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        archive_settings = override_settings(PAYLOAD_ARCHIVE_DIR=archive_dir.name)
+        archive_settings.enable()
+        self.addCleanup(archive_settings.disable)
+
+    def feeds(self):
+        schedule = {'gameWeek': [{'date': self.DATE, 'games': [
+            {'homeTeam': {'abbrev': 'EDM'}, 'awayTeam': {'abbrev': 'VAN'}},
+        ]}]}
+        edm = {'skaters': [skater(9000 + i, goals=45, shots=300) for i in range(5)] + [skater(9100, 0, 1, games=3)]}
+        # VAN's roster is missing on the first run.
+        return {f'/schedule/{self.DATE}': [schedule], '/club-stats/EDM/now': [edm]}
+
+    def ingest(self, server, *args):
+        with override_settings(NHL_API_BASE_URL=server.base_url):
+            call_command('fetch_nhl_data', *args, stdout=io.StringIO())
+        return IngestionRun.objects.order_by('-started_at').first()
+
+    def test_stages_persist_in_batches_and_failures_replay(self):
+        GameStats.objects.create(player_id='9000', date=self.DATE, team='EDM', result_goal='old')
+
+        with ReplayServer(self.feeds()) as server:
+            run = self.ingest(server, '--date', self.DATE)
+            self.assertEqual(GameStats.objects.filter(date=self.DATE, team='EDM').count(), 5)
+            self.assertNotEqual(GameStats.objects.get(player_id='9000').result_goal, 'old')
+            self.assertEqual((run.rows_written, run.rows_skipped, run.errors), (5, 1, 1))
+            self.assertEqual(set(run.stages), {'fetch', 'parse', 'project', 'persist'})
+
+            failed = FailedRecord.objects.get()
+            self.assertEqual((failed.stage, failed.payload['team']), ('fetch', 'VAN'))
+            self.assertIn('VAN', failed.error)
+
+            server.feeds['/club-stats/VAN/now'] = [{'skaters': [skater(9200, goals=45, shots=300)]}]
+            server.hits['/club-stats/VAN/now'] = 0
+            self.ingest(server, '--replay-failed')
+
+        self.assertEqual(GameStats.objects.get(player_id='9200').opp, 'EDM')
+        self.assertIsNotNone(FailedRecord.objects.get().replayed_at)
+
+    def test_replay_recomputes_a_run_from_the_archive(self):
+        with ReplayServer(self.feeds()) as server:
+            original = self.ingest(server, '--date', self.DATE)
+            self.ingest(server, '--date', self.DATE)
+        projected = dict(GameStats.objects.values_list('player_id', 'algo_score_goal'))
+
+        # Both runs fetched identical bodies: indexed twice, stored once.
+        self.assertEqual(original.payloads.count(), 2)
+        self.assertEqual(ArchivedPayload.objects.values('sha256').distinct().count(), 2)
+
+        GameStats.objects.all().delete()
+        with override_settings(NHL_API_BASE_URL='http://127.0.0.1:9'):  # nothing listens
+            call_command('fetch_nhl_data', '--replay', str(original.pk), stdout=io.StringIO())
+
+        replay = IngestionRun.objects.order_by('-started_at').first()
+        self.assertEqual((replay.replay_of, replay.target_date, replay.rows_written), (original, self.DATE, 5))
+        self.assertFalse(replay.payloads.exists())
+        self.assertEqual(dict(GameStats.objects.values_list('player_id', 'algo_score_goal')), projected)
+
+    def test_blobs_live_in_the_database(self):
+        with tempfile.TemporaryDirectory() as lake_dir, override_settings(LAKE_DIR=lake_dir):
+            with ReplayServer(self.feeds()) as server:
+                original = self.ingest(server, '--date', self.DATE)
+                make_rows(1, date='2026-01-06')
+                GameStats.objects.filter(date='2026-01-06').update(result_goal='MISS')
+                warned = self.ingest(server, '--date', self.DATE)
+        self.assertEqual(PayloadBlob.objects.count(), 2)
+        self.assertFalse(os.listdir(settings.PAYLOAD_ARCHIVE_DIR))
+        self.assertEqual(warned.errors, original.errors + 1)  # settled games, empty feature store
+
+        # Blobs from the 'files' storage stay readable
+        digest = PayloadArchive(storage='files').put(b'{"old": true}')
+        self.assertEqual(PayloadArchive().load(digest), {'old': True})
+
+        PayloadBlob.objects.all().delete()  # as a lost disk would
+        with self.assertRaisesMessage(CommandError, 'cannot be replayed'):
+            call_command('fetch_nhl_data', '--replay', str(original.pk), stdout=io.StringIO())
+
+    def test_outcomes_are_kept_and_settled_dates_refused(self):
+        GameStats.objects.create(player_id='9000', date=self.DATE, team='EDM',
+                                 result_goal='INJURED', result_shot='INJURED')
+        with ReplayServer(self.feeds()) as server:
+            original = self.ingest(server, '--date', self.DATE)
+        scratched = GameStats.objects.get(player_id='9000')
+        self.assertEqual((scratched.result_goal, scratched.result_shot), ('INJURED', 'INJURED'))
+        self.assertIsNotNone(scratched.algo_score_goal)
+
+        GameStats.objects.filter(player_id='9001').update(result_goal='HIT', result_shot='4')
+        with self.assertRaisesMessage(CommandError, 'already settled'):
+            call_command('fetch_nhl_data', '--date', self.DATE, stdout=io.StringIO())
+        # A replay still runs, and leaves the settled row's outcome alone
+        with override_settings(NHL_API_BASE_URL='http://127.0.0.1:9'):
+            call_command('fetch_nhl_data', '--replay', str(original.pk), stdout=io.StringIO())
+        settled = GameStats.objects.get(player_id='9001')
+        self.assertEqual((settled.result_goal, settled.result_shot), ('HIT', '4'))
+
+    def test_persist_updates_in_one_statement_and_counts_distinct_rows(self):
+        make_rows(3, date=self.DATE)
+        make_rows(3, date='2026-01-06')  # other rows: untouched
+        GameStats.objects.filter(player_id='EDM-2026-01-07-0', date=self.DATE).update(result_goal='HIT')
+        ingestion = FetchNhlData()
+        ingestion._lock, ingestion.written_keys, ingestion.run = threading.Lock(), set(), SimpleNamespace(rows_written=0)
+
+        def row(i, score):
+            return {'player_id': f'EDM-2026-01-07-{i}', 'name': f'Joueur {i}', 'team': 'EDM', 'opp': 'VAN',
+                    'date': self.DATE, 'is_home': 0, 'algo_score_goal': score, 'algo_score_shot': 1.0,
+                    'python_prob': 30.0, 'python_vol': 2.0, 'result_goal': '3.1', 'result_shot': '1.9'}
+
+        rows = [row(0, 10.0), row(1, 10.0), row(2, 10.0), row(2, 12.0), row(3, 10.0)]
+        with self.assertNumQueries(3 + 2):  # SELECT, UPDATE, INSERT + savepoint
+            ingestion.persist_rows(rows)
+        ingestion.persist_rows([row(3, 11.0)])
+
+        self.assertEqual(ingestion.run.rows_written, 4)
+        today = {r.player_id: r for r in GameStats.objects.filter(date=self.DATE)}
+        self.assertEqual([today[f'EDM-2026-01-07-{i}'].algo_score_goal for i in range(4)], [10.0, 10.0, 12.0, 11.0])
+        self.assertEqual((today['EDM-2026-01-07-0'].result_goal, today['EDM-2026-01-07-0'].result_shot), ('HIT', '1.6'))
+        self.assertEqual((today['EDM-2026-01-07-1'].result_goal, today['EDM-2026-01-07-1'].is_home), ('3.1', 0))
+        self.assertEqual(today['EDM-2026-01-07-1'].name, 'Joueur 1')
+        self.assertFalse(GameStats.objects.filter(date='2026-01-06', algo_score_goal=10.0).exists())
+
+
+@override_settings(PAYLOAD_ARCHIVE_ENABLED=False, METRICS_TOKEN='scrape-me')
+class IngestionLedgerTests(TestCase):
+    def client_stub(self):
+        return SimpleNamespace(request_count=10, bytes_received=1000, error_count=1, archive=None)
+
+    def test_record_run(self):
+        client = self.client_stub()
+        with record_run('fetch_nhl_data', client=client, target_date='2026-01-07') as run:
+            with run.stage('fetch'):
+                client.request_count, client.bytes_received = 14, 5000
+            run.rows_written += 3
+            self.assertEqual(IngestionRun.objects.get().status, IngestionRun.STATUS_RUNNING)
+        ok = IngestionRun.objects.get()
+        self.assertEqual((ok.status, ok.rows_written, ok.target_date), (IngestionRun.STATUS_SUCCESS, 3, '2026-01-07'))
+        self.assertEqual((ok.http_requests, ok.http_bytes, ok.http_errors), (4, 4000, 0))  # deltas
+        self.assertEqual(list(ok.stages), ['fetch'])
+
+        with record_run('fetch_nhl_data') as run:
+            run.fail('Schedule unavailable')
+        with self.assertRaises(RuntimeError):
+            with record_run('fetch_nhl_data'):
+                raise RuntimeError('boom')
+        failed = list(IngestionRun.objects.filter(status=IngestionRun.STATUS_FAILED).values_list('error_message', flat=True))
+        self.assertCountEqual(failed, ['Schedule unavailable', 'RuntimeError: boom'])
+
+    def test_metrics(self):
+        with record_run('fetch_game_results') as run:
+            run.rows_written = 7
+        with record_run('fetch_game_results') as run:
+            run.fail('x')
+        IngestionRun.objects.create(command='fetch_game_results', started_at=timezone.now())  # still running
+
+        text = render_ingestion_metrics()
+        self.assertIn('# TYPE cortex_ingestion_runs_total counter', text)
+        self.assertIn('cortex_ingestion_runs_total{command="fetch_game_results",status="success"} 1', text)
+        self.assertIn('cortex_ingestion_runs_total{command="fetch_game_results",status="failed"} 1', text)
+        self.assertIn('cortex_ingestion_runs_running{command="fetch_game_results"} 1', text)
+        self.assertIn('cortex_ingestion_last_run_success{command="fetch_game_results"} 0', text)
+
+        url = reverse('nhl:ingestion_metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, headers={'Authorization': 'Bearer wrong'}).status_code, 403)
+        response = self.client.get(url, headers={'Authorization': 'Bearer scrape-me'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.decode(), text)
+        self.client.force_login(get_user_model().objects.create_user('ops@cortex.test', 'pw', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_admin_trends(self):
+        with record_run('injury_guardian') as run:
+            with run.stage('persist'):
+                run.rows_written = 2
+        url = reverse('admin:nhl_ingestionrun_trends')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(get_user_model().objects.create_superuser('admin@cortex.test', 'pw'))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        series = response.context['series']['injury_guardian']
+        self.assertEqual((series['rows_written'], list(series['stages']), series['status']), ([2], ['persist'], ['success']))
+
+
+class WatchLineupsTests(TestCase):
+    DATE = '2026-01-07'
+
+    def setUp(self):
+        archive_dir, lake_dir = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        self.addCleanup(lake_dir.cleanup)
+        dir_settings = override_settings(PAYLOAD_ARCHIVE_DIR=archive_dir.name, LAKE_DIR=lake_dir.name)
+        dir_settings.enable()
+        self.addCleanup(dir_settings.disable)
+
+        teams = {abbrev: {'games_played': 40, 'gaa': 3.0, 'pp_pct': 0.2, 'pk_pct': 0.8, 'l10_pts_pct': 0.5,
+                          'shots_allowed': 30.0, 'save_pct': 0.9, 'goalie_form': 0.0} for abbrev in ('EDM', 'VAN')}
+        TeamContextSnapshot.objects.create(date=self.DATE, teams=teams, team_order=['EDM', 'VAN'],
+                                           matchup=[[1.0, 1.0], [1.0, 1.0]])
+        for pid in range(9000, 9005):
+            GameStats.objects.create(player_id=str(pid), date=self.DATE, team='EDM', opp='VAN', result_goal='old')
+        GameStats.objects.create(player_id='9500', date=self.DATE, team='VAN', opp='EDM', result_goal='old')
+
+    def feeds(self):
+        start = (timezone.now() + timezone.timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        schedule = {'gameWeek': [{'date': self.DATE, 'games': [{
+            'id': 2025020500, 'gameState': 'FUT', 'startTimeUTC': start,
+            'homeTeam': {'abbrev': 'EDM'}, 'awayTeam': {'abbrev': 'VAN'},
+        }]}]}
+        pregame = {'gameState': 'PRE', 'homeTeam': {'abbrev': 'EDM'}, 'awayTeam': {'abbrev': 'VAN'}}
+        lineups = {**pregame, 'playerByGameStats': {
+            'homeTeam': {'forwards': [{'playerId': pid} for pid in range(9000, 9004)]},  # 9004 scratched
+            'awayTeam': {'goalies': [{'playerId': 31, 'starter': True}, {'playerId': 35}]},
+        }}
+        van = {'skaters': [skater(9500, 45, 300)], 'goalies': [
+            {'playerId': 31, 'saves': 960, 'shotsAgainst': 1000}, {'playerId': 35, 'saves': 880, 'shotsAgainst': 1000},
+        ]}
+        return {
+            f'/schedule/{self.DATE}': [schedule],
+            '/gamecenter/2025020500/boxscore': [pregame, lineups, lineups, {**lineups, 'gameState': 'LIVE'}],
+            '/club-stats/EDM/now': [{'skaters': [skater(pid, 45, 300) for pid in range(9000, 9005)]}],
+            '/club-stats/VAN/now': [van],
+        }
+
+    def test_reprojects_only_the_affected_team(self):
+        version = dashboard_version()
+        with ReplayServer(self.feeds()) as server:
+            # No wait between polls: each one gets the next boxscore frame
+            with override_settings(NHL_API_BASE_URL=server.base_url, LINEUP_POLL_MIN_INTERVAL=0,
+                                   LINEUP_POLL_MAX_INTERVAL=0):
+                call_command('watch_lineups', '--date', self.DATE, stdout=io.StringIO())
+            self.assertEqual(server.hits['/gamecenter/2025020500/boxscore'], 4)
+
+        rows = dict(GameStats.objects.values_list('player_id', 'result_goal'))
+        self.assertEqual(rows['9004'], 'INJURED')
+        self.assertTrue(all(rows[str(pid)] not in ('old', 'INJURED') for pid in range(9000, 9004)))
+        self.assertEqual(rows['9500'], 'old')  # VAN's skaters don't depend on VAN's own goalie
+        run = IngestionRun.objects.get(command='watch_lineups')
+        self.assertEqual((run.status, run.rows_written), (IngestionRun.STATUS_SUCCESS, 5))
+        self.assertGreater(dashboard_version(), version)
+
+    def test_confirmed_starter_form_reaches_the_projection(self):
+        watcher = LineupWatcher(None, lambda date, changes: None, context={
+            'VAN': {'games_played': 40, 'shots_allowed': 30.0, 'save_pct': 0.9, 'goalie_form': 0.0},
+        })
+        watcher.club_stats['VAN'] = self.feeds()['/club-stats/VAN/now'][0]
+        watcher.team_club_stats = watcher.club_stats.get
+        tracker = LineupTracker(1, self.DATE, 'EDM', 'VAN')
+        [change] = watcher.detect(tracker, {'VAN': (frozenset(), '31')})
+        self.assertEqual((change.team, change.opp_goalie_form, change.lineup), ('EDM', 0.15, None))
+        self.assertEqual(watcher.detect(tracker, {'VAN': (frozenset(), '31')}), [])  # same starter
+
+
+def failing_task(ctx):
+    raise RuntimeError('boom')
+
+
+@mock.patch.dict(tasks.REGISTRY, {'failing': failing_task})
+class TaskQueueTests(TestCase):
+    def test_claim_by_priority_and_retry_then_fail(self):
+        low = tasks.enqueue('failing', priority=Task.PRIORITY_LOW, max_attempts=2)
+        high = tasks.enqueue('failing', priority=Task.PRIORITY_HIGH, max_attempts=2)
+        with self.assertRaises(ValueError):
+            tasks.enqueue('nope')
+
+        claimed = tasks.claim_next('w1')
+        self.assertEqual(claimed.pk, high.pk)
+        self.assertEqual(tasks.claim_next('w2').pk, low.pk)
+        self.assertIsNone(tasks.claim_next('w3'))
+
+        with self.assertLogs('nhl.tasks', 'WARNING'):
+            self.assertFalse(tasks.run_task(claimed))
+        high.refresh_from_db()
+        self.assertEqual((high.status, high.attempts), (Task.STATUS_QUEUED, 1))
+        self.assertIsNotNone(high.run_after)
+
+        Task.objects.filter(pk=high.pk).update(status=Task.STATUS_RUNNING)
+        with self.assertLogs('nhl.tasks', 'WARNING'):
+            tasks.run_task(Task.objects.get(pk=high.pk))
+        high.refresh_from_db()
+        self.assertEqual((high.status, high.attempts), (Task.STATUS_FAILED, 2))
+        self.assertIn('RuntimeError: boom', high.error)
+
+    @override_settings(TASK_STALE_SECONDS=60)
+    def test_requeue_stale_counts_the_attempt(self):
+        old = timezone.now() - timedelta(seconds=120)
+        first = tasks.enqueue('failing', max_attempts=3)
+        last = tasks.enqueue('failing', max_attempts=3)
+        alive = tasks.enqueue('failing', max_attempts=3)
+        Task.objects.filter(pk__in=[first.pk, last.pk]).update(status=Task.STATUS_RUNNING, heartbeat_at=old)
+        Task.objects.filter(pk=last.pk).update(attempts=2)
+        Task.objects.filter(pk=alive.pk).update(status=Task.STATUS_RUNNING, heartbeat_at=timezone.now())
+
+        self.assertEqual(tasks.requeue_stale(), 2)
+        status = {t.pk: (t.status, t.attempts) for t in Task.objects.all()}
+        self.assertEqual(status, {
+            first.pk: (Task.STATUS_QUEUED, 1), last.pk: (Task.STATUS_FAILED, 3), alive.pk: (Task.STATUS_RUNNING, 0),
+        })
+
+    def test_busy_lock_postpones_without_an_attempt(self):
+        queued = tasks.enqueue('rerun_projections', date='2026-01-07')
+        with locked_elsewhere('fetch_nhl_data'), mock.patch('nhl.tasks.call_command') as command:
+            self.assertIsNone(tasks.run_task(tasks.claim_next('w1')))
+        command.assert_not_called()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.STATUS_QUEUED, 0))
+        self.assertIn('already running', queued.progress_message)
+
+    def test_refused_command_is_not_retried(self):
+        make_rows(2, date='2026-01-06')
+        GameStats.objects.filter(player_id='EDM-2026-01-06-0').update(result_goal='MISS')
+        task_obj = tasks.enqueue('rerun_projections', date='2026-01-06')
+        with self.assertLogs('nhl.tasks', 'WARNING'):
+            self.assertFalse(tasks.run_task(tasks.claim_next('w1')))
+        task_obj.refresh_from_db()
+        self.assertEqual((task_obj.status, task_obj.attempts), (Task.STATUS_FAILED, 1))
+        self.assertIn('already settled', task_obj.error)
+
+
+class TaskHeartbeatTests(TransactionTestCase):
+    """The heartbeat thread writes through its own connection: no test transaction around it."""
+
+    @override_settings(TASK_HEARTBEAT_SECONDS=0.05)
+    def test_silent_task_keeps_beating(self):
+        started = timezone.now() - timedelta(hours=1)
+        task_obj = tasks.enqueue('injury_check')
+        Task.objects.filter(pk=task_obj.pk).update(status=Task.STATUS_RUNNING, heartbeat_at=started)
+        with tasks.heartbeat(task_obj):
+            time.sleep(0.3)
+        self.assertGreater(Task.objects.get(pk=task_obj.pk).heartbeat_at, started)
+
+
+@contextmanager
+def locked_elsewhere(name):
+    """Hold a job's lock from another thread and connection, like another instance would."""
+    acquired, release = threading.Event(), threading.Event()
+
+    def hold():
+        try:
+            with advisory_lock(name):
+                acquired.set()
+                release.wait()
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    acquired.wait()
+    try:
+        yield
+    finally:
+        release.set()
+        thread.join()
+
+
+class SchedulerTests(TestCase):
+    """The ledger is written by a fake call_command, at the scheduler's (fake) clock."""
+
+    def setUp(self):
+        self.clock = timezone.make_aware(datetime(2026, 1, 7, 11, 0))
+        self.outcomes = {}  # job -> status of its next runs (default success)
+        self.ran = []
+        patcher = mock.patch('nhl.scheduler.call_command', side_effect=self.fake_command)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.scheduler = Scheduler(client=object(), now=lambda: self.clock, log=self.ran.append,
+                                   retry_minutes=15, max_attempts=3, dependency_wait_minutes=120)
+
+    def fake_command(self, command, stdout=None):
+        name = command.__module__.rsplit('.', 1)[-1]
+        IngestionRun.objects.create(command=name, started_at=self.clock,
+                                    status=self.outcomes.get(name, IngestionRun.STATUS_SUCCESS))
+
+    def at(self, hour, minute=0):
+        self.clock = self.clock.replace(hour=hour, minute=minute)
+        self.ran.clear()
+        self.scheduler.tick()
+        return [line.split('Running ', 1)[1] for line in self.ran if 'Running ' in line]
+
+    def test_jobs_run_in_order_when_due(self):
+        self.assertEqual(self.at(11), [])
+        self.assertEqual(self.at(12, 5), ['sync_players', 'fetch_game_results'])
+        self.assertEqual(self.at(12, 30), [])
+        self.assertEqual(self.at(16, 1), ['fetch_nhl_data'])
+        self.assertEqual(self.at(16, 45), ['injury_guardian', 'watch_lineups'])
+        self.assertEqual(self.at(17), [])
+
+    def test_failed_dependency_is_retried_then_given_up(self):
+        self.outcomes['fetch_game_results'] = IngestionRun.STATUS_FAILED
+        self.assertEqual(self.at(12), ['sync_players', 'fetch_game_results'])
+        self.assertEqual(self.at(12, 10), [])  # retry delay
+        self.assertEqual(self.at(12, 15), ['fetch_game_results'])
+        self.assertEqual(self.at(12, 30), ['fetch_game_results'])
+        self.assertEqual(self.at(12, 45), [])  # max attempts
+        self.assertEqual(self.at(16), ['fetch_nhl_data without fetch_game_results'])
+
+    def test_hung_dependency_waits_until_the_deadline(self):
+        self.outcomes['fetch_game_results'] = IngestionRun.STATUS_RUNNING
+        self.at(12)
+        with locked_elsewhere('fetch_game_results'):  # still running on another instance
+            self.assertEqual(self.at(16), [])
+            self.assertEqual(self.at(17, 59), [])
+            self.assertEqual(self.at(18), ['fetch_nhl_data without fetch_game_results', 'injury_guardian',
+                                           'watch_lineups'])
+        self.assertEqual(len(attempts_on('fetch_game_results', self.clock.date())), 1)
+
+    def test_skipped_job_is_left_to_its_own_process(self):
+        self.scheduler.skip = frozenset({'watch_lineups'})
+        self.at(12)
+        self.assertEqual(self.at(16, 30), ['fetch_nhl_data', 'injury_guardian'])
+
+        lineups = Scheduler(client=object(), now=lambda: self.clock, log=self.ran.append,
+                            skip=[job.name for job in default_jobs() if job.name != 'watch_lineups'])
+        self.ran.clear()
+        self.assertEqual(lineups.tick(), 1)
+        self.assertEqual(self.ran[0], '[Scheduler] Running watch_lineups')
+        with self.assertRaisesMessage(ValueError, 'Unknown job(s) to skip: nope'):
+            Scheduler(client=object(), skip=['nope'])
+
+    def test_lock_skip_is_not_an_attempt(self):
+        self.clock = self.clock.replace(hour=12)
+        with locked_elsewhere('sync_players'):
+            for _ in range(5):
+                self.clock += timedelta(minutes=15)
+                self.scheduler.tick()
+        self.assertEqual(attempts_on('sync_players', self.clock.date()), [])
+        self.assertFalse(IngestionRun.objects.filter(command='sync_players').exists())
+        self.scheduler.tick()
+        self.assertTrue(IngestionRun.objects.filter(command='sync_players').exists())
+
+    def test_run_scheduler_command(self):
+        self.clock = timezone.localtime()  # the command's scheduler reads the real clock
+        out = io.StringIO()
+        call_command('run_scheduler', '--run', 'injury_guardian', stdout=out)
+        self.assertIn('injury_guardian done.', out.getvalue())
+
+        self.outcomes['injury_guardian'] = IngestionRun.STATUS_FAILED
+        IngestionRun.objects.all().delete()
+        with self.assertRaisesMessage(CommandError, 'injury_guardian failed'):
+            call_command('run_scheduler', '--run', 'injury_guardian', stdout=io.StringIO())
+        with self.assertRaisesMessage(CommandError, "Unknown job 'nope'"):
+            call_command('run_scheduler', '--run', 'nope', stdout=io.StringIO())
+
+        with self.assertRaisesMessage(CommandError, "Unknown job 'nope'"):
+            call_command('run_scheduler', '--once', '--only', 'nope', stdout=io.StringIO())
+
+        out = io.StringIO()
+        call_command('run_scheduler', '--once', '--only', 'watch_lineups', stdout=out)
+        self.assertIn('job(s) started.', out.getvalue())
+        self.assertIn('watch_lineups at', out.getvalue())
+        self.assertNotIn('fetch_nhl_data at', out.getvalue())
+
+
+class SyntheticLakeTests(TestCase):
+    def test_season_shape(self):
+        end = date(2026, 4, 16)
+        rows = list(generate_rows(end, seed=1, today=end))
+        games_per_team = Counter()
+        for row in rows:
+            if row['is_home']:
+                games_per_team.update([row['team'], row['opp']])
+        games_per_team = {team: n // DRESSED for team, n in games_per_team.items()}
+
+        self.assertEqual(len(games_per_team), 32)
+        self.assertTrue(all(81 <= n <= 82 for n in games_per_team.values()))
+        # Skewed scoring: a long tail of likely scorers above a low median
+        probs = sorted(row['python_prob'] for row in rows)
+        self.assertLess(probs[len(probs) // 2], 20)
+        self.assertGreater(probs[int(len(probs) * 0.99)], 40)
+        self.assertEqual({row['result_goal'] for row in rows if row['date'] < '2026-04-16'}, {'HIT', 'MISS', 'INJURED'})
+        self.assertEqual(rows[:50], list(generate_rows(end, seed=1, today=end))[:50])
+
+
+class TemplateEngineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('jinja@cortex.test', 'pw', is_premium=True)
+        make_rows(12)
+        make_rows(12, team='MTL', opp='TOR')
+
+    def test_engines_render_the_same_pages(self):
+        self.client.force_login(self.user)
+        pages = {}
+        for engine in ('django', 'jinja2'):
+            with override_settings(NHL_TEMPLATE_ENGINE=engine):
+                dashboard = self.client.get(reverse('nhl:nhl_dashboard'), secure=True)
+                partial = self.client.get(reverse('nhl:nhl_dashboard'), secure=True, HTTP_HX_REQUEST='true')
+                player = self.client.get(reverse('nhl:player_detail', args=['EDM-2026-01-07-3']), secure=True)
+            self.assertEqual({dashboard.status_code, partial.status_code, player.status_code}, {200})
+            pages[engine] = [normalized(r.content.decode()) for r in (dashboard, partial, player)]
+        self.assertEqual(pages['django'], pages['jinja2'])
+        self.assertIn(f"href=\"{reverse('nhl:player_detail', args=['EDM-2026-01-07-0'])}\"", pages['jinja2'][1])
+        self.assertIn('3,2', pages['jinja2'][2])  # python_vol, localized like floatformat:1
+
+    @override_settings(DASHBOARD_REFRESH_SECONDS=60)
+    def test_live_script_is_for_premium_users_only(self):
+        stream = reverse('nhl:live_stream')
+        free = get_user_model().objects.create_user('free@cortex.test', 'pw')
+        for engine in ('django', 'jinja2'):
+            with override_settings(NHL_TEMPLATE_ENGINE=engine):
+                self.client.logout()
+                self.assertNotIn(stream, self.client.get(reverse('nhl:nhl_dashboard'), secure=True).content.decode())
+                self.client.force_login(free)
+                self.assertNotIn(stream, self.client.get(reverse('nhl:nhl_dashboard'), secure=True).content.decode())
+                self.client.force_login(self.user)
+                page = self.client.get(reverse('nhl:nhl_dashboard'), secure=True).content.decode()
+                self.assertNotIn(stream, page)  # WSGI: the match list reloads instead
+                self.assertIn('hx-trigger="every 60s"', page)
+                with override_settings(LIVE_STREAM_ENABLED=True):
+                    page = self.client.get(reverse('nhl:nhl_dashboard'), secure=True).content.decode()
+                self.assertIn(stream, page)
+                self.assertNotIn('hx-trigger="every 60s"', page)
+
+    def test_fmt_matches_floatformat(self):
+        for value in (None, 0, 35.5, 2.5, 0.45, 120.04, 7.25, -0.4):
+            for digits in (0, 1):
+                self.assertEqual(fmt(value, digits), str(floatformat(value, digits)))
+
+
+class SimulationTests(TestCase):
+    def setUp(self):
+        rows = [
+            {'player_id': f'E{i}', 'team': 'EDM', 'opp': 'VAN', 'is_home': 1, 'python_prob': prob, 'python_vol': 2.5}
+            for i, prob in enumerate((40, 30, 20))
+        ]
+        rows.append({'player_id': 'V0', 'team': 'VAN', 'opp': 'EDM', 'is_home': 0, 'python_prob': 35, 'python_vol': 2.0})
+        self.slate = slate_from_rows(rows)
+
+    def test_goal_marginal_matches_the_pace_mixture(self):
+        # Poisson(lam * pace), pace ~ Gamma(PACE_SHAPE, 1 / PACE_SHAPE): negative binomial
+        lam = self.slate.players['E0'].lam_goal
+        expected = 1 - (1 + lam / PACE_SHAPE) ** -PACE_SHAPE
+        # Goals alone (per-player inversion) and next to an assist leg (team allocation)
+        alone = simulate_parlays(self.slate, [[Leg('E0', 'goal')]], 200_000, seed=3)
+        allocated = simulate_parlays(self.slate, [[Leg('E0', 'goal'), Leg('E1', 'assist')]], 200_000, seed=3)
+        self.assertAlmostEqual(alone.marginals['E0:goal:0.5'], expected, delta=0.005)
+        self.assertAlmostEqual(allocated.marginals['E0:goal:0.5'], expected, delta=0.005)
+
+    def test_nobody_assists_his_own_goal(self):
+        plan = _compile(self.slate, [[Leg('E0', 'point')]])
+        team = plan.teams[0]
+        totals = np.random.default_rng(1).poisson(3.0, size=20_000)
+        goals, assists = _allocate(np.random.default_rng(2), totals, team)
+        # One tracked player: each goal drawn involves him exactly once, scoring or assisting
+        self.assertTrue(np.array_equal(goals[0] + assists[0], totals))
+
+        plan = _compile(self.slate, [[Leg(f'E{i}', 'assist') for i in range(3)]])
+        k = plan.teams[0].n_players
+        for scorer, table in enumerate(plan.teams[0].pair_table):
+            first, second = np.divmod(np.unique(table), k + 1)
+            if scorer < k:
+                self.assertNotIn(scorer, first)
+                self.assertNotIn(scorer, second)
+            self.assertFalse(((first == second) & (first < k)).any())
+
+    def test_teammates_are_correlated_and_seeds_reproducible(self):
+        parlay = [Leg('E0', 'goal'), Leg('E1', 'point'), Leg('E2', 'shot', 1.5)]
+        result = simulate_parlays(self.slate, [parlay], 200_000, seed=7)
+        independent = np.prod([result.marginals[leg.key] for leg in parlay])
+        self.assertGreater(result.parlays[0].probability, independent * 1.05)
+
+        self.assertEqual(simulate_parlays(self.slate, [parlay], 200_000, seed=7).marginals, result.marginals)
+        pooled = simulate_parlays(self.slate, [parlay], 100_000, seed=7, chunk_size=25_000, n_jobs=2)
+        single = simulate_parlays(self.slate, [parlay], 100_000, seed=7, chunk_size=25_000)
+        self.assertEqual(pooled.parlays[0].probability, single.parlays[0].probability)
+
+    def test_shots_include_goals(self):
+        result = simulate_parlays(self.slate, [[Leg('E0', 'goal', 1.5), Leg('E0', 'shot', 1.5)]], 100_000, seed=5)
+        # Two goals are two shots
+        self.assertEqual(result.parlays[0].probability, result.marginals['E0:goal:1.5'])
+
+
+class BankrollTests(TestCase):
+    def test_kelly_only_sizes_goal_picks(self):
+        rows = [
+            ('2026-01-07', 3.0, 50.0, 110.0, True, 'GOAL'),
+            ('2026-01-07', 1.8, 90.0, 120.0, True, 'POINT'),  # python_prob is not this pick's probability
+            ('2026-01-08', 2.5, 20.0, 90.0, False, 'GOAL'),   # no edge
+            ('2026-01-08', 2.2, 60.0, 100.0, False, 'SHOT'),
+        ]
+        history = history_from_rows(rows)
+        self.assertTrue(np.isnan(history.prob[[1, 3]]).all())
+
+        flat, kelly = simulate(history, [Strategy('flat', 1.0), Strategy('kelly', 1.0)], [0], n_boot=0)
+        self.assertEqual(flat.bets, 4)
+        self.assertEqual(flat.profit, 0.8)
+        self.assertEqual(kelly.bets, 1)
+        # f = (b * p - q) / b = (2 * 0.5 - 0.5) / 2, capped at MAX_KELLY_STAKE
+        self.assertEqual(kelly.staked, 25.0)
+        self.assertEqual(kelly.final_bankroll, 150.0)
+
+
+class ExportLakeTests(TestCase):
+    def test_incremental_export_rewrites_the_settlement_window(self):
+        for day in ('2026-01-01', '2026-01-05', '2026-01-06', '2026-01-07'):
+            make_rows(3, date=day)
+        with tempfile.TemporaryDirectory() as root:
+            call_command('export_lake', tables=['data_lake'], root=root, stdout=io.StringIO())
+            self.assertEqual(set(open_table('data_lake', root).read(['result_goal'])['result_goal']), {'2.9'})
+
+            # Settled after the export; a new day arrives
+            GameStats.objects.filter(date__in=['2026-01-01', '2026-01-06']).update(result_goal='HIT')
+            make_rows(2, date='2026-01-08')
+            call_command('export_lake', tables=['data_lake'], root=root, resettle_days=3, stdout=io.StringIO())
+
+            table = open_table('data_lake', root)
+            self.assertEqual([p['date'] for p in table.partitions],
+                             ['2026-01-01', '2026-01-05', '2026-01-06', '2026-01-07', '2026-01-08'])
+            results = {day: set(table.read(['result_goal'], start=day, end=day)['result_goal'])
+                       for day in ('2026-01-01', '2026-01-06', '2026-01-08')}
+            self.assertEqual(results, {'2026-01-01': {'2.9'}, '2026-01-06': {'HIT'}, '2026-01-08': {'2.9'}})
+
+
+class EngineBenchmarkTests(TestCase):
+    def test_cases_and_regression_gate(self):
+        cases = build_cases(50, seed=3)
+        self.assertEqual(set(cases), {
+            'estimate_realistic_odds', 'prob_at_least_1', 'poisson_at_least', 'calculate_hybrid_projection', 'slate',
+            'parlays',
+        })
+        result = time_case(*cases['calculate_hybrid_projection'], repeat=2)
+        self.assertGreater(result.ops_per_sec, 0)
+        # 16 parlays, 100k simulations of the 16-game night: ~0.25 s on the baseline machine
+        self.assertLess(time_case(*cases['parlays'], repeat=1).best_ms, 3000)
+
+        results = {'slate': {'ops_per_sec': 80.0}, 'prob_at_least_1': {'ops_per_sec': 95.0}}
+        baseline = {'slate': {'ops_per_sec': 100.0}, 'prob_at_least_1': {'ops_per_sec': 100.0}}
+        comparison = compare(results, baseline, tolerance=0.15)
+        self.assertTrue(comparison['slate']['regressed'])
+        self.assertFalse(comparison['prob_at_least_1']['regressed'])
+        self.assertEqual(compare(results, {}, tolerance=0.15), {})
+
+
+@override_settings(REPLICA_LAG_CHECK_SECONDS=0, REPLICA_MAX_LAG_SECONDS=30)
+class ReplicaRoutingTests(TestCase):
+    """
+    Primary = the test database, replica = a second SQLite file holding other
+    rows. The replica alias only exists for this class, outside the runner's
+    databases: it is connected up front so the test isolation guard allows it.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.replica_file = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False).name
+        connections.settings['replica'] = dict(
+            connections.settings['default'], NAME=cls.replica_file, CONN_MAX_AGE=None
+        )
+        connections['replica'].connect()
+        with connections['replica'].schema_editor() as editor:
+            editor.create_model(GameStats)
+        GameStats.objects.using('replica').create(
+            player_id='replica-only', team='EDM', opp='VAN', date='2026-01-07', ts=timezone.now(),
+            algo_score_goal=90, python_prob=30,
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        os.unlink(cls.replica_file)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('replica@cortex.test', 'pw', is_premium=True)
+        make_rows(3, team='EDM', opp='VAN')
+
+    def setUp(self):
+        routers.reset_lag_cache()
+        self.client.force_login(self.user)
+
+    def slate_ids(self):
+        response = self.client.get(reverse('nhl:api_slate'), {'date': '2026-01-07'})
+        return [row['player_id'] for row in response.json()['results']]
+
+    def test_read_only_views_use_replica(self):
+        self.assertEqual(self.slate_ids(), ['replica-only'])
+        # Outside decorated views (and for writes) the primary is used.
+        self.assertEqual(GameStats.objects.filter(date='2026-01-07').count(), 3)
+        self.assertEqual(routers.ReplicaRouter().db_for_write(GameStats), 'default')
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with mock.patch.object(routers, 'probe_lag', return_value=120.0):
+            self.assertEqual(len(self.slate_ids()), 3)
+        with mock.patch.object(routers, 'probe_lag', return_value=float('inf')):
+            self.assertEqual(routers.read_alias(), 'default')
+        self.assertEqual(self.slate_ids(), ['replica-only'])
+
+    def test_use_primary(self):
+        @routers.read_from_replica
+        def read():
+            with routers.use_primary():
+                return GameStats.objects.filter(date='2026-01-07').count()
+
+        self.assertEqual(read(), 3)
@@ -1,9 +1,18 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'nhl'
 
 urlpatterns = [
     path('dashboard/', views.dashboard, name='nhl_dashboard'),
     path('player/<str:player_id>/', views.player_detail, name='player_detail'),
+    path('parlay/simulate/', views.parlay_simulator, name='parlay_simulator'),
+    path('export/', views.export_picks, name='export_picks'),
+    path('live/stream/', views.live_stream, name='live_stream'),
+    path('metrics/', views.ingestion_metrics, name='ingestion_metrics'),
+
+    # JSON API (read-only)
+    path('api/slate/', api.slate, name='api_slate'),
+    path('api/matches/<str:date>/<str:team>/<str:opp>/', api.match, name='api_match'),
+    path('api/players/<str:player_id>/history/', api.player_history, name='api_player_history'),
 ]
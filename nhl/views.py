@@ -1,19 +1,88 @@
+import asyncio
+import csv
+import itertools
+import json
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.crypto import constant_time_compare
 from django.shortcuts import render
-from .models import GameStats
+from django.utils import timezone
+from django.views.decorators.http import require_GET, require_POST
+from config.routers import read_alias, read_from_replica
+from core.middleware import timed
+from .cache import adashboard_version, dashboard_key
+from .metrics import render_ingestion_metrics
+from .models import GameStats, LiveEvent, LiveStat
 from .services import calculate_odds
+from .view_models import match_cards, player_page
+from .decorators import premium_required
 from .constants import NHL_TEAMS_FULL_NAMES
 from datetime import datetime, timedelta
 from collections import defaultdict
 
-def dashboard(request):
+
+async def arender(request, template_name, context):
+    """
+    `render` for async views, with the NHL pages' engine
+    (settings.NHL_TEMPLATE_ENGINE). Templates may touch lazy DB-backed
+    objects (request.user in base.html), so rendering runs in a worker thread.
+    """
+    with timed('render'):
+        return await sync_to_async(render)(request, template_name, context, using=settings.NHL_TEMPLATE_ENGINE)
+
+
+@read_from_replica
+async def dashboard(request):
     """
     NHL Dashboard view - Match-based display with Top 5 scorers per game.
     Shows games from 8PM today to 5AM tomorrow.
+    Async: DB reads go through the async ORM (see gunicorn_config.py for ASGI mode).
+    The match cards are cached per team filter and tier until the next
+    dashboard version (nhl.cache).
     """
+    selected_team = request.GET.get('team')
+    user = await request.auser()
+    is_premium = getattr(user, 'is_premium', False)
+
+    cached = None
+    if settings.DASHBOARD_CACHE_SECONDS:
+        key = dashboard_key(await adashboard_version(), selected_team, is_premium)
+        cached = await cache.aget(key)
+    if cached is None:
+        cached = await dashboard_matches(selected_team, is_premium)
+        if settings.DASHBOARD_CACHE_SECONDS:
+            await cache.aset(key, cached, settings.DASHBOARD_CACHE_SECONDS)
+    matches, team_list = cached
+    
+    context = {
+        'matches': matches,
+        'teams': team_list,
+        'selected_team': selected_team,
+        'is_premium': is_premium,
+        # Premium dashboards follow live games over SSE (ASGI), the others reload the list
+        'live_stream': is_premium and settings.LIVE_STREAM_ENABLED,
+        'refresh_seconds': settings.DASHBOARD_REFRESH_SECONDS,
+    }
+    
+    # HTMX Response
+    if request.headers.get('HX-Request'):
+        return await arender(request, 'nhl/partials/_match_list.html', context)
+        
+    return await arender(request, 'nhl/dashboard.html', context)
+
+
+async def dashboard_matches(selected_team, is_premium):
+    """(match cards, team list) of the dashboard, from the rows of the last and next 24h."""
     from django.db.models import Q
     
     # 1. Time Filter - Show recent and upcoming games (last 24h + next 24h)
-    now = datetime.now()
+    now = timezone.now()
     past_window = now - timedelta(hours=24)
     future_window = now + timedelta(hours=24)
     
@@ -27,116 +96,111 @@ def dashboard(request):
     ).order_by('ts', 'team', 'opp')
     
     # Team filter (optional)
-    selected_team = request.GET.get('team')
     if selected_team:
         queryset = queryset.filter(Q(team=selected_team) | Q(opp=selected_team))
     
-    # 2. Group by Match
-    matches = defaultdict(lambda: {
-        'team': None,
-        'opp': None,
-        'time': None,
-        'is_home': None,
-        'scorers': [],  # For goals
-        'playmakers': [],  # For assists (will need python_prob_assist if available)
-        'all_players': []
-    })
+    # Fetch first so the Python grouping below is timed on its own (Server-Timing "group")
+    games = [game async for game in queryset]
+    
+    with timed('group'):
+        # 2. Group by Match
+        matches = defaultdict(lambda: {
+            'team': None,
+            'opp': None,
+            'time': None,
+            'is_home': None,
+            'scorers': [],  # For goals
+            'playmakers': [],  # For assists (will need python_prob_assist if available)
+            'all_players': []
+        })
     
-    for game in queryset:
-        # Create unique match key (normalize team order)
-        teams = tuple(sorted([game.team, game.opp]))
-        match_key = f"{teams[0]}_vs_{teams[1]}_{game.date}"
+        for game in games:
+            # Create unique match key (normalize team order)
+            teams = tuple(sorted([game.team, game.opp]))
+            match_key = f"{teams[0]}_vs_{teams[1]}_{game.date}"
         
-        # Set match info
-        if matches[match_key]['team'] is None:
-            matches[match_key]['team'] = game.team if game.is_home else game.opp
-            matches[match_key]['opp'] = game.opp if game.is_home else game.team
-            matches[match_key]['time'] = game.ts
-            matches[match_key]['is_home'] = game.is_home
+            # Set match info
+            if matches[match_key]['team'] is None:
+                matches[match_key]['team'] = game.team if game.is_home else game.opp
+                matches[match_key]['opp'] = game.opp if game.is_home else game.team
+                matches[match_key]['time'] = game.ts
+                matches[match_key]['is_home'] = game.is_home
         
-        # Add player with calculated fields
-        game.calculated_odds = float(game.result_goal) if game.result_goal and game.result_goal != 'INJURED' else 0.0
+            # Add player with calculated fields
+            # result_goal holds the odds until the game is settled (HIT/MISS, live or next day)
+            game.calculated_odds = game.odds or 0.0
         
-        matches[match_key]['all_players'].append(game)
-        matches[match_key]['scorers'].append(game)  # All players are potential scorers
-        matches[match_key]['playmakers'].append(game)  # Same for assists
-    
-    # 3. Process matches - Top 5 for each category
-    processed_matches = []
-    for match_key, match_data in matches.items():
-        # Sort scorers by python_prob (goal probability)
-        top_scorers = sorted(
-            match_data['scorers'],
-            key=lambda x: x.python_prob if x.python_prob else 0,
-            reverse=True
-        )[:5]
+            matches[match_key]['all_players'].append(game)
+            matches[match_key]['scorers'].append(game)  # All players are potential scorers
+            matches[match_key]['playmakers'].append(game)  # Same for assists
+    
+        # 3. Process matches - Top 5 for each category
+        processed_matches = []
+        for match_key, match_data in matches.items():
+            # Sort scorers by python_prob (goal probability)
+            top_scorers = sorted(
+                match_data['scorers'],
+                key=lambda x: x.python_prob if x.python_prob else 0,
+                reverse=True
+            )[:5]
         
-        # For playmakers, we'll use algo_score_shot as proxy (or same python_prob)
-        # TODO: If you have python_prob_assist, use that instead
-        top_playmakers = sorted(
-            match_data['playmakers'],
-            key=lambda x: x.algo_score_shot if x.algo_score_shot else 0,
-            reverse=True
-        )[:5]
+            # For playmakers, we'll use algo_score_shot as proxy (or same python_prob)
+            # TODO: If you have python_prob_assist, use that instead
+            top_playmakers = sorted(
+                match_data['playmakers'],
+                key=lambda x: x.algo_score_shot if x.algo_score_shot else 0,
+                reverse=True
+            )[:5]
         
-        # Calculate match context (offensive vs defensive)
-        avg_prob = sum(p.python_prob for p in match_data['all_players'] if p.python_prob) / max(len(match_data['all_players']), 1)
-        match_context = "Match Offensif 🔥" if avg_prob > 50 else "Match Fermé 🔒" if avg_prob < 30 else "Match Équilibré ⚖️"
+            # Calculate match context (offensive vs defensive)
+            avg_prob = sum(p.python_prob for p in match_data['all_players'] if p.python_prob) / max(len(match_data['all_players']), 1)
+            match_context = "Match Offensif 🔥" if avg_prob > 50 else "Match Fermé 🔒" if avg_prob < 30 else "Match Équilibré ⚖️"
         
-        processed_matches.append({
-            'team': match_data['team'],
-            'opp': match_data['opp'],
-            'team_full': NHL_TEAMS_FULL_NAMES.get(match_data['team'], match_data['team']),
-            'opp_full': NHL_TEAMS_FULL_NAMES.get(match_data['opp'], match_data['opp']),
-            'time': match_data['time'],
-            'context': match_context,
-            'top_scorers': top_scorers,
-            'top_playmakers': top_playmakers,
-        })
+            processed_matches.append({
+                'team': match_data['team'],
+                'opp': match_data['opp'],
+                'team_full': NHL_TEAMS_FULL_NAMES.get(match_data['team'], match_data['team']),
+                'opp_full': NHL_TEAMS_FULL_NAMES.get(match_data['opp'], match_data['opp']),
+                'time': match_data['time'],
+                'context': match_context,
+                'top_scorers': top_scorers,
+                'top_playmakers': top_playmakers,
+            })
     
-    # Sort matches by time
-    processed_matches.sort(key=lambda x: x['time'] if x['time'] else datetime.min, reverse=True)
+        # Sort matches by time
+        processed_matches.sort(key=lambda x: x['time'] if x['time'] else datetime.min, reverse=True)
     
     # 4. Apply Freemium Logic
-    if not request.user.is_premium:
+    if not is_premium:
         # Free users see only first 2 matches
         processed_matches = processed_matches[:2]
         # And only top 3 instead of top 5
         for match in processed_matches:
             match['top_scorers'] = match['top_scorers'][:3]
             match['top_playmakers'] = match['top_playmakers'][:3]
+
+    with timed('view_model'):
+        matches = match_cards(processed_matches)
     
     # 5. Team list for filter
     teams = GameStats.objects.values_list('team', flat=True).distinct().order_by('team')
     team_list = [{
         'abbreviation': t,
         'full_name': NHL_TEAMS_FULL_NAMES.get(t, t)
-    } for t in teams]
-    
-    context = {
-        'matches': processed_matches,
-        'teams': team_list,
-        'selected_team': selected_team,
-        'is_premium': request.user.is_premium,
-    }
-    
-    # HTMX Response
-    if request.headers.get('HX-Request'):
-        return render(request, 'nhl/partials/_match_list.html', context)
-        
-    return render(request, 'nhl/dashboard.html', context)
+    } async for t in teams]
+
+    return matches, team_list
+
 
-def player_detail(request, player_id):
+@read_from_replica
+async def player_detail(request, player_id):
     """
     Player detailed analysis page with comprehensive CORTEX insights.
     """
-    from django.shortcuts import get_object_or_404
-    
-    # Get the player's most recent game stats
-    game = get_object_or_404(
-        GameStats,
-        player_id=player_id
-    )
+    # Get the player's most recent game stats (data_lake holds one row per player and game)
+    game = await GameStats.objects.filter(player_id=player_id).order_by('-ts').afirst()
+    if game is None:
+        raise Http404("Joueur introuvable")
     
     # Determine risk level
     risk_level = "Faible"
@@ -174,7 +238,7 @@ def player_detail(request, player_id):
         context_text += f"Le score CORTEX de {game.cortex_score}% indique une sous-évaluation majeure par le marché."
     
     context = {
-        'game': game,
+        'player': player_page(game),
         'risk_level': risk_level,
         'risk_color': risk_color,
         'verdict': verdict,
@@ -182,4 +246,264 @@ def player_detail(request, player_id):
         'context_text': context_text,
     }
     
-    return render(request, 'nhl/player_detail.html', context)
+    return await arender(request, 'nhl/player_detail.html', context)
+
+@require_POST
+@premium_required
+def parlay_simulator(request):
+    """
+    Premium: price parlays by Monte Carlo over the current slate.
+
+    Body (JSON):
+        {"parlays": [[{"player_id": "8478402", "market": "goal"},
+                      {"player_id": "8477934", "market": "shot", "line": 2.5}]],
+         "n_sims": 100000, "seed": 42}
+    A single parlay may also be sent as {"legs": [...]}; legs may be
+    "player_id:market[:line]" strings.
+    """
+    # numpy is only needed here: importing it lazily keeps it off cold starts and cron commands
+    from .simulation import DEFAULT_N_SIMS, parse_leg, simulate_parlays, slate_from_rows
+
+    try:
+        payload = json.loads(request.body or b'{}')
+        raw_parlays = payload.get('parlays') or [payload.get('legs') or []]
+        parlays = [[parse_leg(spec) for spec in legs] for legs in raw_parlays]
+        n_sims = int(payload.get('n_sims', DEFAULT_N_SIMS))
+        seed = payload.get('seed')
+        seed = int(seed) if seed is not None else None
+    except (ValueError, TypeError, AttributeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    if not 0 < n_sims <= settings.PARLAY_MAX_SIMULATIONS:
+        return JsonResponse(
+            {'error': f"n_sims doit être entre 1 et {settings.PARLAY_MAX_SIMULATIONS}."}, status=400
+        )
+
+    # Same window as the dashboard; only the teams referenced by the legs are loaded.
+    now = timezone.now()
+    window = GameStats.objects.filter(
+        python_prob__isnull=False,
+        ts__gte=now - timedelta(hours=24),
+        ts__lte=now + timedelta(hours=24),
+    )
+    player_ids = {leg.player_id for legs in parlays for leg in legs}
+    teams = set(window.filter(player_id__in=player_ids).values_list('team', flat=True))
+    rows = window.filter(team__in=teams).order_by('ts').values(
+        'player_id', 'team', 'opp', 'is_home', 'python_prob', 'python_vol'
+    )
+
+    n_jobs = settings.PARLAY_SIM_WORKERS if n_sims > settings.PARLAY_POOL_THRESHOLD else 1
+    try:
+        result = simulate_parlays(slate_from_rows(rows), parlays, n_sims=n_sims, seed=seed, n_jobs=n_jobs)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'n_sims': result.n_sims,
+        'seed': result.seed,
+        'parlays': [{
+            'legs': [leg.key for leg in estimate.legs],
+            'probability': estimate.probability,
+            'stderr': estimate.stderr,
+            'fair_odds': estimate.fair_odds,
+        } for estimate in result.parlays],
+        'marginals': result.marginals,
+    })
+
+EXPORT_FIELDS = [
+    'date', 'ts', 'player_id', 'name', 'team', 'opp', 'is_home',
+    'algo_score_goal', 'algo_score_shot', 'python_prob', 'python_vol',
+    'cortex', 'result_goal', 'result_shot',
+]
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """Pseudo-buffer for csv.writer: returns each row instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _export_format(fmt):
+    """(header lines, row -> line, content type) of an export format."""
+    if fmt == 'ndjson':
+        def line(row):
+            return json.dumps(dict(zip(EXPORT_FIELDS, row)), default=str, ensure_ascii=False) + '\n'
+        return [], line, 'application/x-ndjson'
+    writer = csv.writer(Echo())
+    return [writer.writerow(EXPORT_FIELDS)], writer.writerow, 'text/csv'
+
+
+async def _aexport_lines(header, line, rows):
+    for chunk in header:
+        yield chunk
+    async for row in rows:
+        yield line(tuple(row.values()))
+
+
+@require_GET
+@premium_required
+def export_picks(request):
+    """
+    Premium: bulk export of predictions as CSV or NDJSON.
+
+    Rows are streamed from a `.values_list().iterator()` in fixed-size chunks,
+    so peak memory does not depend on the size of the requested range. Under
+    ASGI the body is an async generator over `.values().aiterator()`: a sync one would
+    be consumed whole before the first byte is sent.
+
+    Query params: format (csv|ndjson), start / end (YYYY-MM-DD), team, min_score.
+    """
+    # Rows are read while streaming, after the view returns: bind the
+    # replica (or the primary if it lags) explicitly instead of via the router.
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return JsonResponse({'error': "format doit être 'csv' ou 'ndjson'."}, status=400)
+
+    queryset = GameStats.objects.using(read_alias()).with_cortex_score()
+    if request.GET.get('start'):
+        queryset = queryset.filter(date__gte=request.GET['start'])
+    if request.GET.get('end'):
+        queryset = queryset.filter(date__lte=request.GET['end'])
+    if request.GET.get('team'):
+        queryset = queryset.filter(team=request.GET['team'])
+    if request.GET.get('min_score'):
+        try:
+            queryset = queryset.filter(cortex__gte=float(request.GET['min_score']))
+        except ValueError:
+            return JsonResponse({'error': 'min_score doit être numérique.'}, status=400)
+
+    queryset = queryset.order_by('date', 'ts', 'player_id')
+    header, line, content_type = _export_format(fmt)
+    if isinstance(request, ASGIRequest):
+        # .values(), not .values_list(): aiterator() creates the iterable in the
+        # event loop, and values_list's runs its query right there.
+        rows = queryset.values(*EXPORT_FIELDS).aiterator(chunk_size=EXPORT_CHUNK_SIZE)
+        content = _aexport_lines(header, line, rows)
+    else:
+        rows = queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        content = itertools.chain(header, map(line, rows))
+
+    response = StreamingHttpResponse(content, content_type=f'{content_type}; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="cortex_picks.{fmt}"'
+    return response
+
+
+# Open SSE streams in this process (see LIVE_STREAM_MAX_CONNECTIONS)
+_live_streams = 0
+_live_streams_lock = threading.Lock()
+
+
+def _reserve_live_stream():
+    """Take a stream slot; False when LIVE_STREAM_MAX_CONNECTIONS are open."""
+    global _live_streams
+    with _live_streams_lock:
+        if _live_streams >= settings.LIVE_STREAM_MAX_CONNECTIONS:
+            return False
+        _live_streams += 1
+        return True
+
+
+def _release_live_stream():
+    global _live_streams
+    with _live_streams_lock:
+        _live_streams -= 1
+
+
+def _sse_event(event_id, payload):
+    return f'id: {event_id}\nevent: diff\ndata: {json.dumps(payload, separators=(",", ":"))}\n\n'
+
+
+def _sse_lines(lines):
+    # No id: a reconnecting EventSource keeps resuming from the last diff
+    return f'event: lines\ndata: {json.dumps(lines, separators=(",", ":"))}\n\n'
+
+
+def _live_lines_queryset():
+    """The running lines (LiveStat) of the last 24h, sent first to a fresh connection."""
+    return LiveStat.objects.filter(
+        updated_at__gte=timezone.now() - timedelta(hours=24)
+    ).values_list('player_id', 'goals', 'assists', 'shots')
+
+
+async def _live_events(last_id, lines=False):
+    """Stream body: a coroutine, no thread held between polls."""
+    try:
+        yield 'retry: 5000\n\n'
+        if lines:
+            yield _sse_lines({pid: [g, a, s] async for pid, g, a, s in _live_lines_queryset()})
+        deadline = time.monotonic() + settings.LIVE_STREAM_MAX_SECONDS
+        idle = 0.0
+        while True:
+            batch = [
+                row async for row in
+                LiveEvent.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'payload')[:100]
+            ]
+            for event_id, payload in batch:
+                last_id = event_id
+                yield _sse_event(event_id, payload)
+            if batch:
+                idle = 0.0
+            else:
+                idle += settings.LIVE_STREAM_POLL_SECONDS
+                if idle >= 15:
+                    yield ': keep-alive\n\n'
+                    idle = 0.0
+            if time.monotonic() >= deadline:
+                return
+            await asyncio.sleep(settings.LIVE_STREAM_POLL_SECONDS)
+    finally:
+        _release_live_stream()
+
+
+@premium_required
+async def live_stream(request):
+    """
+    Server-Sent Events stream of live game diffs (see nhl.live), for premium users.
+
+    Each LiveEvent is sent once, with its id as the SSE id, so a reconnecting
+    EventSource resumes from Last-Event-ID. A fresh connection starts at the
+    latest event instead of replaying the backlog, after a `lines` event
+    with the current running lines (LiveStat). Connections are closed after
+    LIVE_STREAM_MAX_SECONDS; browsers reconnect.
+
+    Served under ASGI only (LIVE_STREAM_ENABLED): a WSGI body would hold a
+    thread and its DB connection per open stream, so there the endpoint is a
+    404 and the dashboard doesn't subscribe. At most
+    LIVE_STREAM_MAX_CONNECTIONS streams are open per process. The slot is
+    taken here and released when the body ends. Over the cap, the answer is
+    still a (closed) event stream with a `retry:` delay: EventSource gives
+    up for good on any other response.
+    """
+    if not settings.LIVE_STREAM_ENABLED:
+        raise Http404('Live stream is served under ASGI only')
+
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_id')
+    try:
+        last_id, lines = int(last_id), False
+    except (TypeError, ValueError):
+        last_id, lines = (await LiveEvent.objects.aaggregate(last=Max('id')))['last'] or 0, True
+
+    if not _reserve_live_stream():
+        response = HttpResponse(f'retry: {settings.LIVE_STREAM_BUSY_RETRY_MS}\n\n', content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    response = StreamingHttpResponse(_live_events(last_id, lines), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+def ingestion_metrics(request):
+    """
+    Prometheus scrape endpoint for the ingestion ledger (see nhl.metrics).
+    Accepts `Authorization: Bearer <METRICS_TOKEN>` or a staff session.
+    """
+    auth = request.headers.get('Authorization', '')
+    token_ok = bool(settings.METRICS_TOKEN) and constant_time_compare(auth, f'Bearer {settings.METRICS_TOKEN}')
+    if not token_ok and not request.user.is_staff:
+        return HttpResponse('Forbidden\n', status=403, content_type='text/plain')
+    return HttpResponse(render_ingestion_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')